@@ -16,6 +16,9 @@ from dataclasses import dataclass
 from datetime import datetime, time
 from typing import List, Optional, Set
 
+from log_io import open_log
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set
+
 
 DELAY_WEIGHT_RE = re.compile(
     r"^(?:\d+:)?\s*(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?"
@@ -28,9 +31,6 @@ DELAY_WEIGHT_RE = re.compile(
     re.IGNORECASE,
 )
 
-UE_FLAG_NAMES = ("ue0", "ue1", "ue2", "ue3")
-
-
 @dataclass
 class Row:
     ts: datetime
@@ -68,27 +68,15 @@ def row_passes_start(
     return r.ts >= start_abs
 
 
-def resolve_ue_set(args: argparse.Namespace) -> Set[int]:
-    selected: Set[int] = set()
-    for name in UE_FLAG_NAMES:
-        if getattr(args, name, False):
-            selected.add(int(name[2:]))
-    if selected:
-        return selected
-    if args.ue is not None:
-        return {args.ue}
-    return {0}
-
-
-def parse_log(path: str, ue_filter: Set[int]) -> List[Row]:
+def parse_log(path: str, ue_filter: Optional[Set[int]]) -> List[Row]:
     rows: List[Row] = []
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(path) as f:
         for raw in f:
             m = DELAY_WEIGHT_RE.search(raw)
             if not m:
                 continue
             ue = int(m.group("ue"))
-            if ue not in ue_filter:
+            if ue_filter is not None and ue not in ue_filter:
                 continue
             rows.append(
                 Row(
@@ -106,9 +94,7 @@ def main() -> int:
         description="Extract time + hol_delay_ms from [DELAY-WEIGHT] scheduler logs."
     )
     ap.add_argument("log_file", help="gnb.log or: grep DELAY-WEIGHT gnb.log | grep UE0")
-    ap.add_argument("--ue", type=int, default=None, help="UE index filter (default UE0)")
-    for name in UE_FLAG_NAMES:
-        ap.add_argument(f"--{name}", action="store_true", help=f"Include UE{int(name[2:])}")
+    add_ue_args(ap, default=0, legacy_flags=True)
     ap.add_argument("--start-time", type=str, default=None)
     ap.add_argument("--match-time-of-day", action="store_true")
     ap.add_argument("--relative-time", action="store_true")
@@ -118,8 +104,7 @@ def main() -> int:
     ue_set = resolve_ue_set(args)
     rows = parse_log(args.log_file, ue_set)
     if not rows:
-        ue_list = ",".join(f"UE{u}" for u in sorted(ue_set))
-        print(f"No [DELAY-WEIGHT] lines found for {ue_list}.", file=sys.stderr)
+        print(f"No [DELAY-WEIGHT] lines found for {format_ue_set(ue_set)}.", file=sys.stderr)
         print('  grep "DELAY-WEIGHT" gnb.log | grep "UE0" > hol_delay.log', file=sys.stderr)
         return 1
 
@@ -134,9 +119,10 @@ def main() -> int:
             return 1
         rows = filtered
 
+    multi_ue = is_multi_ue(ue_set)
     if args.header:
         ts_col = "rel_time_s" if args.relative_time else "timestamp"
-        print(f"{ts_col},hol_delay_ms")
+        print(f"{ts_col},ue,hol_delay_ms" if multi_ue else f"{ts_col},hol_delay_ms")
 
     base_ts = rows[0].ts
     for r in rows:
@@ -144,7 +130,10 @@ def main() -> int:
             ts_field = f"{(r.ts - base_ts).total_seconds():.6f}"
         else:
             ts_field = r.ts.strftime("%Y-%m-%dT%H:%M:%S.%f")
-        print(f"{ts_field},{r.hol_delay_ms:.3f}")
+        if multi_ue:
+            print(f"{ts_field},{r.ue},{r.hol_delay_ms:.3f}")
+        else:
+            print(f"{ts_field},{r.hol_delay_ms:.3f}")
 
     return 0
 
@@ -1,38 +1,238 @@
-import re, datetime as dt, collections, sys, pathlib
+#!/usr/bin/env python3
+"""
+srsUE PRB trace: granted PRBs per time bin from UE logs, DL and UL apart.
 
-logfile = pathlib.Path("ue1.log")
+  "2025-12-01T03:43:28.262564 ... PDSCH: ... rnti=0x4601, prb=(0,2) ..."
 
-# 정규식: ISO 시각 + prb=(a,b)
-# 예: "2025-12-01T03:43:28.262564 ... prb=(0, 2) ..."
-pat = re.compile(
-    r'^(?P<ts>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)\.\d+.*?prb=\((\d+),(\d+)\)'
+Bins are integer microseconds on the wall clock (bin = ts_us // bin_us), so
+every log lands on the same grid without a shared base, and 1000 ms bins are
+the whole seconds the old per-second counter used. PRBs of a grant are
+b - a as before. Several UE logs are read in worker processes (-j).
+
+With --gnb, the gNB PDSCH/PUSCH grants (the lines parse_prb_bandwidth_log in
+bandwidth(GBR).py reads; parsed with prb_bitmap.parse_grants) of each UE's
+RNTI are counted on the same grid, and missed_* = gNB grants the UE log does
+not show in that bin. The RNTI of a UE log is the one most of its lines
+carry, or --rnti (one per log, in order).
+
+  python3 Summarize_PRB.py                                  # ue1.log, 1 s bins
+  python3 Summarize_PRB.py ue1.log ue2.log ue3.log --bin-ms 100 --relative-time -j 3
+  python3 Summarize_PRB.py ue1.log --gnb gnb.log --bin-ms 10 > ue1_prb.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from log_io import open_log
+from prb_bitmap import parse_grants
+from rle_series import dt_to_us, us_to_dt
+
+UE_PRB_RE = re.compile(
+    r"^(?:\d+:)?\s*(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?prb=\((?P<a>\d+),\s*(?P<b>\d+)\)"
 )
+RNTI_RE = re.compile(r"rnti=(0x[0-9a-fA-F]+)")
+DIRECTIONS = ("dl", "ul")
+
 
-per_sec = collections.Counter()
+@dataclass
+class PrbBins:
+    """grants / PRBs per (direction, bin index) of one source."""
 
-with logfile.open() as f:
-    for line in f:
-        m = pat.search(line)
-        if not m:
+    label: str
+    bins: Dict[Tuple[str, int], List[int]] = field(default_factory=dict)  # -> [grants, prbs]
+    rntis: Counter = field(default_factory=Counter)
+    lines: int = 0
+    other: int = 0  # prb=(a,b) lines that are neither PDSCH nor PUSCH
+
+    def add(self, direction: str, idx: int, prbs: int) -> None:
+        b = self.bins.get((direction, idx))
+        if b is None:
+            self.bins[(direction, idx)] = [1, prbs]
+        else:
+            b[0] += 1
+            b[1] += prbs
+
+    @property
+    def rnti(self) -> Optional[str]:
+        return self.rntis.most_common(1)[0][0] if self.rntis else None
+
+
+def summarize_ue_log(path: str, bin_us: int) -> PrbBins:
+    """One srsUE log (runs in a worker process)."""
+    out = PrbBins(Path(path).name.split(".")[0])
+    ts_key: Optional[str] = None
+    ts_us = 0
+    with open_log(path) as f:
+        for line in f:
+            if "prb=(" not in line:
+                continue
+            m = UE_PRB_RE.search(line)
+            if not m:
+                continue
+            head = line[: m.start("a")]
+            if "PDSCH" in head:
+                direction = "dl"
+            elif "PUSCH" in head:
+                direction = "ul"
+            else:
+                out.other += 1
+                continue
+            ts = m.group("ts")
+            if ts != ts_key:
+                ts_key, ts_us = ts, dt_to_us(datetime.fromisoformat(ts))
+            r = RNTI_RE.search(line)
+            if r:
+                out.rntis[r.group(1).lower()] += 1
+            out.lines += 1
+            out.add(direction, ts_us // bin_us, int(m.group("b")) - int(m.group("a")))
+    return out
+
+
+def gnb_bins_by_rnti(gnb_log: str, rntis: List[str], bin_us: int) -> Dict[str, PrbBins]:
+    """gNB PDSCH/PUSCH grants of the given RNTIs on the same grid (PRBs = prb_end - prb_start)."""
+    out = {r: PrbBins(f"gnb:{r}") for r in rntis}
+    for g in parse_grants(gnb_log):
+        b = out.get(g.rnti)
+        if b is None:
             continue
-        
-        ts_str, a, b = m.group('ts'), int(m.group(2)), int(m.group(3))
-        ts = dt.datetime.fromisoformat(ts_str)
-        bucket = ts.replace(microsecond=0)  # 1초 단위
-        per_sec[bucket] += (b - a)
-
-# 원하는 구간 슬라이싱
-# start = dt.datetime.fromisoformat('2025-12-01T03:43:15')
-# end   = dt.datetime.fromisoformat('2025-12-01T03:43:54')
-
-# 첫 번째 시간을 기준으로 상대 시간 계산
-sorted_times = sorted(per_sec)
-if sorted_times:
-    first_time = sorted_times[0]
-    
-    for t in sorted_times:
-        # if start <= t <= end:  # 구간 필터링 (필요하면 주석 해제)
-        elapsed_seconds = int((t - first_time).total_seconds())
-        prb_count = per_sec[t]
-        print(f"{elapsed_seconds:>4}초", f"{prb_count:>4} PRB")
+        b.lines += 1
+        b.add(g.channel, g.ts_us // bin_us, g.prb1 - g.prb0)
+    return out
+
+
+def ue_labels(paths: List[str]) -> List[str]:
+    """Label per UE log: its name up to the first dot, or, when two logs share
+    that (run1/ue1.log, run2/ue1.log), the path below their common parent
+    (run1/ue1); still equal (the same log twice) -> prefixed with its index."""
+    labels = [Path(p).name.split(".")[0] for p in paths]
+    if len(set(labels)) == len(labels):
+        return labels
+    full = [os.path.abspath(p) for p in paths]
+    common = os.path.commonpath([os.path.dirname(p) for p in full])
+    labels = [Path(os.path.relpath(p, common)).with_name(lab).as_posix() for p, lab in zip(full, labels)]
+    if len(set(labels)) == len(labels):
+        return labels
+    return [f"{i}:{lab}" for i, lab in enumerate(labels, 1)]
+
+
+def _row_counts(src: Optional[PrbBins], direction: str, idx: int) -> List[int]:
+    if src is None:
+        return [0, 0]
+    return src.bins.get((direction, idx), [0, 0])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="srsUE PRB grants per time bin (DL/UL), optional gNB cross-check.")
+    ap.add_argument("ue_logs", nargs="*", default=["ue1.log"], help="srsUE log(s) (default: ue1.log)")
+    ap.add_argument("--bin-ms", type=float, default=1000.0, help="bin width in ms (default: 1000)")
+    ap.add_argument("--gnb", default=None, help="gnb.log: count the gNB PDSCH/PUSCH grants of each UE's RNTI")
+    ap.add_argument("--rnti", default=None, help="comma-separated RNTI per UE log (default: most common in log)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("--relative-time", action="store_true", help="seconds from the first bin of any log")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    bin_us = round(args.bin_ms * 1000)
+    if bin_us <= 0:
+        print("ERROR: --bin-ms must be > 0", file=sys.stderr)
+        return 2
+    if args.jobs < 1:
+        print("ERROR: --jobs must be >= 1", file=sys.stderr)
+        return 2
+    rnti_arg = [r.strip().lower() for r in args.rnti.split(",")] if args.rnti else None
+    if rnti_arg is not None and len(rnti_arg) != len(args.ue_logs):
+        print("ERROR: --rnti needs one RNTI per UE log", file=sys.stderr)
+        return 2
+
+    try:
+        if args.jobs == 1 or len(args.ue_logs) == 1:
+            ues = [summarize_ue_log(p, bin_us) for p in args.ue_logs]
+        else:
+            with ProcessPoolExecutor(max_workers=min(args.jobs, len(args.ue_logs))) as pool:
+                futures = [pool.submit(summarize_ue_log, p, bin_us) for p in args.ue_logs]
+                ues = [f.result() for f in futures]
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    for u, label in zip(ues, ue_labels(args.ue_logs)):
+        u.label = label
+    if not any(u.bins for u in ues):
+        print("No PDSCH/PUSCH prb=(a,b) lines in " + ", ".join(args.ue_logs), file=sys.stderr)
+        return 1
+
+    rntis = rnti_arg or [u.rnti for u in ues]
+    gnb: Dict[str, PrbBins] = {}
+    if args.gnb is not None:
+        missing = [u.label for u, r in zip(ues, rntis) if r is None]
+        if missing:
+            print(f"ERROR: no rnti= in {', '.join(missing)}; give --rnti", file=sys.stderr)
+            return 2
+        try:
+            gnb = gnb_bins_by_rnti(args.gnb, [r for r in rntis if r], bin_us)
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+
+    multi = len(ues) > 1
+    all_idx = {idx for u in ues for _, idx in u.bins}
+    for g in gnb.values():
+        all_idx.update(idx for _, idx in g.bins)
+    first_idx = min(all_idx)
+
+    if not args.no_header:
+        cols = ["rel_time_s" if args.relative_time else "timestamp"]
+        if multi:
+            cols.append("ue")
+        cols += ["dl_grants", "dl_prb", "ul_grants", "ul_prb"]
+        if gnb:
+            cols += ["gnb_dl_grants", "gnb_dl_prb", "missed_dl", "gnb_ul_grants", "gnb_ul_prb", "missed_ul"]
+        print(",".join(cols))
+
+    missed_tot: Dict[str, Dict[str, List[int]]] = {}
+    for u, rnti in zip(ues, rntis):
+        g = gnb.get(rnti) if rnti else None
+        idxs = sorted({idx for _, idx in u.bins} | ({idx for _, idx in g.bins} if g else set()))
+        tot = missed_tot[u.label] = {d: [0, 0] for d in DIRECTIONS}  # direction -> [gnb grants, missed]
+        for idx in idxs:
+            if args.relative_time:
+                t = f"{(idx - first_idx) * bin_us / 1e6:.6f}"
+            else:
+                t = us_to_dt(idx * bin_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+            vals = [t] + ([u.label] if multi else [])
+            for d in DIRECTIONS:
+                vals += map(str, _row_counts(u, d, idx))
+            if gnb:
+                for d in DIRECTIONS:
+                    ue_grants = _row_counts(u, d, idx)[0]
+                    g_grants, g_prb = _row_counts(g, d, idx)
+                    missed = max(0, g_grants - ue_grants)
+                    tot[d][0] += g_grants
+                    tot[d][1] += missed
+                    vals += [str(g_grants), str(g_prb), str(missed)]
+            print(",".join(vals))
+
+    for u, rnti in zip(ues, rntis):
+        dl = sum(b[1] for (d, _), b in u.bins.items() if d == "dl")
+        ul = sum(b[1] for (d, _), b in u.bins.items() if d == "ul")
+        msg = f"# {u.label}: rnti={rnti} lines={u.lines} other={u.other} dl_prb={dl} ul_prb={ul}"
+        if gnb:
+            for d in DIRECTIONS:
+                g_grants, missed = missed_tot[u.label][d]
+                ratio = missed / g_grants if g_grants else 0.0
+                msg += f" gnb_{d}_grants={g_grants} missed_{d}={missed} ({ratio:.2%})"
+        print(msg, file=sys.stderr)
+    return 0
+
 
+if __name__ == "__main__":
+    raise SystemExit(main())
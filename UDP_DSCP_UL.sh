@@ -134,6 +134,14 @@ start_dscp_wallclock_monitor() {
     stop_dscp_wallclock_monitor 2>/dev/null || true
     : >"$out"
     printf '%s\n' '# wall_time,dscp' >>"$out"
+    # Python monitor (inotify, clock_gettime_ns at read time, no fork per line).
+    # DSCP_WALLCLOCK_PY=0 -> legacy tail -F | while read loop below.
+    if [ "${DSCP_WALLCLOCK_PY:-1}" = "1" ] && command -v python3 >/dev/null 2>&1 \
+        && [ -f "$SCRIPT_DIR/dscp_wallclock_monitor.py" ]; then
+        python3 "$SCRIPT_DIR/dscp_wallclock_monitor.py" "$iperf_log" -o "$out" &
+        DSCP_WALLCLOCK_PID=$!
+        return 0
+    fi
     (
         while [ ! -f "$iperf_log" ]; do sleep 0.05; done
         tail -n 0 -F "$iperf_log" 2>/dev/null | while IFS= read -r line; do
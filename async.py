@@ -10,6 +10,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import List
 
+from log_io import open_log
+from table_io import Column, TableWriter, add_format_args
+
 
 LINE_RE = re.compile(
     r"\[(?P<wall>[^\]]+)\].*?transition#(?P<idx>\d+).*?5QI=(?P<q>\d+).*?(?P<action>전송|성공|실패)\s+\((?P<tag>async dispatch|async)\)",
@@ -38,7 +41,7 @@ def parse_wall_time(value: str) -> datetime:
 def parse_log(path: str) -> List[EventRow]:
     rows: List[EventRow] = []
 
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(path) as f:
         for raw in f:
             line = raw.strip()
             m = LINE_RE.search(line)
@@ -75,6 +78,7 @@ def main() -> int:
         action="store_true",
         help="Output relative seconds from first matched row time",
     )
+    add_format_args(ap)
     args = ap.parse_args()
 
     rows = parse_log(args.log_file)
@@ -84,21 +88,23 @@ def main() -> int:
 
     if args.relative_time:
         base = parse_wall_time(rows[0].wall)
-        print("rel_time_s,transition,5qi,status")
+        t_col = Column("rel_time_s", "%.6f")
     else:
-        print("time,transition,5qi,status")
-
-    for r in rows:
-        status_en = {"전송": "dispatch", "성공": "success", "실패": "fail"}.get(
-            r.status, r.status
-        )
-        if args.mode != "all" and status_en != args.mode:
-            continue
-        if args.relative_time:
-            rel = (parse_wall_time(r.wall) - base).total_seconds()
-            print(f"{rel:.6f},{r.transition},{r.five_qi},{status_en}")
-        else:
-            print(f"{r.wall},{r.transition},{r.five_qi},{status_en}")
+        t_col = Column("time")
+    columns = [t_col, Column("transition", "%d"), Column("5qi", "%d"), Column("status")]
+
+    with TableWriter(columns, args.format) as out:
+        for r in rows:
+            status_en = {"전송": "dispatch", "성공": "success", "실패": "fail"}.get(
+                r.status, r.status
+            )
+            if args.mode != "all" and status_en != args.mode:
+                continue
+            if args.relative_time:
+                rel = (parse_wall_time(r.wall) - base).total_seconds()
+                out.row(rel, r.transition, r.five_qi, status_en)
+            else:
+                out.row(r.wall, r.transition, r.five_qi, status_en)
 
     return 0
 
@@ -10,6 +10,8 @@ from collections import defaultdict, Counter
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from profiling import count, profile_session, stage
+
 # PRB당 대역폭 계산 (kHz 단위)
 # PRB당 대역폭 = 12 subcarriers × SCS (kHz)
 # 예: SCS 15kHz → 12 × 15 = 180 kHz = 0.18 MHz
@@ -210,6 +212,7 @@ def parse_prb_bandwidth_log(log_file: str, scs_khz: Optional[int] = None) -> Dic
         r'(?:\s+mod=(\w+))?'
     )
     
+    line_num = 0
     try:
         with open(log_file, 'r', encoding='utf-8') as f:
             for line_num, line in enumerate(f, 1):
@@ -291,6 +294,8 @@ def parse_prb_bandwidth_log(log_file: str, scs_khz: Optional[int] = None) -> Dic
                         'raw_line': line.strip()
                     }
                     result['pusch'][rnti].append(entry)
+        count("lines", line_num)
+        count("parsed", sum(len(v) for ch in result.values() for v in ch.values()))
     except FileNotFoundError:
         print(f"Error: 파일 '{log_file}'을 찾을 수 없습니다.")
         sys.exit(1)
@@ -805,6 +810,9 @@ def main():
     channel_type = None
     scs_khz = None
     bwp_prb = 52  # 기본값: 일반적인 BWP 크기
+    profile = False
+    profile_json = None
+    profile_dump = None
     
     # 명령줄 인자 파싱
     i = 1
@@ -821,6 +829,15 @@ def main():
         elif sys.argv[i] == '--bwp-prb' and i + 1 < len(sys.argv):
             bwp_prb = int(sys.argv[i + 1])
             i += 2
+        elif sys.argv[i] == '--profile':
+            profile = True
+            i += 1
+        elif sys.argv[i] == '--profile-json' and i + 1 < len(sys.argv):
+            profile_json = sys.argv[i + 1]
+            i += 2
+        elif sys.argv[i] == '--profile-dump' and i + 1 < len(sys.argv):
+            profile_dump = sys.argv[i + 1]
+            i += 2
         elif sys.argv[i].startswith('--'):
             # 알 수 없는 옵션은 건너뛰기
             i += 1
@@ -832,65 +849,71 @@ def main():
     # 로그 파일이 지정되지 않았으면 기본값 사용
     if log_file == default_log_file and len(sys.argv) == 1:
         print(f"로그 파일이 지정되지 않았습니다. 기본값 '{default_log_file}'을 사용합니다.")
-        print("사용법: python3 extract_ue_bandwidth.py [log_file] [--ue <ue_index>] [--channel <pdsch|pusch>] [--scs <kHz>] [--bwp-prb <prb_count>]")
+        print("사용법: python3 extract_ue_bandwidth.py [log_file] [--ue <ue_index>] [--channel <pdsch|pusch>] [--scs <kHz>] [--bwp-prb <prb_count>] [--profile] [--profile-json <path>] [--profile-dump <path>]")
         print(f"예시: python3 extract_ue_bandwidth.py {default_log_file}")
         print(f"예시: python3 extract_ue_bandwidth.py {default_log_file} --ue 0 --channel pdsch")
         print(f"예시: python3 extract_ue_bandwidth.py {default_log_file} --bwp-prb 52")
         print()
     
-    # BWP PRB 자동 추론 (명시적으로 지정되지 않은 경우)
-    if bwp_prb == 52:  # 기본값인 경우에만 추론 시도
-        print("\n[BWP PRB 자동 추론 시도 중...]")
-        inferred_bwp = infer_bwp_prb_from_log(log_file)
-        if inferred_bwp is not None:
-            bwp_prb = inferred_bwp
-            print(f"✓ 로그에서 BWP PRB 크기를 추론했습니다: {bwp_prb} PRB\n")
-        else:
-            print(f"⚠ Warning: 로그에서 BWP PRB 크기를 추론할 수 없습니다.")
-            print(f"  기본값 {bwp_prb} PRB를 사용합니다.")
-            print(f"  만약 밴드위드가 너무 작게 나온다면, --bwp-prb 옵션으로 실제 값을 지정하세요.\n")
-    
-    # 데이터 파싱
-    print(f"로그 파일 파싱 중: {log_file}")
-    bandwidth_data = parse_prb_bandwidth_log(log_file, scs_khz)
-    
-    # RNTI → UE 매핑 (고정값 사용)
-    rnti_ue_map = get_rnti_to_ue_mapping()
-    print("RNTI → UE 인덱스 매핑 (고정값):")
-    for rnti, ue_idx_mapped in sorted(rnti_ue_map.items()):
-        print(f"  RNTI {rnti} → UE{ue_idx_mapped}")
-    print()
+    # --profile / --profile-json / --profile-dump: 단계별 시간 (profiling.py)
+    with profile_session(profile, profile_json, profile_dump):
+        # BWP PRB 자동 추론 (명시적으로 지정되지 않은 경우)
+        if bwp_prb == 52:  # 기본값인 경우에만 추론 시도
+            print("\n[BWP PRB 자동 추론 시도 중...]")
+            with stage("infer-bwp"):
+                inferred_bwp = infer_bwp_prb_from_log(log_file)
+            if inferred_bwp is not None:
+                bwp_prb = inferred_bwp
+                print(f"✓ 로그에서 BWP PRB 크기를 추론했습니다: {bwp_prb} PRB\n")
+            else:
+                print(f"⚠ Warning: 로그에서 BWP PRB 크기를 추론할 수 없습니다.")
+                print(f"  기본값 {bwp_prb} PRB를 사용합니다.")
+                print(f"  만약 밴드위드가 너무 작게 나온다면, --bwp-prb 옵션으로 실제 값을 지정하세요.\n")
+    
+        # 데이터 파싱
+        print(f"로그 파일 파싱 중: {log_file}")
+        with stage("read"):
+            bandwidth_data = parse_prb_bandwidth_log(log_file, scs_khz)
+    
+        # RNTI → UE 매핑 (고정값 사용)
+        rnti_ue_map = get_rnti_to_ue_mapping()
+        print("RNTI → UE 인덱스 매핑 (고정값):")
+        for rnti, ue_idx_mapped in sorted(rnti_ue_map.items()):
+            print(f"  RNTI {rnti} → UE{ue_idx_mapped}")
+        print()
     
-    # SCS 추출 (calculate_bandwidth_per_second에서 사용)
-    if scs_khz is None:
-        scs_khz = parse_scs_from_log(log_file)
+        # SCS 추출 (calculate_bandwidth_per_second에서 사용)
         if scs_khz is None:
-            scs_khz = 15  # 기본값
-    
-    print(f"BWP 설정: {bwp_prb} PRB, SCS: {scs_khz} kHz")
-    
-    # BWP 전체 대역폭 계산 및 출력
-    prb_bandwidth_mhz = (12 * scs_khz) / 1000.0
-    prb_bandwidth_hz = prb_bandwidth_mhz * 1000000.0
-    bwp_total_bw_mhz = bwp_prb * prb_bandwidth_mhz
-    bwp_total_bw_hz = bwp_total_bw_mhz * 1000000.0
-    print(f"BWP 전체 대역폭: {bwp_total_bw_mhz:.3f} MHz ({bwp_total_bw_hz:.0f} Hz)")
-    print(f"  계산: {bwp_prb} PRB × {prb_bandwidth_mhz:.3f} MHz/PRB = {bwp_total_bw_mhz:.3f} MHz")
-    print()
+            scs_khz = parse_scs_from_log(log_file)
+            if scs_khz is None:
+                scs_khz = 15  # 기본값
+    
+        print(f"BWP 설정: {bwp_prb} PRB, SCS: {scs_khz} kHz")
+    
+        # BWP 전체 대역폭 계산 및 출력
+        prb_bandwidth_mhz = (12 * scs_khz) / 1000.0
+        prb_bandwidth_hz = prb_bandwidth_mhz * 1000000.0
+        bwp_total_bw_mhz = bwp_prb * prb_bandwidth_mhz
+        bwp_total_bw_hz = bwp_total_bw_mhz * 1000000.0
+        print(f"BWP 전체 대역폭: {bwp_total_bw_mhz:.3f} MHz ({bwp_total_bw_hz:.0f} Hz)")
+        print(f"  계산: {bwp_prb} PRB × {prb_bandwidth_mhz:.3f} MHz/PRB = {bwp_total_bw_mhz:.3f} MHz")
+        print()
     
-    # 자원 점유 계산
-    print("자원 점유 계산 중...")
-    bandwidth_per_sec = calculate_bandwidth_per_second(bandwidth_data, rnti_ue_map, scs_khz, bwp_prb)
-    print()
+        # 자원 점유 계산
+        print("자원 점유 계산 중...")
+        with stage("bin"):
+            bandwidth_per_sec = calculate_bandwidth_per_second(bandwidth_data, rnti_ue_map, scs_khz, bwp_prb)
+        print()
     
-    # 요약 출력
-    print_bandwidth_summary(bandwidth_per_sec)
+        with stage("write"):
+            # 요약 출력
+            print_bandwidth_summary(bandwidth_per_sec)
     
-    # 상세 출력 (항상 출력)
-    print("\n" + "=" * 100)
-    print("상세 정보 (자원 점유)")
-    print("=" * 100)
-    print_bandwidth_detailed_per_sec(bandwidth_per_sec, ue_idx)
+            # 상세 출력 (항상 출력)
+            print("\n" + "=" * 100)
+            print("상세 정보 (자원 점유)")
+            print("=" * 100)
+            print_bandwidth_detailed_per_sec(bandwidth_per_sec, ue_idx)
 
 if __name__ == '__main__':
     main()
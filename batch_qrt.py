@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Batch QRT over many runs: extraction + matching per run in worker processes.
+
+Runs come from a directory (one sub-directory per run) or a catalog query
+(run_catalog.py). Per run, the inputs of the selected --signal mode are looked up
+by role; a missing CSV is extracted from the raw log with the usual extractor
+(same commands as the manual pipeline), then matched with compute_qrt.py.
+
+Run directory layout (any subset; CSV names are the compute_qrt.py defaults):
+  <run>/pcf.txt  upf.txt  iperf.txt  ul.txt  ul_ue.txt  ul_gnb.txt  prio.txt
+  <run>/gnb.log  pcfd.log  upfd.log  ue.log          (raw logs, .gz/.xz/.zst ok)
+  <run>/run.json  {"start_time": "18:59:39.866793"}  (else: "시작:" in the test log)
+A role found as both <role>.txt and a raw <role>.log* uses the extracted
+<role>.txt; among raw logs of one role the first name in sorted order wins.
+
+Examples:
+  python3 batch_qrt.py --runs-dir ~/sweep_step --signal pcf -j 8 \\
+      -o ~/qrt_all.csv --summary ~/qrt_runs.csv
+  python3 batch_qrt.py --catalog ~/qos_runs.db --where "control='nas' AND step_sec=0.2" \\
+      --signal ul-5qi --store
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import compute_qrt as cq
+from log_io import open_log
+from slot_clock import SCS_KHZ, SlotClock
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# signal mode -> (signal role, target role)
+MODE_ROLES: Dict[str, Tuple[str, str]] = {
+    "pcf": ("pcf", "prio"),
+    "upf": ("upf", "prio"),
+    "iperf": ("iperf", "prio"),
+    "ul": ("ul", "prio"),
+    "ul-5qi": ("ul", "prio"),
+    "ul-upf": ("ul", "upf"),
+    "ul-iperf": ("iperf", "ul"),
+    "ul-iperf-5qi": ("iperf", "ul"),
+    "ul-ue-gnb": ("ul_ue", "ul_gnb"),
+}
+
+# role -> (raw log roles/names, extractor script, extra args, needs start time)
+EXTRACTORS: Dict[str, Tuple[Tuple[str, ...], str, Tuple[str, ...], bool]] = {
+    "prio": (("gnb",), "core_prio.py", ("--exclude-prio-weight", "0.001"), True),
+    "pcf": (("pcfd", "pcf"), "pcf.py", (), True),
+    "upf": (("upfd", "upf"), "upf.py", (), True),
+    "ul_ue": (("ue",), "ul_ue.py", (), False),
+    "ul_gnb": (("gnb",), "ul_gnb.py", (), False),
+}
+
+RAW_SUFFIXES = (".log", ".log.gz", ".log.xz", ".log.zst")
+TEST_LOG_GLOB = "iperf3_*.log"
+
+QrtTuple = Tuple[float, float, int, float]  # (rel_time_signal, rel_time_target, key, qrt_s)
+
+
+@dataclass
+class RunSpec:
+    name: str
+    files: Dict[str, str]
+    start_time: Optional[str] = None
+    run_id: Optional[int] = None
+
+
+@dataclass
+class RunResult:
+    name: str
+    signal: str
+    rows: List[QrtTuple] = field(default_factory=list)
+    events: int = 0
+    warnings: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    run_id: Optional[int] = None
+
+
+def _role_from_filename(path: Path) -> Optional[str]:
+    name = path.name
+    if name.endswith(".txt"):
+        return name[: -len(".txt")]
+    for suffix in RAW_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def _start_time_from_dir(run_dir: Path) -> Optional[str]:
+    manifest = run_dir / "run.json"
+    if manifest.is_file():
+        with open(manifest, encoding="utf-8") as f:
+            value = json.load(f).get("start_time")
+        if value:
+            return str(value)
+    from run_catalog import parse_run_header
+
+    for test_log in sorted(run_dir.glob(TEST_LOG_GLOB)):
+        with open_log(str(test_log)) as f:
+            header = parse_run_header(f)
+        if header.started_at:
+            return header.started_at
+    return None
+
+
+def discover_runs_dir(runs_dir: str) -> List[RunSpec]:
+    root = Path(runs_dir).expanduser()
+    specs: List[RunSpec] = []
+    for run_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        files: Dict[str, str] = {}
+        for p in sorted(run_dir.iterdir()):
+            role = _role_from_filename(p) if p.is_file() else None
+            if role and (role not in files or p.suffix == ".txt"):  # extracted CSV over raw log
+                files[role] = str(p)
+        if files:
+            specs.append(RunSpec(run_dir.name, files, _start_time_from_dir(run_dir)))
+    return specs
+
+
+def discover_catalog(db_path: str, where: Optional[str]) -> List[RunSpec]:
+    from run_catalog import connect
+
+    conn = connect(db_path)
+    try:
+        sql = "SELECT run_id, name, started_at FROM runs"
+        if where:
+            sql += f" WHERE {where}"
+        specs: List[RunSpec] = []
+        for run_id, name, started_at in conn.execute(sql + " ORDER BY run_id").fetchall():
+            files = dict(
+                conn.execute("SELECT role, path FROM run_files WHERE run_id = ?", (run_id,)).fetchall()
+            )
+            specs.append(RunSpec(name, files, started_at, run_id))
+        return specs
+    finally:
+        conn.close()
+
+
+def _extract(spec: RunSpec, role: str, work_dir: Path) -> str:
+    """Return the CSV path for role, running the extractor into work_dir if needed."""
+    if role in spec.files and spec.files[role].endswith(".txt"):
+        return spec.files[role]
+    if role not in EXTRACTORS:
+        raise FileNotFoundError(f"no {role}.txt and no extractor for it")
+    raw_roles, script, extra, needs_start = EXTRACTORS[role]
+    raw = next((spec.files[r] for r in raw_roles if r in spec.files), None)
+    if raw is None:
+        raise FileNotFoundError(f"no {role}.txt and no raw log ({'/'.join(raw_roles)})")
+
+    out_path = work_dir / f"{role}.txt"
+    if out_path.is_file() and out_path.stat().st_mtime >= os.stat(raw).st_mtime:
+        return str(out_path)
+
+    cmd = [sys.executable, str(SCRIPT_DIR / script), raw, *extra]
+    if needs_start:
+        if not spec.start_time:
+            raise ValueError(f"{role}: extraction needs a start time (run.json or test log header)")
+        cmd += ["--start-time", spec.start_time, "--relative-time"]
+    else:
+        cmd += ["-o", str(out_path)]
+    work_dir.mkdir(parents=True, exist_ok=True)
+    if needs_start:
+        with open(out_path, "w", encoding="utf-8") as out:
+            proc = subprocess.run(cmd, stdout=out, stderr=subprocess.PIPE, text=True)
+    else:
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        out_path.unlink(missing_ok=True)
+        last = proc.stderr.strip().splitlines()[-1:] or [f"exit {proc.returncode}"]
+        raise RuntimeError(f"{script} failed: {last[0]}")
+    return str(out_path)
+
+
+def match_run(
+    signal: str,
+    signal_path: str,
+    target_path: str,
+    tol: float = 0.001,
+    prio_decimals: int = 3,
+    anchor_dscp: int = 44,
+    scs_khz: int = 15,
+    match: str = "greedy",
+) -> Tuple[List[QrtTuple], int, List[str]]:
+    """Run one compute_qrt.py mode; rows normalized to (t_signal, t_target, key, qrt_s)."""
+    dscp_map = dict(cq.DEFAULT_DSCP_TO_FIVE_QI)
+
+    if signal == "ul-ue-gnb":
+        ue_clock = SlotClock(scs_khz)
+        gnb_clock = SlotClock(scs_khz, reference=ue_clock)
+        with open_log(signal_path) as f:
+            ue_rows, w1 = cq.read_slot_dscp_rows(f, skip_dscp0=True, clock=ue_clock)
+        with open_log(target_path) as f:
+            gnb_rows, w2 = cq.read_slot_dscp_rows(f, skip_dscp0=True, clock=gnb_clock)
+        res, w3 = cq.compute_qrt_ul_ue_gnb(ue_rows, gnb_rows, ms_per_index=ue_clock.slot_us / 1000.0, match=match)
+        rows = [(ue_clock.to_us(r.tti) / 1e6, gnb_clock.to_us(r.slot) / 1e6, r.dscp, r.qrt_s) for r in res]
+        return rows, len(ue_rows), w1 + w2 + w3
+
+    if signal == "ul-iperf-5qi":
+        with open_log(signal_path) as f:
+            sig_rows = cq.read_pcf_rows(f)
+        with open_log(target_path) as f:
+            tgt_rows, w1 = cq.read_ul_five_qi_rows(f)
+        res, w2 = cq.compute_qrt_five_qi_pair(sig_rows, tgt_rows, signal_label="iperf", target_label="ul", match=match)
+        rows = [(r.rel_time_ul, r.rel_time_upf, r.five_qi, r.qrt_s) for r in res]
+        return rows, len(cq.compress_signal_changes(sig_rows)), w1 + w2
+
+    if signal in ("ul-upf", "ul-iperf"):
+        with open_log(signal_path) as f:
+            if signal == "ul-iperf":
+                sig_rows, w1 = cq.read_upf_rows(f, dscp_map)
+            else:
+                sig_rows, w1 = cq.read_ul_rows(f, dscp_map)
+        with open_log(target_path) as f:
+            if signal == "ul-iperf":
+                tgt_rows, w2 = cq.read_ul_rows(f, dscp_map)
+            else:
+                tgt_rows, w2 = cq.read_upf_rows(f, dscp_map)
+        res, w3 = cq.compute_qrt_ul_upf(sig_rows, tgt_rows, match=match)
+        rows = [(r.rel_time_ul, r.rel_time_upf, r.dscp, r.qrt_s) for r in res]
+        return rows, len(cq.compress_signal_changes(sig_rows)), w1 + w2 + w3
+
+    with open_log(signal_path) as f:
+        sig_rows, w1 = cq.read_signal_rows(signal, f, dscp_map, anchor_dscp=anchor_dscp)
+    with open_log(target_path) as f:
+        prio_rows = cq.read_prio_rows(f)
+    res, w2 = cq.compute_qrt(
+        sig_rows, prio_rows, dict(cq.DEFAULT_FIVE_QI_TO_PRIO), tol,
+        signal_label=signal, prio_decimals=prio_decimals, match=match,
+    )
+    rows = []
+    for r in res:
+        key = r.dscp if signal in ("upf", "iperf", "ul") and r.dscp is not None else r.five_qi
+        rows.append((r.rel_time_signal, r.rel_time_prio, key, r.qrt_s))
+    return rows, len(cq.compress_signal_changes(sig_rows)), w1 + w2
+
+
+def process_run(
+    spec: RunSpec, signal: str, work_root: str, tol: float, prio_decimals: int, anchor_dscp: int,
+    scs_khz: int = 15, match: str = "greedy",
+) -> RunResult:
+    """Worker entry point (must stay picklable: module-level, plain arguments)."""
+    result = RunResult(name=spec.name, signal=signal, run_id=spec.run_id)
+    try:
+        sig_role, tgt_role = MODE_ROLES[signal]
+        work_dir = Path(work_root).expanduser() / spec.name
+        sig_path = _extract(spec, sig_role, work_dir)
+        tgt_path = _extract(spec, tgt_role, work_dir)
+        result.rows, result.events, result.warnings = match_run(
+            signal, sig_path, tgt_path, tol=tol, prio_decimals=prio_decimals, anchor_dscp=anchor_dscp,
+            scs_khz=scs_khz, match=match,
+        )
+    except Exception as e:  # one bad run must not stop the sweep
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _summary_row(res: RunResult) -> str:
+    if not res.rows:
+        stats = ",,,,,"
+    else:
+        from run_catalog import percentile
+
+        vals = sorted(r[3] * 1000.0 for r in res.rows)
+        stats = (
+            f"{vals[0]:.3f},{sum(vals) / len(vals):.3f},{percentile(vals, 50):.3f},"
+            f"{percentile(vals, 95):.3f},{percentile(vals, 99):.3f},{vals[-1]:.3f}"
+        )
+    err = (res.error or "").replace(",", ";")
+    return (
+        f"{res.name},{res.signal},{res.events},{len(res.rows)},{len(res.warnings)},"
+        f"{stats},{err}"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Batch QRT over many runs (process pool).")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--runs-dir", help="directory with one sub-directory per run")
+    src.add_argument("--catalog", help="run_catalog.py database")
+    ap.add_argument("--where", default=None, help="SQL filter on runs (with --catalog)")
+    ap.add_argument("--signal", choices=tuple(MODE_ROLES), default="pcf")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    ap.add_argument("-o", "--output", default="-", help="combined QRT CSV (default: stdout)")
+    ap.add_argument("--summary", default=None, help="per-run summary CSV (default: stderr)")
+    ap.add_argument("--work-dir", default="batch_qrt_work", help="extracted CSVs per run")
+    ap.add_argument("--tol", type=float, default=0.001)
+    ap.add_argument("--prio-decimals", type=int, default=3)
+    ap.add_argument("--anchor-dscp", type=int, default=44)
+    ap.add_argument("--scs", type=int, choices=SCS_KHZ, default=15, help="ul-ue-gnb slot numerology (kHz)")
+    ap.add_argument("--match", choices=cq.MATCH_MODES, default="greedy", help="compute_qrt.py --match")
+    ap.add_argument("--store", action="store_true", help="store QRT rows/stats into --catalog")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    if args.jobs < 1:
+        print("ERROR: --jobs must be >= 1", file=sys.stderr)
+        return 2
+    if args.store and not args.catalog:
+        print("ERROR: --store needs --catalog", file=sys.stderr)
+        return 2
+
+    try:
+        specs = discover_runs_dir(args.runs_dir) if args.runs_dir else discover_catalog(args.catalog, args.where)
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if not specs:
+        print("ERROR: no runs found", file=sys.stderr)
+        return 1
+
+    worker_args = (args.signal, args.work_dir, args.tol, args.prio_decimals, args.anchor_dscp, args.scs, args.match)
+    if args.jobs == 1 or len(specs) == 1:
+        results = [process_run(s, *worker_args) for s in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(specs))) as pool:
+            futures = [pool.submit(process_run, s, *worker_args) for s in specs]
+            results = [f.result() for f in futures]
+
+    out = sys.stdout if args.output == "-" else open(Path(args.output).expanduser(), "w", encoding="utf-8")
+    try:
+        if not args.no_header:
+            out.write("run,signal,idx,rel_time_signal,rel_time_target,key,qrt_s\n")
+        for res in results:
+            for i, (t_sig, t_tgt, key, qrt_s) in enumerate(res.rows):
+                out.write(f"{res.name},{res.signal},{i},{t_sig:.6f},{t_tgt:.6f},{key},{qrt_s:.6f}\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summ = sys.stderr if args.summary is None else open(Path(args.summary).expanduser(), "w", encoding="utf-8")
+    try:
+        if not args.no_header:
+            summ.write("run,signal,events,matched,warnings,min_ms,avg_ms,p50_ms,p95_ms,p99_ms,max_ms,error\n")
+        for res in results:
+            summ.write(_summary_row(res) + "\n")
+    finally:
+        if summ is not sys.stderr:
+            summ.close()
+
+    if args.store:
+        from run_catalog import connect, store_qrt
+
+        conn = connect(args.catalog)
+        try:
+            with conn:
+                for res in results:
+                    if res.run_id is not None and res.error is None:
+                        store_qrt(conn, res.run_id, f"qrt_{args.signal}", res.rows)
+        finally:
+            conn.close()
+
+    failed = [r for r in results if r.error]
+    for r in failed:
+        print(f"WARN: {r.name}: {r.error}", file=sys.stderr)
+    print(
+        f"# runs={len(results)} ok={len(results) - len(failed)} failed={len(failed)} "
+        f"qrt_rows={sum(len(r.rows) for r in results)}",
+        file=sys.stderr,
+    )
+    return 0 if len(failed) < len(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
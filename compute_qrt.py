@@ -13,7 +13,7 @@ UL signal modes:
   - ul-upf:    ul.txt DSCP vs UPF dscp (no prio)
   - ul-iperf:  iperf.txt DSCP (t0) vs ul.txt DSCP (t1); QRT = ul - iperf
   - ul-iperf-5qi: iperf.txt five_qi (t0) vs ul.txt NAS five_qi (t1); QRT = ul - iperf
-  - ul-ue-gnb: ul_ue.txt (tti,dscp_new) vs ul_gnb.txt (slot,dscp_new)
+  - ul-ue-gnb: ul_ue.txt (tti,dscp_new[,timestamp]) vs ul_gnb.txt (slot,dscp_new[,timestamp])
 
 Matching vs prio (sequential, one-to-one):
   - Walk signal rows in time order.
@@ -39,7 +39,30 @@ Matching ul-iperf-5qi (sequential, one-to-one):
 Matching ul-ue-gnb (sequential, one-to-one):
   - Walk UE DSCP phase changes (skip DSCP 0 / repeated same DSCP).
   - For each, take the first unused gNB row with slot >= tti and same dscp_new.
-  - QRT (s) = (slot - tti) * 0.001
+  - QRT (s) = (slot - tti) * slot duration (1 ms at --scs 15, 0.5 ms at 30)
+  - tti / slot counters wrap every 10.24 s (SFN); both are unwrapped with
+    slot_clock.SlotClock, using the timestamp column of ul_ue.py / ul_gnb.py
+    output when present, so wraps between sparse phase rows are counted
+
+--match optimal (all modes):
+  - Greedy can take a row that a later event needed (66 -> 80 -> 66 within one
+    QRT: the first 66 takes the prio row the second 66 should have had).
+  - optimal keeps matches one-to-one and in time order (event i before j =>
+    target of i before target of j), maximizes the number of matches, then
+    minimizes total QRT. Each event considers its first --match-candidates
+    same-key targets at/after it; DP with a Fenwick tree, O(n k log(n k)).
+  - The greedy result is computed too; the counts / total QRT of both and the
+    number of differing events go to stderr, the events to --match-diff CSV.
+
+--pair NAME|SPEC.json (replaces --signal):
+  - Any two extracted series (SMF -> CU-UP, GTP-U -> SDAP, ...) from a
+    declarative spec: columns, row filters, value -> key maps (DSCP -> 5QI ->
+    prio_weight), tolerance, compression; see qrt_pair.py for the format and
+    the presets. Same matcher, --match and output format as the modes above.
+
+--profile / --profile-json PATH / --profile-dump PATH (profiling.py):
+  - Wall time of the read, match-qrt, match-diff and write stages, input
+    lines/s, parsed-row ratio and peak RSS.
 
 DSCP -> 5QI (UPF, same as qos_schedule_dscp / qos_schedule_5qi):
   9/0 -> 9 | 44 -> 66 | 24 -> 80 | 15 -> 84
@@ -50,9 +73,14 @@ from __future__ import annotations
 import argparse
 import re
 import sys
+from bisect import bisect_left
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, TextIO
+from typing import Callable, Iterable, TextIO
+
+from log_io import open_log
+from profiling import add_profile_args, count, counted, session_from_args, stage
+from slot_clock import SCS_KHZ, SlotClock, parse_ts_us
 
 DEFAULT_FIVE_QI_TO_PRIO = {
     9: 0.622,
@@ -107,9 +135,10 @@ class UlUpfQrtRow:
 
 @dataclass(frozen=True)
 class SlotDscpRow:
-    """UE tti or gNB slot index with dscp_new."""
+    """UE tti or gNB slot index with dscp_new (index unwrapped when read with a SlotClock)."""
     index: int
     dscp: int
+    ts_us: int | None = None
 
 
 @dataclass(frozen=True)
@@ -127,10 +156,8 @@ def expand_path(path: str) -> str:
 
 
 def _open_text(path: str) -> TextIO:
-    if path == "-":
-        return sys.stdin
-    resolved = expand_path(path)
-    return open(resolved, encoding="utf-8", errors="replace")
+    # '-' -> stdin; .gz/.xz/.zst (by magic bytes) are decompressed on the fly.
+    return open_log(path)
 
 
 def _parse_float(value: str) -> float:
@@ -391,6 +418,24 @@ def read_prio_rows(stream: Iterable[str]) -> list[PrioRow]:
     return rows
 
 
+def read_signal_rows(
+    signal: str,
+    stream: Iterable[str],
+    dscp_to_five_qi: dict[int, int],
+    anchor_dscp: int | None = 44,
+) -> tuple[list[SignalRow], list[str]]:
+    """Read a signal CSV for the signal-vs-prio modes (pcf/upf/iperf/ul/ul-5qi)."""
+    if signal == "upf":
+        return read_upf_rows(stream, dscp_to_five_qi)
+    if signal == "iperf":
+        return read_iperf_rows(stream, dscp_to_five_qi, anchor_dscp=anchor_dscp)
+    if signal == "ul":
+        return read_ul_rows(stream, dscp_to_five_qi)
+    if signal == "ul-5qi":
+        return read_ul_five_qi_rows(stream)
+    return read_pcf_rows(stream), []
+
+
 def compress_signal_changes(rows: list[SignalRow]) -> list[SignalRow]:
     if not rows:
         return []
@@ -411,6 +456,178 @@ def prio_matches(expected: float, actual: float, tol: float, prio_decimals: int
     return abs(act_r - exp_r) <= tol
 
 
+MATCH_MODES = ("greedy", "optimal")
+DEFAULT_MATCH_CANDIDATES = 16
+
+
+def _find_free(parent: list[int], p: int) -> int:
+    """Union-find 'next unused position at/after p' (path halving)."""
+    while parent[p] != p:
+        parent[p] = parent[parent[p]]
+        p = parent[p]
+    return p
+
+
+def _assign_greedy(
+    event_times: list[float],
+    event_keys: list[object],
+    target_times: list[float],
+    targets_by_key: dict[object, list[int]],
+) -> list[int | None]:
+    """First unused target (index order) with the event's key at/after the event time."""
+    used = [False] * len(target_times)
+    state: dict[object, tuple[list[float], list[int] | None]] = {}
+    out: list[int | None] = []
+    for e, key in zip(event_times, event_keys):
+        lst = targets_by_key.get(key) if key is not None else None
+        if not lst:
+            out.append(None)
+            continue
+        st = state.get(key)
+        if st is None:
+            ts = [target_times[j] for j in lst]
+            ordered = all(ts[i] <= ts[i + 1] for i in range(len(ts) - 1))
+            st = state[key] = (ts, list(range(len(lst) + 1)) if ordered else None)
+        ts, parent = st
+        hit: int | None = None
+        if parent is not None:
+            # Time-ordered targets: bisect, then skip used ones in O(alpha).
+            p = _find_free(parent, bisect_left(ts, e))
+            while p < len(lst) and used[lst[p]]:  # taken through another key
+                parent[p] = p + 1
+                p = _find_free(parent, p)
+            if p < len(lst):
+                parent[p] = p + 1
+                hit = lst[p]
+        else:
+            for p, j in enumerate(lst):
+                if not used[j] and ts[p] >= e:
+                    hit = j
+                    break
+        if hit is not None:
+            used[hit] = True
+        out.append(hit)
+    return out
+
+
+def _assign_optimal(
+    event_times: list[float],
+    event_keys: list[object],
+    target_times: list[float],
+    targets_by_key: dict[object, list[int]],
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
+) -> list[int | None]:
+    """
+    Time-monotone one-to-one assignment: matched targets are in the same time
+    order as their events; most matches first, then the least total QRT.
+
+    Event i may take one of the first `candidates` targets with its key at/after
+    its time (an optimal assignment only skips a target that an earlier event
+    already passed). Chain DP over (event, candidate) pairs in event order with
+    a Fenwick prefix maximum over target time rank: O(n k log(n k)).
+    """
+    by_key: dict[object, tuple[list[int], list[float]]] = {}
+    for key, lst in targets_by_key.items():
+        order = sorted(lst, key=lambda j: (target_times[j], j))
+        by_key[key] = (order, [target_times[j] for j in order])
+
+    cands: list[list[int]] = []
+    for e, key in zip(event_times, event_keys):
+        kt = by_key.get(key) if key is not None else None
+        if kt is None:
+            cands.append([])
+            continue
+        order, ts = kt
+        p = bisect_left(ts, e)
+        cands.append(order[p:p + candidates])
+
+    ranked = sorted({j for c in cands for j in c}, key=lambda j: (target_times[j], j))
+    rank = {j: r for r, j in enumerate(ranked, 1)}
+    size = len(ranked)
+    empty = (0, 0.0, -1)
+    tree = [empty] * (size + 1)  # (matches, -total_qrt, pair id)
+    pair_event: list[int] = []
+    pair_target: list[int] = []
+    pair_prev: list[int] = []
+
+    for i, (e, c) in enumerate(zip(event_times, cands)):
+        pending = []
+        for j in c:
+            r = rank[j]
+            best = empty
+            k = r - 1
+            while k > 0:
+                if tree[k] > best:
+                    best = tree[k]
+                k -= k & -k
+            pid = len(pair_event)
+            pair_event.append(i)
+            pair_target.append(j)
+            pair_prev.append(best[2])
+            pending.append((r, (best[0] + 1, best[1] - (target_times[j] - e), pid)))
+        # Updates after all queries: one event never chains onto itself.
+        for r, val in pending:
+            k = r
+            while k <= size:
+                if val > tree[k]:
+                    tree[k] = val
+                k += k & -k
+
+    best = empty
+    k = size
+    while k > 0:
+        if tree[k] > best:
+            best = tree[k]
+        k -= k & -k
+    out: list[int | None] = [None] * len(event_times)
+    pid = best[2]
+    while pid >= 0:
+        out[pair_event[pid]] = pair_target[pid]
+        pid = pair_prev[pid]
+    return out
+
+
+def assign_targets(
+    event_times: list[float],
+    event_keys: list[object],
+    target_times: list[float],
+    targets_by_key: dict[object, list[int]],
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
+) -> list[int | None]:
+    """Target index per event (None = unmatched); targets_by_key lists indices in file order."""
+    if match == "optimal":
+        return _assign_optimal(event_times, event_keys, target_times, targets_by_key, candidates)
+    return _assign_greedy(event_times, event_keys, target_times, targets_by_key)
+
+
+def _targets_by_key(keys: Iterable[object]) -> dict[object, list[int]]:
+    out: dict[object, list[int]] = {}
+    for j, key in enumerate(keys):
+        out.setdefault(key, []).append(j)
+    return out
+
+
+def _match_series(
+    sources: list,
+    targets: list,
+    *,
+    match: str,
+    candidates: int,
+    describe,
+    tol: float = 0.0,
+    decimals: int | None = None,
+    time_unit_s: float = 1.0,
+) -> tuple[list, list[str]]:
+    """Match hand-built qrt_pair.SeriesRows with qrt_pair.compute_qrt_pair (the --pair matcher)."""
+    from qrt_pair import PairSpec, SeriesSpec, compute_qrt_pair
+
+    pair = PairSpec(SeriesSpec("-"), SeriesSpec("-"), tol=tol, decimals=decimals)
+    return compute_qrt_pair(
+        pair, sources, targets, match, candidates, time_unit_s=time_unit_s, describe=describe
+    )
+
+
 def compute_qrt(
     signal_rows: list[SignalRow],
     prio_rows: list[PrioRow],
@@ -418,64 +635,51 @@ def compute_qrt(
     tol: float,
     signal_label: str = "signal",
     prio_decimals: int = 3,
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
 ) -> tuple[list[QrtRow], list[str]]:
+    """Signal 5QI phase -> first prio row with the mapped prio_weight (rounded, within tol) at/after."""
+    from qrt_pair import SeriesRow
+
     events = compress_signal_changes(signal_rows)
     if not events:
         return [], []
 
-    used_prio: set[int] = set()
-    results: list[QrtRow] = []
+    def describe(src: SeriesRow) -> str:
+        sig = src.row
+        dscp_note = f" DSCP={sig.dscp}" if sig.dscp is not None else ""
+        if src.key is None:
+            return f"unmatched {signal_label} t={sig.rel_time_s:.6f}s: unknown 5QI {sig.five_qi}{dscp_note}"
+        return (
+            f"unmatched {signal_label} t={sig.rel_time_s:.6f}s 5QI={sig.five_qi}{dscp_note} "
+            f"(expected prio_weight={_round_prio_weight(src.key, prio_decimals):.{prio_decimals}f}, "
+            f"no prio at/after signal)"
+        )
 
-    for sig in events:
-        expected = mapping.get(sig.five_qi)
-        if expected is None:
-            continue
-        matched_idx: int | None = None
-        for j, prio in enumerate(prio_rows):
-            if j in used_prio:
-                continue
-            if prio.rel_time_s < sig.rel_time_s:
-                continue
-            if not prio_matches(expected, prio.prio_weight, tol, prio_decimals):
-                continue
-            matched_idx = j
-            break
-        if matched_idx is None:
-            continue
-        used_prio.add(matched_idx)
-        prio = prio_rows[matched_idx]
+    matched, warnings = _match_series(
+        [SeriesRow(sig.rel_time_s, sig.five_qi, mapping.get(sig.five_qi), sig) for sig in events],
+        [SeriesRow(p.rel_time_s, p.prio_weight, p.prio_weight, p) for p in prio_rows],
+        match=match,
+        candidates=candidates,
+        describe=describe,
+        tol=tol,
+        decimals=prio_decimals,
+    )
+    results: list[QrtRow] = []
+    for m in matched:
+        sig, prio = m.source.row, m.target.row
         results.append(
             QrtRow(
                 rel_time_signal=sig.rel_time_s,
                 five_qi=sig.five_qi,
-                expected_prio_weight=expected,
+                expected_prio_weight=m.key,
                 rel_time_prio=prio.rel_time_s,
                 seq=prio.seq,
                 prio_weight=prio.prio_weight,
-                qrt_s=prio.rel_time_s - sig.rel_time_s,
+                qrt_s=m.qrt_s,
                 dscp=sig.dscp,
             )
         )
-
-    warnings: list[str] = []
-    matched_signal_times = {r.rel_time_signal for r in results}
-    for sig in events:
-        if sig.rel_time_s in matched_signal_times:
-            continue
-        expected = mapping.get(sig.five_qi)
-        dscp_note = f" DSCP={sig.dscp}" if sig.dscp is not None else ""
-        if expected is None:
-            warnings.append(
-                f"unmatched {signal_label} t={sig.rel_time_s:.6f}s: unknown 5QI {sig.five_qi}{dscp_note}"
-            )
-        else:
-            warnings.append(
-                f"unmatched {signal_label} t={sig.rel_time_s:.6f}s 5QI={sig.five_qi}{dscp_note} "
-                f"(expected prio_weight={_round_prio_weight(expected, prio_decimals):.{prio_decimals}f}, "
-                f"no prio at/after signal)"
-            )
-
-    results.sort(key=lambda r: r.rel_time_signal)
     return results, warnings
 
 
@@ -490,122 +694,88 @@ def compress_dscp_changes(rows: list[SignalRow]) -> list[SignalRow]:
     return out
 
 
+def _ul_upf_rows(matched: list) -> list[UlUpfQrtRow]:
+    out: list[UlUpfQrtRow] = []
+    for m in matched:
+        sig, tgt = m.source.row, m.target.row
+        out.append(
+            UlUpfQrtRow(
+                rel_time_ul=sig.rel_time_s,
+                rel_time_upf=tgt.rel_time_s,
+                dscp=sig.dscp if sig.dscp is not None else sig.five_qi,
+                five_qi=sig.five_qi,
+                qrt_s=m.qrt_s,
+            )
+        )
+    return out
+
+
 def compute_qrt_five_qi_pair(
     signal_rows: list[SignalRow],
     target_rows: list[SignalRow],
     *,
     signal_label: str = "signal",
     target_label: str = "target",
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
 ) -> tuple[list[UlUpfQrtRow], list[str]]:
-    """Sequential one-to-one: signal 5QI phase -> first unused target with same 5QI at/after."""
+    """One-to-one: signal 5QI phase -> target with same 5QI at/after (first unused, or --match optimal)."""
+    from qrt_pair import SeriesRow
+
     events = compress_signal_changes(signal_rows)
-    targets = compress_signal_changes(target_rows)
     if not events:
         return [], []
-
-    used: set[int] = set()
-    results: list[UlUpfQrtRow] = []
-
-    for sig in events:
-        matched_idx: int | None = None
-        for j, tgt in enumerate(targets):
-            if j in used:
-                continue
-            if tgt.rel_time_s < sig.rel_time_s:
-                continue
-            if tgt.five_qi != sig.five_qi:
-                continue
-            matched_idx = j
-            break
-        if matched_idx is None:
-            continue
-        used.add(matched_idx)
-        tgt = targets[matched_idx]
-        results.append(
-            UlUpfQrtRow(
-                rel_time_ul=sig.rel_time_s,
-                rel_time_upf=tgt.rel_time_s,
-                dscp=sig.dscp if sig.dscp is not None else sig.five_qi,
-                five_qi=sig.five_qi,
-                qrt_s=tgt.rel_time_s - sig.rel_time_s,
-            )
-        )
-
-    warnings: list[str] = []
-    matched_times = {r.rel_time_ul for r in results}
-    for sig in events:
-        if sig.rel_time_s in matched_times:
-            continue
-        warnings.append(
-            f"unmatched {signal_label} t={sig.rel_time_s:.6f}s 5QI={sig.five_qi} "
+    matched, warnings = _match_series(
+        [SeriesRow(sig.rel_time_s, sig.five_qi, sig.five_qi, sig) for sig in events],
+        [SeriesRow(t.rel_time_s, t.five_qi, t.five_qi, t) for t in compress_signal_changes(target_rows)],
+        match=match,
+        candidates=candidates,
+        describe=lambda src: (
+            f"unmatched {signal_label} t={src.t_s:.6f}s 5QI={src.value} "
             f"(no {target_label} with same 5QI at/after)"
-        )
-
-    results.sort(key=lambda r: r.rel_time_ul)
-    return results, warnings
+        ),
+    )
+    return _ul_upf_rows(matched), warnings
 
 
 def compute_qrt_ul_upf(
     ul_rows: list[SignalRow],
     upf_rows: list[SignalRow],
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
 ) -> tuple[list[UlUpfQrtRow], list[str]]:
-    """Sequential one-to-one: UL DSCP phase -> first unused UPF with same DSCP at/after UL time."""
+    """One-to-one: UL DSCP phase -> UPF with same DSCP at/after UL time (first unused, or --match optimal)."""
+    from qrt_pair import SeriesRow
+
     events = compress_signal_changes(ul_rows)
-    targets = compress_dscp_changes(upf_rows)
     if not events:
         return [], []
 
-    used_upf: set[int] = set()
-    results: list[UlUpfQrtRow] = []
-
-    for ul in events:
-        if ul.dscp is None:
-            continue
-        matched_idx: int | None = None
-        for j, upf in enumerate(targets):
-            if j in used_upf:
-                continue
-            if upf.rel_time_s < ul.rel_time_s:
-                continue
-            if upf.dscp != ul.dscp:
-                continue
-            matched_idx = j
-            break
-        if matched_idx is None:
-            continue
-        used_upf.add(matched_idx)
-        upf = targets[matched_idx]
-        results.append(
-            UlUpfQrtRow(
-                rel_time_ul=ul.rel_time_s,
-                rel_time_upf=upf.rel_time_s,
-                dscp=ul.dscp,
-                five_qi=ul.five_qi,
-                qrt_s=upf.rel_time_s - ul.rel_time_s,
-            )
-        )
-
-    warnings: list[str] = []
-    matched_ul_times = {r.rel_time_ul for r in results}
-    for ul in events:
-        if ul.rel_time_s in matched_ul_times:
-            continue
+    def describe(src: SeriesRow) -> str:
+        ul = src.row
         dscp_note = f" DSCP={ul.dscp}" if ul.dscp is not None else ""
-        warnings.append(
-            f"unmatched ul t={ul.rel_time_s:.6f}s 5QI={ul.five_qi}{dscp_note} "
-            f"(no UPF with same DSCP at/after ul)"
-        )
-
-    results.sort(key=lambda r: r.rel_time_ul)
-    return results, warnings
+        return f"unmatched ul t={ul.rel_time_s:.6f}s 5QI={ul.five_qi}{dscp_note} (no UPF with same DSCP at/after ul)"
+
+    matched, warnings = _match_series(
+        [SeriesRow(ul.rel_time_s, ul.dscp, ul.dscp, ul) for ul in events],
+        [SeriesRow(upf.rel_time_s, upf.dscp, upf.dscp, upf) for upf in compress_dscp_changes(upf_rows)],
+        match=match,
+        candidates=candidates,
+        describe=describe,
+    )
+    return _ul_upf_rows(matched), warnings
 
 
 def read_slot_dscp_rows(
     stream: Iterable[str],
     *,
     skip_dscp0: bool = True,
+    clock: SlotClock | None = None,
 ) -> tuple[list[SlotDscpRow], list[str]]:
-    """Parse tti,dscp_new or slot,dscp_new; keep first of each consecutive DSCP phase."""
+    """
+    Parse tti,dscp_new[,timestamp] or slot,dscp_new[,timestamp]; keep first of each
+    consecutive DSCP phase. With clock, every index (also skipped rows) is unwrapped.
+    """
     rows: list[SlotDscpRow] = []
     warnings: list[str] = []
     last_dscp: int | None = None
@@ -623,14 +793,17 @@ def read_slot_dscp_rows(
         try:
             index = _parse_int(parts[0])
             dscp = _parse_int(parts[1])
+            ts_us = parse_ts_us(parts[2]) if len(parts) > 2 else None
         except (ValueError, IndexError) as exc:
             warnings.append(f"skip slot/dscp line: {line!r} ({exc})")
             continue
+        if clock is not None:
+            index = clock.unwrap(index, ts_us)
         if skip_dscp0 and dscp == 0:
             continue
         if last_dscp is not None and dscp == last_dscp:
             continue
-        rows.append(SlotDscpRow(index=index, dscp=dscp))
+        rows.append(SlotDscpRow(index=index, dscp=dscp, ts_us=ts_us))
         last_dscp = dscp
     return rows, warnings
 
@@ -639,50 +812,90 @@ def compute_qrt_ul_ue_gnb(
     ue_rows: list[SlotDscpRow],
     gnb_rows: list[SlotDscpRow],
     ms_per_index: float = 1.0,
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
 ) -> tuple[list[UlUeGnbQrtRow], list[str]]:
-    """Sequential one-to-one: UE tti/dscp -> first unused gNB slot with same dscp and slot >= tti."""
+    """One-to-one: UE tti/dscp -> gNB slot with same dscp and slot >= tti (first unused, or --match optimal)."""
+    from qrt_pair import SeriesRow
+
     if not ue_rows:
         return [], []
+    matched, warnings = _match_series(
+        [SeriesRow(ue.index, ue.dscp, ue.dscp) for ue in ue_rows],
+        [SeriesRow(gnb.index, gnb.dscp, gnb.dscp) for gnb in gnb_rows],
+        match=match,
+        candidates=candidates,
+        describe=lambda src: f"unmatched ue tti={src.t_s} DSCP={src.value} (no gNB slot with same DSCP at/after tti)",
+        time_unit_s=ms_per_index / 1000.0,
+    )
+    results = [UlUeGnbQrtRow(tti=m.t_source, slot=m.t_target, dscp=m.value, qrt_s=m.qrt_s) for m in matched]
+    return results, warnings
 
-    used_gnb: set[int] = set()
-    results: list[UlUeGnbQrtRow] = []
-
-    for ue in ue_rows:
-        matched_idx: int | None = None
-        for j, gnb in enumerate(gnb_rows):
-            if j in used_gnb:
-                continue
-            if gnb.index < ue.index:
-                continue
-            if gnb.dscp != ue.dscp:
-                continue
-            matched_idx = j
-            break
-        if matched_idx is None:
-            continue
-        used_gnb.add(matched_idx)
-        gnb = gnb_rows[matched_idx]
-        results.append(
-            UlUeGnbQrtRow(
-                tti=ue.index,
-                slot=gnb.index,
-                dscp=ue.dscp,
-                qrt_s=(gnb.index - ue.index) * (ms_per_index / 1000.0),
-            )
-        )
 
-    warnings: list[str] = []
-    matched_ttis = {r.tti for r in results}
-    for ue in ue_rows:
-        if ue.index in matched_ttis:
-            continue
-        warnings.append(
-            f"unmatched ue tti={ue.index} DSCP={ue.dscp} "
-            f"(no gNB slot with same DSCP at/after tti)"
-        )
+# (event time, target time, key) attribute of each result row type
+_MATCH_FIELDS = {
+    "QrtRow": ("rel_time_signal", "rel_time_prio", "five_qi"),
+    "UlUpfQrtRow": ("rel_time_ul", "rel_time_upf", "dscp"),
+    "UlUeGnbQrtRow": ("tti", "slot", "dscp"),
+    "PairQrtRow": ("t_source", "t_target", "key"),
+}
 
-    results.sort(key=lambda r: r.tti)
-    return results, warnings
+
+def _report_match_diff(run, results: list, args: argparse.Namespace) -> None:
+    """--match optimal: rerun greedy, print the difference, optionally write it as CSV."""
+    if args.match != "optimal":
+        return
+    with stage("match-diff"):
+        greedy, _ = run("greedy")
+    rows = greedy or results
+    if not rows:
+        return
+    ev, tgt, key = _MATCH_FIELDS[type(rows[0]).__name__]
+    g_by = {(getattr(r, ev), getattr(r, key)): r for r in greedy}
+    o_by = {(getattr(r, ev), getattr(r, key)): r for r in results}
+    diffs = []
+    for k in sorted(set(g_by) | set(o_by)):
+        g, o = g_by.get(k), o_by.get(k)
+        if g is None or o is None or getattr(g, tgt) != getattr(o, tgt):
+            diffs.append((k, g, o))
+    print(
+        f"match: greedy matched={len(greedy)} total_qrt_s={sum(r.qrt_s for r in greedy):.6f} | "
+        f"optimal matched={len(results)} total_qrt_s={sum(r.qrt_s for r in results):.6f} | "
+        f"differ={len(diffs)}",
+        file=sys.stderr,
+    )
+    if not args.match_diff:
+        return
+    with open(expand_path(args.match_diff), "w", encoding="utf-8", newline="") as f:
+        f.write("signal_time,key,greedy_target_time,greedy_qrt_s,optimal_target_time,optimal_qrt_s\n")
+        for (t, k), g, o in diffs:
+            g_cols = f"{getattr(g, tgt)},{g.qrt_s:.6f}" if g is not None else ","
+            o_cols = f"{getattr(o, tgt)},{o.qrt_s:.6f}" if o is not None else ","
+            f.write(f"{t},{k},{g_cols},{o_cols}\n")
+    print(f"match_diff={args.match_diff} rows={len(diffs)}", file=sys.stderr)
+
+
+def _write_intervals(path: str | None, results: list, ue: int | None = None) -> None:
+    """--intervals: matched (signal, target) times, batch_qrt.py column names, + ue (--intervals-ue or empty)."""
+    if not path or not results:
+        return
+    ev, tgt, key = _MATCH_FIELDS[type(results[0]).__name__]
+    ue_s = "" if ue is None else str(ue)
+    with stage("write"), open(expand_path(path), "w", encoding="utf-8", newline="") as f:
+        f.write("rel_time_signal,rel_time_target,key,qrt_s,ue\n")
+        for r in results:
+            f.write(f"{getattr(r, ev):.6f},{getattr(r, tgt):.6f},{getattr(r, key)},{r.qrt_s:.6f},{ue_s}\n")
+
+
+def _report_qrt_distribution(qrt_vals: list[float], stats_json: str | None) -> None:
+    """Percentiles (ms) to stderr; optionally save a mergeable histogram."""
+    from stream_stats import LogHistogram, format_summary
+
+    hist = LogHistogram()
+    hist.update(v * 1000.0 for v in qrt_vals)
+    print(f"qrt_ms: {format_summary(hist)}", file=sys.stderr)
+    if stats_json:
+        hist.save(stats_json)
 
 
 def parse_mapping_arg(items: list[str]) -> dict[int, float]:
@@ -725,12 +938,28 @@ def main() -> int:
     ap.add_argument(
         "--ul-ue",
         default="/tmp/ul_ue.txt",
-        help="UE DSCP phase CSV for ul-ue-gnb (tti,dscp_new)",
+        help="UE DSCP phase CSV for ul-ue-gnb: tti,dscp_new[,timestamp] (ul_ue.py); tti unwrapped with "
+        "slot_clock.SlotClock, across wraps from the timestamps when present",
     )
     ap.add_argument(
         "--ul-gnb",
         default="/tmp/ul_gnb.txt",
-        help="gNB DSCP phase CSV for ul-ue-gnb (slot,dscp_new)",
+        help="gNB DSCP phase CSV for ul-ue-gnb: slot,dscp_new[,timestamp] (ul_gnb.py); slot unwrapped "
+        "with a SlotClock anchored to the --ul-ue one",
+    )
+    ap.add_argument(
+        "--scs",
+        type=int,
+        choices=SCS_KHZ,
+        default=15,
+        help="ul-ue-gnb: subcarrier spacing in kHz; slot = 15/scs ms (default: 15)",
+    )
+    ap.add_argument(
+        "--slot-period",
+        type=int,
+        default=-1,
+        help="ul-ue-gnb: tti/slot counter wrap in indices, SlotClock period (default -1: 10.24 s of "
+        "--scs slots, i.e. 1024 frames; 0 = never wraps)",
     )
     ap.add_argument(
         "--anchor-dscp",
@@ -768,293 +997,275 @@ def main() -> int:
         metavar="5QI=PRIO",
         help="Override mapping, e.g. --map 80=0.715 (repeatable)",
     )
+    ap.add_argument(
+        "--stats",
+        action="store_true",
+        help="Also print QRT percentiles (p50/p90/p99/p99.9, ms) to stderr",
+    )
+    ap.add_argument(
+        "--stats-json",
+        default=None,
+        metavar="PATH",
+        help="Save the QRT histogram (ms) for stream_stats.py merge/bootstrap",
+    )
+    ap.add_argument(
+        "--match",
+        choices=MATCH_MODES,
+        default="greedy",
+        help="greedy: first unused target at/after each event (default); "
+        "optimal: most matches, then least total QRT, matches kept in time order",
+    )
+    ap.add_argument(
+        "--match-candidates",
+        type=int,
+        default=DEFAULT_MATCH_CANDIDATES,
+        metavar="K",
+        help=f"optimal: same-key targets considered per event (default: {DEFAULT_MATCH_CANDIDATES}; "
+        "raise it when events are nearly as frequent as targets)",
+    )
+    ap.add_argument(
+        "--match-diff",
+        default=None,
+        metavar="PATH",
+        help="optimal: write the events where optimal and greedy matching differ (CSV)",
+    )
+    ap.add_argument(
+        "--intervals",
+        default=None,
+        metavar="PATH",
+        help="Also write rel_time_signal,rel_time_target,key,qrt_s,ue per match (stale_bytes.py input; "
+        "not for ul-ue-gnb, whose slot times are not on the --start-time base)",
+    )
+    ap.add_argument(
+        "--intervals-ue",
+        type=int,
+        default=None,
+        metavar="N",
+        help="UE the signal / target series were extracted for, written to the ue column of --intervals",
+    )
+    ap.add_argument(
+        "--pair",
+        default=None,
+        metavar="NAME|SPEC.json",
+        help="Match two extracted series from a pair spec or preset (qrt_pair.py); replaces --signal",
+    )
+    ap.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="--pair: override a spec key, e.g. --set source.file=/tmp/gtp.txt (repeatable)",
+    )
+    add_profile_args(ap)
     args = ap.parse_args()
+    if args.match_candidates < 1:
+        print("ERROR: --match-candidates must be >= 1", file=sys.stderr)
+        return 2
+    with session_from_args(args):
+        return _run(args)
 
-    if args.output is None:
-        default_name = {
-            "upf": "qrt_upf.txt",
-            "iperf": "qrt_iperf.txt",
-            "ul": "qrt_ul.txt",
-            "ul-5qi": "qrt_ul_5qi.txt",
-            "ul-upf": "qrt_ul_upf.txt",
-            "ul-iperf": "qrt_ul_iperf.txt",
-            "ul-iperf-5qi": "qrt_ul_iperf_5qi.txt",
-            "ul-ue-gnb": "qrt_ul_ue_gnb.txt",
-            "pcf": "qrt.txt",
-        }[args.signal]
-        output_path = expand_path(str(home / default_name))
-    else:
-        output_path = expand_path(args.output)
 
-    dscp_map = dict(DEFAULT_DSCP_TO_FIVE_QI)
+@dataclass
+class _Loaded:
+    """A --signal / --pair mode after reading its inputs: matcher + what to report."""
 
-    # --- ul_ue tti vs ul_gnb slot (no prio) ---
-    if args.signal == "ul-ue-gnb":
-        ue_path = expand_path(args.ul_ue)
-        gnb_path = expand_path(args.ul_gnb)
-        if not Path(ue_path).is_file():
-            print(f"ERROR: ul_ue file not found: {ue_path}", file=sys.stderr)
-            return 1
-        if not Path(gnb_path).is_file():
-            print(f"ERROR: ul_gnb file not found: {gnb_path}", file=sys.stderr)
-            return 1
+    run: Callable[[str], tuple[list, list[str]]]  # match mode -> (results, warnings)
+    read_warnings: list[str]
+    info: list[str]  # stderr lines before output=
+    value: Callable[[object], object]  # second output column of a result row
 
-        with _open_text(ue_path) as f:
-            ue_rows, ue_warnings = read_slot_dscp_rows(f, skip_dscp0=True)
-        with _open_text(gnb_path) as f:
-            gnb_rows, gnb_warnings = read_slot_dscp_rows(f, skip_dscp0=True)
-
-        if not ue_rows:
-            print(f"ERROR: no ul_ue rows in {ue_path}", file=sys.stderr)
-            return 1
-        if not gnb_rows:
-            print(f"ERROR: no ul_gnb rows in {gnb_path}", file=sys.stderr)
-            return 1
-
-        results, warnings = compute_qrt_ul_ue_gnb(ue_rows, gnb_rows, ms_per_index=1.0)
-        warnings = ue_warnings + gnb_warnings + warnings
-
-        out_stream: TextIO
-        close_out = False
-        if output_path == "-":
-            out_stream = sys.stdout
-        else:
-            out_parent = Path(output_path).parent
-            if str(out_parent) not in ("", "."):
-                out_parent.mkdir(parents=True, exist_ok=True)
-            out_stream = open(output_path, "w", encoding="utf-8", newline="")
-            close_out = True
 
-        try:
-            for row in results:
-                out_stream.write(f"{row.qrt_s:.6f},{row.dscp}\n")
-        finally:
-            if close_out:
-                out_stream.close()
+def _missing(path: str, what: str) -> bool:
+    if Path(path).is_file():
+        return False
+    print(f"ERROR: {what} file not found: {path}", file=sys.stderr)
+    return True
 
-        print(f"signal=ul_ue file={ue_path}", file=sys.stderr)
-        print(f"target=ul_gnb file={gnb_path}", file=sys.stderr)
-        print(f"output={output_path}", file=sys.stderr)
 
-        for w in warnings:
-            print(f"WARN: {w}", file=sys.stderr)
+def _load_pair(args: argparse.Namespace) -> _Loaded | int:
+    """--pair: declarative source/target series (qrt_pair.py)."""
+    from qrt_pair import compute_qrt_pair, load_pair_spec, read_series
+
+    try:
+        pair = load_pair_spec(args.pair, args.set)
+        with stage("read"):
+            sources, src_warnings = read_series(pair.source, "source")
+            targets, tgt_warnings = read_series(pair.target, "target")
+    except (OSError, ValueError, TypeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    if not sources:
+        print(f"ERROR: no source rows in {pair.source.file}", file=sys.stderr)
+        return 1
+    if not targets:
+        print(f"ERROR: no target rows in {pair.target.file}", file=sys.stderr)
+        return 1
+    return _Loaded(
+        lambda match: compute_qrt_pair(pair, sources, targets, match=match, candidates=args.match_candidates),
+        src_warnings + tgt_warnings,
+        [
+            f"pair={pair.label} source={pair.source.file} rows={len(sources)}",
+            f"target={pair.target.file} rows={len(targets)}",
+        ],
+        lambda row: row.value,
+    )
 
-        if not results:
-            print("ERROR: no QRT rows produced", file=sys.stderr)
-            return 1
 
-        matched = len(results)
-        qrt_vals = [r.qrt_s for r in results]
+def _load_ul_ue_gnb(args: argparse.Namespace) -> _Loaded | int:
+    """ul_ue tti vs ul_gnb slot (no prio)."""
+    if args.intervals:
         print(
-            f"matched={matched} qrt_ms: min={min(qrt_vals)*1000:.3f} "
-            f"avg={sum(qrt_vals)/len(qrt_vals)*1000:.3f} max={max(qrt_vals)*1000:.3f}",
+            "ERROR: --intervals is not available for ul-ue-gnb (slot times, not on the log time base)",
             file=sys.stderr,
         )
-        return 0
-
-    # --- iperf five_qi vs ul NAS five_qi: QRT = ul - iperf ---
-    if args.signal == "ul-iperf-5qi":
-        ul_path = expand_path(args.ul)
-        iperf_path = expand_path(args.iperf)
-        if not Path(iperf_path).is_file():
-            print(f"ERROR: iperf file not found: {iperf_path}", file=sys.stderr)
-            return 1
-        if not Path(ul_path).is_file():
-            print(f"ERROR: ul file not found: {ul_path}", file=sys.stderr)
-            return 1
+        return 2
+    ue_path = expand_path(args.ul_ue)
+    gnb_path = expand_path(args.ul_gnb)
+    if _missing(ue_path, "ul_ue") or _missing(gnb_path, "ul_gnb"):
+        return 1
+
+    period = None if args.slot_period < 0 else args.slot_period
+    ue_clock = SlotClock(args.scs, period)
+    gnb_clock = SlotClock(args.scs, period, reference=ue_clock)
+    with stage("read"):
+        with _open_text(ue_path) as f:
+            ue_rows, ue_warnings = read_slot_dscp_rows(counted(f), skip_dscp0=True, clock=ue_clock)
+        with _open_text(gnb_path) as f:
+            gnb_rows, gnb_warnings = read_slot_dscp_rows(counted(f), skip_dscp0=True, clock=gnb_clock)
+        count("parsed", len(ue_rows) + len(gnb_rows))
+
+    if not ue_rows:
+        print(f"ERROR: no ul_ue rows in {ue_path}", file=sys.stderr)
+        return 1
+    if not gnb_rows:
+        print(f"ERROR: no ul_gnb rows in {gnb_path}", file=sys.stderr)
+        return 1
+
+    def run(match: str):
+        return compute_qrt_ul_ue_gnb(
+            ue_rows,
+            gnb_rows,
+            ms_per_index=ue_clock.slot_us / 1000.0,
+            match=match,
+            candidates=args.match_candidates,
+        )
+
+    return _Loaded(
+        run,
+        ue_warnings + gnb_warnings,
+        [
+            f"signal=ul_ue file={ue_path}",
+            f"target=ul_gnb file={gnb_path}",
+            f"scs_khz={args.scs} slot_us={ue_clock.slot_us} period={ue_clock.period} "
+            f"wraps: ue={ue_clock.wraps} gnb={gnb_clock.wraps}",
+        ],
+        lambda row: row.dscp,
+    )
+
 
+def _load_ul_iperf_5qi(args: argparse.Namespace) -> _Loaded | int:
+    """iperf five_qi vs ul NAS five_qi: QRT = ul - iperf."""
+    ul_path = expand_path(args.ul)
+    iperf_path = expand_path(args.iperf)
+    if _missing(iperf_path, "iperf") or _missing(ul_path, "ul"):
+        return 1
+
+    with stage("read"):
         with _open_text(iperf_path) as f:
-            iperf_rows = read_pcf_rows(f)
+            iperf_rows = read_pcf_rows(counted(f))
         with _open_text(ul_path) as f:
-            ul_rows, ul_warnings = read_ul_five_qi_rows(f)
+            ul_rows, ul_warnings = read_ul_five_qi_rows(counted(f))
+        count("parsed", len(iperf_rows) + len(ul_rows))
 
-        if not iperf_rows:
-            print(f"ERROR: no iperf five_qi rows in {iperf_path}", file=sys.stderr)
-            return 1
-        if not ul_rows:
-            print(f"ERROR: no ul five_qi rows in {ul_path}", file=sys.stderr)
-            return 1
+    if not iperf_rows:
+        print(f"ERROR: no iperf five_qi rows in {iperf_path}", file=sys.stderr)
+        return 1
+    if not ul_rows:
+        print(f"ERROR: no ul five_qi rows in {ul_path}", file=sys.stderr)
+        return 1
 
-        results, warnings = compute_qrt_five_qi_pair(
+    def run(match: str):
+        return compute_qrt_five_qi_pair(
             iperf_rows,
             ul_rows,
             signal_label="iperf",
             target_label="ul",
+            match=match,
+            candidates=args.match_candidates,
         )
-        warnings = ul_warnings + warnings
-
-        out_stream: TextIO
-        close_out = False
-        if output_path == "-":
-            out_stream = sys.stdout
-        else:
-            out_parent = Path(output_path).parent
-            if str(out_parent) not in ("", "."):
-                out_parent.mkdir(parents=True, exist_ok=True)
-            out_stream = open(output_path, "w", encoding="utf-8", newline="")
-            close_out = True
-
-        try:
-            for row in results:
-                out_stream.write(f"{row.qrt_s:.6f},{row.five_qi}\n")
-        finally:
-            if close_out:
-                out_stream.close()
-
-        print(f"signal=iperf(5qi) file={iperf_path}", file=sys.stderr)
-        print(f"target=ul(5qi) file={ul_path}", file=sys.stderr)
-        print(f"output={output_path}", file=sys.stderr)
 
-        for w in warnings:
-            print(f"WARN: {w}", file=sys.stderr)
+    return _Loaded(
+        run, ul_warnings, [f"signal=iperf(5qi) file={iperf_path}", f"target=ul(5qi) file={ul_path}"],
+        lambda row: row.five_qi,
+    )
 
-        if not results:
-            print("ERROR: no QRT rows produced", file=sys.stderr)
-            return 1
 
-        matched = len(results)
-        qrt_vals = [r.qrt_s for r in results]
-        print(
-            f"matched={matched} qrt_ms: min={min(qrt_vals)*1000:.3f} "
-            f"avg={sum(qrt_vals)/len(qrt_vals)*1000:.3f} max={max(qrt_vals)*1000:.3f}",
-            file=sys.stderr,
-        )
-        return 0
-
-    # --- iperf vs ul (no prio): QRT = ul - iperf ---
-    if args.signal == "ul-iperf":
-        ul_path = expand_path(args.ul)
-        iperf_path = expand_path(args.iperf)
-        if not Path(iperf_path).is_file():
-            print(f"ERROR: iperf file not found: {iperf_path}", file=sys.stderr)
-            return 1
-        if not Path(ul_path).is_file():
-            print(f"ERROR: ul file not found: {ul_path}", file=sys.stderr)
-            return 1
+def _load_ul_iperf(args: argparse.Namespace) -> _Loaded | int:
+    """iperf vs ul DSCP (no prio): QRT = ul - iperf."""
+    dscp_map = dict(DEFAULT_DSCP_TO_FIVE_QI)
+    ul_path = expand_path(args.ul)
+    iperf_path = expand_path(args.iperf)
+    if _missing(iperf_path, "iperf") or _missing(ul_path, "ul"):
+        return 1
 
+    with stage("read"):
         with _open_text(iperf_path) as f:
-            iperf_rows, iperf_warnings = read_upf_rows(f, dscp_map)
+            iperf_rows, iperf_warnings = read_upf_rows(counted(f), dscp_map)
         with _open_text(ul_path) as f:
-            ul_rows, ul_warnings = read_ul_rows(f, dscp_map)
-
-        if not iperf_rows:
-            print(f"ERROR: no iperf rows in {iperf_path}", file=sys.stderr)
-            return 1
-        if not ul_rows:
-            print(f"ERROR: no ul rows in {ul_path}", file=sys.stderr)
-            return 1
-
-        # Reuse ul-upf matcher: signal=iperf, target=ul => QRT = ul - iperf
-        results, warnings = compute_qrt_ul_upf(iperf_rows, ul_rows)
-        warnings = [
-            w.replace("ul t=", "iperf t=").replace("no UPF", "no ul")
-            for w in warnings
-        ]
-        warnings = iperf_warnings + ul_warnings + warnings
-
-        out_stream: TextIO
-        close_out = False
-        if output_path == "-":
-            out_stream = sys.stdout
-        else:
-            out_parent = Path(output_path).parent
-            if str(out_parent) not in ("", "."):
-                out_parent.mkdir(parents=True, exist_ok=True)
-            out_stream = open(output_path, "w", encoding="utf-8", newline="")
-            close_out = True
+            ul_rows, ul_warnings = read_ul_rows(counted(f), dscp_map)
+        count("parsed", len(iperf_rows) + len(ul_rows))
 
-        try:
-            for row in results:
-                out_stream.write(f"{row.qrt_s:.6f},{row.dscp}\n")
-        finally:
-            if close_out:
-                out_stream.close()
+    if not iperf_rows:
+        print(f"ERROR: no iperf rows in {iperf_path}", file=sys.stderr)
+        return 1
+    if not ul_rows:
+        print(f"ERROR: no ul rows in {ul_path}", file=sys.stderr)
+        return 1
 
-        print(f"signal=iperf file={iperf_path}", file=sys.stderr)
-        print(f"target=ul file={ul_path}", file=sys.stderr)
-        print(f"output={output_path}", file=sys.stderr)
+    # Reuse ul-upf matcher: signal=iperf, target=ul => QRT = ul - iperf
+    def run(match: str):
+        results, warnings = compute_qrt_ul_upf(iperf_rows, ul_rows, match=match, candidates=args.match_candidates)
+        return results, [w.replace("ul t=", "iperf t=").replace("no UPF", "no ul") for w in warnings]
 
-        for w in warnings:
-            print(f"WARN: {w}", file=sys.stderr)
+    return _Loaded(
+        run, iperf_warnings + ul_warnings, [f"signal=iperf file={iperf_path}", f"target=ul file={ul_path}"],
+        lambda row: row.dscp,
+    )
 
-        if not results:
-            print("ERROR: no QRT rows produced", file=sys.stderr)
-            return 1
 
-        matched = len(results)
-        qrt_vals = [r.qrt_s for r in results]
-        print(
-            f"matched={matched} qrt_ms: min={min(qrt_vals)*1000:.3f} "
-            f"avg={sum(qrt_vals)/len(qrt_vals)*1000:.3f} max={max(qrt_vals)*1000:.3f}",
-            file=sys.stderr,
-        )
-        return 0
-
-    # --- ul vs upf (no prio) ---
-    if args.signal == "ul-upf":
-        ul_path = expand_path(args.ul)
-        upf_path = expand_path(args.upf)
-        if not Path(ul_path).is_file():
-            print(f"ERROR: ul file not found: {ul_path}", file=sys.stderr)
-            return 1
-        if not Path(upf_path).is_file():
-            print(f"ERROR: UPF file not found: {upf_path}", file=sys.stderr)
-            return 1
+def _load_ul_upf(args: argparse.Namespace) -> _Loaded | int:
+    """ul vs upf DSCP (no prio)."""
+    dscp_map = dict(DEFAULT_DSCP_TO_FIVE_QI)
+    ul_path = expand_path(args.ul)
+    upf_path = expand_path(args.upf)
+    if _missing(ul_path, "ul") or _missing(upf_path, "UPF"):
+        return 1
 
+    with stage("read"):
         with _open_text(ul_path) as f:
-            ul_rows, ul_warnings = read_ul_rows(f, dscp_map)
+            ul_rows, ul_warnings = read_ul_rows(counted(f), dscp_map)
         with _open_text(upf_path) as f:
-            upf_rows, upf_warnings = read_upf_rows(f, dscp_map)
-
-        if not ul_rows:
-            print(f"ERROR: no ul rows in {ul_path}", file=sys.stderr)
-            return 1
-        if not upf_rows:
-            print(f"ERROR: no UPF rows in {upf_path}", file=sys.stderr)
-            return 1
-
-        results, warnings = compute_qrt_ul_upf(ul_rows, upf_rows)
-        warnings = ul_warnings + upf_warnings + warnings
-
-        out_stream: TextIO
-        close_out = False
-        if output_path == "-":
-            out_stream = sys.stdout
-        else:
-            out_parent = Path(output_path).parent
-            if str(out_parent) not in ("", "."):
-                out_parent.mkdir(parents=True, exist_ok=True)
-            out_stream = open(output_path, "w", encoding="utf-8", newline="")
-            close_out = True
+            upf_rows, upf_warnings = read_upf_rows(counted(f), dscp_map)
+        count("parsed", len(ul_rows) + len(upf_rows))
 
-        try:
-            for row in results:
-                out_stream.write(f"{row.qrt_s:.6f},{row.dscp}\n")
-        finally:
-            if close_out:
-                out_stream.close()
-
-        print(f"signal=ul file={ul_path}", file=sys.stderr)
-        print(f"target=UPF file={upf_path}", file=sys.stderr)
-        print(f"output={output_path}", file=sys.stderr)
-
-        for w in warnings:
-            print(f"WARN: {w}", file=sys.stderr)
+    if not ul_rows:
+        print(f"ERROR: no ul rows in {ul_path}", file=sys.stderr)
+        return 1
+    if not upf_rows:
+        print(f"ERROR: no UPF rows in {upf_path}", file=sys.stderr)
+        return 1
 
-        if not results:
-            print("ERROR: no QRT rows produced", file=sys.stderr)
-            return 1
+    return _Loaded(
+        lambda match: compute_qrt_ul_upf(ul_rows, upf_rows, match=match, candidates=args.match_candidates),
+        ul_warnings + upf_warnings,
+        [f"signal=ul file={ul_path}", f"target=UPF file={upf_path}"],
+        lambda row: row.dscp,
+    )
 
-        matched = len(results)
-        qrt_vals = [r.qrt_s for r in results]
-        print(
-            f"matched={matched} qrt_ms: min={min(qrt_vals)*1000:.3f} "
-            f"avg={sum(qrt_vals)/len(qrt_vals)*1000:.3f} max={max(qrt_vals)*1000:.3f}",
-            file=sys.stderr,
-        )
-        return 0
 
-    # --- signal vs prio ---
+def _load_signal_prio(args: argparse.Namespace) -> _Loaded | int:
+    """pcf / upf / iperf / ul / ul-5qi signal vs scheduler prio."""
+    dscp_map = dict(DEFAULT_DSCP_TO_FIVE_QI)
     prio_path = expand_path(args.prio)
     if args.signal == "upf":
         signal_path = expand_path(args.upf)
@@ -1081,30 +1292,20 @@ def main() -> int:
     for item in args.map:
         mapping.update(parse_mapping_arg([item]))
 
-    if not Path(signal_path).is_file():
-        print(f"ERROR: {signal_label} file not found: {signal_path}", file=sys.stderr)
+    if _missing(signal_path, signal_label):
         return 1
-    if not Path(prio_path).is_file():
-        print(f"ERROR: prio file not found: {prio_path}", file=sys.stderr)
+    if _missing(prio_path, "prio"):
         print("       Run extract_ue0_gnb_logs.sh first or pass --prio PATH", file=sys.stderr)
         return 1
 
-    parse_warnings: list[str] = []
-    with _open_text(signal_path) as f:
-        if args.signal == "upf":
-            signal_rows, parse_warnings = read_upf_rows(f, dscp_map)
-        elif args.signal == "iperf":
-            signal_rows, parse_warnings = read_iperf_rows(
-                f, dscp_map, anchor_dscp=args.anchor_dscp
+    with stage("read"):
+        with _open_text(signal_path) as f:
+            signal_rows, parse_warnings = read_signal_rows(
+                args.signal, counted(f), dscp_map, anchor_dscp=args.anchor_dscp
             )
-        elif args.signal == "ul":
-            signal_rows, parse_warnings = read_ul_rows(f, dscp_map)
-        elif args.signal == "ul-5qi":
-            signal_rows, parse_warnings = read_ul_five_qi_rows(f)
-        else:
-            signal_rows = read_pcf_rows(f)
-    with _open_text(prio_path) as f:
-        prio_rows = read_prio_rows(f)
+        with _open_text(prio_path) as f:
+            prio_rows = read_prio_rows(counted(f))
+        count("parsed", len(signal_rows) + len(prio_rows))
 
     if not signal_rows:
         print(f"ERROR: no {signal_label} rows in {signal_path}", file=sys.stderr)
@@ -1113,10 +1314,50 @@ def main() -> int:
         print(f"ERROR: no prio rows in {prio_path}", file=sys.stderr)
         return 1
 
-    results, warnings = compute_qrt(
-        signal_rows, prio_rows, mapping, args.tol, signal_label=signal_label, prio_decimals=args.prio_decimals
-    )
-    warnings = parse_warnings + warnings
+    def run(match: str):
+        return compute_qrt(
+            signal_rows,
+            prio_rows,
+            mapping,
+            args.tol,
+            signal_label=signal_label,
+            prio_decimals=args.prio_decimals,
+            match=match,
+            candidates=args.match_candidates,
+        )
+
+    if args.signal in ("upf", "iperf", "ul"):
+        value = lambda row: row.dscp if row.dscp is not None else row.five_qi  # noqa: E731
+    else:  # pcf / ul-5qi
+        value = lambda row: row.five_qi  # noqa: E731
+    return _Loaded(run, parse_warnings, [f"signal={signal_label} file={signal_path}", f"prio={prio_path}"], value)
+
+
+_LOADERS = {
+    "ul-ue-gnb": _load_ul_ue_gnb,
+    "ul-iperf-5qi": _load_ul_iperf_5qi,
+    "ul-iperf": _load_ul_iperf,
+    "ul-upf": _load_ul_upf,
+}
+
+DEFAULT_OUTPUTS = {
+    "upf": "qrt_upf.txt",
+    "iperf": "qrt_iperf.txt",
+    "ul": "qrt_ul.txt",
+    "ul-5qi": "qrt_ul_5qi.txt",
+    "ul-upf": "qrt_ul_upf.txt",
+    "ul-iperf": "qrt_ul_iperf.txt",
+    "ul-iperf-5qi": "qrt_ul_iperf_5qi.txt",
+    "ul-ue-gnb": "qrt_ul_ue_gnb.txt",
+    "pcf": "qrt.txt",
+}
+
+
+def _report(args: argparse.Namespace, output_path: str, loaded: _Loaded) -> int:
+    """Match, write qrt_s,value rows, then the stderr report shared by every mode."""
+    with stage("match-qrt"):
+        results, warnings = loaded.run(args.match)
+    warnings = loaded.read_warnings + warnings
 
     out_stream: TextIO
     close_out = False
@@ -1129,38 +1370,55 @@ def main() -> int:
         out_stream = open(output_path, "w", encoding="utf-8", newline="")
         close_out = True
 
-    try:
-        for row in results:
-            if args.signal in ("upf", "iperf", "ul"):
-                dscp_out = row.dscp if row.dscp is not None else row.five_qi
-                out_stream.write(f"{row.qrt_s:.6f},{dscp_out}\n")
-            else:
-                # pcf / ul-5qi
-                out_stream.write(f"{row.qrt_s:.6f},{row.five_qi}\n")
-    finally:
-        if close_out:
-            out_stream.close()
-
-    print(f"signal={signal_label} file={signal_path}", file=sys.stderr)
-    print(f"prio={prio_path}", file=sys.stderr)
+    value = loaded.value
+    with stage("write"):
+        try:
+            for row in results:
+                out_stream.write(f"{row.qrt_s:.6f},{value(row)}\n")
+        finally:
+            if close_out:
+                out_stream.close()
+
+    for line in loaded.info:
+        print(line, file=sys.stderr)
     print(f"output={output_path}", file=sys.stderr)
 
     for w in warnings:
         print(f"WARN: {w}", file=sys.stderr)
+    _report_match_diff(loaded.run, results, args)
+    _write_intervals(args.intervals, results, args.intervals_ue)
 
     if not results:
         print("ERROR: no QRT rows produced", file=sys.stderr)
         return 1
 
-    matched = len(results)
     qrt_vals = [r.qrt_s for r in results]
     print(
-        f"matched={matched} qrt_ms: min={min(qrt_vals)*1000:.3f} "
+        f"matched={len(results)} qrt_ms: min={min(qrt_vals)*1000:.3f} "
         f"avg={sum(qrt_vals)/len(qrt_vals)*1000:.3f} max={max(qrt_vals)*1000:.3f}",
         file=sys.stderr,
     )
+    if args.stats or args.stats_json:
+        _report_qrt_distribution(qrt_vals, args.stats_json)
     return 0
 
 
+def _run(args: argparse.Namespace) -> int:
+    if args.output is not None:
+        output_path = expand_path(args.output)
+    elif args.pair is not None:
+        output_path = expand_path(str(Path.home() / f"qrt_{Path(args.pair).stem.replace('-', '_')}.txt"))
+    else:
+        output_path = expand_path(str(Path.home() / DEFAULT_OUTPUTS[args.signal]))
+
+    if args.pair is not None:
+        loaded = _load_pair(args)
+    else:
+        loaded = _LOADERS.get(args.signal, _load_signal_prio)(args)
+    if isinstance(loaded, int):
+        return loaded
+    return _report(args, output_path, loaded)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
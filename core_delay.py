@@ -15,7 +15,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Set
+
+from log_io import open_log
+from stream_stats import add_stats_args, report_stats
+from ue_select import add_ue_args, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 DELAY_RE = re.compile(
@@ -48,7 +52,7 @@ def parse_time_arg(value: str, date_fallback: Optional[datetime]) -> datetime:
 
 def parse_rows(
     log_file: str,
-    ue_filter: Optional[int],
+    ue_filter: Optional[Set[int]],
     lcid_filter: Optional[int],
     start_time: Optional[str],
 ) -> List[DelayRow]:
@@ -56,7 +60,7 @@ def parse_rows(
     first_ts: Optional[datetime] = None
     start_dt: Optional[datetime] = None
 
-    with open(log_file, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_file) as f:
         for line in f:
             m = DELAY_RE.search(line)
             if not m:
@@ -76,7 +80,7 @@ def parse_rows(
                 start_dt = parse_time_arg(start_time, first_ts)
             if start_dt is not None and ts < start_dt:
                 continue
-            if ue_filter is not None and ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
             if lcid_filter is not None and lcid != lcid_filter:
                 continue
@@ -100,7 +104,7 @@ def parse_rows(
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract HOL delay/PDB from [DELAY-WEIGHT] logs.")
     ap.add_argument("log_file", help="Path to gnb.log")
-    ap.add_argument("--ue", type=int, default=None, help="Filter UE index (e.g. 0)")
+    add_ue_args(ap, default=None)
     ap.add_argument("--lcid", type=int, default=None, help="Filter LCID (e.g. 4)")
     ap.add_argument(
         "--start-time",
@@ -125,9 +129,11 @@ def main() -> int:
         help="Output only time + hol_delay_ms + pdb_ms columns",
     )
     ap.add_argument("--no-header", action="store_true", help="Print only rows without header")
+    add_stats_args(ap)
     args = ap.parse_args()
 
-    rows = parse_rows(args.log_file, args.ue, args.lcid, args.start_time)
+    ue_set = resolve_ue_set(args)
+    rows = parse_rows(args.log_file, ue_set, args.lcid, args.start_time)
     if not rows:
         print("No [DELAY-WEIGHT] rows matched the given filters.", file=sys.stderr)
         return 1
@@ -139,36 +145,46 @@ def main() -> int:
     else:
         base_ts = rows[0].ts
 
+    # --only-hol-pdb keeps a ue column when several UEs are selected.
+    ue_col = ",ue" if args.only_hol_pdb and is_multi_ue(ue_set) else ""
     if not args.no_header:
         if args.relative_time:
             if args.only_hol_pdb:
-                print("rel_time_s,hol_delay_ms,pdb_ms")
+                print(f"rel_time_s,hol_delay_ms,pdb_ms{ue_col}")
             else:
                 print("rel_time_s,hol_delay_ms,pdb_ms,delay_contrib,delay_weight,ue,lcid")
         else:
             if args.only_hol_pdb:
-                print("timestamp,hol_delay_ms,pdb_ms")
+                print(f"timestamp,hol_delay_ms,pdb_ms{ue_col}")
             else:
                 print("timestamp,hol_delay_ms,pdb_ms,delay_contrib,delay_weight,ue,lcid")
 
     for r in rows:
+        ue_f = f",{r.ue}" if ue_col else ""
         if args.relative_time:
             rel = (r.ts - base_ts).total_seconds()
             if args.only_hol_pdb:
-                print(f"{rel:.6f},{r.hol_delay_ms:.3f},{r.pdb_ms}")
+                print(f"{rel:.6f},{r.hol_delay_ms:.3f},{r.pdb_ms}{ue_f}")
             else:
                 print(
                     f"{rel:.6f},{r.hol_delay_ms:.3f},{r.pdb_ms},{r.delay_contrib:.3f},{r.delay_weight:.3f},{r.ue},{r.lcid}"
                 )
         else:
             if args.only_hol_pdb:
-                print(f"{r.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{r.hol_delay_ms:.3f},{r.pdb_ms}")
+                print(f"{r.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{r.hol_delay_ms:.3f},{r.pdb_ms}{ue_f}")
             else:
                 print(
                     f"{r.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{r.hol_delay_ms:.3f},{r.pdb_ms},"
                     f"{r.delay_contrib:.3f},{r.delay_weight:.3f},{r.ue},{r.lcid}"
                 )
 
+    if args.stats or args.stats_json:
+        report_stats(
+            "hol_delay_ms",
+            (((r.ts - base_ts).total_seconds(), r.hol_delay_ms) for r in rows),
+            stats_json=args.stats_json,
+            window_s=args.stats_window_s,
+        )
     return 0
 
 
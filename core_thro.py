@@ -12,6 +12,9 @@ Notes:
     `target_log_period_ms` (in our patched build: ~10ms). Each line already
     contains DL bytes and brate for the elapsed window.
   - We bin them on top of that and compute average Mbps per bin.
+  - --pyramid PATH stores DL/UL bytes and period at every standard bin size
+    (1..1000 ms) in one pass; --from-pyramid PATH --bin-ms N serves any of
+    them later without re-parsing the log.
 """
 
 from __future__ import annotations
@@ -21,7 +24,12 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Set, Tuple
+
+from log_io import open_log
+from pyramid import Pyramid, add_pyramid_args, load_pyramids, save_pyramids
+from rle_series import dt_to_us, us_to_dt
+from ue_select import add_ue_args, format_ue_set, group_by_ue, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 # Example matched line:
@@ -78,17 +86,17 @@ def _parse_start_time_arg(value: str, date_fallback: datetime | None) -> datetim
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = THROUGHPUT_RE.search(line)
             if not m:
                 continue
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
             ts = datetime.fromisoformat(m.group("ts"))
             period_ms = float(m.group("period_ms"))
@@ -107,11 +115,12 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
     return entries
 
 
-def bin_entries(entries: List[Entry], bin_ms: int) -> List[Bin]:
+def bin_entries(entries: List[Entry], bin_ms: int, base: datetime | None = None) -> List[Bin]:
     if not entries:
         return []
 
-    base = entries[0].ts
+    if base is None:
+        base = entries[0].ts
     bins: dict[int, Bin] = {}
     for e in entries:
         delta_ms = (e.ts - base).total_seconds() * 1000.0
@@ -125,6 +134,30 @@ def bin_entries(entries: List[Entry], bin_ms: int) -> List[Bin]:
     return [bins[i] for i in sorted(bins.keys())]
 
 
+def build_pyramids(entries: List[Entry], base: datetime) -> Dict[str, Pyramid]:
+    """Per-UE (dl_bytes, ul_bytes, period_ms) sums at 1 ms; coarser levels merged from it."""
+    base_us = dt_to_us(base)
+    out: Dict[str, Pyramid] = {}
+    for ue, g in group_by_ue(entries).items():
+        p = out[str(ue)] = Pyramid(base_us, nfields=3)
+        for e in g:
+            p.add(dt_to_us(e.ts), (e.dl_bytes, e.ul_bytes, e.period_ms))
+    return out
+
+
+def bins_from_pyramid(pyr: Pyramid, bin_ms: int) -> List[Bin]:
+    base = us_to_dt(pyr.base_us)
+    return [
+        Bin(
+            start=base + timedelta(milliseconds=idx * bin_ms),
+            dl_bytes=int(c.sums[0]),
+            ul_bytes=int(c.sums[1]),
+            total_period_ms=c.sums[2],
+        )
+        for idx, c in pyr.level(bin_ms)
+    ]
+
+
 def compute_mbps(b: Bin, direction: str) -> float:
     if b.total_period_ms <= 0:
         return 0.0
@@ -144,8 +177,8 @@ def main() -> int:
     ap = argparse.ArgumentParser(
         description="Extract UE throughput from 'Throughput 10ms' lines with configurable bin size."
     )
-    ap.add_argument("log_file", help="Path to gnb.log")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    ap.add_argument("log_file", nargs="?", default=None, help="Path to gnb.log")
+    add_ue_args(ap)
     ap.add_argument("--bin-ms", type=int, default=10, help="Output bin in ms (default: 10)")
     ap.add_argument(
         "--start-time",
@@ -172,44 +205,63 @@ def main() -> int:
         default="throughput_1ms_plot.png",
         help="Output plot filename when --plot is set (default: throughput_1ms_plot.png)",
     )
+    add_pyramid_args(ap)
     args = ap.parse_args()
 
     if args.bin_ms <= 0:
         print("ERROR: --bin-ms must be > 0", file=sys.stderr)
         return 2
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
-    if not entries:
-        print(
-            f"No 'Throughput 10ms' entries found for UE{args.ue} in {args.log_file}",
-            file=sys.stderr,
-        )
-        return 1
-
-    bins = bin_entries(entries, args.bin_ms)
-    first_out_ts = bins[0].start if bins else None
-    x_vals: List[float] = []
-    y_vals: List[float] = []
+    if (args.log_file is None) == (args.from_pyramid is None):
+        print("ERROR: give either a log file or --from-pyramid", file=sys.stderr)
+        return 2
 
+    if args.from_pyramid is not None:
+        try:
+            meta, pyramids = load_pyramids(args.from_pyramid, tool="core_thro")
+            ue_set = None if meta.get("ues") is None else set(meta["ues"])
+            bins_by_ue = {int(ue): bins_from_pyramid(p, args.bin_ms) for ue, p in sorted(pyramids.items())}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+    else:
+        ue_set = resolve_ue_set(args)
+        entries = parse_entries(args.log_file, ue_set, args.start_time)
+        if not entries:
+            print(
+                f"No 'Throughput 10ms' entries found for {format_ue_set(ue_set)} in {args.log_file}",
+                file=sys.stderr,
+            )
+            return 1
+
+        # Common bin grid for all selected UEs (first matched line = bin 0).
+        base = entries[0].ts
+        bins_by_ue = {ue: bin_entries(g, args.bin_ms, base) for ue, g in group_by_ue(entries).items()}
+        if args.pyramid is not None:
+            save_pyramids(
+                args.pyramid, "core_thro", build_pyramids(entries, base),
+                {"ues": None if ue_set is None else sorted(ue_set)},
+            )
+    rows = sorted((b.start, ue, b) for ue, bins in bins_by_ue.items() for b in bins)
+    first_out_ts = rows[0][0] if rows else None
+    multi_ue = is_multi_ue(ue_set)
+    series: Dict[int, Tuple[List[float], List[float]]] = {ue: ([], []) for ue in bins_by_ue}
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,throughput_mbps")
+            print(f"rel_time_s{ue_col},throughput_mbps")
         else:
-            print("timestamp,throughput_mbps")
-
-    for b in bins:
+            print(f"timestamp{ue_col},throughput_mbps")
+    for start, ue, b in rows:
         mbps = compute_mbps(b, args.direction)
+        ue_f = f",{ue}" if multi_ue else ""
+        rel_s = (start - first_out_ts).total_seconds() if first_out_ts is not None else 0.0
+        series[ue][0].append(rel_s)
+        series[ue][1].append(mbps)
         if args.relative_time:
-            rel_s = (b.start - first_out_ts).total_seconds() if first_out_ts is not None else 0.0
-            x_vals.append(rel_s)
-            y_vals.append(mbps)
-            print(f"{rel_s:.6f},{mbps:.2f}")
+            print(f"{rel_s:.6f}{ue_f},{mbps:.2f}")
         else:
-            if first_out_ts is not None:
-                rel_s = (b.start - first_out_ts).total_seconds()
-                x_vals.append(rel_s)
-                y_vals.append(mbps)
-            print(f"{b.start.strftime('%Y-%m-%dT%H:%M:%S.%f')},{mbps:.2f}")
+            print(f"{start.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{mbps:.2f}")
 
     if args.plot:
         try:
@@ -219,10 +271,13 @@ def main() -> int:
             return 3
 
         plt.figure(figsize=(12, 4))
-        plt.plot(x_vals, y_vals, linewidth=1.2)
+        for ue, (x_vals, y_vals) in series.items():
+            plt.plot(x_vals, y_vals, linewidth=1.2, label=f"UE{ue}")
+        if multi_ue:
+            plt.legend(loc="upper right", fontsize="small")
         plt.xlabel("Time (s)")
         plt.ylabel("Throughput (Mbps)")
-        plt.title(f"UE{args.ue} {args.direction.upper()} Throughput ({args.bin_ms}ms bin, 1ms src)")
+        plt.title(f"{format_ue_set(ue_set)} {args.direction.upper()} Throughput ({args.bin_ms}ms bin, 1ms src)")
         plt.grid(True, alpha=0.3)
         plt.tight_layout()
         plt.savefig(args.plot_file, dpi=150)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+DL DSCP propagation tracer: UPF marking -> gNB GTP-U -> SDAP, per UE.
+
+Stages (one pass over each log):
+  upf   [UPF-DSCP] per-packet lines of upfd.log (upf.UpfPacketStream; only
+        the DSCP change points of --upf-direction, default N6-TUN-DL, are
+        kept: UL packets carry their own DSCP and would interleave)
+  gtp   "[GTPU] DL SDU DSCP changed to X" in gnb.log                (gtp.py)
+  sdap  "[STEP1-SDAP] ... DL ... DSCP=X pdu_len=N" in gnb.log     (ul_sdap.py)
+        one line per PDU: counted on the fly, never stored
+
+Every change of the first stage (UPF with --upf, else GTP-U) is one
+transition; it is matched to the next change to the same DSCP in the
+following stage (compute_qrt.assign_targets, one-to-one, --match), so each
+row has the per-hop delays upf->gtp, gtp->sdap and upf->sdap (ms). The UPF
+log has no UE id: with several UEs every UE is traced against the same UPF
+change points.
+
+stale_pkts / stale_bytes: SDAP DL PDUs of the UE that arrive between the
+transition and the next one of the first stage but still carry another DSCP
+(bytes = pdu_len); gtp_stale_* counts the same from the GTP-U change on.
+
+  python3 dscp_trace.py gnb.log --upf upfd.log --year 2026 > dscp_trace.csv
+  python3 dscp_trace.py gnb.log --ues 0-3 --relative-time --min-pdu-len 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from compute_qrt import MATCH_MODES, assign_targets
+from gtp import DSCP_CHANGE_RE
+from log_io import open_log
+from rle_series import dt_to_us, us_to_dt
+from stream_stats import LogHistogram, format_summary
+from ue_select import add_ue_args, resolve_ue_set, ue_wanted
+from ul_sdap import SDAP_DSCP_RE
+from upf import UpfPacketStream
+
+Change = Tuple[int, int]  # (ts_us, dscp)
+
+
+@dataclass
+class UeTrace:
+    """gNB side of one UE: GTP-U / SDAP change points and stale counters."""
+
+    gtp: List[Change] = field(default_factory=list)
+    sdap: List[Change] = field(default_factory=list)
+    gtp_stale: List[List[int]] = field(default_factory=list)  # per gtp change: [pkts, bytes]
+    upf_stale: Dict[int, List[int]] = field(default_factory=dict)  # upf change index -> [pkts, bytes]
+    upf_pos: int = -1  # last UPF change at/before the latest SDAP PDU
+    sdap_pkts: int = 0
+    sdap_bytes: int = 0
+
+
+@dataclass
+class Transition:
+    ue: int
+    dscp: int
+    prev_dscp: Optional[int]
+    upf_us: Optional[int]
+    gtp_us: Optional[int]
+    sdap_us: Optional[int]
+    stale_pkts: int
+    stale_bytes: int
+    gtp_stale_pkts: int
+    gtp_stale_bytes: int
+
+
+def scan_gnb(
+    log_path: str,
+    ue_filter: Optional[Set[int]],
+    upf_changes: List[Change],
+    min_pdu_len: int = 0,
+) -> Dict[int, UeTrace]:
+    """One pass over gnb.log; SDAP PDUs are checked against the latest UPF / GTP-U change."""
+    ues: Dict[int, UeTrace] = {}
+    sec_key: Optional[str] = None
+    sec_us = 0
+    n_upf = len(upf_changes)
+    with open_log(log_path) as f:
+        for line in f:
+            if "STEP1-SDAP" in line:
+                m = SDAP_DSCP_RE.search(line)
+                if not m or m.group("dir") != "DL":
+                    continue
+                pdu_len = int(m.group("pdu_len"))
+                if pdu_len < min_pdu_len:
+                    continue
+            elif "[GTPU]" in line:
+                m = DSCP_CHANGE_RE.search(line)
+                if not m:
+                    continue
+                pdu_len = -1
+            else:
+                continue
+            ue = int(m.group("ue"))
+            if not ue_wanted(ue_filter, ue):
+                continue
+            # PDU timestamps are all different: cache the whole-second part only
+            ts = m.group("ts")
+            if ts[:19] != sec_key:
+                sec_key = ts[:19]
+                sec_us = dt_to_us(datetime.fromisoformat(sec_key))
+            frac = ts[20:26]
+            ts_us = sec_us + int(frac) * 10 ** (6 - len(frac))
+            dscp = int(m.group("dscp"))
+            u = ues.get(ue)
+            if u is None:
+                u = ues[ue] = UeTrace()
+
+            if pdu_len < 0:
+                u.gtp.append((ts_us, dscp))
+                u.gtp_stale.append([0, 0])
+                continue
+
+            u.sdap_pkts += 1
+            u.sdap_bytes += pdu_len
+            if not u.sdap or u.sdap[-1][1] != dscp:
+                u.sdap.append((ts_us, dscp))
+            if u.gtp and dscp != u.gtp[-1][1]:
+                c = u.gtp_stale[-1]
+                c[0] += 1
+                c[1] += pdu_len
+            pos = u.upf_pos
+            while pos + 1 < n_upf and upf_changes[pos + 1][0] <= ts_us:
+                pos += 1
+            u.upf_pos = pos
+            if pos >= 0 and dscp != upf_changes[pos][1]:
+                c = u.upf_stale.get(pos)
+                if c is None:
+                    c = u.upf_stale[pos] = [0, 0]
+                c[0] += 1
+                c[1] += pdu_len
+    return ues
+
+
+def _match(events: List[Change], targets: List[Change], match: str) -> List[Optional[int]]:
+    by_dscp: Dict[int, List[int]] = {}
+    for j, (_, dscp) in enumerate(targets):
+        by_dscp.setdefault(dscp, []).append(j)
+    return assign_targets(
+        [float(t) for t, _ in events], [d for _, d in events], [float(t) for t, _ in targets], by_dscp, match
+    )
+
+
+def trace_ue(ue: int, u: UeTrace, upf_changes: Optional[List[Change]], match: str = "greedy") -> List[Transition]:
+    """Transitions of one UE, anchored on the UPF changes (or the GTP-U changes without UPF log)."""
+    gtp_to_sdap = _match(u.gtp, u.sdap, match)
+    out: List[Transition] = []
+    if upf_changes is None:
+        for i, ((g_us, dscp), s) in enumerate(zip(u.gtp, gtp_to_sdap)):
+            pkts, nbytes = u.gtp_stale[i]
+            out.append(Transition(
+                ue, dscp, u.gtp[i - 1][1] if i else None, None, g_us,
+                u.sdap[s][0] if s is not None else None, pkts, nbytes, pkts, nbytes,
+            ))
+        return out
+
+    # upf_changes[0] is the DSCP of the first packet, not a transition
+    upf_to_gtp = _match(upf_changes[1:], u.gtp, match)
+    for i, g in enumerate(upf_to_gtp, 1):
+        up_us, dscp = upf_changes[i]
+        pkts, nbytes = u.upf_stale.get(i, (0, 0))
+        g_pkts, g_bytes = u.gtp_stale[g] if g is not None else (0, 0)
+        s = gtp_to_sdap[g] if g is not None else None
+        out.append(Transition(
+            ue, dscp, upf_changes[i - 1][1], up_us,
+            u.gtp[g][0] if g is not None else None,
+            u.sdap[s][0] if s is not None else None,
+            pkts, nbytes, g_pkts, g_bytes,
+        ))
+    return out
+
+
+def _delay_ms(a: Optional[int], b: Optional[int]) -> Optional[float]:
+    return None if a is None or b is None else (b - a) / 1000.0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Follow DL DSCP changes UPF -> GTP-U -> SDAP per UE.")
+    ap.add_argument("gnb_log", help="gnb.log with [GTPU] DSCP change and [STEP1-SDAP] lines")
+    ap.add_argument("--upf", default=None, help="upfd.log with [UPF-DSCP] lines (first stage)")
+    ap.add_argument(
+        "--upf-direction", default="N6-TUN-DL", help="UPF direction traced (default: N6-TUN-DL, the DL marking)"
+    )
+    ap.add_argument("--year", type=int, default=None, help="Year for the MM/DD UPF log prefix (default: today)")
+    add_ue_args(ap, default=None)
+    ap.add_argument("--min-pdu-len", type=int, default=0, help="ignore SDAP PDUs shorter than this")
+    ap.add_argument("--match", choices=MATCH_MODES, default="greedy", help="hop matching (compute_qrt.py --match)")
+    ap.add_argument("--relative-time", action="store_true", help="seconds from the first transition")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    upf_changes: Optional[List[Change]] = None
+    try:
+        if args.upf is not None:
+            stream = UpfPacketStream(None, args.year, args.upf_direction).feed_file(args.upf)
+            upf_changes = sorted((c.ts_us, c.dscp) for c in stream.changes)
+            if len(upf_changes) < 2:
+                print(
+                    f"ERROR: no DSCP change in the [UPF-DSCP] {args.upf_direction} packets of {args.upf}",
+                    file=sys.stderr,
+                )
+                return 1
+        ues = scan_gnb(args.gnb_log, resolve_ue_set(args), upf_changes or [], args.min_pdu_len)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if not any(u.gtp for u in ues.values()):
+        print(f"No [GTPU] DL SDU DSCP changes in {args.gnb_log}", file=sys.stderr)
+        return 1
+
+    rows = [t for ue in sorted(ues) for t in trace_ue(ue, ues[ue], upf_changes, args.match)]
+    if not rows:
+        print("No DSCP transitions", file=sys.stderr)
+        return 1
+    starts = [t.upf_us if t.upf_us is not None else t.gtp_us for t in rows]
+    base = min(starts)
+
+    def fmt(us: Optional[int]) -> str:
+        if us is None:
+            return ""
+        if args.relative_time:
+            return f"{(us - base) / 1e6:.6f}"
+        return us_to_dt(us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+    def fmt_ms(v: Optional[float]) -> str:
+        return "" if v is None else f"{v:.3f}"
+
+    hops = {"upf_gtp": LogHistogram(unit=0.001), "gtp_sdap": LogHistogram(unit=0.001), "upf_sdap": LogHistogram(unit=0.001)}
+    if not args.no_header:
+        print("ue,prev_dscp,dscp,upf_time,gtp_time,sdap_time,upf_gtp_ms,gtp_sdap_ms,upf_sdap_ms,"
+              "stale_pkts,stale_bytes,gtp_stale_pkts,gtp_stale_bytes")
+    for t in rows:
+        delays = {
+            "upf_gtp": _delay_ms(t.upf_us, t.gtp_us),
+            "gtp_sdap": _delay_ms(t.gtp_us, t.sdap_us),
+            "upf_sdap": _delay_ms(t.upf_us, t.sdap_us),
+        }
+        for name, v in delays.items():
+            if v is not None:
+                hops[name].add(v)
+        prev = "" if t.prev_dscp is None else str(t.prev_dscp)
+        print(
+            f"{t.ue},{prev},{t.dscp},{fmt(t.upf_us)},{fmt(t.gtp_us)},{fmt(t.sdap_us)},"
+            f"{fmt_ms(delays['upf_gtp'])},{fmt_ms(delays['gtp_sdap'])},{fmt_ms(delays['upf_sdap'])},"
+            f"{t.stale_pkts},{t.stale_bytes},{t.gtp_stale_pkts},{t.gtp_stale_bytes}"
+        )
+
+    for ue in sorted(ues):
+        u = ues[ue]
+        mine = [t for t in rows if t.ue == ue]
+        print(
+            f"# ue={ue} transitions={len(mine)} gtp_changes={len(u.gtp)} sdap_changes={len(u.sdap)} "
+            f"sdap_pkts={u.sdap_pkts} sdap_bytes={u.sdap_bytes} "
+            f"stale_pkts={sum(t.stale_pkts for t in mine)} stale_bytes={sum(t.stale_bytes for t in mine)}",
+            file=sys.stderr,
+        )
+    for name, h in hops.items():
+        if h.count:
+            print(f"# {name}_ms: {format_summary(h)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
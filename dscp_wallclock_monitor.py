@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Record the wall-clock time of iperf "Changed DSCP" lines as wall_time,dscp.
+
+Replacement for the tail -F | while read loop in UDP_DSCP_UL.sh
+(start_dscp_wallclock_monitor): no fork per line, lines are stamped with
+clock_gettime_ns at read time (inotify, polling fallback), and the DSCP is
+parsed with one compiled regex using the same rules as _dscp_from_iperf_line /
+_normalize_dscp_value. Output is what compute_qrt.py --signal iperf reads
+(read_iperf_wallclock_rows):
+
+  # wall_time,dscp
+  18:59:40.066812,44
+
+On SIGTERM/SIGINT it prints its own latency (read -> written, wake -> read)
+to stderr and as '# ...' trailer lines in the CSV (ignored by readers).
+
+  python3 dscp_wallclock_monitor.py /tmp/iperf3_dscp_100cycles_ul_ue1.log \\
+      -o /tmp/iperf3_dscp_100cycles_ul_wallclock.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import signal
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from log_follow import FollowStats, follow_lines
+
+CHANGED_DSCP_RE = re.compile(r"changed\s+dscp", re.IGNORECASE)
+# Same precedence as _dscp_from_iperf_line: "changed ... to N", "TOS N", "DSCP ... N".
+DSCP_TO_RE = re.compile(r"[Cc]hanged.*\b[Tt][Oo]\b[= ]*([0-9]+)")
+DSCP_TOS_RE = re.compile(r".*\b[Tt][Oo][Ss]\b[= ]*([0-9]+)")
+DSCP_KW_RE = re.compile(r".*[Dd][Ss][Cc][Pp][^0-9]*([0-9]+)")
+LAST_NUM_RE = re.compile(r"([0-9]+)(?!.*[0-9])")
+
+# _normalize_dscp_value: TOS bytes / 0 -> DSCP used by the schedules.
+DSCP_FIXED = {0: 9, 36: 9, 9: 9, 15: 15, 24: 24, 44: 44, 60: 15, 96: 24, 176: 44}
+
+DEFAULT_OUTPUT = "/tmp/iperf3_dscp_100cycles_ul_wallclock.txt"
+
+
+def normalize_dscp(v: int) -> int:
+    if v in DSCP_FIXED:
+        return DSCP_FIXED[v]
+    dscp = v // 4 if v % 4 == 0 else v
+    return 9 if dscp == 0 else dscp
+
+
+def dscp_from_iperf_line(line: str) -> Optional[int]:
+    for rx in (DSCP_TO_RE, DSCP_TOS_RE, DSCP_KW_RE, LAST_NUM_RE):
+        m = rx.search(line)
+        if m:
+            return normalize_dscp(int(m.group(1)))
+    return None
+
+
+def format_wall_ns(ns: int) -> str:
+    """HH:MM:SS.ffffff local time (same as wallclock_us in the scripts)."""
+    sec, rem = divmod(ns, 1_000_000_000)
+    return f"{datetime.fromtimestamp(sec).strftime('%H:%M:%S')}.{rem // 1000:06d}"
+
+
+def _latency_summary(name: str, values_us: List[float]) -> str:
+    if not values_us:
+        return f"{name}: n=0"
+    v = sorted(values_us)
+    p = lambda q: v[min(int(q / 100.0 * len(v)), len(v) - 1)]  # noqa: E731
+    return (
+        f"{name}: n={len(v)} p50={p(50):.1f}us p99={p(99):.1f}us max={v[-1]:.1f}us"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="iperf 'Changed DSCP' -> wall_time,dscp CSV.")
+    ap.add_argument("iperf_log", help="iperf client log to follow (e.g. UE1_LOG)")
+    ap.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help=f"CSV (default: {DEFAULT_OUTPUT})")
+    ap.add_argument("--truncate", action="store_true", help="start a new CSV with the header")
+    ap.add_argument("--from-start", action="store_true", help="also scan existing lines")
+    ap.add_argument("--poll-ms", type=float, default=1.0, help="polling interval without inotify")
+    ap.add_argument("--no-inotify", action="store_true", help="force polling")
+    args = ap.parse_args()
+
+    stopping = False
+
+    def on_signal(_sig, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    # Append mode: the scenario script writes the header and the initial
+    # t=0 row (record_initial_dscp_wallclock) into the same file.
+    out = open(args.output, "w" if args.truncate else "a", encoding="utf-8", buffering=1)
+    if args.truncate:
+        out.write("# wall_time,dscp\n")
+
+    stats = FollowStats()
+    write_lat_us: List[float] = []
+    wake_lat_us: List[float] = []
+    events = 0
+    clock = time.clock_gettime_ns
+    realtime = time.CLOCK_REALTIME
+    try:
+        for read_ns, wake_ns, line in follow_lines(
+            args.iperf_log,
+            poll_s=args.poll_ms / 1000.0,
+            use_inotify=not args.no_inotify,
+            from_start=args.from_start,
+            stop=lambda: stopping,
+            stats=stats,
+        ):
+            if not CHANGED_DSCP_RE.search(line):
+                continue
+            dscp = dscp_from_iperf_line(line)
+            if dscp is None:
+                continue
+            out.write(f"{format_wall_ns(read_ns)},{dscp}\n")
+            done_ns = clock(realtime)
+            events += 1
+            write_lat_us.append((done_ns - read_ns) / 1000.0)
+            wake_lat_us.append((read_ns - wake_ns) / 1000.0)
+            if stopping:
+                break
+    finally:
+        summary = [
+            f"dscp_wallclock_monitor mode={stats.mode} lines={stats.lines} events={events} "
+            f"chunks={stats.chunks} reopens={stats.reopens}",
+            _latency_summary("read_to_write", write_lat_us),
+            _latency_summary("wake_to_read", wake_lat_us),
+        ]
+        for s in summary:
+            out.write(f"# {s}\n")
+            print(f"# {s}", file=sys.stderr)
+        out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
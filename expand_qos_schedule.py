@@ -17,6 +17,7 @@ Default profiles (override with --profile or --profiles-json):
 Example:
   python3 expand_qos_schedule.py qos_schedule_dscp_replay.csv -o expanded.csv
   python3 expand_qos_schedule.py qos_schedule_dscp.csv --duration 21
+  python3 expand_qos_schedule.py qos_schedule_dscp.csv --duration 3600 --format bin -o expanded.tbl
   # optional: force 0.5 s grid (not recommended for measured schedules)
   python3 expand_qos_schedule.py schedule.csv --change-step 0.5 --schedule-end 20
 """
@@ -24,13 +25,14 @@ Example:
 from __future__ import annotations
 
 import argparse
-import csv
 import json
 import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, TextIO, Tuple
 
+from table_io import Column, TableWriter, add_format_args
+
 FIVE_QI_TO_DSCP = {80: 24, 66: 44, 84: 15, 9: 0}
 DSCP_TO_FIVE_QI = {24: 80, 44: 66, 15: 84, 0: 9}
 
@@ -198,15 +200,6 @@ def write_schedule_csv(path: Path, events: List[ScheduleEvent], *, dscp: bool) -
     path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
-def active_five_qi(events: List[ScheduleEvent], t: float) -> int:
-    qi = events[0].five_qi
-    for ev in events:
-        if ev.rel_time_s > t + 1e-12:
-            break
-        qi = ev.five_qi
-    return qi
-
-
 def frange(start: float, stop: float, step: float) -> List[float]:
     if step <= 0:
         raise ValueError("step must be > 0")
@@ -214,14 +207,6 @@ def frange(start: float, stop: float, step: float) -> List[float]:
     return [round(start + i * step, 10) for i in range(n + 1)]
 
 
-def fmt_opt(v: Optional[float]) -> str:
-    if v is None:
-        return ""
-    if abs(v - round(v)) < 1e-9:
-        return str(int(round(v)))
-    return f"{v:g}"
-
-
 def write_expanded(
     out: TextIO,
     events: List[ScheduleEvent],
@@ -230,39 +215,31 @@ def write_expanded(
     step: float,
     end_time: float,
     header: bool,
+    fmt: str = "csv",
 ) -> int:
     times = frange(0.0, end_time, step)
-    fieldnames = [
-        "rel_time_s",
-        "five_qi",
-        "dscp",
-        "qos_class",
-        "scenario_rate_mbps",
-        "gbr_mbps",
-        "pdb_ms",
+    columns = [
+        Column("rel_time_s", "%.2f"),
+        Column("five_qi", "%d"),
+        Column("dscp", "%d"),
+        Column("qos_class"),
+        Column("scenario_rate_mbps", "num"),
+        Column("gbr_mbps", "num"),
+        Column("pdb_ms", "num"),
     ]
-    writer = csv.DictWriter(out, fieldnames=fieldnames, lineterminator="\n")
-    if header:
-        writer.writeheader()
-    rows = 0
+    writer = TableWriter(columns, fmt, out, header=header)
+    # times ascend: walk the events once, the active 5QI is the last event at or before t
+    i = 0
     for t in times:
-        qi = active_five_qi(events, t)
+        while i < len(events) and events[i].rel_time_s <= t + 1e-12:
+            i += 1
+        qi = events[i - 1].five_qi if i else events[0].five_qi
         if qi not in profiles:
             raise KeyError(f"no profile for 5QI {qi} (t={t})")
         p = profiles[qi]
-        writer.writerow(
-            {
-                "rel_time_s": f"{t:.2f}",
-                "five_qi": p.five_qi,
-                "dscp": p.dscp,
-                "qos_class": p.qos_class,
-                "scenario_rate_mbps": fmt_opt(p.scenario_rate_mbps),
-                "gbr_mbps": fmt_opt(p.gbr_mbps),
-                "pdb_ms": fmt_opt(p.pdb_ms),
-            }
-        )
-        rows += 1
-    return rows
+        writer.row(t, p.five_qi, p.dscp, p.qos_class, p.scenario_rate_mbps, p.gbr_mbps, p.pdb_ms)
+    writer.close()
+    return writer.count
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -317,6 +294,7 @@ def build_parser() -> argparse.ArgumentParser:
         help="also write aligned rel_time_s,five_qi (or dscp) schedule CSV",
     )
     p.add_argument("--no-header", action="store_true")
+    add_format_args(p)
     return p
 
 
@@ -373,6 +351,7 @@ def main(argv: Optional[List[str]] = None) -> int:
             step=args.step,
             end_time=end_time,
             header=not args.no_header,
+            fmt=args.format,
         )
     finally:
         if close:
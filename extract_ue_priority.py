@@ -7,7 +7,13 @@ UE별 Priority 정보 추출 스크립트
 import re
 import sys
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Sequence
+from datetime import datetime
+
+from window_stats import PRIORITY_FIELDS, summarize, window_records
+
+# 라인 앞의 ISO timestamp (있으면 -w 윈도우 집계에 사용)
+TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+)')
 
 def parse_priority_log(log_file: str) -> Dict[int, List[Dict]]:
     """
@@ -33,8 +39,14 @@ def parse_priority_log(log_file: str) -> Dict[int, List[Dict]]:
                 match = pattern.search(line)
                 if match:
                     ue_idx = int(match.group(1))
+                    ts_match = TIMESTAMP_RE.match(line)
+                    try:
+                        timestamp = datetime.fromisoformat(ts_match.group(1)) if ts_match else None
+                    except ValueError:
+                        timestamp = None
                     entry = {
                         'line': line_num,
+                        'timestamp': timestamp,
                         'min_combined_prio': int(match.group(2)),
                         'prio_weight': float(match.group(3)),
                         'pf_weight': float(match.group(4)),
@@ -66,27 +78,28 @@ def print_summary(ue_data: Dict[int, List[Dict]]):
         print(f"\n[UE{ue_idx}] 총 {len(entries)}개의 레코드")
         print("-" * 80)
         
-        # 통계 계산
-        min_combined_prios = [e['min_combined_prio'] for e in entries]
-        prio_weights = [e['prio_weight'] for e in entries]
-        pf_weights = [e['pf_weight'] for e in entries]
+        # 통계 계산 (한 번 순회)
+        stats = summarize(entries, ('min_combined_prio', 'prio_weight', 'pf_weight'))
+        mcp = stats['min_combined_prio']
+        pw = stats['prio_weight']
+        pf = stats['pf_weight']
         
         print(f"  min_combined_prio:")
-        print(f"    - 최소값: {min(min_combined_prios)}")
-        print(f"    - 최대값: {max(min_combined_prios)}")
-        print(f"    - 평균값: {sum(min_combined_prios) / len(min_combined_prios):.2f}")
-        unique_prios = sorted(set(min_combined_prios))
+        print(f"    - 최소값: {mcp.min}")
+        print(f"    - 최대값: {mcp.max}")
+        print(f"    - 평균값: {mcp.mean:.2f}")
+        unique_prios = sorted(set(e['min_combined_prio'] for e in entries))
         print(f"    - 고유값: {unique_prios}")
         
         print(f"  prio_weight:")
-        print(f"    - 최소값: {min(prio_weights):.3f}")
-        print(f"    - 최대값: {max(prio_weights):.3f}")
-        print(f"    - 평균값: {sum(prio_weights) / len(prio_weights):.3f}")
+        print(f"    - 최소값: {pw.min:.3f}")
+        print(f"    - 최대값: {pw.max:.3f}")
+        print(f"    - 평균값: {pw.mean:.3f}")
         
         print(f"  pf_weight:")
-        print(f"    - 최소값: {min(pf_weights):.6f}")
-        print(f"    - 최대값: {max(pf_weights):.6f}")
-        print(f"    - 평균값: {sum(pf_weights) / len(pf_weights):.6f}")
+        print(f"    - 최소값: {pf.min:.6f}")
+        print(f"    - 최대값: {pf.max:.6f}")
+        print(f"    - 평균값: {pf.mean:.6f}")
 
 def print_detailed(ue_data: Dict[int, List[Dict]], ue_idx: int = None):
     """특정 UE의 상세 정보를 전체 출력합니다."""
@@ -111,6 +124,53 @@ def print_detailed(ue_data: Dict[int, List[Dict]], ue_idx: int = None):
                   f"{entry['prio_weight']:<12.3f} {entry['pf_weight']:<12.6f} "
                   f"{entry['gbr_weight']:<12.3f} {entry['delay_weight']:<12.3f}")
 
+def calculate_priority_per_window(ue_data: Dict[int, List[Dict]],
+                                  window_sec: float = 1.0,
+                                  percentiles: Sequence[float] = ()) -> Dict[int, List[Dict]]:
+    """
+    타임스탬프가 있는 레코드를 윈도우별로 집계합니다 (window_stats 한 번 순회).
+    각 윈도우: 'timestamp', 'count', 필드별 평균/_min/_max/_p<q>
+    """
+    return {ue_idx: window_records(entries, PRIORITY_FIELDS, window_sec, percentiles)
+            for ue_idx, entries in sorted(ue_data.items())}
+
+def print_windowed(per_window: Dict[int, List[Dict]], window_sec: float, ue_idx: int = None):
+    """윈도우별 평균값을 출력합니다."""
+    for ue in sorted(per_window.keys()):
+        if ue_idx is not None and ue != ue_idx:
+            continue
+        windows = per_window[ue]
+        if not windows:
+            print(f"\n[경고] UE{ue}: 타임스탬프가 있는 레코드가 없습니다.")
+            continue
+        
+        print(f"\n{'=' * 80}")
+        print(f"UE{ue} {window_sec:g}초 윈도우별 평균 (전체 {len(windows)}개)")
+        print(f"{'=' * 80}")
+        print(f"{'시간':<14} {'min_combined_prio':<18} {'prio_weight':<12} {'pf_weight':<12} {'gbr_weight':<12} {'delay_weight':<12} {'count':<8}")
+        print("-" * 80)
+        
+        for w in windows:
+            print(f"{w['timestamp'].strftime('%H:%M:%S.%f')[:-3]:<14} {w['min_combined_prio']:<18.2f} "
+                  f"{w['prio_weight']:<12.3f} {w['pf_weight']:<12.6f} "
+                  f"{w['gbr_weight']:<12.3f} {w['delay_weight']:<12.3f} {w['count']:<8}")
+
+def export_windowed_csv(per_window: Dict[int, List[Dict]], output_file: str):
+    """윈도우별 집계 결과(평균/최소/최대/백분위수)를 CSV 파일로 저장합니다."""
+    import csv
+    
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for ue_idx in sorted(per_window.keys()):
+            for w in per_window[ue_idx]:
+                if writer is None:
+                    cols = [k for k in w if k != 'timestamp']
+                    writer = csv.writer(f)
+                    writer.writerow(['UE', 'timestamp'] + cols)
+                writer.writerow([ue_idx, w['timestamp'].isoformat()] + [w[k] for k in cols])
+    
+    print(f"\n데이터가 '{output_file}'에 저장되었습니다.")
+
 def export_to_csv(ue_data: Dict[int, List[Dict]], output_file: str):
     """UE별 데이터를 CSV 파일로 저장합니다."""
     import csv
@@ -146,6 +206,8 @@ def main():
         print("\nOptions:")
         print("  -u <ue_idx>    특정 UE만 출력 (예: -u 0)")
         print("  -c <csv_file>  CSV 파일로 저장")
+        print("  -w <sec>       윈도우별 집계 (초, 예: -w 1, -w 0.1; -c는 집계 결과 저장)")
+        print("  -p <list>      윈도우별 백분위수 CSV 열 (예: -p 50,99, -w와 함께 사용)")
         print("  -h, --help     도움말 출력")
         sys.exit(0)
     
@@ -159,6 +221,8 @@ def main():
     
     ue_idx = None
     csv_file = None
+    window_sec = None
+    percentiles = []
     
     # 옵션 파싱
     i = opt_start
@@ -169,6 +233,15 @@ def main():
         elif sys.argv[i] == '-c' and i + 1 < len(sys.argv):
             csv_file = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == '-w' and i + 1 < len(sys.argv):
+            window_sec = float(sys.argv[i + 1])
+            if window_sec <= 0:
+                print(f"Error: 윈도우 크기는 0보다 커야 합니다: {sys.argv[i + 1]}")
+                sys.exit(2)
+            i += 2
+        elif sys.argv[i] == '-p' and i + 1 < len(sys.argv):
+            percentiles = [float(q) for q in sys.argv[i + 1].split(',') if q.strip()]
+            i += 2
         else:
             print(f"Warning: 알 수 없는 옵션 '{sys.argv[i]}' (무시됨)")
             i += 1
@@ -181,6 +254,14 @@ def main():
         print("추출된 데이터가 없습니다.")
         sys.exit(1)
     
+    if window_sec is not None:
+        # 윈도우별 집계 출력 / 저장
+        per_window = calculate_priority_per_window(ue_data, window_sec, percentiles)
+        print_windowed(per_window, window_sec, ue_idx)
+        if csv_file:
+            export_windowed_csv(per_window, csv_file)
+        return
+    
     # 전체 상세 정보 출력
     print_detailed(ue_data, ue_idx)
     
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Multi-UE fairness and starvation from one gNB log (ENABLE_BG=1 runs).
+
+Reads, in one pass:
+  - served bytes per UE: "UEX Throughput 10ms:" lines (core_thro.py, default)
+    or "UEX [MAC-THP-DL]" lines (real_thro.py, --thro real); each line's bytes
+    are spread over its period / window and cut into --window-ms windows
+  - backlog per UE: "DL Priority calc: UEX min_combined_prio=..., pf_weight=..."
+    lines (priority.py); the scheduler only ranks UEs that have data queued
+
+Per window, over the UEs that were backlogged or served in it:
+  jain  = (sum x)^2 / (n * sum x^2)   x = bytes of each UE
+  share = x / sum x
+
+A starvation interval starts at the first backlog line of a UE that no
+served period covers and ends when the next served period starts ("grant"),
+when its backlog lines stop for more than --starve-ms ("idle"), or at the end
+of the log ("eof"). Intervals longer than --starve-ms are reported.
+
+Bytes, backlog and starvation flags are flat window x UE arrays filled column
+by column, so an hour at 10 ms windows for 64 UEs is a few array passes.
+
+  python3 fairness.py gnb.log --window-ms 100 --relative-time > jain.csv
+  python3 fairness.py gnb.log --ues 0-3 --per-ue --relative-time > share.csv
+  python3 fairness.py gnb.log --thro real --starve-ms 20 --intervals > starve.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from core_thro import THROUGHPUT_RE
+from log_io import open_log
+from priority import PRIORITY_RE
+from real_thro import MAC_THP_RE
+from rle_series import dt_to_us, us_to_dt
+from ue_select import add_ue_args, format_ue_set, resolve_ue_set, ue_wanted
+
+WEIGHT_FIELDS = ("prio_weight", "pf_weight", "gbr_weight", "delay_weight")
+
+
+@dataclass
+class UeSeries:
+    """Served periods and backlog lines of one UE (integer microseconds)."""
+
+    served_t0: array = field(default_factory=lambda: array("q"))
+    served_t1: array = field(default_factory=lambda: array("q"))
+    served_bytes: array = field(default_factory=lambda: array("q"))
+    backlog_t: array = field(default_factory=lambda: array("q"))
+    weights: Tuple[array, ...] = field(default_factory=lambda: tuple(array("d") for _ in WEIGHT_FIELDS))
+    thro_lines: int = 0
+
+
+@dataclass
+class Starvation:
+    ue: int
+    start_us: int
+    end_us: int
+    ended_by: str  # grant | idle | eof
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_us - self.start_us) / 1000.0
+
+
+def parse_log(
+    log_path: str, ue_filter: Optional[Set[int]], thro: str = "core", direction: str = "dl"
+) -> Tuple[Dict[int, UeSeries], Optional[int]]:
+    """One pass over the log -> per-UE series and the first matched timestamp."""
+    by_ue: Dict[int, UeSeries] = {}
+    thro_tag = "Throughput" if thro == "core" else "MAC-THP-DL"
+    thro_re = THROUGHPUT_RE if thro == "core" else MAC_THP_RE
+    first_us: Optional[int] = None
+    ts_key: Optional[str] = None
+    ts_us = 0
+    with open_log(log_path) as f:
+        for line in f:
+            if "Priority calc" in line:
+                m = PRIORITY_RE.search(line)
+                if not m:
+                    continue
+                ue = int(m.group(2))
+                if not ue_wanted(ue_filter, ue):
+                    continue
+                ts = m.group(1)
+                if ts != ts_key:
+                    ts_key, ts_us = ts, dt_to_us(datetime.fromisoformat(ts))
+                s = by_ue.get(ue)
+                if s is None:
+                    s = by_ue[ue] = UeSeries()
+                s.backlog_t.append(ts_us)
+                for col, g in zip(s.weights, (4, 5, 6, 7)):
+                    col.append(float(m.group(g)))
+            elif thro_tag in line:
+                m = thro_re.search(line)
+                if not m:
+                    continue
+                ue = int(m.group("ue"))
+                if not ue_wanted(ue_filter, ue):
+                    continue
+                ts = m.group("ts")
+                if ts != ts_key:
+                    ts_key, ts_us = ts, dt_to_us(datetime.fromisoformat(ts))
+                if thro == "core":
+                    period_ms = float(m.group("period_ms"))
+                    if direction == "dl":
+                        nbytes = int(m.group("dl_bytes"))
+                    elif direction == "ul":
+                        nbytes = int(m.group("ul_bytes"))
+                    else:
+                        nbytes = int(m.group("dl_bytes")) + int(m.group("ul_bytes"))
+                else:
+                    period_ms = float(m.group("window_ms"))
+                    nbytes = int(m.group("vol_bytes"))
+                s = by_ue.get(ue)
+                if s is None:
+                    s = by_ue[ue] = UeSeries()
+                s.thro_lines += 1
+                if nbytes > 0:
+                    s.served_t0.append(ts_us - round(period_ms * 1000))
+                    s.served_t1.append(ts_us)
+                    s.served_bytes.append(nbytes)
+            else:
+                continue
+            if first_us is None:
+                first_us = ts_us
+    for s in by_ue.values():
+        _sort_series(s)
+    return by_ue, first_us
+
+
+def _sort_series(s: UeSeries) -> None:
+    """Lines of one UE are in log order already; only re-sort when they are not."""
+    t = s.backlog_t
+    if any(t[i] > t[i + 1] for i in range(len(t) - 1)):
+        order = sorted(range(len(t)), key=t.__getitem__)
+        s.backlog_t = array("q", (t[i] for i in order))
+        s.weights = tuple(array("d", (col[i] for i in order)) for col in s.weights)
+    t = s.served_t0
+    if any(t[i] > t[i + 1] for i in range(len(t) - 1)):
+        order = sorted(range(len(t)), key=t.__getitem__)
+        s.served_t0 = array("q", (t[i] for i in order))
+        s.served_t1 = array("q", (s.served_t1[i] for i in order))
+        s.served_bytes = array("q", (s.served_bytes[i] for i in order))
+
+
+def _close(ue: int, start: int, last_b: int, grant_us: int, starve_us: int) -> Starvation:
+    """Ended by the grant at grant_us, unless the backlog lines stopped well before it."""
+    if grant_us - last_b > starve_us:
+        return Starvation(ue, start, last_b, "idle")
+    return Starvation(ue, start, grant_us, "grant")
+
+
+def starvation_intervals(ue: int, s: UeSeries, starve_us: int) -> List[Starvation]:
+    """Backlog lines outside every served period, split at gaps > starve_us; kept if longer than starve_us."""
+    out: List[Starvation] = []
+    t0s, t1s = s.served_t0, s.served_t1
+    n_served = len(t0s)
+    j = 0
+    served_until = -1
+    start: Optional[int] = None
+    last_b = 0
+    for t in s.backlog_t:
+        while j < n_served and t0s[j] <= t:
+            if start is not None:
+                out.append(_close(ue, start, last_b, t0s[j], starve_us))
+                start = None
+            served_until = max(served_until, t1s[j])
+            j += 1
+        if t <= served_until:
+            continue
+        if start is not None and t - last_b > starve_us:
+            out.append(Starvation(ue, start, last_b, "idle"))
+            start = None
+        if start is None:
+            start = t
+        last_b = t
+    if start is not None:
+        if j < n_served:
+            out.append(_close(ue, start, last_b, t0s[j], starve_us))
+        else:
+            out.append(Starvation(ue, start, last_b, "eof"))
+    return [iv for iv in out if iv.end_us - iv.start_us > starve_us]
+
+
+@dataclass
+class WindowMatrix:
+    """Window x UE arrays, row-major (cell = w * nue + k)."""
+
+    base_us: int
+    window_us: int
+    ues: List[int]
+    nwin: int
+    served: array  # bytes ('d', spread pieces)
+    active: bytearray  # backlogged or served
+    starved: bytearray
+    weight_sums: Optional[Tuple[array, ...]] = None  # per WEIGHT_FIELDS, with weight_counts
+    weight_counts: Optional[array] = None
+
+    def row(self, w: int) -> slice:
+        return slice(w * len(self.ues), (w + 1) * len(self.ues))
+
+
+def build_matrix(
+    by_ue: Dict[int, UeSeries],
+    starved: Dict[int, List[Starvation]],
+    base_us: int,
+    window_us: int,
+    weights: bool = False,
+) -> WindowMatrix:
+    ues = sorted(by_ue)
+    nue = len(ues)
+    end_us = base_us
+    for s in by_ue.values():
+        if s.backlog_t:
+            end_us = max(end_us, s.backlog_t[-1])
+        if s.served_t1:
+            end_us = max(end_us, max(s.served_t1))
+    nwin = (end_us - base_us) // window_us + 1
+    size = nwin * nue
+    m = WindowMatrix(
+        base_us, window_us, ues, nwin,
+        served=array("d", [0.0]) * size,
+        active=bytearray(size),
+        starved=bytearray(size),
+    )
+    if weights:
+        m.weight_sums = tuple(array("d", [0.0]) * size for _ in WEIGHT_FIELDS)
+        m.weight_counts = array("l", [0]) * size
+
+    for k, ue in enumerate(ues):
+        s = by_ue[ue]
+        served, active = m.served, m.active
+        for t0, t1, nbytes in zip(s.served_t0, s.served_t1, s.served_bytes):
+            if t1 < base_us:
+                continue
+            w1 = (t1 - base_us) // window_us
+            dur = t1 - t0
+            if dur <= 0:
+                served[w1 * nue + k] += nbytes
+                active[w1 * nue + k] = 1
+                continue
+            w = max(0, t0 - base_us) // window_us
+            while w <= w1:
+                b0 = base_us + w * window_us
+                o = min(t1, b0 + window_us) - max(t0, b0)
+                if o > 0:
+                    served[w * nue + k] += nbytes * o / dur
+                    active[w * nue + k] = 1
+                w += 1
+        for t in s.backlog_t:
+            active[(t - base_us) // window_us * nue + k] = 1
+        if m.weight_sums is not None:
+            counts = m.weight_counts
+            for i, t in enumerate(s.backlog_t):
+                cell = (t - base_us) // window_us * nue + k
+                counts[cell] += 1
+                for sums, col in zip(m.weight_sums, s.weights):
+                    sums[cell] += col[i]
+        for iv in starved.get(ue, ()):
+            w1 = (iv.end_us - 1 - base_us) // window_us
+            for w in range(max(0, iv.start_us - base_us) // window_us, w1 + 1):
+                m.starved[w * nue + k] = 1
+    return m
+
+
+def jain(values: List[float]) -> float:
+    """Jain's index of the given allocations; nan for none, 1 when nothing was served."""
+    if not values:
+        return math.nan
+    s1 = sum(values)
+    s2 = sum(x * x for x in values)
+    if s2 <= 0:
+        return 1.0
+    return s1 * s1 / (len(values) * s2)
+
+
+def _format_time(m: WindowMatrix, w: int, relative: bool) -> str:
+    if relative:
+        return f"{w * m.window_us / 1e6:.6f}"
+    return us_to_dt(m.base_us + w * m.window_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-window Jain fairness, UE shares and starvation intervals.")
+    ap.add_argument("log_file", help="Path to gnb.log")
+    add_ue_args(ap, default=None)
+    ap.add_argument(
+        "--thro", choices=["core", "real"], default="core",
+        help="served bytes from 'Throughput 10ms' (core) or [MAC-THP-DL] (real) lines (default: core)",
+    )
+    ap.add_argument("--direction", choices=["dl", "ul", "total"], default="dl", help="--thro core only (default: dl)")
+    ap.add_argument("--window-ms", type=float, default=100.0, help="window size in ms (default: 100)")
+    ap.add_argument("--starve-ms", type=float, default=50.0, help="min starvation / max backlog gap in ms (default: 50)")
+    ap.add_argument("--per-ue", action="store_true", help="one row per window and active UE (share, weights)")
+    ap.add_argument("--intervals", action="store_true", help="print starvation intervals instead of windows")
+    ap.add_argument("--relative-time", action="store_true", help="seconds from the first matched line")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    window_us = round(args.window_ms * 1000)
+    starve_us = round(args.starve_ms * 1000)
+    if window_us <= 0:
+        print("ERROR: --window-ms must be > 0", file=sys.stderr)
+        return 2
+    if starve_us < 0:
+        print("ERROR: --starve-ms must be >= 0", file=sys.stderr)
+        return 2
+    if args.thro == "real" and args.direction != "dl":
+        print("ERROR: [MAC-THP-DL] lines are DL only; drop --direction", file=sys.stderr)
+        return 2
+
+    ue_set = resolve_ue_set(args)
+    try:
+        by_ue, base_us = parse_log(args.log_file, ue_set, args.thro, args.direction)
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if base_us is None:
+        print(f"No throughput / Priority calc lines for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
+        return 1
+
+    starved = {ue: starvation_intervals(ue, s, starve_us) for ue, s in by_ue.items()}
+
+    if args.intervals:
+        if not args.no_header:
+            print("start_s,end_s,ue,duration_ms,ended_by" if args.relative_time else "start,end,ue,duration_ms,ended_by")
+        rows = sorted((iv for ivs in starved.values() for iv in ivs), key=lambda iv: (iv.start_us, iv.ue))
+        for iv in rows:
+            if args.relative_time:
+                a = f"{(iv.start_us - base_us) / 1e6:.6f}"
+                b = f"{(iv.end_us - base_us) / 1e6:.6f}"
+            else:
+                a = us_to_dt(iv.start_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+                b = us_to_dt(iv.end_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+            print(f"{a},{b},{iv.ue},{iv.duration_ms:.3f},{iv.ended_by}")
+        _print_stats(by_ue, starved, None, args)
+        return 0
+
+    m = build_matrix(by_ue, starved, base_us, window_us, weights=args.per_ue)
+    nue = len(m.ues)
+    to_mbps = 8.0 / (window_us / 1e6) / 1e6
+    tcol = "rel_time_s" if args.relative_time else "timestamp"
+    if not args.no_header:
+        if args.per_ue:
+            print(f"{tcol},ue,mbps,share,backlog,starved," + ",".join(WEIGHT_FIELDS))
+        else:
+            print(f"{tcol},active_ues,total_mbps,jain,min_share,min_share_ue,starved_ues")
+
+    jains: List[float] = []
+    for w in range(m.nwin):
+        r = m.row(w)
+        act = m.active[r]
+        if not any(act):
+            continue
+        vals = m.served[r]
+        picked = [k for k in range(nue) if act[k]]
+        x = [vals[k] for k in picked]
+        total = sum(x)
+        j = jain(x)
+        jains.append(j)
+        t = _format_time(m, w, args.relative_time)
+        if args.per_ue:
+            st = m.starved[r]
+            base = w * nue
+            for k in picked:
+                cnt = m.weight_counts[base + k]
+                wv = ",".join(f"{sums[base + k] / cnt:.6f}" if cnt else "" for sums in m.weight_sums)
+                share = vals[k] / total if total > 0 else 0.0
+                print(f"{t},{m.ues[k]},{vals[k] * to_mbps:.6f},{share:.6f},{1 if cnt else 0},{st[k]},{wv}")
+        else:
+            kmin = min(picked, key=lambda k: vals[k])
+            share = vals[kmin] / total if total > 0 else 0.0
+            print(
+                f"{t},{len(picked)},{total * to_mbps:.6f},{j:.6f},{share:.6f},{m.ues[kmin]},{sum(m.starved[r])}"
+            )
+
+    _print_stats(by_ue, starved, jains, args)
+    return 0
+
+
+def _print_stats(
+    by_ue: Dict[int, UeSeries], starved: Dict[int, List[Starvation]], jains: Optional[List[float]], args
+) -> None:
+    total = sum(sum(s.served_bytes) for s in by_ue.values())
+    head = f"# window_ms={args.window_ms:g} starve_ms={args.starve_ms:g} thro={args.thro}"
+    if jains:
+        head += f" windows={len(jains)} mean_jain={sum(jains) / len(jains):.4f} min_jain={min(jains):.4f}"
+    print(head, file=sys.stderr)
+    for ue, s in sorted(by_ue.items()):
+        nbytes = sum(s.served_bytes)
+        ivs = starved.get(ue, [])
+        worst = max((iv.duration_ms for iv in ivs), default=0.0)
+        starve_ms = sum(iv.duration_ms for iv in ivs)
+        share = nbytes / total if total else 0.0
+        print(
+            f"# UE{ue}: thro_lines={s.thro_lines} backlog_lines={len(s.backlog_t)} bytes={nbytes} "
+            f"share={share:.2%} starved={len(ivs)} starved_ms={starve_ms:.1f} max_starve_ms={worst:.1f}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,9 +7,13 @@ UE별 final_priority 정보 추출 스크립트
 import re
 import sys
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Sequence
 from datetime import datetime
 
+from window_stats import summarize, window_records
+
+FINAL_PRIORITY_FIELDS = ('final_priority', 'min_combined_prio')
+
 def parse_final_priority_log(log_file: str) -> Dict[int, List[Dict]]:
     """
     로그 파일에서 UE별 final_priority 정보를 파싱합니다.
@@ -77,19 +81,20 @@ def print_summary(ue_data: Dict[int, List[Dict]]):
         print(f"\n[UE{ue_idx}] 총 {len(entries)}개의 레코드")
         print("-" * 80)
         
-        # 통계 계산
-        final_priorities = [e['final_priority'] for e in entries]
-        min_combined_prios = [e['min_combined_prio'] for e in entries]
+        # 통계 계산 (한 번 순회)
+        stats = summarize(entries, FINAL_PRIORITY_FIELDS)
+        fp = stats['final_priority']
+        mcp = stats['min_combined_prio']
         
         print(f"  final_priority:")
-        print(f"    - 최소값: {min(final_priorities):.6f}")
-        print(f"    - 최대값: {max(final_priorities):.6f}")
-        print(f"    - 평균값: {sum(final_priorities) / len(final_priorities):.6f}")
+        print(f"    - 최소값: {fp.min:.6f}")
+        print(f"    - 최대값: {fp.max:.6f}")
+        print(f"    - 평균값: {fp.mean:.6f}")
         
         print(f"  min_combined_prio:")
-        print(f"    - 최소값: {min(min_combined_prios)}")
-        print(f"    - 최대값: {max(min_combined_prios)}")
-        print(f"    - 고유값: {sorted(set(min_combined_prios))}")
+        print(f"    - 최소값: {mcp.min}")
+        print(f"    - 최대값: {mcp.max}")
+        print(f"    - 고유값: {sorted(set(e['min_combined_prio'] for e in entries))}")
 
 def print_detailed(ue_data: Dict[int, List[Dict]], ue_idx: int = None):
     """특정 UE의 상세 정보를 시간 순서대로 전체 출력합니다."""
@@ -130,6 +135,46 @@ def print_detailed(ue_data: Dict[int, List[Dict]], ue_idx: int = None):
                 time_str = "N/A"
             print(f"{time_str:<12} {entry['final_priority']:<15.6f} {entry['min_combined_prio']:<18}")
 
+def calculate_final_priority_per_window(ue_data: Dict[int, List[Dict]],
+                                        window_sec: float = 1.0,
+                                        percentiles: Sequence[float] = ()) -> Dict[int, List[Dict]]:
+    """
+    윈도우별로 final_priority / min_combined_prio를 집계합니다 (window_stats 한 번 순회).
+    
+    Returns:
+        {ue_index: [{'timestamp': 윈도우 시작, 'count': n, 'final_priority': 평균,
+                     'final_priority_min': ..., 'final_priority_max': ..., 'final_priority_p99': ...}]}
+    """
+    return {ue_idx: window_records(entries, FINAL_PRIORITY_FIELDS, window_sec, percentiles)
+            for ue_idx, entries in sorted(ue_data.items())}
+
+def print_windowed(per_window: Dict[int, List[Dict]], window_sec: float,
+                   percentiles: Sequence[float] = (), ue_idx: int = None):
+    """윈도우별 집계 결과를 출력합니다 (시간은 UE별 첫 윈도우 기준 경과 초)."""
+    pct_cols = [f"final_priority_p{q:g}" for q in percentiles]
+    for ue in sorted(per_window.keys()):
+        if ue_idx is not None and ue != ue_idx:
+            continue
+        windows = per_window[ue]
+        if not windows:
+            continue
+        first_timestamp = windows[0]['timestamp']
+        
+        print(f"\n{'=' * 80}")
+        print(f"UE{ue} {window_sec:g}초 윈도우별 집계 (전체 {len(windows)}개)")
+        print(f"{'=' * 80}")
+        header = f"{'시간(초)':<12} {'평균':<12} {'최소':<12} {'최대':<12}"
+        header += "".join(f" {col.split('_')[-1]:<12}" for col in pct_cols)
+        print(header + f" {'min_combined_prio':<18} {'count':<8}")
+        print("-" * 80)
+        
+        for w in windows:
+            elapsed_seconds = (w['timestamp'] - first_timestamp).total_seconds()
+            row = (f"{elapsed_seconds:<12.3f} {w['final_priority']:<12.6f} "
+                   f"{w['final_priority_min']:<12.6f} {w['final_priority_max']:<12.6f}")
+            row += "".join(f" {w[col]:<12.6f}" for col in pct_cols)
+            print(row + f" {w['min_combined_prio']:<18.2f} {w['count']:<8}")
+
 def export_to_csv(ue_data: Dict[int, List[Dict]], output_file: str):
     """UE별 데이터를 시간 순서대로 CSV 파일로 저장합니다."""
     import csv
@@ -179,6 +224,8 @@ def main():
         print("\nOptions:")
         print("  -u <ue_idx>    특정 UE만 출력 (예: -u 0)")
         print("  -c <csv_file>  CSV 파일로 저장")
+        print("  -w <sec>       윈도우별 집계 출력 (초, 예: -w 1, -w 0.1)")
+        print("  -p <list>      윈도우별 백분위수 (예: -p 50,99, -w와 함께 사용)")
         print("  -h, --help     도움말 출력")
         sys.exit(0)
     
@@ -192,6 +239,8 @@ def main():
     
     ue_idx = None
     csv_file = None
+    window_sec = None
+    percentiles = []
     
     # 옵션 파싱
     i = opt_start
@@ -202,6 +251,15 @@ def main():
         elif sys.argv[i] == '-c' and i + 1 < len(sys.argv):
             csv_file = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == '-w' and i + 1 < len(sys.argv):
+            window_sec = float(sys.argv[i + 1])
+            if window_sec <= 0:
+                print(f"Error: 윈도우 크기는 0보다 커야 합니다: {sys.argv[i + 1]}")
+                sys.exit(2)
+            i += 2
+        elif sys.argv[i] == '-p' and i + 1 < len(sys.argv):
+            percentiles = [float(q) for q in sys.argv[i + 1].split(',') if q.strip()]
+            i += 2
         else:
             print(f"Warning: 알 수 없는 옵션 '{sys.argv[i]}' (무시됨)")
             i += 1
@@ -214,8 +272,13 @@ def main():
         print("추출된 데이터가 없습니다.")
         sys.exit(1)
     
-    # 전체 상세 정보 출력
-    print_detailed(ue_data, ue_idx)
+    if window_sec is not None:
+        # 윈도우별 집계 출력
+        per_window = calculate_final_priority_per_window(ue_data, window_sec, percentiles)
+        print_windowed(per_window, window_sec, percentiles, ue_idx)
+    else:
+        # 전체 상세 정보 출력
+        print_detailed(ue_data, ue_idx)
     
     # CSV 저장
     if csv_file:
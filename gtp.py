@@ -10,6 +10,7 @@ Default behavior:
 Also supports:
   - --start-time (ISO or time-only)
   - --relative-time (seconds from base time)
+  - --runs / --run-stats (DSCP as run-length series, see rle_series.py)
 """
 
 from __future__ import annotations
@@ -19,7 +20,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Set
+
+from log_io import open_log
+from rle_series import add_runs_args, print_runs, report_run_stats, series_by_ue
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 DSCP_CHANGE_RE = re.compile(
@@ -51,19 +56,19 @@ def _parse_start_time_arg(value: str, date_fallback: datetime | None) -> datetim
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = DSCP_CHANGE_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -85,7 +90,7 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract GTP-U DSCP change events.")
     ap.add_argument("log_file", help="Path to gnb.log")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -97,6 +102,7 @@ def main() -> int:
         action="store_true",
         help="Output x-axis as relative seconds from base time (0.0 at --start-time if set, else first row).",
     )
+    add_runs_args(ap)
     ap.add_argument(
         "--no-header",
         action="store_true",
@@ -104,9 +110,10 @@ def main() -> int:
     )
     args = ap.parse_args()
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
     if not entries:
-        print(f"No GTP-U DSCP change entries found for UE{args.ue} in {args.log_file}", file=sys.stderr)
+        print(f"No GTP-U DSCP change entries found for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -114,18 +121,29 @@ def main() -> int:
     else:
         base = entries[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
+    if args.runs or args.run_stats:
+        series = series_by_ue(entries, lambda e: e.dscp)
+        if args.run_stats:
+            report_run_stats(series, "dscp")
+        if args.runs:
+            print_runs(series, "dscp", str, base if args.relative_time else None, multi_ue, args.no_header)
+            return 0
+
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,dscp")
+            print(f"rel_time_s{ue_col},dscp")
         else:
-            print("timestamp,dscp")
+            print(f"timestamp{ue_col},dscp")
 
     for e in entries:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.dscp}")
+            print(f"{rel_s:.6f}{ue_f},{e.dscp}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.dscp}")
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.dscp}")
 
     return 0
 
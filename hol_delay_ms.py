@@ -16,6 +16,10 @@ from dataclasses import dataclass
 from datetime import datetime, time
 from typing import List, Optional, Set
 
+from log_io import open_log
+from stream_stats import add_stats_args, report_stats
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set
+
 
 RLC_QUEUE_DELAY_RE = re.compile(
     r"^(?:\d+:)?\s*(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?"
@@ -26,9 +30,6 @@ RLC_QUEUE_DELAY_RE = re.compile(
     re.IGNORECASE,
 )
 
-UE_FLAG_NAMES = ("ue0", "ue1", "ue2", "ue3")
-
-
 @dataclass
 class Row:
     ts: datetime
@@ -66,27 +67,15 @@ def row_passes_start(
     return r.ts >= start_abs
 
 
-def resolve_ue_set(args: argparse.Namespace) -> Set[int]:
-    selected: Set[int] = set()
-    for name in UE_FLAG_NAMES:
-        if getattr(args, name, False):
-            selected.add(int(name[2:]))
-    if selected:
-        return selected
-    if args.ue is not None:
-        return {args.ue}
-    return {0}
-
-
-def parse_log(path: str, ue_filter: Set[int]) -> List[Row]:
+def parse_log(path: str, ue_filter: Optional[Set[int]]) -> List[Row]:
     rows: List[Row] = []
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(path) as f:
         for raw in f:
             m = RLC_QUEUE_DELAY_RE.search(raw)
             if not m:
                 continue
             ue = int(m.group("ue"))
-            if ue not in ue_filter:
+            if ue_filter is not None and ue not in ue_filter:
                 continue
             rows.append(
                 Row(
@@ -104,20 +93,18 @@ def main() -> int:
         description="Extract time + RLC queue_delay_ms from [RLC-QUEUE-DELAY] logs."
     )
     ap.add_argument("log_file", help="gnb.log or: grep RLC-QUEUE-DELAY gnb.log | grep ue=0")
-    ap.add_argument("--ue", type=int, default=None, help="UE index filter (default UE0)")
-    for name in UE_FLAG_NAMES:
-        ap.add_argument(f"--{name}", action="store_true", help=f"Include UE{int(name[2:])}")
+    add_ue_args(ap, default=0, legacy_flags=True)
     ap.add_argument("--start-time", type=str, default=None)
     ap.add_argument("--match-time-of-day", action="store_true")
     ap.add_argument("--relative-time", action="store_true")
     ap.add_argument("--header", action="store_true")
+    add_stats_args(ap)
     args = ap.parse_args()
 
     ue_set = resolve_ue_set(args)
     rows = parse_log(args.log_file, ue_set)
     if not rows:
-        ue_list = ",".join(f"UE{u}" for u in sorted(ue_set))
-        print(f"No [RLC-QUEUE-DELAY] lines found for {ue_list}.", file=sys.stderr)
+        print(f"No [RLC-QUEUE-DELAY] lines found for {format_ue_set(ue_set)}.", file=sys.stderr)
         print('  grep "RLC-QUEUE-DELAY" gnb.log | grep "ue=0" > rlc_queue.log', file=sys.stderr)
         return 1
 
@@ -132,9 +119,10 @@ def main() -> int:
             return 1
         rows = filtered
 
+    multi_ue = is_multi_ue(ue_set)
     if args.header:
         ts_col = "rel_time_s" if args.relative_time else "timestamp"
-        print(f"{ts_col},queue_delay_ms")
+        print(f"{ts_col},ue,queue_delay_ms" if multi_ue else f"{ts_col},queue_delay_ms")
 
     base_ts = rows[0].ts
     for r in rows:
@@ -142,8 +130,18 @@ def main() -> int:
             ts_field = f"{(r.ts - base_ts).total_seconds():.6f}"
         else:
             ts_field = r.ts.strftime("%Y-%m-%dT%H:%M:%S.%f")
-        print(f"{ts_field},{r.queue_delay_ms:.3f}")
-
+        if multi_ue:
+            print(f"{ts_field},{r.ue},{r.queue_delay_ms:.3f}")
+        else:
+            print(f"{ts_field},{r.queue_delay_ms:.3f}")
+
+    if args.stats or args.stats_json:
+        report_stats(
+            "queue_delay_ms",
+            (((r.ts - base_ts).total_seconds(), r.queue_delay_ms) for r in rows),
+            stats_json=args.stats_json,
+            window_s=args.stats_window_s,
+        )
     return 0
 
 
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Ingest iperf3 --json / --json-stream output into typed per-interval arrays.
+
+One file per UE (UE=PATH). Both formats are detected automatically:
+  --json          one JSON document (start / intervals / end)
+  --json-stream   one {"event": ..., "data": ...} object per line
+
+Custom --rate-change / --dscp-change events are picked up from json-stream
+events whose name contains "rate"/"dscp", and from plain "Changed DSCP to 44
+at 1.20 seconds" / "Changed rate to 7M at 1.20 seconds" lines mixed into
+the output.
+
+Time base: rel_time_s = wall clock of the interval start - t0, where t0 is
+--t0 (epoch seconds, ISO, or HH:MM:SS[.ffffff] on the iperf start date) or
+the earliest iperf start over all UEs.
+
+Examples:
+  python3 iperf_json.py ue0=/tmp/ue0.json ue1=/tmp/ue1.json > iperf_intervals.csv
+  python3 iperf_json.py ue0=/tmp/ue0.json --events iperf_events.csv --t0 18:59:39.866793
+  # goodput vs MAC throughput per schedule phase (pcf.txt / iperf.txt phases)
+  python3 iperf_json.py ue0=/tmp/ue0.json --phases pcf.txt --mac real_thro.csv --mac-ue 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from log_io import open_log
+
+CHANGED_RE = re.compile(
+    r"Changed\s+(?P<kind>DSCP|rate)\b\D*?(?:to\s*)?(?P<value>[0-9][0-9.]*\s*[KMGkmg]?)"
+    r".*?\bat\s+(?P<t>[0-9]+(?:\.[0-9]+)?)\s*s",
+    re.IGNORECASE,
+)
+RATE_SUFFIX = {"": 1.0, "k": 1e3, "m": 1e6, "g": 1e9}
+
+
+@dataclass
+class ChangeEvent:
+    t_s: float  # seconds since this iperf's start
+    kind: str  # "dscp" | "rate"
+    value: float
+
+
+@dataclass
+class IperfIntervals:
+    """Column arrays, one element per reporting interval (the 'sum' record)."""
+
+    ue: str
+    start_epoch: Optional[float] = None
+    t_start: array = field(default_factory=lambda: array("d"))
+    t_end: array = field(default_factory=lambda: array("d"))
+    bytes: array = field(default_factory=lambda: array("q"))
+    bits_per_second: array = field(default_factory=lambda: array("d"))
+    jitter_ms: array = field(default_factory=lambda: array("d"))
+    lost_packets: array = field(default_factory=lambda: array("q"))
+    packets: array = field(default_factory=lambda: array("q"))
+    omitted: array = field(default_factory=lambda: array("b"))
+    events: List[ChangeEvent] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.t_start)
+
+    def append_sum(self, s: dict) -> None:
+        self.t_start.append(float(s.get("start", 0.0)))
+        self.t_end.append(float(s.get("end", 0.0)))
+        self.bytes.append(int(s.get("bytes", 0)))
+        self.bits_per_second.append(float(s.get("bits_per_second", 0.0)))
+        # TCP sums have no jitter / packet counters.
+        self.jitter_ms.append(float(s.get("jitter_ms", float("nan"))))
+        self.lost_packets.append(int(s.get("lost_packets", 0)))
+        self.packets.append(int(s.get("packets", 0)))
+        self.omitted.append(1 if s.get("omitted") else 0)
+
+
+def parse_rate(text: str) -> float:
+    """'7M' -> 7e6, '500k' -> 5e5, '2000000' -> 2e6 (bits/s)."""
+    text = text.strip()
+    m = re.fullmatch(r"([0-9]*\.?[0-9]+)\s*([KMGkmg]?)", text)
+    if not m:
+        raise ValueError(f"invalid rate: {text!r}")
+    return float(m.group(1)) * RATE_SUFFIX[m.group(2).lower()]
+
+
+def _event_from_dict(name: str, data: dict) -> Optional[ChangeEvent]:
+    kind = "dscp" if "dscp" in name.lower() or "tos" in name.lower() else "rate"
+    t = next((data[k] for k in ("time", "at", "t", "seconds", "start") if k in data), None)
+    if kind == "dscp":
+        v = next((data[k] for k in ("dscp", "new_dscp", "value", "tos") if k in data), None)
+        if v is not None and "tos" in data and "dscp" not in data and "new_dscp" not in data:
+            v = int(v) >> 2
+    else:
+        v = next((data[k] for k in ("rate", "bitrate", "new_rate", "value", "bits_per_second") if k in data), None)
+        if isinstance(v, str):
+            v = parse_rate(v)
+    if t is None or v is None:
+        return None
+    return ChangeEvent(float(t), kind, float(v))
+
+
+def _event_from_line(line: str) -> Optional[ChangeEvent]:
+    m = CHANGED_RE.search(line)
+    if not m:
+        return None
+    kind = m.group("kind").lower()
+    value = m.group("value").strip()
+    v = float(int(float(value))) if kind == "dscp" else parse_rate(value)
+    return ChangeEvent(float(m.group("t")), kind, v)
+
+
+def _start_epoch(start: dict) -> Optional[float]:
+    ts = start.get("timestamp") or {}
+    if "timesecs" in ts:
+        return float(ts["timesecs"])
+    return None
+
+
+def _ingest_stream_event(name: str, data: dict, out: IperfIntervals) -> None:
+    if name == "start":
+        out.start_epoch = _start_epoch(data)
+    elif name == "interval":
+        s = data.get("sum")
+        if s:
+            out.append_sum(s)
+    elif "change" in name.lower() or "dscp" in name.lower():
+        ev = _event_from_dict(name, data)
+        if ev:
+            out.events.append(ev)
+
+
+def _ingest_document(doc: dict, out: IperfIntervals) -> None:
+    out.start_epoch = _start_epoch(doc.get("start") or {})
+    for iv in doc.get("intervals") or []:
+        s = iv.get("sum")
+        if s:
+            out.append_sum(s)
+    for key, items in doc.items():
+        if "change" in key.lower() and isinstance(items, list):
+            for item in items:
+                if isinstance(item, dict):
+                    ev = _event_from_dict(key, item)
+                    if ev:
+                        out.events.append(ev)
+
+
+def read_iperf_json(ue: str, lines: Iterable[str]) -> IperfIntervals:
+    """Parse --json or --json-stream (plus interleaved 'Changed ...' text)."""
+    out = IperfIntervals(ue=ue)
+    it = iter(lines)
+    for raw in it:
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                obj = None
+            if isinstance(obj, dict) and "event" in obj:
+                _ingest_stream_event(str(obj["event"]), obj.get("data") or {}, out)
+                continue
+            if isinstance(obj, dict):
+                _ingest_document(obj, out)
+                continue
+            # Pretty-printed --json document: the rest of the input.
+            text = (raw + "".join(it)).lstrip()
+            doc, end = json.JSONDecoder().raw_decode(text)
+            _ingest_document(doc, out)
+            for rest in text[end:].splitlines():
+                ev = _event_from_line(rest)
+                if ev:
+                    out.events.append(ev)
+            break
+        ev = _event_from_line(line)
+        if ev:
+            out.events.append(ev)
+    out.events.sort(key=lambda e: e.t_s)
+    return out
+
+
+def parse_t0(value: str, ref_epoch: Optional[float]) -> float:
+    """--t0 as epoch seconds, ISO datetime, or HH:MM:SS[.f] on the date of ref_epoch."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if "T" in value or " " in value:
+        return datetime.fromisoformat(value.replace(" ", "T")).timestamp()
+    if ref_epoch is None:
+        raise ValueError("time-only --t0 needs an iperf start timestamp")
+    day = datetime.fromtimestamp(ref_epoch).date()
+    return datetime.fromisoformat(f"{day.isoformat()}T{value}").timestamp()
+
+
+def phase_means(
+    samples: Sequence[Tuple[float, float]],
+    phases: Sequence[Tuple[float, int]],
+) -> List[Tuple[float, Optional[float], int, int, Optional[float]]]:
+    """
+    Mean of (t, value) samples per phase [start_i, start_{i+1}).
+    samples and phases sorted by time. Returns (start, end, key, n, mean).
+    """
+    out: List[Tuple[float, Optional[float], int, int, Optional[float]]] = []
+    j = 0
+    for i, (start_s, key) in enumerate(phases):
+        end_s = phases[i + 1][0] if i + 1 < len(phases) else None
+        while j < len(samples) and samples[j][0] < start_s:
+            j += 1
+        k = j
+        total = 0.0
+        while k < len(samples) and (end_s is None or samples[k][0] < end_s):
+            total += samples[k][1]
+            k += 1
+        n = k - j
+        out.append((start_s, end_s, key, n, (total / n) if n else None))
+        j = k
+    return out
+
+
+def read_phases(path: str) -> List[Tuple[float, int]]:
+    """rel_time_s[,transition],value CSV -> [(start, value)], consecutive dups dropped."""
+    phases: List[Tuple[float, int]] = []
+    with open_log(path) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split(",")]
+            try:
+                t = float(parts[0])
+                value = int(float(parts[2] if len(parts) >= 3 else parts[1]))
+            except (ValueError, IndexError):
+                continue
+            if phases and phases[-1][1] == value:
+                continue
+            phases.append((t, value))
+    return phases
+
+
+def read_mac_samples(path: str, ue: Optional[int]) -> List[Tuple[float, float]]:
+    """real_thro.py / core_thro.py CSV: rel_time_s[,ue],mbps."""
+    samples: List[Tuple[float, float]] = []
+    with open_log(path) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split(",")]
+            try:
+                t = float(parts[0])
+                mbps = float(parts[-1])
+            except ValueError:
+                continue
+            if ue is not None and len(parts) >= 3 and int(parts[1]) != ue:
+                continue
+            samples.append((t, mbps))
+    samples.sort()
+    return samples
+
+
+def _parse_inputs(items: List[str]) -> List[Tuple[str, str]]:
+    out: List[Tuple[str, str]] = []
+    for i, item in enumerate(items):
+        if "=" in item:
+            ue, path = item.split("=", 1)
+        else:
+            ue, path = f"ue{i}", item
+        out.append((ue.strip(), path.strip()))
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="iperf3 --json/--json-stream -> per-interval CSV.")
+    ap.add_argument("inputs", nargs="+", metavar="UE=PATH", help="iperf3 JSON output per UE")
+    ap.add_argument("--t0", default=None, help="experiment t0: epoch, ISO, or HH:MM:SS[.ffffff]")
+    ap.add_argument("--events", default=None, help="write rate/dscp change events CSV here")
+    ap.add_argument("--include-omitted", action="store_true", help="keep --omit intervals")
+    ap.add_argument("--phases", default=None, help="signal CSV; print per-phase goodput instead")
+    ap.add_argument("--mac", default=None, help="with --phases: MAC throughput CSV to compare")
+    ap.add_argument("--mac-ue", type=int, default=None, help="ue column filter for --mac")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    series: List[IperfIntervals] = []
+    for ue, path in _parse_inputs(args.inputs):
+        try:
+            with open_log(path) as f:
+                s = read_iperf_json(ue, f)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {path}: {e}", file=sys.stderr)
+            return 1
+        if not len(s):
+            print(f"WARN: {ue}: no intervals in {path}", file=sys.stderr)
+        series.append(s)
+    if not any(len(s) for s in series):
+        print("ERROR: no iperf intervals", file=sys.stderr)
+        return 1
+
+    starts = [s.start_epoch for s in series if s.start_epoch is not None]
+    try:
+        if args.t0 is not None:
+            t0 = parse_t0(args.t0, min(starts) if starts else None)
+        else:
+            t0 = min(starts) if starts else 0.0
+    except ValueError as e:
+        print(f"ERROR: --t0: {e}", file=sys.stderr)
+        return 2
+
+    def offset(s: IperfIntervals) -> float:
+        return (s.start_epoch - t0) if s.start_epoch is not None else 0.0
+
+    if args.events:  # also with --phases
+        with open(args.events, "w", encoding="utf-8") as f:
+            f.write("ue,rel_time_s,kind,value\n")
+            for s in series:
+                off = offset(s)
+                for ev in s.events:
+                    value = f"{int(ev.value)}" if ev.kind == "dscp" else f"{ev.value:.0f}"
+                    f.write(f"{s.ue},{ev.t_s + off:.6f},{ev.kind},{value}\n")
+
+    if args.phases:
+        phases = read_phases(args.phases)
+        if not phases:
+            print(f"ERROR: no phases in {args.phases}", file=sys.stderr)
+            return 1
+        mac = read_mac_samples(args.mac, args.mac_ue) if args.mac else []
+        mac_by_phase = phase_means(mac, phases) if mac else []
+        if not args.no_header:
+            cols = "ue,phase,start_s,end_s,value,n,goodput_mbps,loss_pct"
+            print(cols + (",mac_mbps,goodput_over_mac" if mac else ""))
+        for s in series:
+            off = offset(s)
+            pts = [
+                (s.t_start[i] + off, s.bits_per_second[i] / 1e6)
+                for i in range(len(s)) if args.include_omitted or not s.omitted[i]
+            ]
+            loss = [
+                (s.t_start[i] + off, s.lost_packets[i], s.packets[i])
+                for i in range(len(s)) if args.include_omitted or not s.omitted[i]
+            ]
+            for p, (start, end, key, n, mean) in enumerate(phase_means(pts, phases)):
+                lost = sum(l for t, l, _ in loss if t >= start and (end is None or t < end))
+                pk = sum(k for t, _, k in loss if t >= start and (end is None or t < end))
+                loss_pct = f"{100.0 * lost / pk:.3f}" if pk else ""
+                row = (
+                    f"{s.ue},{p},{start:.6f},{'' if end is None else f'{end:.6f}'},{key},{n},"
+                    f"{'' if mean is None else f'{mean:.6f}'},{loss_pct}"
+                )
+                if mac:
+                    mac_mean = mac_by_phase[p][4]
+                    ratio = f"{mean / mac_mean:.4f}" if mean is not None and mac_mean else ""
+                    row += f",{'' if mac_mean is None else f'{mac_mean:.6f}'},{ratio}"
+                print(row)
+        return 0
+
+    if not args.no_header:
+        print("ue,rel_time_s,interval_s,bytes,mbps,jitter_ms,lost_packets,packets,loss_pct")
+    for s in series:
+        off = offset(s)
+        for i in range(len(s)):
+            if s.omitted[i] and not args.include_omitted:
+                continue
+            pk = s.packets[i]
+            loss_pct = f"{100.0 * s.lost_packets[i] / pk:.3f}" if pk else ""
+            jitter = s.jitter_ms[i]
+            print(
+                f"{s.ue},{s.t_start[i] + off:.6f},{s.t_end[i] - s.t_start[i]:.6f},{s.bytes[i]},"
+                f"{s.bits_per_second[i] / 1e6:.6f},{'' if jitter != jitter else f'{jitter:.3f}'},"
+                f"{s.lost_packets[i]},{pk},{loss_pct}"
+            )
+
+    n_iv = sum(len(s) for s in series)
+    n_ev = sum(len(s.events) for s in series)
+    print(f"# ues={len(series)} intervals={n_iv} change_events={n_ev} t0={t0:.6f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+tail -F in Python: follow a growing log with inotify, or polling as fallback.
+
+Every chunk is stamped with time.clock_gettime_ns(CLOCK_REALTIME) right after
+read() returns, so all lines of the chunk carry the time they became visible
+(not the time they were processed). Like tail -F, the follower waits for the
+file to appear and reopens it on truncation / rotation.
+
+  python3 log_follow.py /tmp/iperf3_dscp_100cycles_ul_ue1.log      # tail -n 0 -F
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+
+READ_CHUNK = 1 << 16
+
+
+class _Inotify:
+    """Minimal inotify binding (ctypes; no third-party package)."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        self.wd: Optional[int] = None
+
+    def watch(self, path: str) -> None:
+        if self.wd is not None:
+            self._libc.inotify_rm_watch(self.fd, self.wd)
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        self.wd = wd
+
+    def wait(self, timeout_s: float) -> int:
+        """Block until events (or timeout); returns the OR of event masks."""
+        ready, _, _ = select.select([self.fd], [], [], timeout_s)
+        if not ready:
+            return 0
+        mask = 0
+        try:
+            buf = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return 0
+        off = 0
+        while off + 16 <= len(buf):
+            _wd, ev_mask, _cookie, name_len = struct.unpack_from("iIII", buf, off)
+            mask |= ev_mask
+            off += 16 + name_len
+        return mask
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+@dataclass
+class FollowStats:
+    chunks: int = 0
+    lines: int = 0
+    bytes: int = 0
+    reopens: int = 0
+    mode: str = "poll"
+
+
+def follow_lines(
+    path: str,
+    poll_s: float = 0.001,
+    use_inotify: bool = True,
+    from_start: bool = False,
+    stop: Optional[Callable[[], bool]] = None,
+    stats: Optional[FollowStats] = None,
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (read_ns, wake_ns, line) for lines appended to path.
+    wake_ns: when the follower woke up (inotify event / poll tick);
+    read_ns: when read() returned the chunk containing the line.
+    """
+    st = stats if stats is not None else FollowStats()
+    stop = stop or (lambda: False)
+    clock = time.clock_gettime_ns
+    realtime = time.CLOCK_REALTIME
+
+    notify: Optional[_Inotify] = None
+    if use_inotify:
+        try:
+            notify = _Inotify()
+            st.mode = "inotify"
+        except (OSError, AttributeError):
+            notify = None
+            st.mode = "poll"
+
+    def wait(timeout_s: float) -> None:
+        if notify is not None:
+            notify.wait(timeout_s)
+        else:
+            time.sleep(timeout_s)
+
+    try:
+        # Like tail -F: a file that appears later is followed from its start.
+        while not os.path.exists(path):
+            from_start = True
+            if stop():
+                return
+            time.sleep(max(poll_s, 0.01))
+
+        f = open(path, "rb", buffering=0)
+        ino = os.fstat(f.fileno()).st_ino
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        if notify is not None:
+            notify.watch(path)
+        partial = b""
+
+        while not stop():
+            wake_ns = clock(realtime)
+            data = f.read(READ_CHUNK)
+            if data:
+                read_ns = clock(realtime)
+                st.chunks += 1
+                st.bytes += len(data)
+                buf = partial + data
+                lines = buf.split(b"\n")
+                partial = lines.pop()
+                for raw in lines:
+                    st.lines += 1
+                    yield read_ns, wake_ns, raw.decode("utf-8", errors="replace")
+                continue
+
+            # EOF: rotated / truncated?
+            try:
+                cur = os.stat(path)
+            except FileNotFoundError:
+                wait(max(poll_s, 0.01))
+                continue
+            if cur.st_ino != ino or cur.st_size < f.tell():
+                f.close()
+                f = open(path, "rb", buffering=0)
+                ino = os.fstat(f.fileno()).st_ino
+                partial = b""
+                st.reopens += 1
+                if notify is not None:
+                    notify.watch(path)
+                continue
+            # inotify: sleep until the writer touches the file; the 0.25 s cap
+            # keeps rotation and stop() noticed.
+            wait(0.25 if notify is not None else poll_s)
+        f.close()
+    finally:
+        if notify is not None:
+            notify.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Follow a log like tail -F (inotify / polling).")
+    ap.add_argument("log", help="file to follow")
+    ap.add_argument("--from-start", action="store_true", help="emit existing content first")
+    ap.add_argument("--poll-ms", type=float, default=1.0, help="polling interval without inotify")
+    ap.add_argument("--no-inotify", action="store_true", help="force polling")
+    args = ap.parse_args()
+
+    try:
+        for _read_ns, _wake_ns, line in follow_lines(
+            args.log, args.poll_ms / 1000.0, not args.no_inotify, args.from_start
+        ):
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Shared log reader (plain / .gz / .xz / .zst, or - for stdin) and seekable archives.
+
+Compression is detected from the magic bytes, so the extension does not matter
+and compressed data piped on stdin works too:
+
+  zcat gnb.log.gz | python3 ul_gnb.py -          # still fine
+  python3 ul_gnb.py gnb.log.gz                   # no decompress step needed
+  cat upfd.log.xz | python3 upf.py - --bin-ms 500
+
+Archive a run as independently compressed frames plus a time index
+(<archive>.idx, JSON) and read back only the frames a time range touches:
+
+  python3 log_io.py pack gnb.log -o gnb.log.zst --frame-mib 4
+  python3 log_io.py cat gnb.log.zst --start 18:59:39 --end 19:00:10 | \\
+      python3 ul_gnb.py - -o ul_gnb.txt
+
+zstd archives also carry the standard zstd seek table (skippable frame at the
+end), so other seekable-zstd tools can open them. .zst needs the optional
+'zstandard' package; --codec gzip / xz work with the standard library only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import io
+import json
+import lzma
+import re
+import struct
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# zstd seekable format: seek table in a skippable frame at the end of the file.
+ZSTD_SKIPPABLE_SEEK_MAGIC = 0x184D2A5E
+ZSTD_SEEKABLE_MAGIC = 0x8F92EAB1
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# gNB/UE (ISO) and Open5GS (MM/DD HH:MM:SS.mmm) line prefixes, optional grep -n.
+ISO_LINE_TS_RE = re.compile(
+    r"^(?:\d+:)?\s*(?P<date>\d{4}-\d{2}-\d{2})T(?P<hms>\d{2}:\d{2}:\d{2})(?:\.(?P<frac>\d+))?"
+)
+O5GS_LINE_TS_RE = re.compile(
+    r"^(?:\d+:)?\s*(?P<mm>\d{2})/(?P<dd>\d{2}) (?P<hms>\d{2}:\d{2}:\d{2})(?:\.(?P<frac>\d+))?"
+)
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except Exception as e:
+        raise RuntimeError(
+            f".zst input needs the 'zstandard' package (pip install zstandard): {e}"
+        ) from e
+    return zstandard
+
+
+def _detect_codec(head: bytes) -> str:
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(XZ_MAGIC):
+        return "xz"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return "plain"
+
+
+def _decompress_stream(raw: BinaryIO, codec: str) -> BinaryIO:
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if codec == "xz":
+        return lzma.LZMAFile(raw, mode="rb")
+    if codec == "zstd":
+        # read_across_frames: archives are many frames + a skippable seek table.
+        return _zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    return raw
+
+
+def open_log(path: str) -> TextIO:
+    """
+    Open a text log for line iteration; '-' means stdin.
+    gzip / xz / zstd are decompressed on the fly (detected by magic bytes).
+    """
+    if path == "-":
+        raw = sys.stdin.buffer
+        codec = _detect_codec(raw.peek(8)[:8]) if hasattr(raw, "peek") else "plain"
+        if codec == "plain":
+            return sys.stdin
+        return io.TextIOWrapper(_decompress_stream(raw, codec), encoding="utf-8", errors="replace")
+
+    resolved = str(Path(path).expanduser())
+    with open(resolved, "rb") as f:
+        codec = _detect_codec(f.read(8))
+    if codec == "plain":
+        return open(resolved, "r", encoding="utf-8", errors="replace")
+    raw = open(resolved, "rb")
+    return io.TextIOWrapper(_decompress_stream(raw, codec), encoding="utf-8", errors="replace")
+
+
+def line_timestamp(line: str, year: int) -> Optional[str]:
+    """Normalized 'YYYY-MM-DDTHH:MM:SS.ffffff' of a log line, or None."""
+    m = ISO_LINE_TS_RE.match(line)
+    if m:
+        date = m.group("date")
+    else:
+        m = O5GS_LINE_TS_RE.match(line)
+        if not m:
+            return None
+        date = f"{year:04d}-{m.group('mm')}-{m.group('dd')}"
+    frac = (m.group("frac") or "")[:6].ljust(6, "0")
+    return f"{date}T{m.group('hms')}.{frac}"
+
+
+@dataclass
+class FrameInfo:
+    offset: int
+    csize: int
+    usize: int
+    lines: int
+    first_ts: Optional[str]
+    last_ts: Optional[str]
+
+
+def _compress_frame(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level)
+    if codec == "xz":
+        return lzma.compress(data, preset=level)
+    return _zstandard().ZstdCompressor(level=level, write_content_size=True).compress(data)
+
+
+def _decompress_frame(data: bytes, codec: str) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "xz":
+        return lzma.decompress(data)
+    return _zstandard().ZstdDecompressor().decompress(data)
+
+
+def _zstd_seek_table(frames: List[FrameInfo]) -> bytes:
+    entries = b"".join(struct.pack("<II", fr.csize, fr.usize) for fr in frames)
+    footer = struct.pack("<IBI", len(frames), 0, ZSTD_SEEKABLE_MAGIC)
+    body = entries + footer
+    return struct.pack("<II", ZSTD_SKIPPABLE_SEEK_MAGIC, len(body)) + body
+
+
+def index_path(archive: str) -> Path:
+    return Path(str(Path(archive).expanduser()) + INDEX_SUFFIX)
+
+
+def pack_log(
+    src: str,
+    dst: str,
+    codec: str = "zstd",
+    frame_bytes: int = 4 << 20,
+    level: Optional[int] = None,
+    year: Optional[int] = None,
+) -> List[FrameInfo]:
+    """Write src as independently compressed frames + <dst>.idx time index."""
+    if level is None:
+        level = {"zstd": 9, "gzip": 6, "xz": 6}[codec]
+    if year is None:
+        year = datetime.now().year
+    if codec == "zstd":
+        _zstandard()
+
+    frames: List[FrameInfo] = []
+    chunk: List[str] = []
+    chunk_size = 0
+    first_ts: Optional[str] = None
+    last_ts: Optional[str] = None
+    offset = 0
+
+    dst_path = Path(dst).expanduser()
+    with open_log(src) as inf, open(dst_path, "wb") as out:
+
+        def flush() -> None:
+            nonlocal chunk, chunk_size, first_ts, last_ts, offset
+            if not chunk:
+                return
+            data = "".join(chunk).encode("utf-8")
+            blob = _compress_frame(data, codec, level)
+            out.write(blob)
+            frames.append(FrameInfo(offset, len(blob), len(data), len(chunk), first_ts, last_ts))
+            offset += len(blob)
+            chunk, chunk_size = [], 0
+            # Frames without their own timestamp inherit the previous one.
+            first_ts = last_ts
+
+        for line in inf:
+            ts = line_timestamp(line, year)
+            if ts is not None:
+                if first_ts is None or not chunk:
+                    first_ts = ts
+                last_ts = ts
+            chunk.append(line)
+            chunk_size += len(line)
+            if chunk_size >= frame_bytes:
+                flush()
+        flush()
+
+        if codec == "zstd":
+            out.write(_zstd_seek_table(frames))
+
+    index = {
+        "version": INDEX_VERSION,
+        "codec": codec,
+        "source": str(src),
+        "frames": [asdict(fr) for fr in frames],
+    }
+    with open(index_path(str(dst_path)), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    return frames
+
+
+def load_index(archive: str) -> dict:
+    with open(index_path(archive), encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"unsupported archive index version: {index.get('version')!r}")
+    return index
+
+
+def _normalize_bound(value: Optional[str], ref_date: Optional[str]) -> Optional[str]:
+    """Full ISO stays as-is; HH:MM:SS[.f] takes the date of the first frame."""
+    if value is None:
+        return None
+    value = value.strip()
+    if "T" in value or " " in value:
+        dt = datetime.fromisoformat(value.replace(" ", "T"))
+    else:
+        if ref_date is None:
+            raise ValueError("time-only bound needs an archive with timestamps")
+        dt = datetime.fromisoformat(f"{ref_date}T{value}")
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def iter_log_range(
+    archive: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield lines of the archive frames overlapping [start, end].
+    Only those frames are read and decompressed; filtering is per frame,
+    so a few lines outside the range are returned at the edges.
+    """
+    index = load_index(archive)
+    codec = index["codec"]
+    frames = [FrameInfo(**fr) for fr in index["frames"]]
+    ref = next((fr.first_ts for fr in frames if fr.first_ts), None)
+    ref_date = ref[:10] if ref else None
+    lo = _normalize_bound(start, ref_date)
+    hi = _normalize_bound(end, ref_date)
+
+    with open(Path(archive).expanduser(), "rb") as f:
+        for fr in frames:
+            if lo is not None and fr.last_ts is not None and fr.last_ts < lo:
+                continue
+            if hi is not None and fr.first_ts is not None and fr.first_ts > hi:
+                break
+            f.seek(fr.offset)
+            data = _decompress_frame(f.read(fr.csize), codec)
+            yield from io.StringIO(data.decode("utf-8", errors="replace"))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compressed log reader / seekable archive tool.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_pack = sub.add_parser("pack", help="write a seekable archive + time index")
+    p_pack.add_argument("log", help="input log (plain/.gz/.xz/.zst, or - for stdin)")
+    p_pack.add_argument("-o", "--output", required=True, help="archive path")
+    p_pack.add_argument("--codec", choices=("zstd", "gzip", "xz"), default="zstd")
+    p_pack.add_argument("--level", type=int, default=None, help="compression level")
+    p_pack.add_argument(
+        "--frame-mib", type=float, default=4.0, help="uncompressed MiB per frame (default: 4)"
+    )
+    p_pack.add_argument(
+        "--year", type=int, default=None,
+        help="year for Open5GS MM/DD timestamps (default: current year)",
+    )
+
+    p_cat = sub.add_parser("cat", help="print lines (optionally a time range) to stdout")
+    p_cat.add_argument("log", help="archive (uses <log>.idx) or any plain/compressed log")
+    p_cat.add_argument("--start", default=None, help="ISO or HH:MM:SS[.ffffff]")
+    p_cat.add_argument("--end", default=None, help="ISO or HH:MM:SS[.ffffff]")
+
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "pack":
+            if args.frame_mib <= 0:
+                print("ERROR: --frame-mib must be > 0", file=sys.stderr)
+                return 2
+            frames = pack_log(
+                args.log,
+                args.output,
+                codec=args.codec,
+                frame_bytes=int(args.frame_mib * (1 << 20)),
+                level=args.level,
+                year=args.year,
+            )
+            usize = sum(fr.usize for fr in frames)
+            csize = sum(fr.csize for fr in frames)
+            ratio = (usize / csize) if csize else 0.0
+            print(
+                f"# frames={len(frames)} bytes_in={usize} bytes_out={csize} ratio={ratio:.2f}",
+                file=sys.stderr,
+            )
+            return 0
+
+        out = sys.stdout
+        if args.start is None and args.end is None or not index_path(args.log).is_file():
+            if args.start is not None or args.end is not None:
+                print(f"WARN: no index for {args.log}; printing whole log", file=sys.stderr)
+            with open_log(args.log) as f:
+                for line in f:
+                    out.write(line)
+        else:
+            for line in iter_log_range(args.log, args.start, args.end):
+                out.write(line)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Open5GS log time decoder: 'MM/DD HH:MM:SS.mmm' (+ wall=HH:MM:SS.ffffff) -> int us.
+
+Open5GS prints neither the year nor (in wall=) the date, so a run that crosses
+midnight or New Year sorts wrong when every line is decoded on its own.
+Open5gsClock decodes lines in log order and keeps the calendar state:
+
+  - the date part is cached (one datetime per day, not per line) and the
+    HH:MM:SS part per second, so a line costs a few int() calls;
+  - MM/DD going from December back to January bumps the year;
+  - a MM/DD prefix date is taken as is. Near midnight a wall= clock gets the
+    day (MM/DD, the day before or after) that puts it nearest to its own
+    prefix time, and a time-only value the day nearest to the previous line,
+    so a wall= clock on either side of a prefix date that already rolled
+    over, or a late line, stays on its day.
+
+Used by pcf.py, upf.py and smf_qos.py.
+
+  python3 open5gs_time.py smf.log --year 2025 | head     # line,epoch_us,timestamp
+  python3 -m doctest open5gs_time.py                      # midnight regression cases
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from log_io import open_log
+from rle_series import dt_to_us, us_to_dt
+
+DAY_US = 86_400_000_000
+ROLLOVER_US = DAY_US // 2
+
+# Open5GS line prefix: "04/26 12:11:58.038: [upf] INFO: ..."
+O5GS_PREFIX_RE = re.compile(r"(?P<date>\d{1,2}/\d{1,2})\s+(?P<tod>\d{2}:\d{2}:\d{2}(?:\.\d+)?)")
+
+
+class Open5gsClock:
+    """Stateful MM/DD + time-of-day decoder; feed values in log order."""
+
+    def __init__(self, year: Optional[int] = None, fallback_date: Optional[date] = None) -> None:
+        today = datetime.now().date()
+        self.year = year or today.year
+        self._fallback = fallback_date or today
+        self._day_cache: Dict[Tuple[int, int, int], int] = {}
+        self._mmdd_key: Optional[str] = None
+        self._mmdd_day_us = 0
+        self._last_md: Optional[Tuple[int, int]] = None
+        self._tod_key: Optional[str] = None
+        self._tod_us = 0
+        self._cur_day_us: Optional[int] = None  # day of time-only values
+        self.last_us: Optional[int] = None
+        self.day_rollovers = 0
+        self.year_rollovers = 0
+
+    def _day_us(self, y: int, m: int, d: int) -> int:
+        key = (y, m, d)
+        us = self._day_cache.get(key)
+        if us is None:
+            us = self._day_cache[key] = dt_to_us(datetime(y, m, d))
+        return us
+
+    def _date_us(self, mmdd: str) -> int:
+        if mmdd == self._mmdd_key:
+            return self._mmdd_day_us
+        mm, _, dd = mmdd.partition("/")
+        md = (int(mm), int(dd))
+        if self._last_md is not None and self._last_md[0] == 12 and md[0] == 1:
+            self.year += 1
+            self.year_rollovers += 1
+        self._last_md = md
+        self._mmdd_key = mmdd
+        self._mmdd_day_us = self._day_us(self.year, md[0], md[1])
+        return self._mmdd_day_us
+
+    def _time_us(self, tod: str) -> int:
+        """'HH:MM:SS[.f...]' -> us since midnight (seconds part cached)."""
+        hms = tod[:8]
+        if hms != self._tod_key:
+            self._tod_key = hms
+            self._tod_us = (int(hms[0:2]) * 3600 + int(hms[3:5]) * 60 + int(hms[6:8])) * 1_000_000
+        frac = tod[9:15]
+        if not frac:
+            return self._tod_us
+        return self._tod_us + int(frac) * 10 ** (6 - len(frac))
+
+    def decode(self, mmdd: Optional[str], tod: str, ref_tod: Optional[str] = None) -> int:
+        """Epoch us (naive local time) of an optional 'MM/DD' and 'HH:MM:SS[.ffffff]'.
+
+        ref_tod: the line's own prefix time when tod is a wall= clock; its day
+        (prefix day or the one before / after) is the one nearest to MM/DD
+        ref_tod. Without ref_tod the MM/DD date is used as is; time-only values
+        get the day nearest to the previous line.
+
+        >>> c = Open5gsClock(2026)
+        >>> [str(us_to_dt(c.decode("04/26", "23:59:59.999", "23:59:59.999")))[:19],
+        ...  str(us_to_dt(c.decode("04/27", "23:59:59.9998", "00:00:00.000")))[:19],
+        ...  str(us_to_dt(c.decode("04/27", "00:00:00.0003", "00:00:00.000")))[:19],
+        ...  str(us_to_dt(c.decode("04/27", "00:05:00", "00:05:00.001")))[:19]]
+        ['2026-04-26 23:59:59', '2026-04-26 23:59:59', '2026-04-27 00:00:00', '2026-04-27 00:05:00']
+        >>> str(us_to_dt(c.decode("04/26", "00:00:00.000200", "23:59:59.999")))
+        '2026-04-27 00:00:00.000200'
+        >>> c = Open5gsClock(2026)
+        >>> [str(us_to_dt(c.decode("04/26", t)))[:16] for t in ("09:00:00.000", "22:00:00.000")]
+        ['2026-04-26 09:00', '2026-04-26 22:00']
+        >>> c = Open5gsClock(2026, fallback_date=date(2026, 4, 26))
+        >>> [str(us_to_dt(c.decode(None, t)))[:16] for t in ("23:59:00", "00:01:00", "23:59:59")]
+        ['2026-04-26 23:59', '2026-04-27 00:01', '2026-04-26 23:59']
+        """
+        tod_us = self._time_us(tod)
+        if mmdd:
+            day_us = self._date_us(mmdd)
+            ref = None if ref_tod is None else day_us + self._time_us(ref_tod)
+        else:
+            if self._cur_day_us is None:
+                f = self._fallback
+                self._cur_day_us = self._day_us(f.year, f.month, f.day)
+            day_us = self._cur_day_us
+            ref = self.last_us
+        ts = day_us + tod_us
+        shift = 0
+        if ref is not None:
+            # only the neighbour day on the near side of midnight: a wall= clock
+            # differs from its prefix by seconds, not by a day
+            alt = -DAY_US if tod_us >= ROLLOVER_US else DAY_US
+            if abs(ts + alt - ref) < abs(ts - ref):
+                shift = alt
+        ts += shift
+        if shift > 0:
+            self.day_rollovers += 1
+            if not mmdd:
+                self._cur_day_us += DAY_US
+        if self.last_us is None or (ts > self.last_us and (shift <= 0 or ts - self.last_us <= ROLLOVER_US)):
+            self.last_us = ts
+        return ts
+
+    def decode_dt(self, mmdd: Optional[str], tod: str, ref_tod: Optional[str] = None) -> datetime:
+        return us_to_dt(self.decode(mmdd, tod, ref_tod))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Decode Open5GS MM/DD HH:MM:SS.mmm line times (log order).")
+    ap.add_argument("log", help="Open5GS log (or - for stdin)")
+    ap.add_argument("--year", type=int, default=None, help="year of the first line (default: current year)")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    clock = Open5gsClock(args.year)
+    n = 0
+    if not args.no_header:
+        print("line,epoch_us,timestamp")
+    with open_log(args.log) as f:
+        for line_no, line in enumerate(f, 1):
+            m = O5GS_PREFIX_RE.match(line)
+            if not m:
+                continue
+            us = clock.decode(m.group("date"), m.group("tod"))
+            print(f"{line_no},{us},{us_to_dt(us).strftime('%Y-%m-%dT%H:%M:%S.%f')}")
+            n += 1
+    print(
+        f"# lines={n} day_rollovers={clock.day_rollovers} year_rollovers={clock.year_rollovers}",
+        file=sys.stderr,
+    )
+    return 0 if n else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
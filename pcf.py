@@ -8,6 +8,13 @@ Parse PCF [PCF-API-INGRESS] lines and emit 5QI vs time.
 
 Consecutive identical five_qi values are collapsed to the first occurrence only
 (default). Use --no-collapse-consecutive to keep every log line.
+
+--pyramid PATH stores last / most common 5QI at every standard bin size
+(1..1000 ms) from one pass; --from-pyramid PATH --bin-ms N serves them later
+without re-parsing the log.
+
+--format tsv|bin writes the rows as TSV or as a columnar table_io.py file
+(timestamps as epoch us) instead of CSV.
 """
 
 from __future__ import annotations
@@ -17,9 +24,16 @@ import re
 import sys
 from collections import Counter
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Optional, Tuple
 
+from log_io import open_log
+from open5gs_time import Open5gsClock
+from profiling import ParseStats, add_profile_args, attach, session_from_args, stage
+from pyramid import Pyramid, add_pyramid_args, load_pyramids, save_pyramids
+from rle_series import dt_to_us, us_to_dt
+from table_io import Column, TableWriter, add_format_args
+
 ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
 
 PCF_INGRESS_RE = re.compile(
@@ -53,14 +67,6 @@ class PcfSample:
     mbr_ul: Optional[int]
 
 
-@dataclass
-class ParseStats:
-    lines_read: int = 0
-    marker_hits: int = 0
-    parsed: int = 0
-    after_start_filter: int = 0
-
-
 def _parse_time_of_day(value: str) -> datetime.time:
     if "." in value:
         return datetime.strptime(value, "%H:%M:%S.%f").time()
@@ -74,14 +80,6 @@ def _parse_start_time(value: str, date_fallback: datetime) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def _combine_ts(date_mmdd: Optional[str], wall: str, year: int, fallback_date: datetime) -> datetime:
-    t = _parse_time_of_day(wall)
-    if date_mmdd:
-        month, day = map(int, date_mmdd.split("/"))
-        return datetime(year, month, day, t.hour, t.minute, t.second, t.microsecond)
-    return datetime.combine(fallback_date.date(), t)
-
-
 def _parse_iso_ts(value: str) -> datetime:
     v = value.replace("Z", "+00:00")
     if " " in v and "T" not in v:
@@ -94,19 +92,18 @@ def _resolve_timestamp(
     date_mmdd: Optional[str],
     wall: Optional[str],
     prefix_ts: Optional[str],
-    year: int,
-    fallback: datetime,
+    clock: Open5gsClock,
 ) -> datetime:
     if wall:
-        return _combine_ts(date_mmdd, wall, year, fallback)
+        return clock.decode_dt(date_mmdd, wall, prefix_ts)
     iso_m = ISO_TS_RE.search(line)
     if iso_m:
         return _parse_iso_ts(iso_m.group("iso"))
     if prefix_ts:
-        return _combine_ts(date_mmdd, prefix_ts, year, fallback)
+        return clock.decode_dt(date_mmdd, prefix_ts)
     tod_m = TIME_OF_DAY_RE.search(line)
     if tod_m:
-        return _combine_ts(date_mmdd, tod_m.group("t"), year, fallback)
+        return clock.decode_dt(date_mmdd, tod_m.group("t"))
     raise ValueError(f"no timestamp in line: {line[:120]!r}")
 
 
@@ -126,7 +123,7 @@ def _parse_af_app_id(af_app_id: str) -> Tuple[int, int, Optional[int], Optional[
     return five_qi, qfi, gbr_dl, gbr_ul, mbr_dl, mbr_ul
 
 
-def _parse_line(line: str, year: int, fallback: datetime) -> Optional[PcfSample]:
+def _parse_line(line: str, clock: Open5gsClock) -> Optional[PcfSample]:
     raw = ANSI_RE.sub("", line).rstrip("\r\n")
     if "PCF-API-INGRESS" not in raw:
         return None
@@ -159,7 +156,7 @@ def _parse_line(line: str, year: int, fallback: datetime) -> Optional[PcfSample]
         prefix_ts = prefix_m.group("prefix") if prefix_m else None
 
     five_qi, qfi, gbr_dl, gbr_ul, mbr_dl, mbr_ul = _parse_af_app_id(af_app_id)
-    ts = _resolve_timestamp(raw, date_mmdd, wall, prefix_ts, year, fallback)
+    ts = _resolve_timestamp(raw, date_mmdd, wall, prefix_ts, clock)
     return PcfSample(
         ts=ts,
         five_qi=five_qi,
@@ -181,16 +178,16 @@ def parse_samples(
     samples: List[PcfSample] = []
     first_ts: Optional[datetime] = None
     start_dt: Optional[datetime] = None
-    use_year = year or datetime.now().year
+    clock = Open5gsClock(year)
     st = stats if stats is not None else ParseStats()
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             st.lines_read += 1
             if "PCF-API-INGRESS" in ANSI_RE.sub("", line):
                 st.marker_hits += 1
             try:
-                sample = _parse_line(line, use_year, first_ts or datetime.now())
+                sample = _parse_line(line, clock)
             except ValueError:
                 continue
             if sample is None:
@@ -286,6 +283,43 @@ def bin_samples_mode(samples: List[PcfSample], bin_ms: int, bin_base: datetime)
     return out
 
 
+def build_pyramid(samples: List[PcfSample], bin_base: datetime) -> Pyramid:
+    """last = the whole sample (minus ts), mode key = five_qi."""
+    p = Pyramid(dt_to_us(bin_base))
+    for s in samples:
+        p.add(
+            dt_to_us(s.ts),
+            last=(s.five_qi, s.qfi, s.method, s.gbr_dl, s.gbr_ul, s.mbr_dl, s.mbr_ul),
+            key=s.five_qi,
+        )
+    return p
+
+
+def bins_from_pyramid(pyr: Pyramid, bin_ms: int, mode: str = "last") -> List[tuple[int, PcfSample]]:
+    """Same rows as bin_samples_last / bin_samples_mode, served from a stored pyramid."""
+    out: List[tuple[int, PcfSample]] = []
+    for idx, c in pyr.level(bin_ms):
+        last_qi, qfi, method, gbr_dl, gbr_ul, mbr_dl, mbr_ul = c.last
+        five_qi = c.mode if mode == "mode" else last_qi
+        same = five_qi == last_qi
+        out.append(
+            (
+                idx,
+                PcfSample(
+                    ts=us_to_dt(c.last_us),
+                    five_qi=five_qi,
+                    qfi=qfi,
+                    method=method,
+                    gbr_dl=gbr_dl if same else None,
+                    gbr_ul=gbr_ul if same else None,
+                    mbr_dl=mbr_dl if same else None,
+                    mbr_ul=mbr_ul if same else None,
+                ),
+            )
+        )
+    return out
+
+
 def _bin_base(start_time: Optional[str], samples: List[PcfSample]) -> datetime:
     if not samples:
         raise ValueError("no samples")
@@ -294,23 +328,13 @@ def _bin_base(start_time: Optional[str], samples: List[PcfSample]) -> datetime:
     return samples[0].ts
 
 
-def _print_row(
-    rel_or_ts: str,
-    sample: PcfSample,
-    include_gbr: bool,
-    include_method: bool,
-) -> None:
-    cols = [rel_or_ts, str(sample.five_qi)]
+def _write_row(out: TableWriter, t: object, sample: PcfSample, include_gbr: bool, include_method: bool) -> None:
+    cols = [t, sample.five_qi]
     if include_method:
         cols.append(sample.method)
     if include_gbr:
-        cols.extend(
-            [
-                "" if sample.gbr_dl is None else str(sample.gbr_dl),
-                "" if sample.mbr_dl is None else str(sample.mbr_dl),
-            ]
-        )
-    print(",".join(cols))
+        cols.extend([sample.gbr_dl, sample.mbr_dl])
+    out.row(*cols)
 
 
 def _print_no_match_help(log_path: str, stats: ParseStats) -> None:
@@ -328,7 +352,7 @@ def _print_no_match_help(log_path: str, stats: ParseStats) -> None:
         print("  No PCF-API-INGRESS in file.", file=sys.stderr)
 
     try:
-        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        with open_log(log_path) as f:
             for line in f:
                 if "PCF-API-INGRESS" in line:
                     print(f"  example: {ANSI_RE.sub('', line).rstrip()[:220]}", file=sys.stderr)
@@ -337,9 +361,52 @@ def _print_no_match_help(log_path: str, stats: ParseStats) -> None:
         pass
 
 
+def _writer(args: argparse.Namespace, time_fmt: str = "iso") -> TableWriter:
+    """Row writer; time_fmt: how absolute timestamps are passed (datetime "iso" or epoch us "iso_us")."""
+    cols = [Column("rel_time_s", "%.6f") if args.relative_time else Column("timestamp", time_fmt), Column("five_qi", "%d")]
+    if args.include_method:
+        cols.append(Column("method"))
+    if args.include_gbr:
+        cols.extend([Column("gbr_dl", "%d", nullable=True), Column("mbr_dl", "%d", nullable=True)])
+    return TableWriter(cols, args.format, header=not args.no_header)
+
+
+def _serve_pyramid(args: argparse.Namespace) -> int:
+    """--from-pyramid: binned rows as with a log file (collapse as stored when written)."""
+    try:
+        meta, series = load_pyramids(args.from_pyramid, tool="pcf")
+        pyr = series["pcf"]
+        bins = bins_from_pyramid(pyr, args.bin_ms, args.bin_mode)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if meta.get("collapsed") and args.no_collapse_consecutive:
+        print("# note: pyramid was written from collapsed samples", file=sys.stderr)
+
+    out = _writer(args, "iso_us")
+    if not args.no_collapse_consecutive:
+        bins = collapse_consecutive_bins(bins)
+    step_s = args.bin_ms / 1000.0
+    step_us = args.bin_ms * 1000
+    with out:
+        for idx, s in bins:
+            t = idx * step_s if args.relative_time else pyr.base_us + idx * step_us
+            _write_row(out, t, s, args.include_gbr, args.include_method)
+
+    qi_counts: Counter = Counter()
+    for _, c in pyr.level(pyr.levels_ms[-1]):
+        qi_counts.update(c.counts or {})
+    print(
+        f"# bin_ms={args.bin_ms} lines={meta.get('lines')} collapsed={pyr.samples} bins={len(bins)} "
+        f"5qi_hist={dict(sorted(qi_counts.items()))}",
+        file=sys.stderr,
+    )
+    return 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract [PCF-API-INGRESS] 5QI vs time CSV")
-    ap.add_argument("log_file")
+    ap.add_argument("log_file", nargs="?", default=None)
     ap.add_argument("--bin-ms", type=int, default=None, help="Bin width (500 = 0.5s iperf step)")
     ap.add_argument("--bin-mode", choices=("last", "mode"), default="last")
     ap.add_argument("--start-time", type=str, default=None, help="e.g. 21:27:24.646004 or ISO")
@@ -353,46 +420,65 @@ def main() -> int:
         action="store_true",
         help="Keep every row even when five_qi is unchanged from the previous row",
     )
+    add_pyramid_args(ap)
+    add_profile_args(ap)
+    add_format_args(ap)
     args = ap.parse_args()
+    with session_from_args(args):
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> int:
+    if args.bin_ms is not None and args.bin_ms <= 0:
+        print("ERROR: --bin-ms must be > 0", file=sys.stderr)
+        return 2
+    if (args.log_file is None) == (args.from_pyramid is None):
+        print("ERROR: give either a log file or --from-pyramid", file=sys.stderr)
+        return 2
+    if args.from_pyramid is not None:
+        if args.bin_ms is None:
+            print("ERROR: --from-pyramid needs --bin-ms", file=sys.stderr)
+            return 2
+        return _serve_pyramid(args)
 
-    stats = ParseStats()
-    samples = parse_samples(args.log_file, args.start_time, args.year, stats)
+    stats = attach(ParseStats())
+    with stage("read"):
+        samples = parse_samples(args.log_file, args.start_time, args.year, stats)
     if not samples:
         _print_no_match_help(args.log_file, stats)
         return 1
 
     raw_count = len(samples)
     if not args.no_collapse_consecutive:
-        samples = collapse_consecutive_five_qi(samples)
+        with stage("collapse"):
+            samples = collapse_consecutive_five_qi(samples)
 
     bin_base = _bin_base(args.start_time, samples)
+    if args.pyramid is not None:
+        with stage("pyramid"):
+            save_pyramids(
+                args.pyramid, "pcf", {"pcf": build_pyramid(samples, bin_base)},
+                {"lines": raw_count, "collapsed": not args.no_collapse_consecutive},
+            )
 
-    if not args.no_header:
-        cols = ["rel_time_s" if args.relative_time else "timestamp", "five_qi"]
-        if args.include_method:
-            cols.append("method")
-        if args.include_gbr:
-            cols.extend(["gbr_dl", "mbr_dl"])
-        print(",".join(cols))
+    out = _writer(args, "iso" if args.bin_ms is None else "iso_us")
 
     if args.bin_ms is not None:
-        if args.bin_ms <= 0:
-            print("ERROR: --bin-ms must be > 0", file=sys.stderr)
-            return 2
-        bins = (
-            bin_samples_mode(samples, args.bin_ms, bin_base)
-            if args.bin_mode == "mode"
-            else bin_samples_last(samples, args.bin_ms, bin_base)
-        )
-        if not args.no_collapse_consecutive:
-            bins = collapse_consecutive_bins(bins)
+        with stage("bin"):
+            bins = (
+                bin_samples_mode(samples, args.bin_ms, bin_base)
+                if args.bin_mode == "mode"
+                else bin_samples_last(samples, args.bin_ms, bin_base)
+            )
+            if not args.no_collapse_consecutive:
+                bins = collapse_consecutive_bins(bins)
         step_s = args.bin_ms / 1000.0
-        for idx, s in bins:
-            if args.relative_time:
-                _print_row(f"{idx * step_s:.6f}", s, args.include_gbr, args.include_method)
-            else:
-                ts = bin_base + timedelta(milliseconds=idx * args.bin_ms)
-                _print_row(ts.strftime("%Y-%m-%dT%H:%M:%S.%f"), s, args.include_gbr, args.include_method)
+        step_us = args.bin_ms * 1000
+        base_us = dt_to_us(bin_base.replace(tzinfo=None))
+        with stage("write"), out:
+            for idx, s in bins:
+                t = idx * step_s if args.relative_time else base_us + idx * step_us
+                _write_row(out, t, s, args.include_gbr, args.include_method)
 
         qi_counts = Counter(s.five_qi for s in samples)
         print(
@@ -401,12 +487,10 @@ def main() -> int:
             file=sys.stderr,
         )
     else:
-        for s in samples:
-            if args.relative_time:
-                rel = (s.ts - bin_base).total_seconds()
-                _print_row(f"{rel:.6f}", s, args.include_gbr, args.include_method)
-            else:
-                _print_row(s.ts.strftime("%Y-%m-%dT%H:%M:%S.%f"), s, args.include_gbr, args.include_method)
+        with stage("write"), out:
+            for s in samples:
+                t = (s.ts - bin_base).total_seconds() if args.relative_time else s.ts
+                _write_row(out, t, s, args.include_gbr, args.include_method)
 
         qi_counts = Counter(s.five_qi for s in samples)
         print(
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Per-slot PRB x symbol occupancy of the cell from gNB PDSCH / PUSCH grants.
+
+Every slot gets one bitmap per channel (DL = PDSCH, UL = PUSCH): bit
+sym * stride + prb is set when a grant covers that resource element group.
+Bitmaps are plain Python ints, so OR / AND over a whole slot is one big-int
+operation and int.bit_count() gives the area; the mask of a grant
+(prb=[a, b) symb=[c, d)) is cached, so a grant costs a dict lookup, an AND
+and an OR. Per slot this gives:
+
+  used_re     PRB x symbols granted (union over UEs)
+  overlap_re  PRB x symbols granted to more than one UE (collisions)
+  idle_re     capacity - used (capacity = BWP PRBs x 14 symbols)
+
+Windows (--window-ms) add the slots with no grant at all to the capacity, so
+utilization there is "share of the cell the scheduler handed out". A window
+at or above --full-threshold is marked limited=capacity: a GBR miss there is
+the cell running out of PRBs; below it, the scheduler left PRBs idle
+(policy-limited).
+
+Grant lines are the ones bandwidth(GBR).py parses:
+  <ISO ts> ... [ sfn.slot] ... PDSCH: rnti=0x4601 h_id=0 k1=4 prb=[0, 42) symb=[1, 14) ...
+Grant lines without their own timestamp (srsRAN "Slot decisions" blocks)
+take the time and slot of the header line above them. Without a [sfn.slot]
+tag, the slot is the timestamp divided by the slot duration (--scs).
+
+  python3 prb_bitmap.py gnb.log --window-ms 100 --bwp-prb 52 > prb_util.csv
+  python3 prb_bitmap.py gnb.log --slots --channel dl | head
+  python3 prb_bitmap.py gnb.log --window-ms 1000 --per-ue
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from log_io import open_log
+from rle_series import dt_to_us, us_to_dt
+from slot_clock import slot_us_for_scs
+
+SYMBOLS_PER_SLOT = 14
+MAX_NR_PRB = 275  # bitmap row stride when the BWP size is not given
+CHANNELS = {"PDSCH": "dl", "PUSCH": "ul"}
+
+# Matched at the channel name (found with str.find), not searched from the line start.
+GRANT_RE = re.compile(
+    r"(?P<ch>PDSCH|PUSCH):\s+rnti=(?P<rnti>0x[0-9a-fA-F]+)\s+"
+    r".*?prb=\[(?P<p0>\d+),\s*(?P<p1>\d+)\)\s+"
+    r"symb=\[(?P<s0>\d+),\s*(?P<s1>\d+)\)"
+)
+HEADER_RE = re.compile(r"^(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+)")
+SLOT_TAG_RE = re.compile(r"\[\s*(?P<sfn>\d+)\.(?P<slot>\d+)\]")
+SCS_RE = re.compile(r"common_scs:\s*(\d+)")
+
+
+@dataclass(slots=True)
+class Grant:
+    ts_us: int
+    slot_tag: Optional[str]  # "[ sfn.slot]" tag of the log prefix, as written
+    channel: str  # dl / ul
+    rnti: str
+    prb0: int
+    prb1: int
+    sym0: int
+    sym1: int
+
+
+def parse_grants(
+    log_path: str, channel: Optional[str] = None, on_scs: Optional[Callable[[int], None]] = None
+) -> Iterator[Grant]:
+    """Grants in log order (one pass; common_scs lines go to on_scs)."""
+    cur_ts: Optional[str] = None
+    cur_tag: Optional[str] = None
+    ts_cache: Tuple[Optional[str], int] = (None, 0)
+    with open_log(log_path) as f:
+        for line in f:
+            i = line.find("SCH:")
+            if i < 2:
+                if "Slot decisions" in line:
+                    m = HEADER_RE.match(line)
+                    if m:
+                        cur_ts = m.group("ts")
+                        t = SLOT_TAG_RE.search(line)
+                        cur_tag = t.group(0) if t else None
+                elif on_scs is not None and "common_scs" in line:
+                    m = SCS_RE.search(line)
+                    if m:
+                        on_scs(int(m.group(1)))
+                continue
+            m = GRANT_RE.match(line, i - 2)
+            if not m:
+                continue
+            ch_s, rnti, p0, p1, s0, s1 = m.group("ch", "rnti", "p0", "p1", "s0", "s1")
+            ch = CHANNELS[ch_s]
+            if channel is not None and ch != channel:
+                continue
+            h = HEADER_RE.match(line) if line[:1].isdigit() else None
+            if h is not None:
+                ts_s = h.group("ts")
+                t = SLOT_TAG_RE.search(line, 0, i)
+                tag = t.group(0) if t else None
+            elif cur_ts is not None:
+                ts_s, tag = cur_ts, cur_tag
+            else:
+                continue
+            if ts_s != ts_cache[0]:
+                ts_cache = (ts_s, dt_to_us(datetime.fromisoformat(ts_s)))
+            yield Grant(
+                ts_us=ts_cache[1],
+                slot_tag=tag,
+                channel=ch,
+                rnti=rnti.lower(),
+                prb0=int(p0),
+                prb1=int(p1),
+                sym0=int(s0),
+                sym1=int(s1),
+            )
+
+
+@dataclass
+class SlotOccupancy:
+    """One channel in one slot."""
+
+    ts_us: int  # first grant of the slot
+    grants: int = 0
+    used: int = 0  # bitmap: union of all grants
+    collide: int = 0  # bitmap: granted more than once
+    ue_re: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def used_re(self) -> int:
+        return self.used.bit_count()
+
+    @property
+    def overlap_re(self) -> int:
+        return self.collide.bit_count()
+
+
+class PrbBitmapEngine:
+    """Folds time-ordered grants into per-slot, per-channel bitmaps; on_slot gets each finished slot."""
+
+    def __init__(
+        self,
+        on_slot: Callable[[str, SlotOccupancy], None],
+        stride: int = MAX_NR_PRB,
+        slot_us: int = 1000,
+    ) -> None:
+        self.on_slot = on_slot
+        self.stride = stride
+        self.slot_us = slot_us
+        self.max_prb = 0
+        self.grants = 0
+        self.clipped = 0
+        self._masks: Dict[Tuple[int, int, int, int], int] = {}
+        self._combs: Dict[Tuple[int, int], int] = {}
+        self._cur: Dict[str, Tuple[object, SlotOccupancy]] = {}
+
+    def mask(self, prb0: int, prb1: int, sym0: int, sym1: int) -> int:
+        """Bitmap of prb=[prb0, prb1) x symb=[sym0, sym1)."""
+        key = (prb0, prb1, sym0, sym1)
+        m = self._masks.get(key)
+        if m is None:
+            comb = self._combs.get((sym0, sym1))
+            if comb is None:
+                comb = 0
+                for s in range(sym0, sym1):
+                    comb |= 1 << (s * self.stride)
+                self._combs[(sym0, sym1)] = comb
+            # The row never reaches the next symbol, so the product has no carries.
+            m = self._masks[key] = (((1 << (prb1 - prb0)) - 1) << prb0) * comb
+        return m
+
+    def feed(self, g: Grant) -> None:
+        self.grants += 1
+        prb1, sym1 = min(g.prb1, self.stride), min(g.sym1, SYMBOLS_PER_SLOT)
+        if prb1 != g.prb1 or sym1 != g.sym1:
+            self.clipped += 1
+        if prb1 <= g.prb0 or sym1 <= g.sym0:
+            return
+        self.max_prb = max(self.max_prb, prb1)
+        key = g.slot_tag if g.slot_tag is not None else g.ts_us // self.slot_us
+        cur = self._cur.get(g.channel)
+        if cur is None or cur[0] != key:
+            if cur is not None:
+                self.on_slot(g.channel, cur[1])
+            cur = self._cur[g.channel] = (key, SlotOccupancy(g.ts_us))
+        occ = cur[1]
+        m = self.mask(g.prb0, prb1, g.sym0, sym1)
+        occ.collide |= occ.used & m
+        occ.used |= m
+        occ.grants += 1
+        occ.ue_re[g.rnti] = occ.ue_re.get(g.rnti, 0) + (prb1 - g.prb0) * (sym1 - g.sym0)
+
+    def feed_all(self, grants: Iterable[Grant]) -> "PrbBitmapEngine":
+        for g in grants:
+            self.feed(g)
+        return self
+
+    def close(self) -> None:
+        for ch, (_, occ) in self._cur.items():
+            self.on_slot(ch, occ)
+        self._cur = {}
+
+
+class SlotTable:
+    """Finished slots of one channel as int64 columns (millions of slots stay small)."""
+
+    def __init__(self) -> None:
+        self.ts_us = array("q")
+        self.grants = array("l")
+        self.ues = array("l")
+        self.used_re = array("l")
+        self.overlap_re = array("l")
+
+    def add(self, occ: SlotOccupancy) -> None:
+        self.ts_us.append(occ.ts_us)
+        self.grants.append(occ.grants)
+        self.ues.append(len(occ.ue_re))
+        self.used_re.append(occ.used_re)
+        self.overlap_re.append(occ.overlap_re)
+
+    def __len__(self) -> int:
+        return len(self.ts_us)
+
+
+@dataclass
+class WindowOccupancy:
+    slots: int = 0  # slots with at least one grant
+    grants: int = 0
+    used_re: int = 0
+    overlap_re: int = 0
+    collided_slots: int = 0
+    ue_re: Dict[str, int] = field(default_factory=dict)
+
+
+class WindowAggregator:
+    """on_slot target: per-channel windows (and, with keep_slots, the per-slot table)."""
+
+    def __init__(self, window_us: int, keep_slots: bool = False) -> None:
+        self.window_us = window_us
+        self.base_us: Optional[int] = None
+        self.windows: Dict[str, Dict[int, WindowOccupancy]] = {}
+        self.tables: Optional[Dict[str, SlotTable]] = {} if keep_slots else None
+
+    def __call__(self, channel: str, occ: SlotOccupancy) -> None:
+        if self.base_us is None:
+            self.base_us = occ.ts_us
+        wid = max(0, occ.ts_us - self.base_us) // self.window_us
+        ch = self.windows.get(channel)
+        if ch is None:
+            ch = self.windows[channel] = {}
+        w = ch.get(wid)
+        if w is None:
+            w = ch[wid] = WindowOccupancy()
+        w.slots += 1
+        w.grants += occ.grants
+        used, over = occ.used_re, occ.overlap_re
+        w.used_re += used
+        w.overlap_re += over
+        if over:
+            w.collided_slots += 1
+        for rnti, re_ in occ.ue_re.items():
+            w.ue_re[rnti] = w.ue_re.get(rnti, 0) + re_
+        if self.tables is not None:
+            t = self.tables.get(channel)
+            if t is None:
+                t = self.tables[channel] = SlotTable()
+            t.add(occ)
+
+
+def _format_time(ts_us: int, base_us: int, relative: bool) -> str:
+    if relative:
+        return f"{(ts_us - base_us) / 1e6:.6f}"
+    return us_to_dt(ts_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-slot PRB x symbol occupancy from gNB PDSCH/PUSCH grants.")
+    ap.add_argument("log_file", help="gnb.log (or - for stdin)")
+    ap.add_argument("--channel", choices=("dl", "ul"), default=None, help="only PDSCH (dl) or PUSCH (ul)")
+    ap.add_argument("--bwp-prb", type=int, default=None, help="BWP size in PRBs (default: highest PRB granted)")
+    ap.add_argument("--scs", type=int, default=None, help="SCS in kHz (default: common_scs from the log, else 15)")
+    ap.add_argument("--window-ms", type=float, default=1000.0, help="window for aggregated rows (default: 1000)")
+    ap.add_argument("--slots", action="store_true", help="print one row per slot instead of windows")
+    ap.add_argument("--per-ue", action="store_true", help="add one row per UE (rnti) and window")
+    ap.add_argument(
+        "--full-threshold",
+        type=float,
+        default=0.95,
+        help="window utilization at/above which it is marked limited=capacity (default: 0.95)",
+    )
+    ap.add_argument("--relative-time", action="store_true")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    if args.bwp_prb is not None and not 0 < args.bwp_prb <= MAX_NR_PRB:
+        print(f"ERROR: --bwp-prb must be 1..{MAX_NR_PRB}", file=sys.stderr)
+        return 2
+    if not args.window_ms > 0:
+        print("ERROR: --window-ms must be > 0", file=sys.stderr)
+        return 2
+    if args.scs is not None and args.scs not in (15, 30, 60, 120):
+        print("ERROR: --scs must be 15, 30, 60 or 120", file=sys.stderr)
+        return 2
+
+    scs_seen: List[int] = []
+    scs = args.scs or 15
+    agg = WindowAggregator(max(1, round(args.window_ms * 1000)), keep_slots=args.slots)
+    engine = PrbBitmapEngine(agg, stride=args.bwp_prb or MAX_NR_PRB, slot_us=slot_us_for_scs(scs))
+
+    def on_scs(v: int) -> None:
+        # common_scs is printed with the cell config, before the first grant.
+        if args.scs is None and not scs_seen and v in (15, 30, 60, 120):
+            scs_seen.append(v)
+            engine.slot_us = slot_us_for_scs(v)
+
+    engine.feed_all(parse_grants(args.log_file, args.channel, on_scs))
+    engine.close()
+    if engine.grants == 0:
+        print(f"No PDSCH/PUSCH grants in {args.log_file}", file=sys.stderr)
+        return 1
+    if scs_seen:
+        scs = scs_seen[0]
+
+    nprb = args.bwp_prb or engine.max_prb
+    cap_slot = nprb * SYMBOLS_PER_SLOT
+    slots_per_window = args.window_ms * 1000.0 / engine.slot_us
+    base_us = agg.base_us or 0
+    tcol = "rel_time_s" if args.relative_time else "timestamp"
+
+    if args.slots:
+        if not args.no_header:
+            print(f"{tcol},channel,grants,ues,used_re,overlap_re,idle_re,utilization")
+        rows = sorted(
+            (t.ts_us[i], ch, i) for ch, t in (agg.tables or {}).items() for i in range(len(t))
+        )
+        for ts, ch, i in rows:
+            t = agg.tables[ch]
+            used = t.used_re[i]
+            print(
+                f"{_format_time(ts, base_us, args.relative_time)},{ch},{t.grants[i]},{t.ues[i]},"
+                f"{used},{t.overlap_re[i]},{cap_slot - used},{used / cap_slot:.4f}"
+            )
+    else:
+        if not args.no_header:
+            ue_col = ",rnti" if args.per_ue else ""
+            print(
+                f"{tcol},channel{ue_col},slots,grants,used_re,overlap_re,collided_slots,"
+                f"capacity_re,idle_re,utilization,limited"
+            )
+        cap_win = round(slots_per_window * cap_slot)
+        for ch in sorted(agg.windows):
+            for wid, w in sorted(agg.windows[ch].items()):
+                t = _format_time(base_us + wid * agg.window_us, base_us, args.relative_time)
+                util = w.used_re / cap_win if cap_win else 0.0
+                limited = "capacity" if util >= args.full_threshold else "policy"
+                ue_f = "," if args.per_ue else ""
+                print(
+                    f"{t},{ch}{ue_f},{w.slots},{w.grants},{w.used_re},{w.overlap_re},{w.collided_slots},"
+                    f"{cap_win},{cap_win - w.used_re},{util:.4f},{limited}"
+                )
+                if args.per_ue:
+                    for rnti, re_ in sorted(w.ue_re.items()):
+                        print(f"{t},{ch},{rnti},,,{re_},,,{cap_win},,{re_ / cap_win if cap_win else 0.0:.4f},")
+
+    stats = []
+    for ch in sorted(agg.windows):
+        ws = agg.windows[ch].values()
+        slots = sum(w.slots for w in ws)
+        used = sum(w.used_re for w in ws)
+        over = sum(w.overlap_re for w in ws)
+        coll = sum(w.collided_slots for w in ws)
+        stats.append(
+            f"{ch}: slots={slots} used_re={used} overlap_re={over} collided_slots={coll} "
+            f"mean_slot_util={used / (slots * cap_slot) if slots and cap_slot else 0.0:.4f}"
+        )
+    print(
+        f"# scs_khz={scs} slot_us={engine.slot_us} bwp_prb={nprb} grants={engine.grants} "
+        f"clipped={engine.clipped} | " + " | ".join(stats),
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,10 +4,12 @@ Extract DL prio_weight change events from scheduler logs.
 
 Features:
   - Parse "DL Priority calc: UEX ... prio_weight=Y" lines
-  - Filter by UE index
+  - Filter by UE index or set (--ues 0-63; changes are tracked per UE)
   - Emit only rows where prio_weight changes from previous value
   - Optional --start-time filtering (full ISO or time-only)
   - Optional --relative-time output (seconds from base time)
+  - Optional --runs: one row per constant run (start,end,duration) via rle_series
+  - --format csv|tsv|bin for the change rows (table_io)
 """
 
 from __future__ import annotations
@@ -17,7 +19,12 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Set
+
+from log_io import open_log
+from rle_series import add_runs_args, change_items, epsilon_same, print_runs, report_run_stats, series_by_ue
+from table_io import Column, TableWriter, add_format_args
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 PRIO_RE = re.compile(
@@ -49,19 +56,19 @@ def _parse_start_time_arg(value: str, date_fallback: datetime | None) -> datetim
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = PRIO_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -80,25 +87,10 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
     return entries
 
 
-def extract_changes(entries: List[Entry], epsilon: float) -> List[Entry]:
-    if not entries:
-        return []
-
-    out: List[Entry] = []
-    prev = entries[0].prio_weight
-    out.append(entries[0])
-
-    for e in entries[1:]:
-        if abs(e.prio_weight - prev) > epsilon:
-            out.append(e)
-            prev = e.prio_weight
-    return out
-
-
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract prio_weight change events from scheduler logs.")
     ap.add_argument("log_file", help="Path to scheduler log file")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -116,25 +108,33 @@ def main() -> int:
         default=1e-12,
         help="Minimum absolute difference to treat as a change (default: 1e-12)",
     )
+    add_runs_args(ap)
     ap.add_argument(
         "--no-header",
         action="store_true",
         help="Print only rows without header",
     )
+    add_format_args(ap)
     args = ap.parse_args()
 
     if args.epsilon < 0:
         print("ERROR: --epsilon must be >= 0", file=sys.stderr)
         return 2
+    if args.runs and args.format != "csv":
+        print("ERROR: --runs writes CSV only", file=sys.stderr)
+        return 2
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
     if not entries:
-        print(f"No priority entries found for UE{args.ue} in {args.log_file}", file=sys.stderr)
+        print(f"No priority entries found for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
         return 1
 
-    changed = extract_changes(entries, args.epsilon)
+    # One run per prio_weight value (within --epsilon); the change rows are the first entry of each run.
+    series = series_by_ue(entries, lambda e: e.prio_weight, epsilon_same(args.epsilon))
+    changed = change_items(series)
     if not changed:
-        print(f"No prio_weight changes found for UE{args.ue}", file=sys.stderr)
+        print(f"No prio_weight changes found for {format_ue_set(ue_set)}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -142,18 +142,26 @@ def main() -> int:
     else:
         base = changed[0].ts
 
-    if not args.no_header:
-        if args.relative_time:
-            print("rel_time_s,prio_weight")
-        else:
-            print("timestamp,prio_weight")
-
-    for e in changed:
-        if args.relative_time:
-            rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.prio_weight:.6f}")
-        else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.prio_weight:.6f}")
+    multi_ue = is_multi_ue(ue_set)
+    if args.run_stats:
+        report_run_stats(series, "prio_weight")
+    if args.runs:
+        print_runs(
+            series, "prio_weight", lambda v: f"{v:.6f}", base if args.relative_time else None, multi_ue, args.no_header
+        )
+        return 0
+
+    columns = [Column("rel_time_s", "%.6f") if args.relative_time else Column("timestamp", "iso")]
+    if multi_ue:
+        columns.append(Column("ue", "%d"))
+    columns.append(Column("prio_weight", "%.6f"))
+    with TableWriter(columns, args.format, header=not args.no_header) as out:
+        for e in changed:
+            t = (e.ts - base).total_seconds() if args.relative_time else e.ts
+            if multi_ue:
+                out.row(t, e.ue, e.prio_weight)
+            else:
+                out.row(t, e.prio_weight)
 
     return 0
 
@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 """
 UE별 Priority 정보 추출 스크립트
-로그 파일에서 각 UE의 min_combined_prio, prio_weight 등의 정보를 추출하고 1초 윈도우별로 집계합니다.
+로그 파일에서 각 UE의 min_combined_prio, prio_weight 등의 정보를 추출하고 윈도우별(기본 1초)로 집계합니다.
 """
 
 import re
 import sys
 from collections import defaultdict
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime
+
+from window_stats import PRIORITY_FIELDS, window_records
+
+# 로그 라인 패턴: timestamp + UE{번호} min_combined_prio={값}, prio_weight={값}, ...
+# 예: 2025-12-27T07:13:44.846214 [SCHED   ] [I] [   998.3] DL Priority calc: UE2 min_combined_prio=80, ...
+PRIORITY_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?'
+    r'UE(\d+)\s+min_combined_prio=(\d+),\s+prio_weight=([\d.]+),\s+'
+    r'pf_weight=([\d.]+),\s+gbr_weight=([\d.]+),\s+delay_weight=([\d.]+)'
+)
 
 def parse_priority_log(log_file: str) -> Dict[int, List[Dict]]:
     """
@@ -22,13 +32,7 @@ def parse_priority_log(log_file: str) -> Dict[int, List[Dict]]:
     """
     ue_data = defaultdict(list)
     
-    # 로그 라인 패턴: timestamp + UE{번호} min_combined_prio={값}, prio_weight={값}, ...
-    # 예: 2025-12-27T07:13:44.846214 [SCHED   ] [I] [   998.3] DL Priority calc: UE2 min_combined_prio=80, ...
-    pattern = re.compile(
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?'
-        r'UE(\d+)\s+min_combined_prio=(\d+),\s+prio_weight=([\d.]+),\s+'
-        r'pf_weight=([\d.]+),\s+gbr_weight=([\d.]+),\s+delay_weight=([\d.]+)'
-    )
+    pattern = PRIORITY_RE
     
     try:
         with open(log_file, 'r', encoding='utf-8') as f:
@@ -73,83 +77,36 @@ def parse_priority_log(log_file: str) -> Dict[int, List[Dict]]:
     return ue_data
 
 def calculate_priority_per_second(ue_data: Dict[int, List[Dict]], 
-                                  time_window_sec: float = 1.0) -> Dict[int, List[Dict]]:
+                                  time_window_sec: float = 1.0,
+                                  percentiles: Sequence[float] = ()) -> Dict[int, List[Dict]]:
     """
-    1초 윈도우별로 priority 정보를 집계합니다.
+    윈도우별로 priority 정보를 집계합니다 (기본 1초).
+    
+    엔트리마다 정수 윈도우 번호를 계산해 한 번만 순회하며 누적하므로
+    (window_stats.window_records) 윈도우 크기와 관계없이 O(n)입니다.
     
     Args:
         ue_data: parse_priority_log()의 결과
         time_window_sec: 집계 시간 윈도우 (초, 기본값 1.0)
+        percentiles: 함께 계산할 백분위수 (예: (50, 99) -> 'prio_weight_p99' 등)
         
     Returns:
         {ue_index: [{'timestamp': ..., 'min_combined_prio': ..., 'prio_weight': ..., ...}]} 딕셔너리
-        각 윈도우의 평균값을 포함
+        각 윈도우의 평균값, 필드별 _min/_max, count를 포함
     """
     ue_priority_per_sec = defaultdict(list)
     
     for ue_idx, entries in ue_data.items():
-        # 타임스탬프가 있는 엔트리만 필터링
-        valid_entries = [e for e in entries if e['timestamp'] is not None]
-        if not valid_entries:
-            continue
-        
-        # 타임스탬프 기준으로 정렬
-        valid_entries = sorted(valid_entries, key=lambda x: x['timestamp'])
-        
-        # 1초 윈도우별로 집계
-        processed_windows = set()
-        
-        for entry in valid_entries:
-            window_start = entry['timestamp']
-            window_start_sec = window_start.replace(microsecond=0)
-            window_key = window_start_sec
-            
-            if window_key in processed_windows:
-                continue
-            
-            window_end = window_start_sec + timedelta(seconds=time_window_sec)
-            processed_windows.add(window_key)
-            
-            # 윈도우 내의 모든 엔트리를 찾기
-            window_entries = [e for e in valid_entries
-                            if window_start_sec <= e['timestamp'] < window_end]
-            
-            if window_entries:
-                # 평균값 계산
-                avg_min_combined_prio = sum(e['min_combined_prio'] for e in window_entries) / len(window_entries)
-                avg_prio_weight = sum(e['prio_weight'] for e in window_entries) / len(window_entries)
-                avg_pf_weight = sum(e['pf_weight'] for e in window_entries) / len(window_entries)
-                avg_gbr_weight = sum(e['gbr_weight'] for e in window_entries) / len(window_entries)
-                avg_delay_weight = sum(e['delay_weight'] for e in window_entries) / len(window_entries)
-                
-                # 최소/최대값도 계산
-                min_combined_prios = [e['min_combined_prio'] for e in window_entries]
-                prio_weights = [e['prio_weight'] for e in window_entries]
-                
-                priority_entry = {
-                    'timestamp': window_start_sec,
-                    'min_combined_prio': avg_min_combined_prio,
-                    'prio_weight': avg_prio_weight,
-                    'pf_weight': avg_pf_weight,
-                    'gbr_weight': avg_gbr_weight,
-                    'delay_weight': avg_delay_weight,
-                    'min_combined_prio_min': min(min_combined_prios),
-                    'min_combined_prio_max': max(min_combined_prios),
-                    'prio_weight_min': min(prio_weights),
-                    'prio_weight_max': max(prio_weights),
-                    'count': len(window_entries)  # 윈도우 내 레코드 수
-                }
-                ue_priority_per_sec[ue_idx].append(priority_entry)
-        
-        # 타임스탬프 기준으로 정렬
-        ue_priority_per_sec[ue_idx].sort(key=lambda x: x['timestamp'])
+        windows = window_records(entries, PRIORITY_FIELDS, time_window_sec, percentiles)
+        if windows:
+            ue_priority_per_sec[ue_idx] = windows
     
     return ue_priority_per_sec
 
-def print_summary(priority_per_sec: Dict[int, List[Dict]]):
-    """UE별 요약 정보를 출력합니다 (1초 윈도우별 집계 결과 기반)."""
+def print_summary(priority_per_sec: Dict[int, List[Dict]], window_sec: float = 1.0):
+    """UE별 요약 정보를 출력합니다 (윈도우별 집계 결과 기반)."""
     print("=" * 100)
-    print("UE별 Priority 정보 요약 (1초 윈도우별 집계)")
+    print(f"UE별 Priority 정보 요약 ({window_sec:g}초 윈도우별 집계)")
     print("=" * 100)
     
     for ue_idx in sorted(priority_per_sec.keys()):
@@ -157,7 +114,7 @@ def print_summary(priority_per_sec: Dict[int, List[Dict]]):
         if not entries:
             continue
             
-        print(f"\n[UE{ue_idx}] 총 {len(entries)}개의 1초 윈도우")
+        print(f"\n[UE{ue_idx}] 총 {len(entries)}개의 {window_sec:g}초 윈도우")
         print("-" * 100)
         
         # 통계 계산
@@ -204,13 +161,15 @@ def get_global_first_timestamp(priority_per_sec: Dict[int, List[Dict]]) -> Optio
 
 def print_detailed(priority_per_sec: Dict[int, List[Dict]], 
                    ue_idx: Optional[int] = None, 
-                   use_global_time: bool = True):
-    """특정 UE의 상세 정보를 시간 순서대로 전체 출력합니다 (1초 윈도우별 집계 결과).
+                   use_global_time: bool = True,
+                   window_sec: float = 1.0):
+    """특정 UE의 상세 정보를 시간 순서대로 전체 출력합니다 (윈도우별 집계 결과).
     
     Args:
         priority_per_sec: calculate_priority_per_second()의 결과
         ue_idx: 특정 UE만 출력 (None이면 모두)
         use_global_time: True면 모든 UE의 가장 이른 시간을 기준으로 사용 (기본값: True)
+        window_sec: 집계 윈도우 크기 (초, 표시용)
     """
     if ue_idx is not None:
         ues_to_print = [ue_idx] if ue_idx in priority_per_sec else []
@@ -250,21 +209,21 @@ def print_detailed(priority_per_sec: Dict[int, List[Dict]],
             continue
         
         print(f"\n{'=' * 100}")
-        print(f"UE{ue} 상세 정보 (전체 {len(entries)}개, 시간 순서대로 정렬, 1초 윈도우별 집계)")
+        print(f"UE{ue} 상세 정보 (전체 {len(entries)}개, 시간 순서대로 정렬, {window_sec:g}초 윈도우별 집계)")
         print(f"{time_label}: {first_timestamp.isoformat()}")
         print(f"{'=' * 100}")
         print(f"{'시간(hh:mm:ss)':<15} {'min_combined_prio':<18} {'prio_weight':<12} {'pf_weight':<12} {'gbr_weight':<12} {'delay_weight':<12} {'count':<8}")
         print("-" * 100)
-        print("  참고: 모든 값은 1초 윈도우 내의 평균값입니다.")
+        print(f"  참고: 모든 값은 {window_sec:g}초 윈도우 내의 평균값입니다.")
         print("-" * 100)
         
         for entry in entries:
             if entry['timestamp'] is not None:
-                # hh:mm:ss 형식으로 표시
-                hours = entry['timestamp'].hour
-                minutes = entry['timestamp'].minute
-                seconds = entry['timestamp'].second
-                abs_time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+                # hh:mm:ss 형식으로 표시 (1초 미만 윈도우는 ms까지)
+                if window_sec < 1.0:
+                    abs_time_str = entry['timestamp'].strftime('%H:%M:%S.%f')[:-3]
+                else:
+                    abs_time_str = entry['timestamp'].strftime('%H:%M:%S')
             else:
                 abs_time_str = "N/A"
             
@@ -273,14 +232,17 @@ def print_detailed(priority_per_sec: Dict[int, List[Dict]],
                   f"{entry['gbr_weight']:<12.3f} {entry['delay_weight']:<12.3f} "
                   f"{entry['count']:<8}")
 
-def export_to_csv(priority_per_sec: Dict[int, List[Dict]], output_file: str):
-    """UE별 데이터를 시간 순서대로 CSV 파일로 저장합니다 (1초 윈도우별 집계 결과)."""
+def export_to_csv(priority_per_sec: Dict[int, List[Dict]], output_file: str,
+                  percentiles: Sequence[float] = (), window_sec: float = 1.0):
+    """UE별 데이터를 시간 순서대로 CSV 파일로 저장합니다 (윈도우별 집계 결과)."""
     import csv
     
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
+        time_digits = 1 if window_sec >= 1.0 else 3
+        pct_cols = [f"{field}_p{q:g}" for field in PRIORITY_FIELDS for q in percentiles]
         writer.writerow(['UE', '시간(초)', 'min_combined_prio', 'prio_weight', 
-                        'pf_weight', 'gbr_weight', 'delay_weight', 'count'])
+                        'pf_weight', 'gbr_weight', 'delay_weight', 'count'] + pct_cols)
         
         for ue_idx in sorted(priority_per_sec.keys()):
             entries = priority_per_sec[ue_idx]
@@ -302,14 +264,14 @@ def export_to_csv(priority_per_sec: Dict[int, List[Dict]], output_file: str):
                     elapsed_seconds = None
                 writer.writerow([
                     ue_idx,
-                    f"{elapsed_seconds:.1f}" if elapsed_seconds is not None else "",
+                    f"{elapsed_seconds:.{time_digits}f}" if elapsed_seconds is not None else "",
                     f"{entry['min_combined_prio']:.2f}",
                     f"{entry['prio_weight']:.3f}",
                     f"{entry['pf_weight']:.6f}",
                     f"{entry['gbr_weight']:.3f}",
                     f"{entry['delay_weight']:.3f}",
                     entry['count']
-                ])
+                ] + [f"{entry[col]:g}" for col in pct_cols])
     
     print(f"\n데이터가 '{output_file}'에 저장되었습니다.")
 
@@ -326,6 +288,8 @@ def main():
         print("  -u <ue_idx>    특정 UE만 출력 (예: -u 0)")
         print("  -c <csv_file>  CSV 파일로 저장")
         print("  -g, --global   모든 UE를 공통 기준 시간으로 정렬")
+        print("  -w <sec>       집계 윈도우 크기 (초, 기본값 1.0, 예: -w 0.1)")
+        print("  -p <list>      CSV에 백분위수 열 추가 (예: -p 50,99)")
         print("  -h, --help     도움말 출력")
         sys.exit(0)
     
@@ -340,6 +304,8 @@ def main():
     ue_idx = None
     csv_file = None
     use_global_time = False
+    window_sec = 1.0
+    percentiles = []
     
     # 옵션 파싱
     i = opt_start
@@ -353,6 +319,15 @@ def main():
         elif sys.argv[i] in ['-g', '--global']:
             use_global_time = True
             i += 1
+        elif sys.argv[i] == '-w' and i + 1 < len(sys.argv):
+            window_sec = float(sys.argv[i + 1])
+            if window_sec <= 0:
+                print(f"Error: 윈도우 크기는 0보다 커야 합니다: {sys.argv[i + 1]}")
+                sys.exit(2)
+            i += 2
+        elif sys.argv[i] == '-p' and i + 1 < len(sys.argv):
+            percentiles = [float(q) for q in sys.argv[i + 1].split(',') if q.strip()]
+            i += 2
         else:
             print(f"Warning: 알 수 없는 옵션 '{sys.argv[i]}' (무시됨)")
             i += 1
@@ -365,20 +340,20 @@ def main():
         print("추출된 데이터가 없습니다.")
         sys.exit(1)
     
-    # 1초 윈도우별로 집계
-    print("1초 윈도우별로 집계 중...")
-    priority_per_sec = calculate_priority_per_second(ue_data)
+    # 윈도우별로 집계
+    print(f"{window_sec:g}초 윈도우별로 집계 중...")
+    priority_per_sec = calculate_priority_per_second(ue_data, window_sec, percentiles)
     print()
     
     # 요약 출력
-    print_summary(priority_per_sec)
+    print_summary(priority_per_sec, window_sec)
     
     # 전체 상세 정보 출력
-    print_detailed(priority_per_sec, ue_idx, use_global_time)
+    print_detailed(priority_per_sec, ue_idx, use_global_time, window_sec)
     
     # CSV 저장
     if csv_file:
-        export_to_csv(priority_per_sec, csv_file)
+        export_to_csv(priority_per_sec, csv_file, percentiles, window_sec)
 
 if __name__ == '__main__':
     main()
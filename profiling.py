@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Shared --profile instrumentation for the extractors and compute_qrt.py.
+
+Entry points run their body inside profile_session(); the body marks its
+phases with stage("read") / stage("bin") / stage("match-qrt") /
+stage("write") and reports volumes with count() or a ParseStats. Outside a
+session stage() and count() do nothing, so library callers (batch_qrt.py,
+dscp_trace.py, ...) pay no cost.
+
+  --profile            per-stage wall time, lines/s, matched-line ratio and
+                       peak RSS as "# profile ..." lines on stderr
+  --profile-json PATH  the same as JSON
+  --profile-dump PATH  cProfile stats (python3 -m pstats PATH), or a
+                       pyinstrument HTML report when PATH ends in .html
+
+Timestamp parsing runs per line inside "read"; it is not a stage of its own
+(a timer per line would cost more than the parsing), use --profile-dump to
+see it.
+
+  python3 upf.py upfd.log --changes --profile > /dev/null
+  python3 compute_qrt.py --signal pcf --profile-json /tmp/qrt_prof.json
+  python3 pcf.py pcf.log --bin-ms 500 --profile-dump /tmp/pcf.prof
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import ContextManager, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass
+class ParseStats:
+    """Line counters of one log pass (also the input of the no-match help)."""
+
+    lines_read: int = 0
+    marker_hits: int = 0
+    parsed: int = 0
+    after_start_filter: int = 0
+    fallback: int = 0  # lines the primary pattern could not decode
+
+    @property
+    def matched_ratio(self) -> float:
+        return self.parsed / self.lines_read if self.lines_read else 0.0
+
+
+class Profiler:
+    """Stage wall times (ns) and counters of one run."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter_ns()
+        self.stages: Dict[str, List[int]] = {}  # name -> [ns, calls], first-use order
+        self.counters: Dict[str, int] = {}
+        self.parse_stats: List[ParseStats] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            st = self.stages.setdefault(name, [0, 0])
+            st[0] += time.perf_counter_ns() - t
+            st[1] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> dict:
+        total_ns = time.perf_counter_ns() - self.t0
+        counters = dict(self.counters)
+        for ps in self.parse_stats:
+            counters["lines"] = counters.get("lines", 0) + ps.lines_read
+            counters["marker_hits"] = counters.get("marker_hits", 0) + ps.marker_hits
+            counters["parsed"] = counters.get("parsed", 0) + ps.parsed
+            counters["after_start_filter"] = counters.get("after_start_filter", 0) + ps.after_start_filter
+            if ps.fallback:
+                counters["fallback"] = counters.get("fallback", 0) + ps.fallback
+        out: dict = {
+            "total_s": total_ns / 1e9,
+            "stages": {
+                name: {"s": ns / 1e9, "calls": calls, "share": ns / total_ns if total_ns else 0.0}
+                for name, (ns, calls) in self.stages.items()
+            },
+            "counters": counters,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        lines = counters.get("lines")
+        if lines:
+            read_ns = self.stages["read"][0] if "read" in self.stages else total_ns
+            out["lines_per_s"] = lines * 1e9 / read_ns if read_ns else 0.0
+            if "parsed" in counters:
+                out["matched_ratio"] = counters["parsed"] / lines
+        return out
+
+
+_active: Optional[Profiler] = None
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as `name` in the current session (no-op without one)."""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+def count(name: str, n: int = 1) -> None:
+    if _active is not None:
+        _active.count(name, n)
+
+
+def attach(stats: ParseStats) -> ParseStats:
+    """Report `stats` (read at the end of the session) with the profile."""
+    if _active is not None:
+        _active.parse_stats.append(stats)
+    return stats
+
+
+def counted(lines: Iterable[str]) -> Iterable[str]:
+    """Pass-through that adds every line to the "lines" counter while profiling."""
+    if _active is None:
+        return lines
+    return _count_lines(lines, _active)
+
+
+def _count_lines(lines: Iterable[str], prof: Profiler) -> Iterator[str]:
+    n = 0
+    try:
+        for line in lines:
+            n += 1
+            yield line
+    finally:
+        prof.count("lines", n)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # not on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _pyinstrument():
+    try:
+        import pyinstrument
+    except Exception as e:
+        raise RuntimeError(
+            f".html --profile-dump needs the 'pyinstrument' package (pip install pyinstrument): {e}"
+        ) from e
+    return pyinstrument
+
+
+def format_report(rep: dict) -> List[str]:
+    lines = [f"# profile total_s={rep['total_s']:.3f} peak_rss_mb="
+             + ("n/a" if rep["peak_rss_mb"] is None else f"{rep['peak_rss_mb']:.1f}")]
+    for name, st in rep["stages"].items():
+        lines.append(f"# profile stage={name} s={st['s']:.3f} ({st['share']:.1%}) calls={st['calls']}")
+    if rep["counters"]:
+        lines.append("# profile " + " ".join(f"{k}={v}" for k, v in rep["counters"].items()))
+    if "lines_per_s" in rep:
+        extra = f" matched_ratio={rep['matched_ratio']:.4f}" if "matched_ratio" in rep else ""
+        lines.append(f"# profile lines_per_s={rep['lines_per_s']:.0f}{extra}")
+    return lines
+
+
+@contextmanager
+def profile_session(
+    enabled: bool = False,
+    json_path: Optional[str] = None,
+    dump_path: Optional[str] = None,
+) -> Iterator[Optional[Profiler]]:
+    """Collect stages/counters for the block; report on exit, also after an error return."""
+    global _active
+    if not (enabled or json_path or dump_path):
+        yield None
+        return
+    prof = Profiler()
+    sampler = None
+    if dump_path and dump_path.endswith(".html"):
+        sampler = _pyinstrument().Profiler()
+        sampler.start()
+    elif dump_path:
+        import cProfile
+
+        sampler = cProfile.Profile()
+        sampler.enable()
+    prev, _active = _active, prof
+    try:
+        yield prof
+    finally:
+        _active = prev
+        if sampler is not None:
+            if dump_path.endswith(".html"):
+                sampler.stop()
+                with open(dump_path, "w", encoding="utf-8") as f:
+                    f.write(sampler.output_html())
+            else:
+                sampler.disable()
+                sampler.dump_stats(dump_path)
+        rep = prof.report()
+        if enabled:
+            for line in format_report(rep):
+                print(line, file=sys.stderr)
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(rep, f, indent=2)
+                f.write("\n")
+
+
+def _dump_path(path: str) -> str:
+    if path.endswith(".html"):
+        try:
+            _pyinstrument()
+        except RuntimeError as e:
+            raise argparse.ArgumentTypeError(str(e)) from e
+    return path
+
+
+def add_profile_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--profile", action="store_true", help="Per-stage timing, lines/s and peak memory on stderr")
+    ap.add_argument("--profile-json", metavar="PATH", default=None, help="Write the --profile report as JSON")
+    ap.add_argument(
+        "--profile-dump",
+        metavar="PATH",
+        default=None,
+        type=_dump_path,
+        help="cProfile stats to PATH (pyinstrument HTML if PATH ends in .html)",
+    )
+
+
+def session_from_args(args: argparse.Namespace) -> ContextManager[Optional[Profiler]]:
+    """profile_session() from the add_profile_args() options."""
+    return profile_session(args.profile, args.profile_json, args.profile_dump)
+
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Multi-resolution time-series pyramid: 1/10/50/100/500/1000 ms levels in one pass.
+
+Samples go into the finest level only (1 ms cells relative to a base time);
+each coarser level is built by merging the cells of the previous level, never
+by rescanning the samples. A cell keeps count, per-field sums, the last value
+(by time) and, for categorical signals, value counts for the mode.
+
+The extractors write every level to one file while they parse (--pyramid) and
+later serve any --bin-ms from that file without reading the log again
+(--from-pyramid). A bin size that is not stored is derived from the largest
+stored level that divides it.
+
+  python3 real_thro.py gnb.log --ues 0-3 --pyramid thro.pyr.json.gz > /dev/null
+  python3 real_thro.py --from-pyramid thro.pyr.json.gz --bin-ms 50 --relative-time
+  python3 upf.py upfd.log --pyramid upf.pyr.json --bin-ms 500
+  python3 pyramid.py info thro.pyr.json.gz
+  python3 pyramid.py show upf.pyr.json --bin-ms 100 | head
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from log_io import open_log
+
+LEVELS_MS = (1, 10, 50, 100, 500, 1000)
+FORMAT = "pyramid/1"
+
+
+class Cell:
+    """Aggregate of the samples in one bin."""
+
+    __slots__ = ("count", "sums", "last", "last_us", "counts")
+
+    def __init__(self, nfields: int) -> None:
+        self.count = 0
+        self.sums = [0.0] * nfields
+        self.last: object = None
+        self.last_us = -(1 << 62)
+        self.counts: Optional[Dict[object, int]] = None
+
+    def add(self, t_us: int, sums: Sequence[float], last: object, key: object, count: int = 1) -> None:
+        self.count += count
+        for i, v in enumerate(sums):
+            self.sums[i] += v
+        if last is not None and t_us >= self.last_us:
+            self.last_us = t_us
+            self.last = last
+        if key is not None:
+            if self.counts is None:
+                self.counts = {}
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other: "Cell") -> None:
+        self.count += other.count
+        for i, v in enumerate(other.sums):
+            self.sums[i] += v
+        if other.last is not None and other.last_us >= self.last_us:
+            self.last_us = other.last_us
+            self.last = other.last
+        if other.counts is not None:
+            if self.counts is None:
+                self.counts = {}
+            for k, n in other.counts.items():
+                self.counts[k] = self.counts.get(k, 0) + n
+
+    @property
+    def mode(self) -> object:
+        """Most common key (ties: first seen, like Counter.most_common)."""
+        if not self.counts:
+            return None
+        best, best_n = None, -1
+        for k, n in self.counts.items():
+            if n > best_n:
+                best, best_n = k, n
+        return best
+
+
+class Pyramid:
+    """Cells at several bin sizes over one base time; levels_ms[0] is the finest."""
+
+    def __init__(self, base_us: int, nfields: int = 0, levels_ms: Sequence[int] = LEVELS_MS) -> None:
+        levels = sorted(set(int(ms) for ms in levels_ms))
+        if not levels or levels[0] <= 0:
+            raise ValueError(f"bad levels: {levels_ms}")
+        for ms in levels[1:]:
+            if ms % levels[0]:
+                raise ValueError(f"level {ms} ms is not a multiple of the finest level {levels[0]} ms")
+        self.base_us = base_us
+        self.nfields = nfields
+        self.levels_ms = levels
+        self.cells: Dict[int, Dict[int, Cell]] = {ms: {} for ms in levels}
+        self._raw: Dict[int, dict] = {}  # stored levels not decoded yet (from_dict)
+        self._dirty = False
+
+    def _level_cells(self, ms: int) -> Dict[int, Cell]:
+        raw = self._raw.pop(ms, None)
+        if raw is not None:
+            self.cells[ms] = _decode_level(raw, self.nfields)
+        return self.cells[ms]
+
+    @property
+    def finest(self) -> Dict[int, Cell]:
+        return self._level_cells(self.levels_ms[0])
+
+    @property
+    def samples(self) -> int:
+        """Samples folded in (read from the coarsest level, the cheapest one)."""
+        return sum(c.count for _, c in self.level(self.levels_ms[-1]))
+
+    def _finest_cell(self, idx: int) -> Cell:
+        c = self.finest.get(idx)
+        if c is None:
+            c = self.finest[idx] = Cell(self.nfields)
+        return c
+
+    def add(self, t_us: int, sums: Sequence[float] = (), last: object = None, key: object = None) -> None:
+        """One sample at t_us (before the base -> first bin)."""
+        idx = max(0, t_us - self.base_us) // (self.levels_ms[0] * 1000)
+        self._finest_cell(idx).add(t_us, sums, last, key)
+        self._dirty = True
+
+    def add_cell(self, idx: int, cell: Cell) -> None:
+        """Merge a pre-aggregated finest-level cell (e.g. an extractor's own 1 ms slot)."""
+        self._finest_cell(max(0, idx)).merge(cell)
+        self._dirty = True
+
+    def add_spread(self, t0_us: int, t1_us: int, amounts: Sequence[float]) -> None:
+        """
+        Spread amounts over [t0, t1) by overlap (the part before the base is
+        dropped). The sample itself is counted in the bin holding t1.
+        """
+        step = self.levels_ms[0] * 1000
+        self._finest_cell(max(0, t1_us - self.base_us) // step).count += 1
+        self._dirty = True
+        dur = t1_us - t0_us
+        lo = max(t0_us, self.base_us)
+        if dur <= 0 or t1_us <= lo:
+            return
+        idx = (lo - self.base_us) // step
+        while True:
+            b0 = self.base_us + idx * step
+            o0, o1 = max(lo, b0), min(t1_us, b0 + step)
+            if o1 > o0:
+                frac = (o1 - o0) / dur
+                c = self._finest_cell(idx)
+                for i, v in enumerate(amounts):
+                    c.sums[i] += v * frac
+            if b0 + step > t1_us:
+                break
+            idx += 1
+
+    def build(self) -> None:
+        """Derive every coarser level from the next finer one."""
+        prev_ms = self.levels_ms[0]
+        for ms in self.levels_ms[1:]:
+            self.cells[ms] = _downsample(self._level_cells(prev_ms), ms // prev_ms, self.nfields)
+            prev_ms = ms
+        self._dirty = False
+
+    def level(self, bin_ms: int) -> List[Tuple[int, Cell]]:
+        """(bin index, cell) for non-empty bins of bin_ms, in time order."""
+        if self._dirty:
+            self.build()
+        if bin_ms in self.cells:
+            cells = self._level_cells(bin_ms)
+        else:
+            src = max((ms for ms in self.levels_ms if bin_ms % ms == 0), default=None)
+            if src is None:
+                raise ValueError(
+                    f"--bin-ms {bin_ms} is not a multiple of a stored level ({','.join(map(str, self.levels_ms))})"
+                )
+            cells = _downsample(self._level_cells(src), bin_ms // src, self.nfields)
+        return sorted(cells.items())
+
+    def to_dict(self) -> dict:
+        if self._dirty:
+            self.build()
+        levels = {}
+        for ms in self.levels_ms:
+            items = sorted(self._level_cells(ms).items())
+            levels[str(ms)] = {
+                "idx": [i for i, _ in items],
+                "count": [c.count for _, c in items],
+                "sums": [c.sums for _, c in items] if self.nfields else None,
+                "last_us": [c.last_us if c.last is not None else None for _, c in items],
+                "last": [c.last for _, c in items],
+                "counts": [list(c.counts.items()) if c.counts else None for _, c in items],
+            }
+        return {"base_us": self.base_us, "nfields": self.nfields, "levels_ms": self.levels_ms, "levels": levels}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Pyramid":
+        """Levels are decoded on first use, so serving one bin size reads one level."""
+        p = cls(int(d["base_us"]), int(d["nfields"]), d["levels_ms"])
+        p._raw = {int(ms): lv for ms, lv in d["levels"].items()}
+        return p
+
+
+def _decode_level(lv: dict, nfields: int) -> Dict[int, Cell]:
+    cells: Dict[int, Cell] = {}
+    sums = lv.get("sums")
+    for j, idx in enumerate(lv["idx"]):
+        c = Cell(0)
+        c.count = lv["count"][j]
+        c.sums = list(sums[j]) if sums is not None else [0.0] * nfields
+        last = lv["last"][j]
+        if last is not None:
+            c.last = tuple(last) if isinstance(last, list) else last
+            c.last_us = lv["last_us"][j]
+        if lv["counts"][j]:
+            c.counts = {(tuple(k) if isinstance(k, list) else k): n for k, n in lv["counts"][j]}
+        cells[idx] = c
+    return cells
+
+
+def _downsample(cells: Dict[int, Cell], factor: int, nfields: int) -> Dict[int, Cell]:
+    out: Dict[int, Cell] = {}
+    for idx in sorted(cells):
+        j = idx // factor
+        c = out.get(j)
+        if c is None:
+            c = out[j] = Cell(nfields)
+        c.merge(cells[idx])
+    return out
+
+
+def save_pyramids(path: str, tool: str, series: Dict[str, Pyramid], meta: Optional[dict] = None) -> None:
+    """All series of one extractor run in one JSON file (.gz -> gzip)."""
+    doc = {
+        "format": FORMAT,
+        "tool": tool,
+        "meta": meta or {},
+        "series": {name: p.to_dict() for name, p in series.items()},
+    }
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(doc, f, separators=(",", ":"))
+
+
+def load_pyramids(path: str, tool: Optional[str] = None) -> Tuple[dict, Dict[str, Pyramid]]:
+    """(meta, {series name: Pyramid}); tool checks which extractor wrote the file."""
+    with open_log(path) as f:
+        doc = json.load(f)
+    if doc.get("format") != FORMAT:
+        raise ValueError(f"{path}: not a {FORMAT} file")
+    if tool is not None and doc.get("tool") != tool:
+        raise ValueError(f"{path}: written by {doc.get('tool')}, not {tool}")
+    return doc.get("meta", {}), {name: Pyramid.from_dict(d) for name, d in doc["series"].items()}
+
+
+def merged_level(series: Iterable[Pyramid], bin_ms: int) -> List[Tuple[int, Cell]]:
+    """One level of several series (e.g. directions) merged cell-wise; ties on last go to later series."""
+    out: Dict[int, Cell] = {}
+    for p in series:
+        for idx, c in p.level(bin_ms):
+            m = out.get(idx)
+            if m is None:
+                m = out[idx] = Cell(p.nfields)
+            m.merge(c)
+    return sorted(out.items())
+
+
+def add_pyramid_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--pyramid",
+        metavar="PATH",
+        default=None,
+        help=f"Also write all bin levels ({','.join(map(str, LEVELS_MS))} ms) to PATH (.json / .json.gz)",
+    )
+    ap.add_argument(
+        "--from-pyramid",
+        metavar="PATH",
+        default=None,
+        help="Serve --bin-ms from a file written with --pyramid instead of parsing the log",
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Inspect pyramid files written by the extractors (--pyramid).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info", help="series, levels and cell counts")
+    p_info.add_argument("path")
+    p_show = sub.add_parser("show", help="dump one level as CSV")
+    p_show.add_argument("path")
+    p_show.add_argument("--bin-ms", type=int, required=True)
+    p_show.add_argument("--series", default=None, help="series name (default: all, merged)")
+    p_show.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    try:
+        meta, series = load_pyramids(args.path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    if args.cmd == "info":
+        print(f"# meta={json.dumps(meta, sort_keys=True)}")
+        print("series,level_ms,cells,samples")
+        for name, p in series.items():
+            for ms in p.levels_ms:
+                cells = p.level(ms)
+                print(f"{name},{ms},{len(cells)},{sum(c.count for _, c in cells)}")
+        return 0
+
+    if args.series is not None:
+        if args.series not in series:
+            print(f"ERROR: no series {args.series!r} (have: {','.join(series)})", file=sys.stderr)
+            return 2
+        series = {args.series: series[args.series]}
+    if not series:
+        print("ERROR: empty pyramid", file=sys.stderr)
+        return 1
+    try:
+        cells = merged_level(series.values(), args.bin_ms)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    nfields = next(iter(series.values())).nfields
+    if not args.no_header:
+        sums = [f"sum{i}" for i in range(nfields)]
+        print(",".join(["rel_time_s", "count", *sums, "last", "mode"]))
+    step_s = args.bin_ms / 1000.0
+    for idx, c in cells:
+        vals = [f"{idx * step_s:.6f}", str(c.count), *(f"{v:.6g}" for v in c.sums)]
+        last = c.last[0] if isinstance(c.last, tuple) else c.last
+        vals += ["" if last is None else str(last), "" if c.mode is None else str(c.mode)]
+        print(",".join(vals))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,90 @@
 #!/usr/bin/env python3
 """
 UE별 QoS 정보 (5QI, PDB, GBR) 추출 스크립트
+
+사용법:
+  python3 qos_info.py gnb.log                          # STEP6-SCHED 라인 표
+  python3 qos_info.py gnb.log --timeline > qos.csv     # UE/LCID별 변경 구간 (CSV)
+  python3 qos_info.py gnb.log --at 12:11:58.500000     # 해당 시각의 유효 설정
+
+다른 스크립트에서 (지연 vs PDB, 처리량 vs GBR):
+  timeline = build_qos_timeline("gnb.log")
+  cfg = timeline.config_at(ue_idx, lcid, dt_to_us(ts))   # O(log n)
 """
 import re
 import sys
 from collections import defaultdict
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from log_io import open_log
+from rle_series import RleSeries, dt_to_us, us_to_dt
+
+# [STEP6-SCHED] QoS Info - UE0 LCID4 5QI=5QI=0x9 PDB=300ms GBR=None Type=non-GBR
+# [STEP6-SCHED] QoS Info - UE0 LCID4 5QI=5QI=0x9 PDB=300ms GBR_DL=128000bps GBR_UL=128000bps Type=GBR
+# [SCHED-QoS] UE1 LCID4 PDB=300ms GBR=None Type=non-GBR
+# [SCHED-QoS] UE1 LCID4 PDB=300ms GBR_DL=128000bps Type=GBR (used in scheduling)
+# 네 가지 형태를 한 번의 search로 처리 (STEP6-SCHED는 5qi 그룹이 있음)
+QOS_RE = re.compile(
+    r'^(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?'
+    r'(?:\[STEP6-SCHED\] QoS Info - UE(?P<ue1>\d+) LCID(?P<lcid1>\d+) 5QI=5QI=0x(?P<five_qi>[0-9a-fA-F]+)'
+    r'|\[SCHED-QoS\] UE(?P<ue2>\d+) LCID(?P<lcid2>\d+))'
+    r' PDB=(?P<pdb>\d+)ms (?:GBR=None|GBR_DL=(?P<gbr_dl>\d+)bps(?: GBR_UL=(?P<gbr_ul>\d+)bps)?)'
+    r' Type=(?P<res_type>\w+)'
+)
+
+
+class QosConfig(NamedTuple):
+    five_qi: Optional[int]
+    pdb_ms: int
+    gbr_dl_bps: Optional[int]
+    gbr_ul_bps: Optional[int]
+    res_type: str
+
+
+def parse_qos_line(line: str) -> Optional[Tuple[str, int, int, str, QosConfig]]:
+    """
+    QoS 라인 하나를 (timestamp, ue_idx, lcid, type, QosConfig)로 변환, 아니면 None
+
+    SCHED-QoS 라인에는 5QI / GBR_UL이 없으므로 None
+    """
+    if 'QoS' not in line:
+        return None
+    m = QOS_RE.search(line)
+    if not m:
+        return None
+    gbr_dl = m.group('gbr_dl')
+    gbr_ul = m.group('gbr_ul')
+    if m.group('ue1') is not None:
+        # STEP6-SCHED: GBR_DL이 있으면 GBR_UL도 함께 출력됨
+        if gbr_dl is not None and gbr_ul is None:
+            return None
+        ue_idx, lcid, kind = int(m.group('ue1')), int(m.group('lcid1')), 'STEP6-SCHED'
+        five_qi: Optional[int] = int(m.group('five_qi'), 16)
+    else:
+        # SCHED-QoS: GBR_DL만 출력됨
+        if gbr_ul is not None:
+            return None
+        ue_idx, lcid, kind = int(m.group('ue2')), int(m.group('lcid2')), 'SCHED-QoS'
+        five_qi = None
+    cfg = QosConfig(
+        five_qi,
+        int(m.group('pdb')),
+        int(gbr_dl) if gbr_dl is not None else None,
+        int(gbr_ul) if gbr_ul is not None else None,
+        m.group('res_type'),
+    )
+    return m.group('ts'), ue_idx, lcid, kind, cfg
+
+
+def iter_qos_lines(log_file: str) -> Iterator[Tuple[int, str, int, int, str, QosConfig]]:
+    """QoS 라인을 한 번의 정규식으로 읽어 (line, timestamp, ue_idx, lcid, type, QosConfig) 순서로 반환"""
+    with open_log(log_file) as f:
+        for line_num, line in enumerate(f, 1):
+            hit = parse_qos_line(line)
+            if hit is not None:
+                yield (line_num,) + hit
+
 
 def parse_qos_log(log_file: str) -> list:
     """
@@ -28,130 +107,101 @@ def parse_qos_log(log_file: str) -> list:
             ...
         ]
     """
-    # 패턴 1: [STEP6-SCHED] QoS Info - UE0 LCID4 5QI=5QI=0x9 PDB=300ms GBR=None Type=non-GBR
-    # 또는 [STEP6-SCHED] QoS Info - UE0 LCID4 5QI=5QI=0x9 PDB=300ms GBR_DL=128000bps GBR_UL=128000bps Type=GBR
-    pattern1_gbr_none = re.compile(
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?\[STEP6-SCHED\] QoS Info - UE(\d+) LCID(\d+) 5QI=5QI=0x([0-9a-fA-F]+) PDB=(\d+)ms GBR=None Type=(\w+)'
-    )
-    pattern1_gbr_dl_ul = re.compile(
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?\[STEP6-SCHED\] QoS Info - UE(\d+) LCID(\d+) 5QI=5QI=0x([0-9a-fA-F]+) PDB=(\d+)ms GBR_DL=(\d+)bps GBR_UL=(\d+)bps Type=(\w+)'
-    )
-    
-    # 패턴 2: [SCHED-QoS] UE1 LCID4 PDB=300ms GBR=None Type=non-GBR
-    # 또는 [SCHED-QoS] UE1 LCID4 PDB=300ms GBR_DL=128000bps Type=GBR (used in scheduling)
-    pattern2_gbr_none = re.compile(
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?\[SCHED-QoS\] UE(\d+) LCID(\d+) PDB=(\d+)ms GBR=None Type=(\w+)'
-    )
-    pattern2_gbr_dl = re.compile(
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?\[SCHED-QoS\] UE(\d+) LCID(\d+) PDB=(\d+)ms GBR_DL=(\d+)bps Type=(\w+)'
-    )
-    
     entries = []
-    
-    with open(log_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            # 패턴 1-1: GBR=None인 경우
-            match1_none = pattern1_gbr_none.search(line)
-            if match1_none:
-                timestamp = match1_none.group(1)
-                ue_idx = int(match1_none.group(2))
-                lcid = int(match1_none.group(3))
-                five_qi_hex = match1_none.group(4)
-                pdb_ms = int(match1_none.group(5))
-                res_type = match1_none.group(6)
-                
-                entry = {
-                    'line': line_num,
-                    'timestamp': timestamp,
-                    'ue_idx': ue_idx,
-                    'lcid': lcid,
-                    '5qi': int(five_qi_hex, 16),
-                    'pdb_ms': pdb_ms,
-                    'gbr_dl_bps': None,
-                    'gbr_ul_bps': None,
-                    'res_type': res_type,
-                    'type': 'STEP6-SCHED'
-                }
-                entries.append(entry)
-                continue
-            
-            # 패턴 1-2: GBR_DL/UL 있는 경우
-            match1_gbr = pattern1_gbr_dl_ul.search(line)
-            if match1_gbr:
-                timestamp = match1_gbr.group(1)
-                ue_idx = int(match1_gbr.group(2))
-                lcid = int(match1_gbr.group(3))
-                five_qi_hex = match1_gbr.group(4)
-                pdb_ms = int(match1_gbr.group(5))
-                gbr_dl = int(match1_gbr.group(6))
-                gbr_ul = int(match1_gbr.group(7))
-                res_type = match1_gbr.group(8)
-                
-                entry = {
-                    'line': line_num,
-                    'timestamp': timestamp,
-                    'ue_idx': ue_idx,
-                    'lcid': lcid,
-                    '5qi': int(five_qi_hex, 16),
-                    'pdb_ms': pdb_ms,
-                    'gbr_dl_bps': gbr_dl,
-                    'gbr_ul_bps': gbr_ul,
-                    'res_type': res_type,
-                    'type': 'STEP6-SCHED'
-                }
-                entries.append(entry)
-                continue
-            
-            # 패턴 2-1: GBR=None인 경우
-            match2_none = pattern2_gbr_none.search(line)
-            if match2_none:
-                timestamp = match2_none.group(1)
-                ue_idx = int(match2_none.group(2))
-                lcid = int(match2_none.group(3))
-                pdb_ms = int(match2_none.group(4))
-                res_type = match2_none.group(5)
-                
-                entry = {
-                    'line': line_num,
-                    'timestamp': timestamp,
-                    'ue_idx': ue_idx,
-                    'lcid': lcid,
-                    '5qi': None,
-                    'pdb_ms': pdb_ms,
-                    'gbr_dl_bps': None,
-                    'gbr_ul_bps': None,
-                    'res_type': res_type,
-                    'type': 'SCHED-QoS'
-                }
-                entries.append(entry)
-                continue
-            
-            # 패턴 2-2: GBR_DL 있는 경우
-            match2_gbr = pattern2_gbr_dl.search(line)
-            if match2_gbr:
-                timestamp = match2_gbr.group(1)
-                ue_idx = int(match2_gbr.group(2))
-                lcid = int(match2_gbr.group(3))
-                pdb_ms = int(match2_gbr.group(4))
-                gbr_dl = int(match2_gbr.group(5))
-                res_type = match2_gbr.group(6)
-                
-                entry = {
-                    'line': line_num,
-                    'timestamp': timestamp,
-                    'ue_idx': ue_idx,
-                    'lcid': lcid,
-                    '5qi': None,
-                    'pdb_ms': pdb_ms,
-                    'gbr_dl_bps': gbr_dl,
-                    'gbr_ul_bps': None,
-                    'res_type': res_type,
-                    'type': 'SCHED-QoS'
-                }
-                entries.append(entry)
-    
+    for line_num, timestamp, ue_idx, lcid, kind, cfg in iter_qos_lines(log_file):
+        entries.append({
+            'line': line_num,
+            'timestamp': timestamp,
+            'ue_idx': ue_idx,
+            'lcid': lcid,
+            '5qi': cfg.five_qi,
+            'pdb_ms': cfg.pdb_ms,
+            'gbr_dl_bps': cfg.gbr_dl_bps,
+            'gbr_ul_bps': cfg.gbr_ul_bps,
+            'res_type': cfg.res_type,
+            'type': kind,
+        })
     return entries
 
+
+class QosTimeline:
+    """
+    UE/LCID별 QoS 설정 구간 (변경 시에만 새 구간 저장)
+
+    (ue, lcid) -> RleSeries[QosConfig]; config_at()은 bisect로 O(log n)
+    SCHED-QoS 라인은 5QI / GBR_UL을 현재 구간 값으로 채운 뒤 비교하므로
+    같은 설정의 반복 로그는 구간을 늘리기만 함
+    """
+
+    def __init__(self) -> None:
+        self.series: Dict[Tuple[int, int], RleSeries[QosConfig]] = {}
+        self.lines = 0
+
+    def add(self, t_us: int, ue_idx: int, lcid: int, cfg: QosConfig) -> bool:
+        """샘플 추가; 새 구간이 시작되면 True"""
+        s = self.series.get((ue_idx, lcid))
+        if s is None:
+            s = self.series[(ue_idx, lcid)] = RleSeries()
+        elif s.values:
+            cur = s.values[-1]
+            if cfg.five_qi is None:
+                cfg = cfg._replace(five_qi=cur.five_qi)
+            if cfg.gbr_ul_bps is None and cfg.gbr_dl_bps is not None:
+                cfg = cfg._replace(gbr_ul_bps=cur.gbr_ul_bps)
+            # 멀티스레드 로그의 미세한 역순은 같은 시각으로 취급
+            t_us = max(t_us, s.end_us[-1])
+        self.lines += 1
+        return s.append(t_us, cfg)
+
+    def close(self, end_us: int) -> None:
+        """모든 마지막 구간을 end_us까지 연장 (로그 끝)"""
+        for s in self.series.values():
+            s.close(end_us)
+
+    def keys(self) -> List[Tuple[int, int]]:
+        return sorted(self.series)
+
+    def config_at(self, ue_idx: int, lcid: int, t_us: int) -> Optional[QosConfig]:
+        s = self.series.get((ue_idx, lcid))
+        return None if s is None else s.value_at(t_us)
+
+    def configs_at(self, ue_idx: int, t_us: int) -> Dict[int, QosConfig]:
+        """해당 시각에 유효한 UE의 LCID별 설정"""
+        out = {}
+        for (ue, lcid), s in sorted(self.series.items()):
+            if ue != ue_idx:
+                continue
+            cfg = s.value_at(t_us)
+            if cfg is not None:
+                out[lcid] = cfg
+        return out
+
+    def intervals(self) -> List[Tuple[int, int, int, int, QosConfig]]:
+        """(start_us, end_us, ue_idx, lcid, QosConfig), 시작 시각 순"""
+        return sorted(
+            (start, end, ue, lcid, cfg)
+            for (ue, lcid), s in self.series.items()
+            for start, end, cfg in s.runs()
+        )
+
+
+def build_qos_timeline(log_file: str, kinds: Tuple[str, ...] = ('STEP6-SCHED', 'SCHED-QoS')) -> QosTimeline:
+    """한 번의 파일 읽기로 QoS 설정 타임라인 생성 (엔트리 리스트를 만들지 않음)"""
+    timeline = QosTimeline()
+    ts_key: Optional[str] = None
+    ts_us = 0
+    last_us = 0
+    for _, timestamp, ue_idx, lcid, kind, cfg in iter_qos_lines(log_file):
+        if kind not in kinds:
+            continue
+        if timestamp != ts_key:
+            ts_key, ts_us = timestamp, dt_to_us(datetime.fromisoformat(timestamp))
+        timeline.add(ts_us, ue_idx, lcid, cfg)
+        last_us = max(last_us, ts_us)
+    timeline.close(last_us)
+    return timeline
+
+
 def format_gbr(gbr_bps: Optional[int]) -> str:
     """GBR 값을 포맷팅"""
     if gbr_bps is None:
@@ -159,6 +209,7 @@ def format_gbr(gbr_bps: Optional[int]) -> str:
     else:
         return str(gbr_bps)
 
+
 def print_qos_info(entries: list):
     """UE별로 QoS 정보 출력 (STEP6-SCHED만)"""
     if not entries:
@@ -199,13 +250,64 @@ def print_qos_info(entries: list):
     print("\n" + "=" * 120)
     print(f"총 {len(filtered_entries)}개의 QoS 정보 추출 완료 (UE {len(ue_groups)}개, STEP6-SCHED만)")
 
+
+def print_qos_timeline(timeline: QosTimeline):
+    """변경 시점 기준 구간 출력 (CSV)"""
+    print("start,end,ue,lcid,5qi,pdb_ms,gbr_dl_bps,gbr_ul_bps,res_type")
+    for start, end, ue_idx, lcid, cfg in timeline.intervals():
+        five_qi_str = str(cfg.five_qi) if cfg.five_qi is not None else ""
+        print(f"{us_to_dt(start).strftime('%Y-%m-%dT%H:%M:%S.%f')},{us_to_dt(end).strftime('%Y-%m-%dT%H:%M:%S.%f')},"
+              f"{ue_idx},{lcid},{five_qi_str},{cfg.pdb_ms},"
+              f"{format_gbr(cfg.gbr_dl_bps)},{format_gbr(cfg.gbr_ul_bps)},{cfg.res_type}")
+    print(f"# {len(timeline.series)}개 UE/LCID, {timeline.lines}개 라인 -> {len(timeline.intervals())}개 구간",
+          file=sys.stderr)
+
+
+def print_qos_at(timeline: QosTimeline, at: str):
+    """--at 시각에 유효한 UE/LCID별 설정 출력"""
+    if "T" not in at:
+        # 시각만 주어지면 첫 구간의 날짜 사용
+        first = min((s.start_us[0] for s in timeline.series.values()), default=0)
+        at = f"{us_to_dt(first).date().isoformat()}T{at}"
+    t_us = dt_to_us(datetime.fromisoformat(at))
+    print("ue,lcid,5qi,pdb_ms,gbr_dl_bps,gbr_ul_bps,res_type")
+    for ue_idx, lcid in timeline.keys():
+        cfg = timeline.config_at(ue_idx, lcid, t_us)
+        if cfg is None:
+            continue
+        five_qi_str = str(cfg.five_qi) if cfg.five_qi is not None else ""
+        print(f"{ue_idx},{lcid},{five_qi_str},{cfg.pdb_ms},"
+              f"{format_gbr(cfg.gbr_dl_bps)},{format_gbr(cfg.gbr_ul_bps)},{cfg.res_type}")
+
+
 def main():
     log_file = "gnb.log"
+    timeline_mode = False
+    at = None
     
-    if len(sys.argv) > 1:
-        log_file = sys.argv[1]
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--timeline':
+            timeline_mode = True
+        elif args[i] == '--at' and i + 1 < len(args):
+            at = args[i + 1]
+            i += 1
+        else:
+            log_file = args[i]
+        i += 1
     
     try:
+        if timeline_mode or at is not None:
+            timeline = build_qos_timeline(log_file)
+            if not timeline.series:
+                print("추출된 QoS 정보가 없습니다.", file=sys.stderr)
+                sys.exit(1)
+            if at is not None:
+                print_qos_at(timeline, at)
+            else:
+                print_qos_timeline(timeline)
+            return
         entries = parse_qos_log(log_file)
         print_qos_info(entries)
     except FileNotFoundError:
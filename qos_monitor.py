@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Live PDB-violation / GBR-shortfall monitor: follow gnb.log while it grows.
+
+Reads, per line (log_follow.py; inotify, polling fallback):
+  - [DELAY-WEIGHT] UEX LCIDY ... hol_delay_ms=.. PDB=..ms   (core_delay.py)
+      pdb violation while hol_delay_ms > PDB of that UE/LCID
+  - UEX Throughput 10ms: sum_dl_tb_bytes=.., period=..ms      (core_thro.py)
+      DL Mbps per --gbr-window-ms window (log time, wall-clock aligned)
+  - [STEP6-SCHED] QoS Info / [SCHED-QoS] lines                  (qos_info.py)
+      active GBR_DL per UE/LCID; a UE's GBR is the sum over its LCIDs
+  gbr shortfall: a window in which the UE had queued data (some hol_delay_ms > 0)
+  but DL Mbps < GBR * (1 - --gbr-tolerance)
+
+Every violation is one event per (kind, UE, LCID) with a "start" row as soon
+as it has lasted --min-ms and an "end" row when the next compliant sample (or
+window) arrives. worst is the highest HOL delay (pdb) or lowest Mbps (gbr).
+State is the open events plus one window accumulator per UE, so memory does
+not grow with the log; times in the rows are log timestamps.
+
+  python3 qos_monitor.py /tmp/gnb.log -o /tmp/qos_events.csv           # tail -n 0 -F
+  python3 qos_monitor.py /tmp/gnb.log --ues 0-3 --gbr-window-ms 200 --min-ms 20
+  python3 qos_monitor.py gnb.log --no-follow                           # after the run
+
+On SIGTERM/SIGINT (or EOF with --no-follow) open events are closed as
+"open" rows and the read -> event latency is printed to stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core_delay import DELAY_RE
+from core_thro import THROUGHPUT_RE
+from log_follow import FollowStats, follow_lines
+from log_io import open_log
+from qos_info import parse_qos_line
+from rle_series import dt_to_us, us_to_dt
+from stream_stats import LogHistogram, format_summary
+from ue_select import add_ue_args, resolve_ue_set, ue_wanted
+
+HEADER = "phase,kind,ue,lcid,start,end,duration_ms,worst,limit,samples"
+
+
+@dataclass(slots=True)
+class Violation:
+    kind: str  # pdb | gbr
+    ue: int
+    lcid: Optional[int]
+    start_us: int
+    last_us: int
+    worst: float
+    limit: float
+    samples: int = 1
+    reported: bool = False
+
+    @property
+    def duration_us(self) -> int:
+        return self.last_us - self.start_us
+
+
+@dataclass(slots=True)
+class _GbrWindow:
+    idx: int
+    dl_bytes: int = 0
+    period_us: int = 0
+    backlog: bool = False
+    backlog_next: bool = False  # hol > 0 seen in a later window before this one closed
+
+
+class QosMonitor:
+    """Per-line state machine; emit(phase, violation, end_us) gets every start / end row."""
+
+    def __init__(
+        self,
+        emit: Callable[[str, Violation, Optional[int]], None],
+        ue_filter: Optional[Set[int]] = None,
+        gbr_window_us: int = 100_000,
+        gbr_tolerance: float = 0.0,
+        min_us: int = 0,
+    ) -> None:
+        self.emit = emit
+        self.ue_filter = ue_filter
+        self.gbr_window_us = gbr_window_us
+        self.gbr_tolerance = gbr_tolerance
+        self.min_us = min_us
+        self.open: Dict[Tuple[str, int, Optional[int]], Violation] = {}
+        self.gbr_bps: Dict[int, Dict[int, int]] = {}  # ue -> lcid -> active GBR_DL
+        self.windows: Dict[int, _GbrWindow] = {}
+        self.events = 0
+        self._ts_key: Optional[str] = None
+        self._ts_us = 0
+
+    def _time(self, ts: str) -> int:
+        if ts != self._ts_key:
+            self._ts_key, self._ts_us = ts, dt_to_us(datetime.fromisoformat(ts))
+        return self._ts_us
+
+    def feed(self, line: str) -> None:
+        if "[DELAY-WEIGHT]" in line:
+            m = DELAY_RE.search(line)
+            if m:
+                ue = int(m.group("ue"))
+                if ue_wanted(self.ue_filter, ue):
+                    self.on_delay(self._time(m.group("ts")), ue, int(m.group("lcid")),
+                                  float(m.group("hol")), int(m.group("pdb")))
+        elif "Throughput" in line:
+            m = THROUGHPUT_RE.search(line)
+            if m:
+                ue = int(m.group("ue"))
+                if ue_wanted(self.ue_filter, ue):
+                    self.on_throughput(self._time(m.group("ts")), ue, int(m.group("dl_bytes")),
+                                       float(m.group("period_ms")))
+        elif "QoS" in line:
+            hit = parse_qos_line(line)
+            if hit is not None and ue_wanted(self.ue_filter, hit[1]):
+                _ts, ue, lcid, _kind, cfg = hit
+                self._time(_ts)
+                self.gbr_bps.setdefault(ue, {})[lcid] = cfg.gbr_dl_bps or 0
+
+    # --- samples ---
+
+    def _violating(self, kind: str, ue: int, lcid: Optional[int], t_us: int, value: float, limit: float,
+                   worse: Callable[[float, float], bool], start_us: Optional[int] = None) -> None:
+        key = (kind, ue, lcid)
+        v = self.open.get(key)
+        if v is None:
+            start = t_us if start_us is None else start_us
+            v = self.open[key] = Violation(kind, ue, lcid, start, t_us, value, limit)
+        else:
+            v.last_us = max(v.last_us, t_us)
+            v.samples += 1
+            v.limit = limit
+            if worse(value, v.worst):
+                v.worst = value
+        if not v.reported and v.duration_us >= self.min_us:
+            v.reported = True
+            self.events += 1
+            self.emit("start", v, None)
+
+    def _compliant(self, kind: str, ue: int, lcid: Optional[int], t_us: int) -> None:
+        v = self.open.pop((kind, ue, lcid), None)
+        if v is not None and v.reported:
+            self.emit("end", v, t_us)
+
+    def on_delay(self, t_us: int, ue: int, lcid: int, hol_ms: float, pdb_ms: int) -> None:
+        if hol_ms > pdb_ms:
+            self._violating("pdb", ue, lcid, t_us, hol_ms, pdb_ms, float.__gt__)
+        else:
+            self._compliant("pdb", ue, lcid, t_us)
+        if hol_ms > 0:
+            idx = t_us // self.gbr_window_us
+            w = self.windows.get(ue)
+            if w is None:
+                w = self.windows[ue] = _GbrWindow(idx)
+            if idx == w.idx:
+                w.backlog = True
+            elif idx > w.idx:
+                w.backlog_next = True
+
+    def on_throughput(self, t_us: int, ue: int, dl_bytes: int, period_ms: float) -> None:
+        idx = t_us // self.gbr_window_us
+        w = self.windows.get(ue)
+        if w is None:
+            w = self.windows[ue] = _GbrWindow(idx)
+        elif idx > w.idx:
+            self._close_window(ue, w)
+            w.idx, w.dl_bytes, w.period_us = idx, 0, 0
+            w.backlog, w.backlog_next = w.backlog_next, False
+        w.dl_bytes += dl_bytes
+        w.period_us += round(period_ms * 1000)
+
+    def _close_window(self, ue: int, w: _GbrWindow) -> None:
+        gbr = sum(self.gbr_bps.get(ue, {}).values())
+        start_us = w.idx * self.gbr_window_us
+        if gbr <= 0 or w.period_us <= 0 or not w.backlog:
+            self._compliant("gbr", ue, None, start_us)
+            return
+        mbps = w.dl_bytes * 8.0 / w.period_us  # bits / us == Mbps
+        limit = gbr / 1e6
+        if mbps < limit * (1.0 - self.gbr_tolerance):
+            self._violating("gbr", ue, None, start_us + self.gbr_window_us, mbps, limit, float.__lt__, start_us)
+        else:
+            self._compliant("gbr", ue, None, start_us)
+
+    def close(self) -> None:
+        """End of input: judge the last GBR window of each UE, then report
+        still-open events as 'open'."""
+        for ue, w in self.windows.items():
+            self._close_window(ue, w)
+        self.windows.clear()
+        for v in sorted(self.open.values(), key=lambda v: (v.start_us, v.kind, v.ue)):
+            if v.reported:
+                self.emit("open", v, v.last_us)
+        self.open.clear()
+
+
+def _fmt_us(us: int) -> str:
+    return us_to_dt(us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def format_event(phase: str, v: Violation, end_us: Optional[int]) -> str:
+    lcid = "" if v.lcid is None else str(v.lcid)
+    if end_us is None:
+        end, dur = "", v.duration_us
+    else:
+        end, dur = _fmt_us(end_us), end_us - v.start_us
+    return (
+        f"{phase},{v.kind},{v.ue},{lcid},{_fmt_us(v.start_us)},{end},{dur / 1000.0:.3f},"
+        f"{v.worst:.3f},{v.limit:g},{v.samples}"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Follow gnb.log and report PDB violations / GBR shortfalls.")
+    ap.add_argument("log", help="gnb.log to follow")
+    add_ue_args(ap, default=None)
+    ap.add_argument("-o", "--output", default=None, help="event CSV (default: stdout)")
+    ap.add_argument("--gbr-window-ms", type=float, default=100.0, help="DL throughput window for GBR (default: 100)")
+    ap.add_argument("--gbr-tolerance", type=float, default=0.0, help="shortfall only below GBR * (1 - tol) (default: 0)")
+    ap.add_argument("--min-ms", type=float, default=0.0, help="report violations lasting at least this long")
+    ap.add_argument("--no-follow", action="store_true", help="read the file once and stop at EOF")
+    ap.add_argument("--from-start", action="store_true", help="also scan existing lines when following")
+    ap.add_argument("--poll-ms", type=float, default=1.0, help="polling interval without inotify")
+    ap.add_argument("--no-inotify", action="store_true", help="force polling")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    gbr_window_us = round(args.gbr_window_ms * 1000)
+    if gbr_window_us <= 0:
+        print("ERROR: --gbr-window-ms must be > 0", file=sys.stderr)
+        return 2
+    if not 0.0 <= args.gbr_tolerance < 1.0:
+        print("ERROR: --gbr-tolerance must be in [0, 1)", file=sys.stderr)
+        return 2
+
+    out = sys.stdout if args.output is None else open(args.output, "w", encoding="utf-8", buffering=1)
+    if not args.no_header:
+        out.write(HEADER + "\n")
+        out.flush()
+
+    clock = time.clock_gettime_ns
+    realtime = time.CLOCK_REALTIME
+    latency = LogHistogram(unit=1.0)  # us
+    read_ns = 0
+
+    def emit(phase: str, v: Violation, end_us: Optional[int]) -> None:
+        out.write(format_event(phase, v, end_us) + "\n")
+        out.flush()
+        if read_ns:
+            latency.add((clock(realtime) - read_ns) / 1000.0)
+
+    mon = QosMonitor(
+        emit,
+        resolve_ue_set(args),
+        gbr_window_us=gbr_window_us,
+        gbr_tolerance=args.gbr_tolerance,
+        min_us=round(args.min_ms * 1000),
+    )
+
+    stopping = False
+
+    def on_signal(_sig, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    stats = FollowStats()
+    try:
+        if args.no_follow:
+            with open_log(args.log) as f:
+                for line in f:
+                    stats.lines += 1
+                    mon.feed(line)
+                    if stopping:
+                        break
+        else:
+            for read_ns, _wake_ns, line in follow_lines(
+                args.log,
+                poll_s=args.poll_ms / 1000.0,
+                use_inotify=not args.no_inotify,
+                from_start=args.from_start,
+                stop=lambda: stopping,
+                stats=stats,
+            ):
+                mon.feed(line)
+                if stopping:
+                    break
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    finally:
+        read_ns = 0
+        mon.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"# qos_monitor lines={stats.lines} events={mon.events} mode={'file' if args.no_follow else stats.mode}",
+          file=sys.stderr)
+    if not args.no_follow:
+        print(f"# read_to_event_us: {format_summary(latency)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
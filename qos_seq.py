@@ -6,6 +6,7 @@ Supports:
   - --start-time (ISO or time-only HH:MM:SS.ffffff)
   - --relative-time
   - --ue filtering (default UE0)
+  - --runs / --run-stats (5QI as run-length series, see rle_series.py)
 """
 
 from __future__ import annotations
@@ -15,7 +16,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Set
+
+from log_io import open_log
+from rle_series import add_runs_args, print_runs, report_run_stats, series_by_ue
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 LINE_RE = re.compile(
@@ -42,19 +47,19 @@ def parse_time_arg(value: str, date_fallback: datetime | None) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_rows(path: str, ue_filter: int, start_time: str | None) -> List[Row]:
+def parse_rows(path: str, ue_filter: Set[int] | None, start_time: str | None) -> List[Row]:
     out: List[Row] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(path) as f:
         for line in f:
             m = LINE_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -77,7 +82,7 @@ def parse_rows(path: str, ue_filter: int, start_time: str | None) -> List[Row]:
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract seq and 5QI from sched_cfg_build logs.")
     ap.add_argument("log_file", help="Path to gnb.log")
-    ap.add_argument("--ue", type=int, default=0, help="UE index (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -85,12 +90,14 @@ def main() -> int:
         help="Start time: HH:MM:SS.ffffff or YYYY-MM-DDTHH:MM:SS.ffffff",
     )
     ap.add_argument("--relative-time", action="store_true", help="Output relative seconds from base time")
+    add_runs_args(ap)
     ap.add_argument("--no-header", action="store_true", help="Print rows only")
     args = ap.parse_args()
 
-    rows = parse_rows(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    rows = parse_rows(args.log_file, ue_set, args.start_time)
     if not rows:
-        print(f"No sched_cfg_build rows found for UE{args.ue}", file=sys.stderr)
+        print(f"No sched_cfg_build rows found for {format_ue_set(ue_set)}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -98,18 +105,29 @@ def main() -> int:
     else:
         base = rows[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
+    if args.runs or args.run_stats:
+        series = series_by_ue(rows, lambda r: r.five_qi)
+        if args.run_stats:
+            report_run_stats(series, "five_qi")
+        if args.runs:
+            print_runs(series, "five_qi", str, base if args.relative_time else None, multi_ue, args.no_header)
+            return 0
+
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,seq,five_qi")
+            print(f"rel_time_s{ue_col},seq,five_qi")
         else:
-            print("timestamp,seq,five_qi")
+            print(f"timestamp{ue_col},seq,five_qi")
 
     for r in rows:
+        ue_f = f",{r.ue}" if multi_ue else ""
         if args.relative_time:
             rel = (r.ts - base).total_seconds()
-            print(f"{rel:.6f},{r.seq},{r.five_qi}")
+            print(f"{rel:.6f}{ue_f},{r.seq},{r.five_qi}")
         else:
-            print(f"{r.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{r.seq},{r.five_qi}")
+            print(f"{r.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{r.seq},{r.five_qi}")
 
     return 0
 
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Declarative hop pairs for compute_qrt.py: match any two extracted series.
+
+A pair spec names a source and a target series (CSV from one of the
+extractors), how each row becomes a match key, and how the rows are
+compressed; compute_qrt.assign_targets does the matching (greedy or
+--match optimal), QRT = target time - source time.
+
+  {
+    "source": {"file": "gtp.txt", "time": "rel_time_s", "value": "dscp"},
+    "target": {"file": "ul_sdap.txt", "time": "rel_time_s", "value": "dscp",
+               "where": {"direction": "DL"}, "skip": [0]},
+    "tol": 0
+  }
+
+Series keys (all optional except file):
+  time      column name or 0-based index (default 0); rel_time_s seconds,
+            ISO timestamps (epoch seconds) or HH:MM:SS[.ffffff]
+  value     column name or index (default 1)
+  where     {"column": "value", ...} rows to keep (e.g. {"ue": "0"})
+  skip      values dropped before mapping (e.g. [0] for DSCP 0)
+  map       value -> key steps, names from MAPS ("dscp_5qi", "5qi_prio")
+            or inline {"44": 66, ...}; rows with an unmapped value are dropped
+  compress  "changes" (first row of each run of equal keys; default for the
+            source) or "none" (default for the target)
+  scale     multiplier for a numeric time column (e.g. 0.0005 for 30 kHz slots)
+
+Pair keys: tol / decimals (numeric keys equal after round(decimals) within
+tol; default exact), label.
+
+compute_qrt_pair() is also the matcher behind every --signal mode of
+compute_qrt.py: those build the SeriesRows with their own readers (row =
+the reader's row, for their result types and warnings).
+
+Presets (PAIR_PRESETS) cover the hops without a --signal mode; the file
+names are the extractor outputs and can be changed with --set:
+
+  python3 compute_qrt.py --pair gtp-sdap -o qrt_gtp_sdap.txt
+  python3 compute_qrt.py --pair smf-up --set source.file=/tmp/smf.txt --match optimal
+  python3 compute_qrt.py --pair my_pair.json --set target.where.ue=1
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from compute_qrt import (
+    DEFAULT_DSCP_TO_FIVE_QI,
+    DEFAULT_FIVE_QI_TO_PRIO,
+    DEFAULT_MATCH_CANDIDATES,
+    assign_targets,
+    expand_path,
+)
+from log_io import open_log
+from slot_clock import parse_ts_us
+
+Key = Union[int, float, str]
+
+MAPS: Dict[str, Dict[Key, Key]] = {
+    "dscp_5qi": dict(DEFAULT_DSCP_TO_FIVE_QI),
+    "5qi_prio": dict(DEFAULT_FIVE_QI_TO_PRIO),
+}
+
+PAIR_PRESETS: Dict[str, dict] = {
+    # SMF NGAP QoS (smf_qos.py) -> CU-UP DRB modification (up.py)
+    "smf-up": {
+        "label": "smf->cu-up",
+        "source": {"file": "smf_qos.txt", "time": "rel_time_s", "value": "5qi"},
+        "target": {"file": "up.txt", "time": "rel_time_s", "value": "five_qi_dec"},
+    },
+    # GTP-U DL SDU DSCP change (gtp.py) -> SDAP DL DSCP (ul_sdap.py --direction DL)
+    "gtp-sdap": {
+        "label": "gtpu->sdap",
+        "source": {"file": "gtp.txt", "time": "rel_time_s", "value": "dscp"},
+        "target": {"file": "ul_sdap.txt", "time": "rel_time_s", "value": "dscp",
+                   "where": {"direction": "DL"}, "skip": [0], "compress": "changes"},
+    },
+    # UPF DSCP (upf.py --changes) -> GTP-U DSCP change (gtp.py)
+    "upf-gtp": {
+        "label": "upf->gtpu",
+        "source": {"file": "upf.txt", "time": 0, "value": 1, "skip": [0]},
+        "target": {"file": "gtp.txt", "time": "rel_time_s", "value": "dscp"},
+    },
+    # same as --signal pcf: PCF 5QI -> scheduler prio_weight
+    "pcf-prio": {
+        "label": "PCF",
+        "source": {"file": "pcf.txt", "time": 0, "value": -1, "map": ["5qi_prio"]},
+        "target": {"file": "prio.txt", "time": 0, "value": 2},
+        "tol": 0.001,
+        "decimals": 3,
+    },
+}
+
+_HMS_RE = re.compile(r"\d{1,2}:\d{2}:\d{2}(?:\.\d+)?")
+
+
+@dataclass
+class SeriesSpec:
+    file: str
+    time: Union[str, int] = 0
+    value: Union[str, int] = 1
+    where: Dict[str, str] = field(default_factory=dict)
+    skip: List[Key] = field(default_factory=list)
+    map: List[Union[str, dict]] = field(default_factory=list)
+    compress: str = "none"
+    scale: float = 1.0
+
+
+@dataclass
+class PairSpec:
+    source: SeriesSpec
+    target: SeriesSpec
+    tol: float = 0.0
+    decimals: Optional[int] = None
+    label: str = "pair"
+
+
+@dataclass(frozen=True)
+class SeriesRow:
+    t_s: float
+    value: Key  # as read (after skip)
+    key: Optional[Key]  # after map; None never matches
+    row: object = field(default=None, compare=False, repr=False)  # caller's own row, if built by hand
+
+
+@dataclass(frozen=True)
+class PairQrtRow:
+    t_source: float
+    t_target: float
+    value: Key
+    key: Key
+    qrt_s: float
+    source: Optional[SeriesRow] = field(default=None, compare=False, repr=False)
+    target: Optional[SeriesRow] = field(default=None, compare=False, repr=False)
+
+
+def parse_key(text: str) -> Key:
+    """'44' -> 44, '0x54' -> 84, '0.715' -> 0.715, anything else stays a string."""
+    text = text.strip()
+    try:
+        return int(text, 0)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _set_path(cfg: dict, dotted: str, raw: str) -> None:
+    """--set target.where.ue=1 (value parsed as JSON when it is JSON)."""
+    keys = dotted.split(".")
+    cur = cfg
+    for k in keys[:-1]:
+        cur = cur.setdefault(k, {})
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    cur[keys[-1]] = value
+
+
+def _series_spec(cfg: dict, role: str, default_compress: str) -> SeriesSpec:
+    if not isinstance(cfg, dict) or "file" not in cfg:
+        raise ValueError(f"pair spec: {role}.file is required")
+    unknown = set(cfg) - set(SeriesSpec.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"pair spec: unknown {role} key(s) {', '.join(sorted(unknown))}")
+    spec = SeriesSpec(**{"compress": default_compress, **cfg})
+    if spec.compress not in ("changes", "none"):
+        raise ValueError(f"pair spec: {role}.compress must be 'changes' or 'none'")
+    for m in spec.map:
+        if isinstance(m, str) and m not in MAPS:
+            raise ValueError(f"pair spec: unknown map {m!r} (one of {', '.join(MAPS)})")
+    spec.where = {str(k): str(v) for k, v in spec.where.items()}
+    spec.skip = [parse_key(str(v)) for v in spec.skip]
+    return spec
+
+
+def load_pair_spec(name_or_path: str, overrides: Sequence[str] = ()) -> PairSpec:
+    """Preset name or JSON file (relative files are next to it), then --set overrides."""
+    if name_or_path in PAIR_PRESETS:
+        cfg = json.loads(json.dumps(PAIR_PRESETS[name_or_path]))
+    else:
+        path = Path(expand_path(name_or_path))
+        if not path.is_file():
+            raise ValueError(f"no pair preset or spec file {name_or_path!r} (presets: {', '.join(PAIR_PRESETS)})")
+        cfg = json.loads(path.read_text(encoding="utf-8"))
+        for role in ("source", "target"):
+            f = (cfg.get(role) or {}).get("file")
+            if isinstance(f, str) and f != "-" and not Path(f).expanduser().is_absolute():
+                cfg[role]["file"] = str(path.resolve().parent / f)
+    for item in overrides:
+        key, _, raw = item.partition("=")
+        _set_path(cfg, key.strip(), raw)
+
+    pair = PairSpec(
+        source=_series_spec(cfg.get("source"), "source", "changes"),
+        target=_series_spec(cfg.get("target"), "target", "none"),
+        tol=float(cfg.get("tol", 0.0)),
+        decimals=None if cfg.get("decimals") is None else int(cfg["decimals"]),
+        label=str(cfg.get("label", Path(name_or_path).stem)),
+    )
+    pair.source.file = expand_path(pair.source.file)
+    pair.target.file = expand_path(pair.target.file)
+    return pair
+
+
+def _column(spec: Union[str, int], header: Optional[List[str]], role: str) -> int:
+    if isinstance(spec, int):
+        return spec
+    if header is None or spec not in header:
+        raise ValueError(f"{role}: no column {spec!r} (header: {','.join(header or [])})")
+    return header.index(spec)
+
+
+def _time_s(text: str, scale: float) -> float:
+    try:
+        return float(text) * scale
+    except ValueError:
+        pass
+    if _HMS_RE.fullmatch(text):
+        h, m, s = text.split(":")
+        return int(h) * 3600 + int(m) * 60 + float(s)
+    us = parse_ts_us(text)
+    if us is None:
+        raise ValueError("empty time")
+    return us / 1e6
+
+
+def read_series(spec: SeriesSpec, role: str = "series") -> Tuple[List[SeriesRow], List[str]]:
+    """Rows of one series in file order (map / skip / where applied, compress applied)."""
+    maps = [MAPS[m] if isinstance(m, str) else {parse_key(str(k)): v for k, v in m.items()} for m in spec.map]
+    rows: List[SeriesRow] = []
+    warnings: List[str] = []
+    unmapped: Counter = Counter()
+    header: Optional[List[str]] = None
+    cols: Optional[Tuple[int, int, List[Tuple[int, str]]]] = None
+
+    with open_log(spec.file) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split(",")]
+            if cols is None:
+                first = parts[spec.time] if isinstance(spec.time, int) and -len(parts) <= spec.time < len(parts) else ""
+                is_header = not first or not (first[0].isdigit() or first[0] in "-.")
+                if is_header:
+                    header = parts
+                cols = (
+                    _column(spec.time, header, role),
+                    _column(spec.value, header, role),
+                    [(_column(k, header, role), v) for k, v in spec.where.items()],
+                )
+                if is_header:
+                    continue
+            t_col, v_col, where = cols
+            try:
+                if any(parts[c] != v for c, v in where):
+                    continue
+                t_s = _time_s(parts[t_col], spec.scale)
+                value = parse_key(parts[v_col])
+            except (IndexError, ValueError) as exc:
+                warnings.append(f"skip {role} line: {line!r} ({exc})")
+                continue
+            if value in spec.skip:
+                continue
+            key = value
+            for m in maps:
+                if key not in m:
+                    break
+                key = m[key]
+            else:
+                if spec.compress == "changes" and rows and rows[-1].key == key:
+                    continue
+                rows.append(SeriesRow(t_s, value, key))
+                continue
+            unmapped[value] += 1
+
+    for value, n in sorted(unmapped.items(), key=lambda kv: str(kv[0])):
+        warnings.append(f"{role}: no mapping for value {value} ({n} rows skipped)")
+    return rows, warnings
+
+
+def _targets_by_key(pair: PairSpec, src_keys: set, targets: List[SeriesRow]) -> Dict[Key, List[int]]:
+    """Target indices per source key; numeric keys within tol after rounding."""
+    by_key: Dict[Key, List[int]] = {}
+    for j, row in enumerate(targets):
+        by_key.setdefault(row.key, []).append(j)
+    if pair.tol <= 0 and pair.decimals is None:
+        return by_key
+
+    def norm(k: Key) -> Key:
+        if isinstance(k, (int, float)) and pair.decimals is not None:
+            return round(k, pair.decimals)
+        return k
+
+    out: Dict[Key, List[int]] = {}
+    for sk in src_keys:
+        if sk is None:
+            continue
+        ns = norm(sk)
+        hits: List[int] = []
+        for tk, idx in by_key.items():
+            nt = norm(tk)
+            if isinstance(ns, str) or isinstance(nt, str):
+                same = ns == nt
+            else:
+                same = abs(nt - ns) <= pair.tol
+            if same:
+                hits.extend(idx)
+        out[sk] = sorted(hits)
+    return out
+
+
+def compute_qrt_pair(
+    pair: PairSpec,
+    sources: List[SeriesRow],
+    targets: List[SeriesRow],
+    match: str = "greedy",
+    candidates: int = DEFAULT_MATCH_CANDIDATES,
+    *,
+    time_unit_s: float = 1.0,
+    describe: Optional[Callable[[SeriesRow], str]] = None,
+) -> Tuple[List[PairQrtRow], List[str]]:
+    """
+    One-to-one: source key phase -> target with the same key at/after (first
+    unused, or --match optimal); rows in source time order.
+
+    time_unit_s: seconds per time unit (slot indices); describe: warning text
+    of an unmatched source row.
+    """
+    if not sources:
+        return [], []
+    keys = [s.key for s in sources]
+    assigned = assign_targets(
+        [s.t_s for s in sources],
+        keys,
+        [t.t_s for t in targets],
+        _targets_by_key(pair, set(keys), targets),
+        match,
+        candidates,
+    )
+    results: List[PairQrtRow] = []
+    warnings: List[str] = []
+    for src, j in zip(sources, assigned):
+        if j is None:
+            if describe is not None:
+                warnings.append(describe(src))
+            else:
+                warnings.append(
+                    f"unmatched {pair.label} t={src.t_s:.6f}s value={src.value} key={src.key}: no target at/after"
+                )
+            continue
+        tgt = targets[j]
+        results.append(
+            PairQrtRow(src.t_s, tgt.t_s, src.value, src.key, (tgt.t_s - src.t_s) * time_unit_s, src, tgt)
+        )
+    results.sort(key=lambda r: r.t_source)
+    return results, warnings
@@ -5,6 +5,14 @@ Parse UE{n} [MAC-THP-DL] — token-bucket-shaped MAC SDU payload (allocate_mac_s
   grep "MAC-THP-DL" gnb.log > mac_thp_dl.log
   python3 extract_mac_thp_dl.py mac_thp_dl.log --bin-ms 500 --relative-time --start-time ...
   python3 extract_mac_thp_dl.py mac_thp_dl.log --ue0 --ue1 --ue2 --bin-ms 500 --relative-time
+  python3 extract_mac_thp_dl.py gnb.log --ues 0-63 --bin-ms 500 --relative-time
+
+  # parse once, then zoom without re-reading the log
+  python3 real_thro.py gnb.log --ues 0-3 --pyramid thro.pyr.json.gz > /dev/null
+  python3 real_thro.py --from-pyramid thro.pyr.json.gz --bin-ms 50 --relative-time
+
+  # 1 ms bins of a long run: columnar binary instead of CSV (table_io.py)
+  python3 real_thro.py gnb.log --ues 0-3 --bin-ms 1 --format bin > thro.tbl
 """
 
 from __future__ import annotations
@@ -16,6 +24,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
 
+from log_io import open_log
+from pyramid import Pyramid, add_pyramid_args, load_pyramids, save_pyramids
+from rle_series import dt_to_us, us_to_dt
+from table_io import Column, TableWriter, add_format_args
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set
+
 MAC_THP_RE = re.compile(
     r"^(?:\d+:)?\s*(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+).*?"
     r"UE(?P<ue>\d+)\s+\[MAC-THP-DL\]\s+"
@@ -25,8 +39,6 @@ MAC_THP_RE = re.compile(
     re.IGNORECASE,
 )
 
-UE_FLAG_NAMES = ("ue0", "ue1", "ue2", "ue3")
-
 
 @dataclass
 class Sample:
@@ -47,28 +59,20 @@ def _parse_start_time(value: str, date_fallback: datetime) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def resolve_ue_set(args: argparse.Namespace) -> Set[int]:
-    selected: Set[int] = set()
-    for name in UE_FLAG_NAMES:
-        if getattr(args, name, False):
-            selected.add(int(name[2:]))
-    if selected:
-        return selected
-    return {args.ue}
-
-
-def parse_samples(log_path: str, ue_filter: Set[int], start_time: Optional[str]) -> Dict[int, List[Sample]]:
-    by_ue: Dict[int, List[Sample]] = {ue: [] for ue in ue_filter}
+def parse_samples(
+    log_path: str, ue_filter: Optional[Set[int]], start_time: Optional[str]
+) -> Dict[int, List[Sample]]:
+    by_ue: Dict[int, List[Sample]] = {ue: [] for ue in ue_filter or ()}
     first_ts: Optional[datetime] = None
     start_dt: Optional[datetime] = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = MAC_THP_RE.search(line)
             if not m:
                 continue
             ue = int(m.group("ue"))
-            if ue not in ue_filter:
+            if ue_filter is not None and ue not in ue_filter:
                 continue
             ts = datetime.fromisoformat(m.group("ts"))
             if first_ts is None:
@@ -77,12 +81,12 @@ def parse_samples(log_path: str, ue_filter: Set[int], start_time: Optional[str])
                 start_dt = _parse_start_time(start_time, first_ts)
             if start_dt is not None and ts < start_dt:
                 continue
-            by_ue[ue].append(
+            by_ue.setdefault(ue, []).append(
                 Sample(ts=ts, ue=ue, window_ms=float(m.group("window_ms")), vol_bytes=int(m.group("vol_bytes")))
             )
 
-    for ue in ue_filter:
-        by_ue[ue].sort(key=lambda s: s.ts)
+    for samples in by_ue.values():
+        samples.sort(key=lambda s: s.ts)
     return by_ue
 
 
@@ -112,6 +116,27 @@ def bin_samples(samples: List[Sample], bin_ms: int, bin_base: datetime) -> List[
     return [(i, accum.get(i, 0)) for i in range(0, last_idx + 1)]
 
 
+def build_pyramids(by_ue: Dict[int, List[Sample]], bin_base: datetime) -> Dict[str, Pyramid]:
+    """vol_bytes spread over each sample window at 1 ms; coarser levels merged from it."""
+    base_us = dt_to_us(bin_base)
+    out: Dict[str, Pyramid] = {}
+    for ue, samples in sorted(by_ue.items()):
+        p = out[str(ue)] = Pyramid(base_us, nfields=1)
+        for s in samples:
+            t1 = dt_to_us(s.ts)
+            p.add_spread(t1 - round(s.window_ms * 1000), t1, (s.vol_bytes,))
+    return out
+
+
+def bins_from_pyramid(pyr: Pyramid, bin_ms: int) -> List[tuple[int, int]]:
+    """Dense (idx, bytes) like bin_samples; bytes are rounded per bin, not per sample piece."""
+    cells = pyr.level(bin_ms)
+    if not cells:
+        return []
+    accum = {idx: int(round(c.sums[0])) for idx, c in cells}
+    return [(i, accum.get(i, 0)) for i in range(0, cells[-1][0] + 1)]
+
+
 def _bin_base(start_time: Optional[str], by_ue: Dict[int, List[Sample]]) -> datetime:
     all_samples = [s for samples in by_ue.values() for s in samples]
     if not all_samples:
@@ -123,90 +148,112 @@ def _bin_base(start_time: Optional[str], by_ue: Dict[int, List[Sample]]) -> date
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract [MAC-THP-DL] shaped throughput CSV")
-    ap.add_argument("log_file")
-    ap.add_argument("--ue", type=int, default=0, help="UE index when no --ueN flag (default: 0)")
-    for name in UE_FLAG_NAMES:
-        ap.add_argument(f"--{name}", action="store_true", help=f"Include UE{int(name[2:])}")
+    ap.add_argument("log_file", nargs="?", default=None)
+    add_ue_args(ap, default=0, legacy_flags=True)
     ap.add_argument("--bin-ms", type=int, default=None, help="Re-bin (50= DSCP step, 500=0.5s)")
     ap.add_argument("--start-time", type=str, default=None)
     ap.add_argument("--relative-time", action="store_true")
     ap.add_argument("--no-header", action="store_true")
+    add_pyramid_args(ap)
+    add_format_args(ap)
     args = ap.parse_args()
 
-    ue_set = resolve_ue_set(args)
-    by_ue = parse_samples(args.log_file, ue_set, args.start_time)
-
-    nonempty = {ue: samples for ue, samples in by_ue.items() if samples}
-    if not nonempty:
-        ue_list = ",".join(f"UE{u}" for u in sorted(ue_set))
-        print(f"No [MAC-THP-DL] lines for {ue_list}", file=sys.stderr)
-        return 1
-
-    multi_ue = len(ue_set) > 1
-    bin_base = _bin_base(args.start_time, nonempty)
-
-    if not args.no_header:
-        if multi_ue:
-            cols = "rel_time_s,ue,throughput_mbps" if args.relative_time else "timestamp,ue,throughput_mbps"
-        else:
-            cols = "rel_time_s,throughput_mbps" if args.relative_time else "timestamp,throughput_mbps"
-        print(cols)
-
-    if args.bin_ms is not None:
-        if args.bin_ms <= 0:
-            print("ERROR: --bin-ms must be > 0", file=sys.stderr)
+    if args.bin_ms is not None and args.bin_ms <= 0:
+        print("ERROR: --bin-ms must be > 0", file=sys.stderr)
+        return 2
+    if (args.log_file is None) == (args.from_pyramid is None):
+        print("ERROR: give either a log file or --from-pyramid", file=sys.stderr)
+        return 2
+
+    by_ue: Dict[int, List[Sample]] = {}
+    pyramids: Dict[str, Pyramid] = {}
+    if args.from_pyramid is not None:
+        if args.bin_ms is None:
+            print("ERROR: --from-pyramid needs --bin-ms", file=sys.stderr)
+            return 2
+        try:
+            meta, pyramids = load_pyramids(args.from_pyramid, tool="real_thro")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
             return 2
+        if not pyramids:
+            print(f"No [MAC-THP-DL] lines in {args.from_pyramid}", file=sys.stderr)
+            return 1
+        ue_set = None if meta.get("ues") is None else set(meta["ues"])
+        multi_ue = is_multi_ue(ue_set)
+        ues = sorted(int(ue) for ue in pyramids)
+        bin_base = us_to_dt(next(iter(pyramids.values())).base_us)
+    else:
+        ue_set = resolve_ue_set(args)
+        by_ue = parse_samples(args.log_file, ue_set, args.start_time)
+
+        nonempty = {ue: samples for ue, samples in by_ue.items() if samples}
+        if not nonempty:
+            print(f"No [MAC-THP-DL] lines for {format_ue_set(ue_set)}", file=sys.stderr)
+            return 1
+
+        multi_ue = is_multi_ue(ue_set)
+        ues = sorted(by_ue)
+        bin_base = _bin_base(args.start_time, nonempty)
+        if args.pyramid is not None:
+            pyramids = build_pyramids(by_ue, bin_base)
+            save_pyramids(args.pyramid, "real_thro", pyramids, {"ues": None if ue_set is None else sorted(ue_set)})
+
+    columns = [Column("rel_time_s", "%.6f") if args.relative_time else Column("timestamp", "iso_us")]
+    if multi_ue:
+        columns.append(Column("ue", "%d"))
+    columns.append(Column("throughput_mbps", "%.6f"))
+    out = TableWriter(columns, args.format, header=not args.no_header)
 
+    if args.bin_ms is not None:
         binned: Dict[int, List[tuple[int, int]]] = {}
+        lines: Dict[int, int] = {}
         max_bins = 0
-        for ue in sorted(ue_set):
-            bins = bin_samples(by_ue.get(ue, []), args.bin_ms, bin_base)
+        for ue in ues:
+            if args.from_pyramid is not None:
+                pyr = pyramids[str(ue)]
+                bins = bins_from_pyramid(pyr, args.bin_ms)
+                lines[ue] = pyr.samples
+            else:
+                bins = bin_samples(by_ue.get(ue, []), args.bin_ms, bin_base)
+                lines[ue] = len(by_ue.get(ue, []))
             binned[ue] = bins
             max_bins = max(max_bins, len(bins))
 
         step_s = args.bin_ms / 1000.0
+        step_us = args.bin_ms * 1000
+        base_us = dt_to_us(bin_base)
         stats: List[str] = []
         for idx in range(max_bins):
-            for ue in sorted(ue_set):
+            t = idx * step_s if args.relative_time else base_us + idx * step_us
+            for ue in ues:
                 bins = binned[ue]
                 nbytes = bins[idx][1] if idx < len(bins) else 0
                 mbps = (nbytes * 8.0) / step_s / 1_000_000.0
-                if args.relative_time:
-                    rel = idx * step_s
-                    if multi_ue:
-                        print(f"{rel:.6f},{ue},{mbps:.6f}")
-                    else:
-                        print(f"{rel:.6f},{mbps:.6f}")
+                if multi_ue:
+                    out.row(t, ue, mbps)
                 else:
-                    ts = bin_base + timedelta(milliseconds=idx * args.bin_ms)
-                    if multi_ue:
-                        print(f"{ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{ue},{mbps:.6f}")
-                    else:
-                        print(f"{ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{mbps:.6f}")
+                    out.row(t, mbps)
+        out.close()
 
-        for ue in sorted(ue_set):
+        for ue in ues:
             bins = binned[ue]
             total = sum(n for _, n in bins)
             dur = len(bins) * step_s
             avg = (total * 8.0 / dur / 1_000_000.0) if dur > 0 else 0.0
-            stats.append(f"UE{ue}: lines={len(by_ue.get(ue, []))} bins={len(bins)} avg_mbps={avg:.3f}")
+            stats.append(f"UE{ue}: lines={lines[ue]} bins={len(bins)} avg_mbps={avg:.3f}")
         print(f"# bin_ms={args.bin_ms} " + " | ".join(stats), file=sys.stderr)
     else:
-        for ue in sorted(ue_set):
+        for ue in ues:
             for s in by_ue.get(ue, []):
                 mbps = (s.vol_bytes * 8.0) / (s.window_ms / 1000.0) / 1_000_000.0
-                if args.relative_time:
-                    rel = (s.ts - bin_base).total_seconds()
-                    if multi_ue:
-                        print(f"{rel:.6f},{ue},{mbps:.6f}")
-                    else:
-                        print(f"{rel:.6f},{mbps:.6f}")
+                t = (s.ts - bin_base).total_seconds() if args.relative_time else dt_to_us(s.ts)
+                if multi_ue:
+                    out.row(t, ue, mbps)
                 else:
-                    if multi_ue:
-                        print(f"{s.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{ue},{mbps:.6f}")
-                    else:
-                        print(f"{s.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{mbps:.6f}")
-        stats = [f"UE{ue}: lines={len(by_ue.get(ue, []))}" for ue in sorted(ue_set)]
+                    out.row(t, mbps)
+        out.close()
+        stats = [f"UE{ue}: lines={len(by_ue.get(ue, []))}" for ue in ues]
         print("# " + " | ".join(stats), file=sys.stderr)
 
     return 0
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Run-length-encoded series for step-like signals (prio_weight, 5QI, DSCP).
+
+A series is three parallel arrays, one element per run of equal values:
+start_us, end_us (int64, end exclusive) and value. A new sample with the
+same value (or within epsilon) only moves the end of the current run, so
+1 ms prio samples shrink to one run per change. Each run ends where the next
+starts; the last run ends at the last sample seen (or close(end_us)).
+
+  value_at(t_us)        O(log n) (bisect on start_us)
+  intersect(other)      runs where both series are defined, value pairs
+  stats()               duration-weighted mean / min / max / time per value
+
+The extractors (prio, core_prio, ul_prio, qos_seq, gtp, up) build one series
+per UE; --runs prints the runs instead of change rows and --run-stats adds
+duration-weighted stats on stderr. Joining two extractor outputs:
+
+  python3 prio.py gnb.log --start-time 12:11:58.000000 --relative-time --runs > prio_runs.csv
+  python3 up.py gnb.log --start-time 12:11:58.000000 --relative-time --runs > fiveqi_runs.csv
+  python3 rle_series.py join prio_runs.csv fiveqi_runs.csv    # start_s,end_s,duration_s,a,b
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from log_io import open_log
+
+T = TypeVar("T")
+V = TypeVar("V")
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def dt_to_us(ts: datetime) -> int:
+    """Naive log timestamp -> integer microseconds (exact, no float rounding)."""
+    d = ts - EPOCH
+    return (d.days * 86400 + d.seconds) * 1_000_000 + d.microseconds
+
+
+def us_to_dt(us: int) -> datetime:
+    return EPOCH + timedelta(microseconds=us)
+
+
+class RleSeries(Generic[V]):
+    """Piecewise-constant series as runs (start_us, end_us, value)."""
+
+    def __init__(self, same: Optional[Callable[[V, V], bool]] = None, keep_items: bool = False) -> None:
+        self.start_us = array("q")
+        self.end_us = array("q")
+        self.values: List[V] = []
+        self.samples = array("q")  # samples folded into each run
+        # First / last source item of each run (e.g. the log Entry), for
+        # extractors that print the change row itself.
+        self.first_items: Optional[List[object]] = [] if keep_items else None
+        self.last_items: Optional[List[object]] = [] if keep_items else None
+        self._same = same or (lambda a, b: a == b)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, t_us: int, value: V, item: object = None) -> bool:
+        """Add a sample (t_us non-decreasing); True when it starts a new run."""
+        if self.values:
+            if t_us < self.end_us[-1]:
+                raise ValueError(f"samples must be time-ordered ({t_us} < {self.end_us[-1]})")
+            self.end_us[-1] = t_us
+            if self._same(self.values[-1], value):
+                self.samples[-1] += 1
+                if self.last_items is not None:
+                    self.last_items[-1] = item
+                return False
+        self.start_us.append(t_us)
+        self.end_us.append(t_us)
+        self.values.append(value)
+        self.samples.append(1)
+        if self.first_items is not None:
+            self.first_items.append(item)
+            self.last_items.append(item)
+        return True
+
+    def close(self, end_us: int) -> None:
+        """Extend the last run to end_us (e.g. end of the experiment)."""
+        if self.values and end_us > self.end_us[-1]:
+            self.end_us[-1] = end_us
+
+    def runs(self) -> Iterator[Tuple[int, int, V]]:
+        return zip(self.start_us, self.end_us, self.values)
+
+    def index_at(self, t_us: int) -> int:
+        """Index of the run covering t_us, or -1."""
+        i = bisect_right(self.start_us, t_us) - 1
+        if i < 0:
+            return -1
+        # The last run covers its own end so a series of one sample is usable.
+        if t_us < self.end_us[i] or (i == len(self.values) - 1 and t_us == self.end_us[i]):
+            return i
+        return -1
+
+    def value_at(self, t_us: int, default: Optional[V] = None) -> Optional[V]:
+        i = self.index_at(t_us)
+        return default if i < 0 else self.values[i]
+
+    def intersect(self, other: "RleSeries") -> Iterator[Tuple[int, int, V, object]]:
+        """(start_us, end_us, self value, other value) where both runs overlap (zero-length skipped)."""
+        i = j = 0
+        na, nb = len(self.values), len(other.values)
+        while i < na and j < nb:
+            lo = max(self.start_us[i], other.start_us[j])
+            hi = min(self.end_us[i], other.end_us[j])
+            if hi > lo:
+                yield lo, hi, self.values[i], other.values[j]
+            if self.end_us[i] <= other.end_us[j]:
+                i += 1
+            else:
+                j += 1
+
+    def stats(self) -> "RunStats":
+        st = RunStats()
+        for s, e, v in self.runs():
+            st.add(e - s, v)
+        st.changes = max(0, len(self.values) - 1)
+        st.samples = sum(self.samples)
+        return st
+
+
+class RunStats:
+    """Duration-weighted statistics over runs."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.changes = 0
+        self.samples = 0
+        self.duration_us = 0
+        self._weighted = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.time_by_value: Dict[object, int] = {}
+
+    def add(self, dur_us: int, value) -> None:
+        self.runs += 1
+        self.duration_us += dur_us
+        self.time_by_value[value] = self.time_by_value.get(value, 0) + dur_us
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            return
+        self._weighted += v * dur_us
+        self.min = v if self.min is None else min(self.min, v)
+        self.max = v if self.max is None else max(self.max, v)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._weighted / self.duration_us if self.duration_us else None
+
+    def format(self) -> str:
+        mean = "nan" if self.mean is None else f"{self.mean:.6g}"
+        share = ",".join(
+            f"{v}:{us / self.duration_us:.3f}" for v, us in sorted(self.time_by_value.items(), key=lambda kv: -kv[1])
+        ) if self.duration_us else ""
+        return (
+            f"runs={self.runs} changes={self.changes} samples={self.samples} "
+            f"duration_s={self.duration_us / 1e6:.6f} mean={mean} min={self.min} max={self.max} "
+            f"time_share={share}"
+        )
+
+
+def build_series(
+    items: Iterable[T],
+    value: Callable[[T], V],
+    ts_us: Callable[[T], int] = lambda it: dt_to_us(it.ts),
+    same: Optional[Callable[[V, V], bool]] = None,
+    keep_items: bool = True,
+) -> RleSeries[V]:
+    """One series from time-ordered items."""
+    s: RleSeries[V] = RleSeries(same, keep_items)
+    for it in items:
+        s.append(ts_us(it), value(it), it)
+    return s
+
+
+def series_by_ue(
+    items: Iterable[T],
+    value: Callable[[T], V],
+    same: Optional[Callable[[V, V], bool]] = None,
+    ue: Callable[[T], int] = lambda it: it.ue,
+    ts_us: Callable[[T], int] = lambda it: dt_to_us(it.ts),
+) -> Dict[int, RleSeries[V]]:
+    """Per-UE series (items time-ordered); keys sorted."""
+    out: Dict[int, RleSeries[V]] = {}
+    for it in items:
+        u = ue(it)
+        s = out.get(u)
+        if s is None:
+            s = out[u] = RleSeries(same, keep_items=True)
+        s.append(ts_us(it), value(it), it)
+    return {u: out[u] for u in sorted(out)}
+
+
+def epsilon_same(epsilon: float) -> Callable[[float, float], bool]:
+    """Equality used by the prio extractors: |a - b| <= epsilon."""
+    return lambda a, b: abs(a - b) <= epsilon
+
+
+def change_items(series: Dict[int, RleSeries], keep: str = "first") -> List:
+    """First (or last) source item of every run, all UEs, in time order."""
+    out: List = []
+    for s in series.values():
+        out.extend(s.first_items if keep == "first" else s.last_items)
+    out.sort(key=lambda it: it.ts)
+    return out
+
+
+def add_runs_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--runs", action="store_true", help="Print runs (start,end,duration_s,value) instead of rows")
+    ap.add_argument("--run-stats", action="store_true", help="Duration-weighted per-UE stats on stderr")
+
+
+def print_runs(
+    series: Dict[int, RleSeries],
+    value_name: str,
+    fmt: Callable[[object], str],
+    relative_base: Optional[datetime],
+    multi_ue: bool,
+    no_header: bool = False,
+) -> None:
+    """Runs of all UEs ordered by start; relative_base None -> ISO timestamps."""
+    if not no_header:
+        ue_col = ",ue" if multi_ue else ""
+        t = "start_s,end_s" if relative_base is not None else "start,end"
+        print(f"{t}{ue_col},duration_s,{value_name}")
+    base_us = dt_to_us(relative_base) if relative_base is not None else 0
+    rows = sorted((s, e, ue, v) for ue, ser in series.items() for s, e, v in ser.runs())
+    for s, e, ue, v in rows:
+        ue_f = f",{ue}" if multi_ue else ""
+        if relative_base is not None:
+            t = f"{(s - base_us) / 1e6:.6f},{(e - base_us) / 1e6:.6f}"
+        else:
+            t = f"{us_to_dt(s).strftime('%Y-%m-%dT%H:%M:%S.%f')},{us_to_dt(e).strftime('%Y-%m-%dT%H:%M:%S.%f')}"
+        print(f"{t}{ue_f},{(e - s) / 1e6:.6f},{fmt(v)}")
+
+
+def report_run_stats(series: Dict[int, RleSeries], value_name: str) -> None:
+    for ue, s in series.items():
+        print(f"# ue={ue} {value_name} {s.stats().format()}", file=sys.stderr)
+
+
+def _read_runs_csv(path: str, value_column: Optional[str]) -> RleSeries:
+    """Extractor --relative-time output (rows or --runs) -> series keyed on the first time column."""
+    with open_log(path) as f:
+        rows = [r for r in csv.reader(f) if r and not r[0].startswith("#")]
+    if not rows:
+        raise ValueError(f"{path}: empty")
+    header = rows[0]
+    try:
+        float(header[0])
+        header, body = [], rows
+    except ValueError:
+        body = rows[1:]
+    vi = header.index(value_column) if value_column and header else len(rows[0]) - 1
+    has_end = len(header) > 1 and header[1] in ("end_s", "end")
+    s: RleSeries = RleSeries()
+    for r in body:
+        s.append(round(float(r[0]) * 1e6), r[vi])
+        if has_end:
+            s.end_us[-1] = max(s.end_us[-1], round(float(r[1]) * 1e6))
+    return s
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Run-length series tools.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    j = sub.add_parser("join", help="intersect two step signals (extractor --relative-time CSVs)")
+    j.add_argument("a")
+    j.add_argument("b")
+    j.add_argument("--a-column", default=None, help="value column of a (default: last)")
+    j.add_argument("--b-column", default=None, help="value column of b (default: last)")
+    j.add_argument("--no-header", action="store_true")
+    st = sub.add_parser("stats", help="duration-weighted stats of one step signal")
+    st.add_argument("csv")
+    st.add_argument("--column", default=None, help="value column (default: last)")
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "stats":
+            print(_read_runs_csv(args.csv, args.column).stats().format())
+            return 0
+        a = _read_runs_csv(args.a, args.a_column)
+        b = _read_runs_csv(args.b, args.b_column)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    if not args.no_header:
+        print("start_s,end_s,duration_s,a,b")
+    n = 0
+    for s, e, va, vb in a.intersect(b):
+        print(f"{s / 1e6:.6f},{e / 1e6:.6f},{(e - s) / 1e6:.6f},{va},{vb}")
+        n += 1
+    if n == 0:
+        print("ERROR: series do not overlap", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,687 @@
+#!/usr/bin/env python3
+"""
+SQLite catalog of experiment runs: parameters, log files, derived metrics.
+
+Parameters come from the header block the scenario scripts write to their test
+log (run_5qi.sh, UDP_DSCP_UL.sh, 5QI_Traffic_NAS.sh, ...):
+
+  ==========================================
+    iperf3 Dynamic 5QI — UE0 UDP + UE1/UE2 TCP ...
+    시작: 18:59:39.866793
+    STEP_SEC=0.2 CYCLES=30 TRANSITIONS=90 TOTAL_DUR=...
+    RANDOM_SEED=1234 (file=/tmp/qos_random_seed)
+  ==========================================
+
+Examples:
+  python3 run_catalog.py add /tmp/iperf3_dynamic_5qi_pcf_ue0_only.log \\
+      --name pcf_step02_r1 --file gnb=/tmp/gnb.log --file prio=/tmp/prio.txt
+  python3 run_catalog.py ingest-qrt pcf_step02_r1 --signal pcf \\
+      --signal-file ~/pcf.txt --prio /tmp/prio.txt
+  python3 run_catalog.py ingest-throughput pcf_step02_r1 --csv thr.csv \\
+      --phases ~/pcf.txt --ue 0
+  python3 run_catalog.py ingest-delay pcf_step02_r1 --csv hol.csv --metric hol_delay_ms
+  python3 run_catalog.py query \\
+      "SELECT r.control, r.step_sec, avg(s.p95_ms), count(*) FROM qrt_stats s \\
+       JOIN runs r USING(run_id) GROUP BY r.control, r.step_sec ORDER BY 1, 2"
+
+Derived metrics are cached per (run, metric): re-ingesting with unchanged
+input hashes and parameters is a no-op unless --force is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from iperf_json import phase_means, read_phases
+from log_io import open_log
+
+DEFAULT_DB = os.environ.get("QOS_RUN_CATALOG", str(Path.home() / "qos_runs.db"))
+
+HEADER_RULE_RE = re.compile(r"^\s*={10,}\s*$")
+HEADER_PARAM_RE = re.compile(r"(?<![\w-])(?P<key>[A-Za-z][A-Za-z0-9_]*)=(?P<val>[^\s()]+)")
+# "초기(9)=2M pdb-only(80)=0.5M ..." -> per-5QI rates
+HEADER_RATE_RE = re.compile(r"(?P<label>[\w-]+)\((?P<five_qi>\d+)\)=(?P<rate>[^\s()]+)")
+HEADER_START_RE = re.compile(r"시작(?:\s*시간)?:\s*(?P<ts>\d{2}:\d{2}:\d{2}(?:\.\d+)?)")
+HEADER_CHANGE_ARGS_RE = re.compile(r"--(?P<opt>rate-change|dscp-change)\s+(?P<args>\S.*)$")
+
+HEADER_MAX_LINES = 400
+HASH_CHUNK = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        INTEGER PRIMARY KEY,
+    name          TEXT NOT NULL UNIQUE,
+    scenario      TEXT,
+    title         TEXT,
+    control       TEXT,
+    started_at    TEXT,
+    registered_at TEXT NOT NULL,
+    step_sec      REAL,
+    cycles        INTEGER,
+    transitions   INTEGER,
+    random_seed   TEXT,
+    max_inflight  INTEGER,
+    schedule_file TEXT,
+    test_log      TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_control_step ON runs(control, step_sec);
+
+CREATE TABLE IF NOT EXISTS run_params (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    key    TEXT NOT NULL,
+    value  TEXT,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS run_params_key ON run_params(key, value);
+
+CREATE TABLE IF NOT EXISTS run_files (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    role   TEXT NOT NULL,
+    path   TEXT NOT NULL,
+    size   INTEGER,
+    mtime  REAL,
+    sha256 TEXT,
+    PRIMARY KEY (run_id, role)
+);
+
+CREATE TABLE IF NOT EXISTS derived (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    metric      TEXT NOT NULL,
+    inputs      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, metric)
+);
+
+CREATE TABLE IF NOT EXISTS qrt_rows (
+    run_id        INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    metric        TEXT NOT NULL,
+    idx           INTEGER NOT NULL,
+    rel_time_sig  REAL,
+    rel_time_tgt  REAL,
+    key           INTEGER,
+    qrt_s         REAL NOT NULL,
+    PRIMARY KEY (run_id, metric, idx)
+);
+
+CREATE TABLE IF NOT EXISTS qrt_stats (
+    run_id     INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    metric     TEXT NOT NULL,
+    key        INTEGER,
+    n          INTEGER NOT NULL,
+    min_ms     REAL,
+    avg_ms     REAL,
+    p50_ms     REAL,
+    p90_ms     REAL,
+    p95_ms     REAL,
+    p99_ms     REAL,
+    max_ms     REAL
+);
+CREATE INDEX IF NOT EXISTS qrt_stats_run ON qrt_stats(run_id, metric, key);
+
+CREATE TABLE IF NOT EXISTS phase_throughput (
+    run_id    INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    metric    TEXT NOT NULL,
+    ue        INTEGER,
+    phase     INTEGER NOT NULL,
+    start_s   REAL NOT NULL,
+    end_s     REAL,
+    value     INTEGER,
+    n_bins    INTEGER NOT NULL,
+    avg_mbps  REAL,
+    PRIMARY KEY (run_id, metric, phase)
+);
+CREATE INDEX IF NOT EXISTS phase_throughput_value ON phase_throughput(value);
+
+CREATE TABLE IF NOT EXISTS delay_stats (
+    run_id  INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    metric  TEXT NOT NULL,
+    n       INTEGER NOT NULL,
+    min_ms  REAL,
+    avg_ms  REAL,
+    p50_ms  REAL,
+    p90_ms  REAL,
+    p95_ms  REAL,
+    p99_ms  REAL,
+    p999_ms REAL,
+    max_ms  REAL,
+    PRIMARY KEY (run_id, metric)
+);
+"""
+
+
+@dataclass
+class RunHeader:
+    title: Optional[str]
+    started_at: Optional[str]
+    params: Dict[str, str]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(Path(db_path).expanduser()))
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_run_header(lines: Iterable[str]) -> RunHeader:
+    """Collect KEY=VAL tokens from the ==== header block of a test log."""
+    params: Dict[str, str] = {}
+    title: Optional[str] = None
+    started_at: Optional[str] = None
+    rules = 0
+    for n, raw in enumerate(lines):
+        if n >= HEADER_MAX_LINES:
+            break
+        line = raw.rstrip("\n")
+        if HEADER_RULE_RE.match(line):
+            rules += 1
+            if rules >= 2:
+                break
+            continue
+        if rules == 0:
+            continue
+        text = line.strip()
+        if not text:
+            continue
+        if title is None:
+            title = text
+            continue
+        m = HEADER_START_RE.search(text)
+        if m and started_at is None:
+            started_at = m.group("ts")
+            continue
+        m = HEADER_CHANGE_ARGS_RE.search(text)
+        if m:
+            params[m.group("opt").upper().replace("-", "_") + "_ARGS"] = m.group("args").strip()
+            continue
+        for rm in HEADER_RATE_RE.finditer(text):
+            params[f"RATE_5QI_{rm.group('five_qi')}"] = rm.group("rate")
+        prev_key: Optional[str] = None
+        for pm in HEADER_PARAM_RE.finditer(text):
+            key, val = pm.group("key"), pm.group("val")
+            if key == "file" and prev_key:
+                # "PCF_USE_SCHEDULE=1 file=..." / "RANDOM_SEED=.. (file=..)"
+                key = "SCHEDULE_FILE" if prev_key.endswith("USE_SCHEDULE") else f"{prev_key}_FILE"
+            params[key] = val
+            prev_key = key
+    return RunHeader(title=title, started_at=started_at, params=params)
+
+
+def _guess_control(title: Optional[str], params: Dict[str, str]) -> Optional[str]:
+    if "PCF_BASE" in params or "PCF_MODE" in params:
+        return "pcf"
+    if any(k.endswith("NAS_SOCKET") for k in params):
+        return "nas"
+    if "DSCP_CHANGE_ARGS" in params or "DSCP_USE_SCHEDULE" in params:
+        return "dscp"
+    if title and "NAS" in title:
+        return "nas"
+    return None
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def resolve_run(conn: sqlite3.Connection, run: str) -> int:
+    row = conn.execute("SELECT run_id FROM runs WHERE name = ?", (run,)).fetchone()
+    if row is None and run.isdigit():
+        row = conn.execute("SELECT run_id FROM runs WHERE run_id = ?", (int(run),)).fetchone()
+    if row is None:
+        raise KeyError(f"unknown run: {run}")
+    return int(row[0])
+
+
+def add_file(
+    conn: sqlite3.Connection, run_id: int, role: str, path: str, do_hash: bool = True
+) -> None:
+    resolved = str(Path(path).expanduser().resolve())
+    st = os.stat(resolved)
+    digest = file_sha256(resolved) if do_hash else None
+    conn.execute(
+        "INSERT OR REPLACE INTO run_files(run_id, role, path, size, mtime, sha256) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (run_id, role, resolved, st.st_size, st.st_mtime, digest),
+    )
+
+
+def add_run(
+    conn: sqlite3.Connection,
+    test_log: str,
+    name: Optional[str] = None,
+    scenario: Optional[str] = None,
+    control: Optional[str] = None,
+    tags: Optional[Dict[str, str]] = None,
+) -> int:
+    with open_log(test_log) as f:
+        header = parse_run_header(f)
+    params = dict(header.params)
+    params.update(tags or {})
+    if name is None:
+        name = f"{Path(test_log).stem}_{datetime.now().strftime('%Y%m%dT%H%M%S')}"
+    cur = conn.execute(
+        "INSERT INTO runs(name, scenario, title, control, started_at, registered_at, step_sec, "
+        "cycles, transitions, random_seed, max_inflight, schedule_file, test_log) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            name,
+            scenario,
+            header.title,
+            control or _guess_control(header.title, params),
+            header.started_at,
+            _now(),
+            _to_float(params.get("STEP_SEC")),
+            _to_int(params.get("CYCLES")),
+            _to_int(params.get("TRANSITIONS")),
+            params.get("RANDOM_SEED"),
+            _to_int(params.get("MAX_INFLIGHT")),
+            params.get("SCHEDULE_FILE"),
+            str(Path(test_log).expanduser().resolve()) if test_log != "-" else None,
+        ),
+    )
+    run_id = int(cur.lastrowid)
+    conn.executemany(
+        "INSERT OR REPLACE INTO run_params(run_id, key, value) VALUES (?, ?, ?)",
+        [(run_id, k, v) for k, v in sorted(params.items())],
+    )
+    return run_id
+
+
+def _inputs_fingerprint(paths: Sequence[str]) -> str:
+    return json.dumps({str(Path(p).expanduser()): file_sha256(str(Path(p).expanduser())) for p in paths},
+                      sort_keys=True)
+
+
+def _cached(
+    conn: sqlite3.Connection, run_id: int, metric: str, inputs: str, params: str
+) -> bool:
+    row = conn.execute(
+        "SELECT inputs, params FROM derived WHERE run_id = ? AND metric = ?", (run_id, metric)
+    ).fetchone()
+    return row is not None and row[0] == inputs and row[1] == params
+
+
+def _mark_derived(
+    conn: sqlite3.Connection, run_id: int, metric: str, inputs: str, params: str
+) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO derived(run_id, metric, inputs, params, computed_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (run_id, metric, inputs, params, _now()),
+    )
+
+
+def percentile(sorted_vals: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile of an ascending sequence (q in [0, 100])."""
+    if not sorted_vals:
+        raise ValueError("percentile of empty sequence")
+    pos = (len(sorted_vals) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def _summary_ms(values_s: Sequence[float], qs: Sequence[float]) -> List[float]:
+    vals = sorted(v * 1000.0 for v in values_s)
+    return [vals[0], sum(vals) / len(vals)] + [percentile(vals, q) for q in qs] + [vals[-1]]
+
+
+def store_qrt(
+    conn: sqlite3.Connection,
+    run_id: int,
+    metric: str,
+    rows: Sequence[Tuple[Optional[float], Optional[float], Optional[int], float]],
+) -> None:
+    """rows: (rel_time_sig, rel_time_tgt, key, qrt_s)."""
+    conn.execute("DELETE FROM qrt_rows WHERE run_id = ? AND metric = ?", (run_id, metric))
+    conn.execute("DELETE FROM qrt_stats WHERE run_id = ? AND metric = ?", (run_id, metric))
+    conn.executemany(
+        "INSERT INTO qrt_rows(run_id, metric, idx, rel_time_sig, rel_time_tgt, key, qrt_s) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(run_id, metric, i, *row) for i, row in enumerate(rows)],
+    )
+    # key NULL = all rows; one extra row per 5QI/DSCP.
+    groups: Dict[Optional[int], List[float]] = {None: [r[3] for r in rows]}
+    for r in rows:
+        if r[2] is not None:
+            groups.setdefault(r[2], []).append(r[3])
+    for key, vals in groups.items():
+        if not vals:
+            continue
+        conn.execute(
+            "INSERT INTO qrt_stats(run_id, metric, key, n, min_ms, avg_ms, p50_ms, p90_ms, "
+            "p95_ms, p99_ms, max_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, metric, key, len(vals), *_summary_ms(vals, (50, 90, 95, 99))),
+        )
+
+
+def ingest_qrt(
+    conn: sqlite3.Connection,
+    run_id: int,
+    signal: str,
+    signal_file: str,
+    prio_file: str,
+    metric: Optional[str] = None,
+    tol: float = 0.001,
+    prio_decimals: int = 3,
+    anchor_dscp: int = 44,
+    force: bool = False,
+) -> Optional[int]:
+    """Run compute_qrt (signal vs prio) and cache rows + stats. None = cached."""
+    import compute_qrt as cq
+
+    metric = metric or f"qrt_{signal}"
+    inputs = _inputs_fingerprint([signal_file, prio_file])
+    params = json.dumps(
+        {"signal": signal, "tol": tol, "prio_decimals": prio_decimals, "anchor_dscp": anchor_dscp},
+        sort_keys=True,
+    )
+    if not force and _cached(conn, run_id, metric, inputs, params):
+        return None
+
+    dscp_map = dict(cq.DEFAULT_DSCP_TO_FIVE_QI)
+    with open_log(signal_file) as f:
+        signal_rows, _ = cq.read_signal_rows(signal, f, dscp_map, anchor_dscp=anchor_dscp)
+    with open_log(prio_file) as f:
+        prio_rows = cq.read_prio_rows(f)
+    results, _ = cq.compute_qrt(
+        signal_rows, prio_rows, dict(cq.DEFAULT_FIVE_QI_TO_PRIO), tol,
+        signal_label=signal, prio_decimals=prio_decimals,
+    )
+    store_qrt(
+        conn, run_id, metric,
+        [(r.rel_time_signal, r.rel_time_prio, r.five_qi, r.qrt_s) for r in results],
+    )
+    _mark_derived(conn, run_id, metric, inputs, params)
+    return len(results)
+
+
+def _read_numeric_csv(path: str) -> Tuple[List[str], List[List[str]]]:
+    header: List[str] = []
+    rows: List[List[str]] = []
+    with open_log(path) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split(",")]
+            try:
+                float(parts[0])
+            except ValueError:
+                if not rows and not header:
+                    header = parts
+                continue
+            rows.append(parts)
+    return header, rows
+
+
+def _column(header: List[str], name: Optional[str], default: int) -> int:
+    if name is None:
+        return default
+    if name.lstrip("-").isdigit():
+        return int(name)
+    if name not in header:
+        raise ValueError(f"column {name!r} not in header {header}")
+    return header.index(name)
+
+
+def ingest_throughput(
+    conn: sqlite3.Connection,
+    run_id: int,
+    csv_path: str,
+    phases_path: str,
+    metric: str = "throughput",
+    ue: Optional[int] = None,
+    value_column: Optional[str] = None,
+    force: bool = False,
+) -> Optional[int]:
+    """
+    Average a binned throughput CSV (rel_time_s,...,mbps; last column by default)
+    over the phases of a signal CSV (rel_time_s[,transition],value).
+    """
+    inputs = _inputs_fingerprint([csv_path, phases_path])
+    params = json.dumps({"ue": ue, "value_column": value_column}, sort_keys=True)
+    if not force and _cached(conn, run_id, metric, inputs, params):
+        return None
+
+    header, thr_rows = _read_numeric_csv(csv_path)
+    col = _column(header, value_column, -1)
+    ue_col = header.index("ue") if "ue" in header else None
+    samples: List[Tuple[float, float]] = []
+    for parts in thr_rows:
+        if ue is not None and ue_col is not None and int(parts[ue_col]) != ue:
+            continue
+        samples.append((float(parts[0]), float(parts[col])))
+    samples.sort()
+
+    phases = read_phases(phases_path)
+
+    conn.execute("DELETE FROM phase_throughput WHERE run_id = ? AND metric = ?", (run_id, metric))
+    out = [
+        (run_id, metric, ue, i, start_s, end_s, value, n, mean)
+        for i, (start_s, end_s, value, n, mean) in enumerate(phase_means(samples, phases))
+    ]
+    conn.executemany(
+        "INSERT INTO phase_throughput(run_id, metric, ue, phase, start_s, end_s, value, n_bins, "
+        "avg_mbps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        out,
+    )
+    _mark_derived(conn, run_id, metric, inputs, params)
+    return len(out)
+
+
+def ingest_delay(
+    conn: sqlite3.Connection,
+    run_id: int,
+    csv_path: str,
+    metric: str,
+    value_column: Optional[str] = None,
+    force: bool = False,
+) -> Optional[int]:
+    """Percentiles of a delay CSV column in ms (default: second column)."""
+    inputs = _inputs_fingerprint([csv_path])
+    params = json.dumps({"value_column": value_column}, sort_keys=True)
+    if not force and _cached(conn, run_id, metric, inputs, params):
+        return None
+
+    header, rows = _read_numeric_csv(csv_path)
+    col = _column(header, value_column, 1)
+    vals = sorted(float(parts[col]) for parts in rows if len(parts) > col)
+    conn.execute("DELETE FROM delay_stats WHERE run_id = ? AND metric = ?", (run_id, metric))
+    if vals:
+        summary = [vals[0], sum(vals) / len(vals)]
+        summary += [percentile(vals, q) for q in (50, 90, 95, 99, 99.9)] + [vals[-1]]
+        conn.execute(
+            "INSERT INTO delay_stats(run_id, metric, n, min_ms, avg_ms, p50_ms, p90_ms, p95_ms, "
+            "p99_ms, p999_ms, max_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, metric, len(vals), *summary),
+        )
+    _mark_derived(conn, run_id, metric, inputs, params)
+    return len(vals)
+
+
+def _parse_kv(items: List[str], what: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for item in items:
+        if "=" not in item:
+            raise ValueError(f"{what} must be KEY=VALUE, got {item!r}")
+        k, v = item.split("=", 1)
+        out[k.strip()] = v.strip()
+    return out
+
+
+def _print_rows(cur: sqlite3.Cursor, no_header: bool) -> int:
+    if not no_header and cur.description:
+        print(",".join(d[0] for d in cur.description))
+    n = 0
+    for row in cur:
+        print(",".join("" if v is None else str(v) for v in row))
+        n += 1
+    return n
+
+
+def _report_cached(what: str, n: Optional[int]) -> None:
+    if n is None:
+        print(f"# {what}: cached (inputs unchanged; --force to recompute)", file=sys.stderr)
+    else:
+        print(f"# {what}: stored {n} row(s)", file=sys.stderr)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Experiment run catalog (SQLite).")
+    ap.add_argument("--db", default=DEFAULT_DB, help=f"catalog path (default: {DEFAULT_DB})")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_add = sub.add_parser("add", help="register a run from its scenario test log")
+    p_add.add_argument("test_log", help="scenario LOG_FILE with the ==== header")
+    p_add.add_argument("--name", default=None, help="unique run name (default: <log>_<now>)")
+    p_add.add_argument("--scenario", default=None, help="scenario script, e.g. run_5qi.sh")
+    p_add.add_argument("--control", default=None, help="pcf / nas / dscp (default: guessed)")
+    p_add.add_argument("--tag", action="append", default=[], metavar="KEY=VAL")
+    p_add.add_argument("--file", action="append", default=[], metavar="ROLE=PATH",
+                       help="log/CSV belonging to the run, e.g. gnb=/tmp/gnb.log (repeatable)")
+    p_add.add_argument("--no-hash", action="store_true", help="skip sha256 of --file paths")
+
+    p_file = sub.add_parser("add-file", help="attach files to a run")
+    p_file.add_argument("run")
+    p_file.add_argument("file", nargs="+", metavar="ROLE=PATH")
+    p_file.add_argument("--no-hash", action="store_true")
+
+    p_qrt = sub.add_parser("ingest-qrt", help="compute + store QRT (signal vs prio)")
+    p_qrt.add_argument("run")
+    p_qrt.add_argument("--signal", choices=("pcf", "upf", "iperf", "ul", "ul-5qi"), default="pcf")
+    p_qrt.add_argument("--signal-file", required=True)
+    p_qrt.add_argument("--prio", required=True, help="prio.txt")
+    p_qrt.add_argument("--metric", default=None, help="metric name (default: qrt_<signal>)")
+    p_qrt.add_argument("--tol", type=float, default=0.001)
+    p_qrt.add_argument("--prio-decimals", type=int, default=3)
+    p_qrt.add_argument("--anchor-dscp", type=int, default=44)
+    p_qrt.add_argument("--force", action="store_true")
+
+    p_thr = sub.add_parser("ingest-throughput", help="store per-phase mean throughput")
+    p_thr.add_argument("run")
+    p_thr.add_argument("--csv", required=True, help="binned throughput CSV (rel_time_s,...,mbps)")
+    p_thr.add_argument("--phases", required=True, help="signal CSV giving phase starts")
+    p_thr.add_argument("--metric", default="throughput")
+    p_thr.add_argument("--ue", type=int, default=None, help="filter a ue column if present")
+    p_thr.add_argument("--column", default=None, help="value column name/index (default: last)")
+    p_thr.add_argument("--force", action="store_true")
+
+    p_del = sub.add_parser("ingest-delay", help="store delay percentiles")
+    p_del.add_argument("run")
+    p_del.add_argument("--csv", required=True, help="delay CSV (time,delay_ms,...)")
+    p_del.add_argument("--metric", required=True, help="e.g. hol_delay_ms / ul_queue_delay_ms")
+    p_del.add_argument("--column", default=None, help="value column name/index (default: 1)")
+    p_del.add_argument("--force", action="store_true")
+
+    p_runs = sub.add_parser("runs", help="list runs")
+    p_runs.add_argument("--no-header", action="store_true")
+
+    p_q = sub.add_parser("query", help="run SQL and print CSV")
+    p_q.add_argument("sql")
+    p_q.add_argument("--no-header", action="store_true")
+
+    args = ap.parse_args()
+
+    try:
+        conn = connect(args.db)
+    except sqlite3.Error as e:
+        print(f"ERROR: cannot open catalog {args.db}: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        with conn:
+            if args.cmd == "add":
+                run_id = add_run(
+                    conn, args.test_log, name=args.name, scenario=args.scenario,
+                    control=args.control, tags=_parse_kv(args.tag, "--tag"),
+                )
+                for role, path in _parse_kv(args.file, "--file").items():
+                    add_file(conn, run_id, role, path, do_hash=not args.no_hash)
+                if args.test_log != "-":
+                    add_file(conn, run_id, "test_log", args.test_log, do_hash=not args.no_hash)
+                name = conn.execute("SELECT name FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+                print(f"{run_id},{name}")
+            elif args.cmd == "add-file":
+                run_id = resolve_run(conn, args.run)
+                for role, path in _parse_kv(args.file, "file").items():
+                    add_file(conn, run_id, role, path, do_hash=not args.no_hash)
+            elif args.cmd == "ingest-qrt":
+                run_id = resolve_run(conn, args.run)
+                n = ingest_qrt(
+                    conn, run_id, args.signal, args.signal_file, args.prio, metric=args.metric,
+                    tol=args.tol, prio_decimals=args.prio_decimals,
+                    anchor_dscp=args.anchor_dscp, force=args.force,
+                )
+                _report_cached(args.metric or f"qrt_{args.signal}", n)
+            elif args.cmd == "ingest-throughput":
+                run_id = resolve_run(conn, args.run)
+                n = ingest_throughput(
+                    conn, run_id, args.csv, args.phases, metric=args.metric, ue=args.ue,
+                    value_column=args.column, force=args.force,
+                )
+                _report_cached(args.metric, n)
+            elif args.cmd == "ingest-delay":
+                run_id = resolve_run(conn, args.run)
+                n = ingest_delay(
+                    conn, run_id, args.csv, args.metric, value_column=args.column, force=args.force
+                )
+                _report_cached(args.metric, n)
+            elif args.cmd == "runs":
+                _print_rows(
+                    conn.execute(
+                        "SELECT run_id, name, scenario, control, started_at, step_sec, cycles, "
+                        "random_seed, max_inflight, schedule_file FROM runs ORDER BY run_id"
+                    ),
+                    args.no_header,
+                )
+            else:
+                _print_rows(conn.execute(args.sql), args.no_header)
+    except (KeyError, ValueError, OSError, sqlite3.Error) as e:
+        msg = e.args[0] if isinstance(e, KeyError) and e.args else e
+        print(f"ERROR: {msg}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+Run a QoS scenario (iperf3 traffic + PCF / NAS / DSCP control) from one JSON file.
+
+Replaces the timing path of run_5qi.sh, UDP_DSCP_UL.sh, 5qi_nas_100ms.sh, ...:
+the schedule is built once, the iperf3 clients are forked together (t=0), and
+every control action is fired from one monotonic-clock loop (sleep, then a
+short spin for the last SPIN_US). No date/awk fork per transition, so steps
+down to 10 ms are usable; each dispatch records its error vs the schedule.
+
+Scenario file (all keys except "ues" optional):
+
+  {
+    "title": "iperf3 Dynamic 5QI — UE0 UDP (PCF)",
+    "duration_s": 25,
+    "log_dir": "/tmp/scenario_5qi",
+    "iperf3_bin": "src/iperf3",
+    "netns_exec": ["sudo", "ip", "netns", "exec", "{netns}"],
+    "servers": [{"netns": "ue1", "port": 6500}],
+    "pcf": {"base": "http://127.0.0.13:7777/npcf-policyauthorization/v1/app-sessions",
+            "curl": ["curl", "-s"], "mode": "async", "max_inflight": 8, "qfi": 1},
+    "nas": {"socket": "/tmp/srsue_ue0_nas.sock", "psi": 1, "qfi": 1},
+    "profiles": {"66": {"rate": "8M", "gbr_dl": 7000000, "gbr_ul": 7000000,
+                        "mbr_dl": 20000000, "mbr_ul": 20000000}},
+    "ues": [
+      {"name": "ue0", "ip": "10.45.0.2", "control": "pcf",
+       "traffic": {"server": "10.45.0.2", "port": 6500, "udp": true, "length": 1200,
+                   "rate_change": true, "extra": ["-d"]},
+       "schedule": {"file": "qos_schedule_dscp_replay.txt"}}
+    ]
+  }
+
+control: pcf (curl PATCH/POST afAppId, as change_5qi_pcf), nas (MODIFY line
+to the srsUE AF_UNIX datagram socket, as 5QI_Traffic_NAS.sh), dscp (in-band
+iperf --dscp-change; the loop only logs the mark), none.
+schedule: {"file": ...} (expand_qos_schedule.load_schedule), {"events":
+[[t, five_qi], ...]}, or {"step_s": 0.01, "five_qi": [9, 80, 66, 84], "cycles": 30}
+(+ "shuffle": true / "seed": N for a per-cycle random order, "offset_s").
+
+Scaling: a ues entry with "range": "0-63" expands to one UE per index, with
+{i} / {n} (= i+1) substituted in strings, "ip_base" + i as ip, traffic.port +
+i * "port_step", seed + i and offset_s + i * "stagger_s" per UE, so each UE
+gets its own schedule, iperf3 session and control stream. Control actions of
+all UEs share one pool of "max_inflight" workers (global bound); actions of
+the same UE stay in order.
+
+  {"ues": [{"range": "0-63", "name": "ue{i}", "netns": "ue{n}", "ip_base": "10.45.0.2",
+            "control": "nas", "nas_socket": "/tmp/srsue_ue{i}_nas.sock", "stagger_s": 0.001,
+            "traffic": {"server": "10.45.0.1", "port": 6500, "rate_change": true},
+            "schedule": {"step_s": 0.05, "five_qi": [80, 66, 84], "shuffle": true, "seed": 7,
+                         "initial": 9, "cycles": 20}}],
+   "max_inflight": 16, "control_mode": "async"}
+
+Outputs in log_dir: test.log (==== header + QRT-T0 lines, readable by
+run_catalog.py add), <ue>.log (iperf3), dispatch.csv (per-action timing).
+
+  python3 scenario_runner.py scenario.json
+  python3 scenario_runner.py scenario.json --dry-run          # no processes
+  python3 scenario_runner.py scenario.json --set duration_s=5 --set pcf.mode=sync
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import ipaddress
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+from expand_qos_schedule import FIVE_QI_TO_DSCP, load_schedule
+from stream_stats import LogHistogram, format_summary
+from ue_select import parse_ue_spec
+
+CONTROLS = ("pcf", "nas", "dscp", "none")
+MIN_STEP_S = 0.01
+SPIN_US = 2000
+PROC_CHECK_S = 0.2
+
+# run_5qi.sh defaults (UE0_RATE_*, GBR_5QI*_*, MBR_5QI*_*)
+DEFAULT_PROFILES: Dict[int, dict] = {
+    66: {"rate": "8M", "gbr_dl": 7000000, "gbr_ul": 7000000, "mbr_dl": 20000000, "mbr_ul": 20000000},
+    84: {"rate": "5M", "gbr_dl": 4000000, "gbr_ul": 4000000, "mbr_dl": 20000000, "mbr_ul": 20000000},
+    80: {"rate": "1.5M"},
+    9: {"rate": "1.5M"},
+}
+
+HTTP_STATUS_RE = re.compile(r"HTTP_STATUS:\s*(\d+)")
+LOCATION_RE = re.compile(r"^location:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass
+class Traffic:
+    server: str
+    port: int = 6500
+    udp: bool = True
+    length: Optional[int] = 1200
+    bitrate: Optional[str] = None
+    rate_change: bool = False
+    dscp_change: bool = False
+    interval_s: float = 1.0
+    extra: List[str] = field(default_factory=list)
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class UeSpec:
+    name: str
+    ip: str
+    netns: Optional[str]
+    control: str
+    traffic: Optional[Traffic]
+    schedule: List[Tuple[float, int]]
+    nas_socket: Optional[str] = None
+
+
+@dataclass
+class Scenario:
+    title: str
+    duration_s: float
+    log_dir: Path
+    iperf3_bin: str
+    netns_exec: List[str]
+    servers: List[dict]
+    pcf: dict
+    nas: dict
+    profiles: Dict[int, dict]
+    ues: List[UeSpec]
+    control_mode: str = "async"
+    max_inflight: int = 8
+
+
+@dataclass(order=True)
+class Action:
+    t_ns: int
+    seq: int
+    ue: UeSpec = field(compare=False)
+    idx: int = field(compare=False)
+    five_qi: int = field(compare=False)
+
+
+@dataclass
+class DispatchRecord:
+    idx: int
+    ue: str
+    control: str
+    t_rel_s: float
+    five_qi: int
+    err_us: float
+    queue_ms: Optional[float] = None
+    ctrl_ms: Optional[float] = None
+    ok: Optional[bool] = None
+
+
+def timestamp_us() -> str:
+    """HH:MM:SS.ffffff (timestamp_us in the scenario scripts)."""
+    return datetime.now().strftime("%H:%M:%S.%f")
+
+
+def _set_path(cfg: dict, dotted: str, raw: str) -> None:
+    """--set pcf.mode=sync / ues.0.control=none (list items by index)."""
+    keys = [int(k) if k.isdigit() else k for k in dotted.split(".")]
+    cur = cfg
+    for k in keys[:-1]:
+        cur = cur[k] if isinstance(k, int) else cur.setdefault(k, {})
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    cur[keys[-1]] = value
+
+
+def build_schedule(spec: dict, base_dir: Path) -> List[Tuple[float, int]]:
+    """[(rel_time_s, five_qi)] sorted; the first point is the t=0 state."""
+    if "file" in spec:
+        path = Path(spec["file"])
+        if not path.is_absolute():
+            path = base_dir / path
+        events = [(ev.rel_time_s, ev.five_qi) for ev in load_schedule(path)]
+    elif "events" in spec:
+        events = sorted((float(t), int(q)) for t, q in spec["events"])
+    elif "step_s" in spec:
+        step = float(spec["step_s"])
+        seq = [int(q) for q in spec.get("five_qi", [9, 80, 66, 84])]
+        n = int(spec.get("transitions", int(spec.get("cycles", 1)) * len(seq)))
+        initial = spec.get("initial")
+        # shuffle: every cycle uses each 5QI once, in a seeded random order.
+        rng = random.Random(spec.get("seed")) if spec.get("shuffle") else None
+        events = []
+        if initial is not None:
+            events.append((0.0, int(initial)))
+        start = len(events)
+        order = seq
+        for i in range(n + 1 - start):
+            if rng is not None and i % len(seq) == 0:
+                prev = events[-1][1] if events else None
+                order = seq[:]
+                rng.shuffle(order)
+                if len(order) > 1 and order[0] == prev:
+                    # no same-5QI "transition" across the cycle boundary
+                    order.append(order.pop(0))
+            events.append((round((start + i) * step, 6), order[i % len(seq)]))
+    else:
+        raise ValueError(f"schedule needs file, events, or step_s: {spec}")
+    if not events:
+        raise ValueError("empty schedule")
+    offset = float(spec.get("offset_s", 0.0))
+    if offset:
+        # The t=0 state is the session start; only the changes move.
+        events = [events[0]] + [(round(t + offset, 6), q) for t, q in events[1:]]
+    for t, q in events:
+        if q not in FIVE_QI_TO_DSCP:
+            raise ValueError(f"unknown 5QI {q} at t={t}")
+    return events
+
+
+def _subst(value, fields: Dict[str, int]):
+    if isinstance(value, str):
+        return value.format_map(fields) if "{" in value else value
+    if isinstance(value, list):
+        return [_subst(v, fields) for v in value]
+    if isinstance(value, dict):
+        return {k: _subst(v, fields) for k, v in value.items()}
+    return value
+
+
+def expand_ue_entries(entries: List[dict], default_schedule: Optional[dict] = None) -> List[dict]:
+    """Expand {"range": "0-63", ...} templates into one entry per UE."""
+    out: List[dict] = []
+    for u in entries:
+        if "range" not in u:
+            out.append(u)
+            continue
+        ids = parse_ue_spec(str(u["range"]))
+        if ids is None:
+            raise ValueError("ues range must list UE indices, not 'all'")
+        tmpl = {k: v for k, v in u.items() if k not in ("range", "ip_base", "stagger_s")}
+        for i in sorted(ids):
+            e = _subst(copy.deepcopy(tmpl), {"i": i, "n": i + 1})
+            e.setdefault("name", f"ue{i}")
+            if "schedule" not in e and default_schedule is not None:
+                e["schedule"] = copy.deepcopy(default_schedule)
+            if "ip_base" in u:
+                e["ip"] = str(ipaddress.ip_address(u["ip_base"]) + i)
+            tr = e.get("traffic")
+            if tr is not None:
+                tr["port"] = int(tr.get("port", 6500)) + i * int(tr.pop("port_step", 1))
+            sched = e.get("schedule")
+            if sched is not None:
+                if "seed" in sched:
+                    sched["seed"] = int(sched["seed"]) + i
+                if "stagger_s" in u:
+                    sched["offset_s"] = float(sched.get("offset_s", 0.0)) + i * float(u["stagger_s"])
+            out.append(e)
+    return out
+
+
+def load_scenario(path: str, overrides: Sequence[str] = ()) -> Scenario:
+    cfg = json.loads(Path(path).read_text(encoding="utf-8"))
+    for item in overrides:
+        key, _, raw = item.partition("=")
+        _set_path(cfg, key.strip(), raw)
+    base_dir = Path(path).resolve().parent
+
+    profiles = {k: dict(v) for k, v in DEFAULT_PROFILES.items()}
+    for k, v in (cfg.get("profiles") or {}).items():
+        profiles[int(k)] = {**profiles.get(int(k), {}), **v}
+
+    default_schedule = cfg.get("schedule")
+    ues: List[UeSpec] = []
+    for i, u in enumerate(expand_ue_entries(cfg.get("ues") or [], default_schedule)):
+        control = u.get("control", "none")
+        if control not in CONTROLS:
+            raise ValueError(f"ue {i}: control must be one of {CONTROLS}, got {control!r}")
+        t = u.get("traffic")
+        traffic = None
+        if t is not None:
+            traffic = Traffic(
+                server=str(t.get("server", u.get("ip", ""))),
+                port=int(t.get("port", 6500 + i)),
+                udp=bool(t.get("udp", True)),
+                length=None if t.get("length") is None else int(t["length"]),
+                bitrate=t.get("bitrate"),
+                rate_change=bool(t.get("rate_change", False)),
+                dscp_change=bool(t.get("dscp_change", control == "dscp")),
+                interval_s=float(t.get("interval_s", 1.0)),
+                extra=[str(a) for a in t.get("extra", [])],
+                env={str(k): str(v) for k, v in (t.get("env") or {}).items()},
+            )
+        sched_spec = u.get("schedule", copy.deepcopy(default_schedule))
+        if sched_spec is None:
+            sched = [(0.0, 9)]
+        else:
+            sched = build_schedule(sched_spec, base_dir)
+        ues.append(
+            UeSpec(
+                name=str(u.get("name", f"ue{i}")),
+                ip=str(u.get("ip", "")),
+                netns=u.get("netns"),
+                control=control,
+                traffic=traffic,
+                schedule=sched,
+                nas_socket=u.get("nas_socket"),
+            )
+        )
+    if not ues:
+        raise ValueError("scenario has no ues")
+    names = [u.name for u in ues]
+    if len(set(names)) != len(names):
+        raise ValueError("ue names must be unique")
+    pcf = dict(cfg.get("pcf") or {})
+
+    return Scenario(
+        title=str(cfg.get("title", Path(path).stem)),
+        duration_s=float(cfg.get("duration_s", 25)),
+        log_dir=Path(cfg.get("log_dir", f"/tmp/scenario_{Path(path).stem}")),
+        iperf3_bin=str(cfg.get("iperf3_bin", "iperf3")),
+        netns_exec=[str(a) for a in cfg.get("netns_exec", ["sudo", "ip", "netns", "exec", "{netns}"])],
+        servers=list(cfg.get("servers") or []),
+        pcf=pcf,
+        nas=dict(cfg.get("nas") or {}),
+        profiles=profiles,
+        ues=ues,
+        control_mode=str(cfg.get("control_mode", pcf.get("mode", "async"))),
+        max_inflight=int(cfg.get("max_inflight", pcf.get("max_inflight", 8))),
+    )
+
+
+def rate_for(profiles: Dict[int, dict], five_qi: int) -> str:
+    return str(profiles.get(five_qi, {}).get("rate", profiles[9]["rate"]))
+
+
+def rate_change_arg(ue: UeSpec, profiles: Dict[int, dict]) -> str:
+    """--rate-change "r0,t1,r1,..." (build_rate_change_by_5qi)."""
+    parts = [rate_for(profiles, ue.schedule[0][1])]
+    for t, q in ue.schedule[1:]:
+        parts.append(f"{t:.6f},{rate_for(profiles, q)}")
+    return ",".join(parts)
+
+
+def dscp_change_arg(ue: UeSpec) -> str:
+    """--dscp-change "d0,t1,d1,..." (build_dscp_change)."""
+    parts = [str(FIVE_QI_TO_DSCP[ue.schedule[0][1]])]
+    for t, q in ue.schedule[1:]:
+        parts.append(f"{t:.6f},{FIVE_QI_TO_DSCP[q]}")
+    return ",".join(parts)
+
+
+def _in_netns(sc: Scenario, netns: Optional[str], env: Dict[str, str], argv: List[str]) -> List[str]:
+    prefix: List[str] = []
+    if netns:
+        prefix = [a.replace("{netns}", netns) for a in sc.netns_exec]
+    if env:
+        # sudo drops the environment; pass it explicitly like the scripts do.
+        prefix = prefix + ["env"] + [f"{k}={v}" for k, v in env.items()]
+    return prefix + argv
+
+
+def iperf_client_argv(sc: Scenario, ue: UeSpec) -> List[str]:
+    tr = ue.traffic
+    assert tr is not None
+    argv = [sc.iperf3_bin, "-c", tr.server, "-t", f"{sc.duration_s:g}", "-p", str(tr.port),
+            "-i", f"{tr.interval_s:g}"]
+    if tr.udp:
+        argv.append("-u")
+    if tr.length:
+        argv += ["-l", str(tr.length)]
+    if tr.rate_change:
+        argv += ["--rate-change", rate_change_arg(ue, sc.profiles)]
+    elif tr.bitrate:
+        argv += ["-b", str(tr.bitrate)]
+    if tr.dscp_change:
+        argv += ["--dscp-change", dscp_change_arg(ue)]
+    argv += tr.extra
+    return _in_netns(sc, ue.netns, tr.env, argv)
+
+
+class TestLog:
+    """[HH:MM:SS.ffffff] lines to test.log (log_event) and stdout; thread-safe."""
+
+    def __init__(self, path: Path, quiet: bool = False) -> None:
+        self._f: TextIO = path.open("w", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+        self._quiet = quiet
+
+    def raw(self, text: str) -> None:
+        with self._lock:
+            self._f.write(text + "\n")
+
+    def event(self, msg: str) -> None:
+        line = f"[{timestamp_us()}] {msg}"
+        with self._lock:
+            self._f.write(line + "\n")
+        if not self._quiet:
+            print(line, flush=True)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def write_header(log: TestLog, sc: Scenario) -> None:
+    log.raw("=" * 42)
+    log.raw(f"  {sc.title}")
+    log.raw(f"  시작: {timestamp_us()}")
+    log.raw(f"  IPERF3_BIN={sc.iperf3_bin}")
+    log.raw(f"  TOTAL_DUR={sc.duration_s:g} UES={len(sc.ues)}")
+    if any(u.control == "pcf" for u in sc.ues):
+        log.raw(f"  PCF_BASE={sc.pcf.get('base', '')}")
+        log.raw(f"  PCF_MODE={sc.control_mode}")
+    if any(u.control == "nas" for u in sc.ues):
+        nas_ue = next(u for u in sc.ues if u.control == "nas")
+        log.raw(f"  UE0_NAS_SOCKET={nas_ue.nas_socket or sc.nas.get('socket', '')}")
+    log.raw(f"  CONTROL_MODE={sc.control_mode} MAX_INFLIGHT={sc.max_inflight}")
+    for ue in sc.ues:
+        seq = " ".join(str(q) for _t, q in ue.schedule)
+        log.raw(f"  {ue.name}: {ue.control}, {len(ue.schedule)} points, 5QI 시퀀스: {seq}")
+        if ue.traffic is not None and ue.traffic.rate_change:
+            log.raw(f"  {ue.name}: --rate-change {rate_change_arg(ue, sc.profiles)}")
+        if ue.traffic is not None and ue.traffic.dscp_change:
+            log.raw(f"  {ue.name}: --dscp-change {dscp_change_arg(ue)}")
+    rates = " ".join(f"5qi({q})={p.get('rate', '-')}" for q, p in sorted(sc.profiles.items()))
+    log.raw(f"  {rates}")
+    log.raw("=" * 42)
+    log.raw("")
+
+
+class Controller:
+    """
+    Control-path actions. async: all UEs share one pool of max_inflight
+    workers (global in-flight bound); each UE's actions run in order through
+    a per-UE queue. sync: inline in the dispatch loop (PCF_MODE=sync).
+    """
+
+    def __init__(self, sc: Scenario, log: TestLog, dry_run: bool) -> None:
+        self.sc = sc
+        self.log = log
+        self.dry_run = dry_run
+        self.async_mode = sc.control_mode == "async"
+        self.pool = ThreadPoolExecutor(max_workers=max(1, sc.max_inflight))
+        self.pending: List[Future] = []
+        self._app_ids: Dict[str, str] = {}
+        self._queues: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._nas_sock: Optional[socket.socket] = None
+        if any(u.control == "nas" for u in sc.ues):
+            self._nas_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.failures = 0
+        self.inflight = 0
+        self.inflight_peak = 0
+
+    # -- PCF (change_5qi_pcf) ------------------------------------------------
+
+    def _af_app_id(self, five_qi: int) -> str:
+        qfi = self.sc.pcf.get("qfi", 1)
+        p = self.sc.profiles.get(five_qi, {})
+        gbr = (int(p.get("gbr_dl", 0)), int(p.get("gbr_ul", 0)))
+        mbr = (int(p.get("mbr_dl", 0)), int(p.get("mbr_ul", 0)))
+        if any(gbr):
+            if any(mbr):
+                return f"5GC-QOS:{qfi}:{five_qi}:{gbr[0]}:{gbr[1]}:{mbr[0]}:{mbr[1]}"
+            return f"5GC-QOS:{qfi}:{five_qi}:{gbr[0]}:{gbr[1]}"
+        return f"5GC-QOS:{qfi}:{five_qi}"
+
+    def _curl(self, args: List[str]) -> Tuple[Optional[int], str]:
+        argv = [str(a) for a in self.sc.pcf.get("curl", ["curl", "-s"])] + args
+        proc = subprocess.run(argv, capture_output=True, text=True, errors="replace")
+        m = None
+        for m in HTTP_STATUS_RE.finditer(proc.stdout):
+            pass
+        return (int(m.group(1)) if m else None), proc.stdout
+
+    def pcf_change(self, ue: UeSpec, five_qi: int) -> Tuple[bool, str]:
+        base = self.sc.pcf.get("base", "")
+        af_id = self._af_app_id(five_qi)
+        # Actions of one UE never overlap, so the first POST cannot race.
+        app_id = self._app_ids.get(ue.name)
+        if app_id is None:
+            body = {"ascReqData": {"ueIpv4": ue.ip,
+                                   "notifUri": self.sc.pcf.get("notif_uri", ""),
+                                   "suppFeat": self.sc.pcf.get("supp_feat", "2"),
+                                   "afAppId": af_id}}
+            status, out = self._curl(["-i", "-w", "\nHTTP_STATUS:%{http_code}", "-X", "POST", base,
+                                      "-H", "Content-Type: application/json",
+                                      "-d", json.dumps(body, separators=(",", ":"))])
+            m = None
+            for m in LOCATION_RE.finditer(out):
+                pass
+            if m:
+                self._app_ids[ue.name] = m.group(1).rstrip("/").rsplit("/", 1)[-1]
+            return status in (200, 201, 204), f"HTTP={status or '?'}"
+        body = {"ascReqData": {"afAppId": af_id}}
+        status, _out = self._curl(["-w", "\nHTTP_STATUS:%{http_code}", "-X", "PATCH", f"{base}/{app_id}",
+                                   "-H", "Content-Type: application/json",
+                                   "-d", json.dumps(body, separators=(",", ":"))])
+        return status in (200, 201, 204), f"HTTP={status or '?'}"
+
+    # -- NAS (change_5qi_ue0, without the socat fork) ----------------------------
+
+    def nas_change(self, ue: UeSpec, five_qi: int) -> Tuple[bool, str]:
+        path = ue.nas_socket or self.sc.nas.get("socket", "")
+        p = self.sc.profiles.get(five_qi, {})
+        line = "MODIFY {} {} {} {} {} {} {}\n".format(
+            self.sc.nas.get("psi", 1), self.sc.nas.get("qfi", 1), five_qi,
+            int(p.get("gbr_dl", 0)), int(p.get("gbr_ul", 0)),
+            int(p.get("mbr_dl", 0)), int(p.get("mbr_ul", 0)),
+        )
+        assert self._nas_sock is not None
+        try:
+            self._nas_sock.sendto(line.encode(), path)
+        except OSError as e:
+            return False, str(e)
+        return True, "sent"
+
+    # -- dispatch ---------------------------------------------------------------
+
+    def _run(self, rec: DispatchRecord, ue: UeSpec, submit_ns: int) -> None:
+        start_ns = time.monotonic_ns()
+        rec.queue_ms = (start_ns - submit_ns) / 1e6
+        if self.dry_run:
+            ok, info = True, "dry-run"
+        elif ue.control == "pcf":
+            ok, info = self.pcf_change(ue, rec.five_qi)
+        else:
+            ok, info = self.nas_change(ue, rec.five_qi)
+        rec.ctrl_ms = (time.monotonic_ns() - start_ns) / 1e6
+        rec.ok = ok
+        tag = "PCF" if ue.control == "pcf" else "NAS"
+        mode = "async" if self.async_mode else "sync"
+        state = f"OK {tag.lower()}_ms={rec.ctrl_ms:.0f}" if ok else f"FAIL {info}"
+        self.log.event(
+            f"t={rec.t_rel_s:.6f}s transition#{rec.idx} ue={ue.name} 5QI={rec.five_qi} "
+            f"rate={rate_for(self.sc.profiles, rec.five_qi)} {tag} {state} ({mode})"
+        )
+        if not ok:
+            with self._lock:
+                self.failures += 1
+
+    def _drain(self, ue: UeSpec) -> None:
+        """Pool worker: run this UE's queued actions in order."""
+        q = self._queues[ue.name]
+        with self._lock:
+            self.inflight += 1
+            self.inflight_peak = max(self.inflight_peak, self.inflight)
+        while True:
+            with self._lock:
+                rec, submit_ns = q[0]
+            try:
+                self._run(rec, ue, submit_ns)
+            finally:
+                with self._lock:
+                    q.popleft()
+                    if not q:
+                        self.inflight -= 1
+                        return
+
+    def dispatch(self, rec: DispatchRecord, ue: UeSpec) -> None:
+        if ue.control in ("dscp", "none"):
+            rec.ok = True
+            return
+        now = time.monotonic_ns()
+        if not self.async_mode:
+            self._run(rec, ue, now)
+            return
+        with self._lock:
+            q = self._queues.setdefault(ue.name, deque())
+            q.append((rec, now))
+            if len(q) > 1:
+                return  # the worker draining this UE picks it up
+        self.pending.append(self.pool.submit(self._drain, ue))
+
+    def close(self) -> None:
+        for fut in self.pending:
+            fut.result()
+        self.pool.shutdown(wait=True)
+        if self._nas_sock is not None:
+            self._nas_sock.close()
+
+
+def build_actions(sc: Scenario) -> List[Action]:
+    actions: List[Action] = []
+    seq = 0
+    for ue in sc.ues:
+        if ue.control == "none":
+            continue
+        for idx, (t, q) in enumerate(ue.schedule):
+            actions.append(Action(int(round(t * 1e9)), seq, ue, idx, q))
+            seq += 1
+    actions.sort()
+    return actions
+
+
+def min_step_s(sc: Scenario) -> Optional[float]:
+    steps = [b[0] - a[0] for ue in sc.ues for a, b in zip(ue.schedule, ue.schedule[1:])]
+    return min(steps) if steps else None
+
+
+def wait_until(target_ns: int, spin_ns: int, procs_alive) -> bool:
+    """Sleep until ~spin_ns before target, then spin; False if traffic died."""
+    clock = time.monotonic_ns
+    next_check = clock()
+    while True:
+        now = clock()
+        rem = target_ns - now
+        if rem <= 0:
+            return True
+        if now >= next_check:
+            if not procs_alive():
+                return False
+            next_check = now + int(PROC_CHECK_S * 1e9)
+        if rem > spin_ns:
+            time.sleep(min(rem - spin_ns, int(PROC_CHECK_S * 1e9)) / 1e9)
+
+
+def write_dispatch_csv(path: Path, records: List[DispatchRecord]) -> None:
+    def opt(v: Optional[float]) -> str:
+        return "" if v is None else f"{v:.3f}"
+
+    with path.open("w", encoding="utf-8") as f:
+        f.write("idx,ue,control,t_rel_s,five_qi,dispatch_err_us,queue_ms,ctrl_ms,ok\n")
+        for r in records:
+            ok = "" if r.ok is None else int(r.ok)
+            f.write(
+                f"{r.idx},{r.ue},{r.control},{r.t_rel_s:.6f},{r.five_qi},{r.err_us:.1f},"
+                f"{opt(r.queue_ms)},{opt(r.ctrl_ms)},{ok}\n"
+            )
+
+
+def run(sc: Scenario, dry_run: bool, spin_us: float, quiet: bool) -> int:
+    sc.log_dir.mkdir(parents=True, exist_ok=True)
+    log = TestLog(sc.log_dir / "test.log", quiet=quiet)
+    write_header(log, sc)
+
+    step = min_step_s(sc)
+    if step is not None and step < MIN_STEP_S - 1e-9:
+        log.event(f"WARNING min step {step * 1000:.1f} ms < {MIN_STEP_S * 1000:.0f} ms")
+
+    procs: List[Tuple[str, subprocess.Popen]] = []
+    logs: List[TextIO] = []
+
+    def spawn(name: str, argv: List[str], out_path: Optional[Path]) -> None:
+        log.event(f"exec {name}: {' '.join(argv)}")
+        if dry_run:
+            return
+        out = out_path.open("w", encoding="utf-8") if out_path else subprocess.DEVNULL
+        if out_path:
+            logs.append(out)  # type: ignore[arg-type]
+        procs.append((name, subprocess.Popen(argv, stdout=out, stderr=subprocess.STDOUT)))
+
+    for srv in sc.servers:
+        argv = _in_netns(sc, srv.get("netns"), {}, [sc.iperf3_bin, "-s", "-p", str(srv.get("port", 6500)), "-D"])
+        log.event(f"server: {' '.join(argv)}")
+        if not dry_run:
+            subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    ctrl = Controller(sc, log, dry_run)
+    actions = build_actions(sc)
+    records: List[DispatchRecord] = []
+    spin_ns = int(spin_us * 1000)
+    early_exit = False
+
+    try:
+        # Fork all clients back to back so they share t=0.
+        for ue in sc.ues:
+            if ue.traffic is not None:
+                spawn(ue.name, iperf_client_argv(sc, ue), sc.log_dir / f"{ue.name}.log")
+        t0 = time.monotonic_ns()
+        epoch_ns = time.time_ns()
+        log.event(f"PIDs {' '.join(f'{n}={p.pid}' for n, p in procs)} EPOCH_NS={epoch_ns}")
+        clients = [p for _n, p in procs]
+
+        def alive() -> bool:
+            return all(p.poll() is None for p in clients)
+
+        for act in actions:
+            target = t0 + act.t_ns
+            if not wait_until(target, spin_ns, alive):
+                early_exit = True
+                break
+            err_us = (time.monotonic_ns() - target) / 1000.0
+            ue = act.ue
+            rec = DispatchRecord(act.idx, ue.name, ue.control, act.t_ns / 1e9, act.five_qi, err_us)
+            records.append(rec)
+            tag = "QRT-T0-UL-NAS" if ue.control == "nas" else "QRT-T0"
+            log.event(
+                f"{tag} transition#{act.idx} t_rel={rec.t_rel_s:.6f} five_qi={act.five_qi} "
+                f"epoch_ns={epoch_ns} ue={ue.name} err_us={err_us:.1f}"
+            )
+            ctrl.dispatch(rec, ue)
+
+        if not early_exit and clients:
+            early_exit = not wait_until(t0 + int(sc.duration_s * 1e9), spin_ns, alive)
+    except KeyboardInterrupt:
+        log.event("interrupted")
+        early_exit = True
+    finally:
+        ctrl.close()
+        rcs = []
+        for name, p in procs:
+            try:
+                rcs.append((name, p.wait(timeout=5)))
+            except subprocess.TimeoutExpired:
+                p.terminate()
+                rcs.append((name, p.wait()))
+        for f in logs:
+            f.close()
+
+    write_dispatch_csv(sc.log_dir / "dispatch.csv", records)
+    h = LogHistogram(unit=1.0)
+    h.update(abs(r.err_us) for r in records)
+    summary = [
+        f"dispatch_err_us {format_summary(h)}",
+        f"actions={len(records)}/{len(actions)} control_fail={ctrl.failures} "
+        f"inflight_peak={ctrl.inflight_peak} early_exit={int(early_exit)}",
+        "rc " + " ".join(f"{n}={rc}" for n, rc in rcs),
+    ]
+    for s in summary:
+        log.event(s)
+        print(f"# {s}", file=sys.stderr)
+    log.event("종료")
+    log.close()
+    bad_rc = any(rc not in (0, None) for _n, rc in rcs)
+    return 1 if early_exit or ctrl.failures or bad_rc else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Config-driven iperf3 + PCF/NAS/DSCP scenario runner.")
+    ap.add_argument("scenario", help="scenario JSON")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VAL",
+                    help="override a scenario key (dotted path, JSON value), repeatable")
+    ap.add_argument("--dry-run", action="store_true", help="no processes / control calls; timing only")
+    ap.add_argument("--spin-us", type=float, default=SPIN_US,
+                    help=f"busy-wait window before each action (default: {SPIN_US})")
+    ap.add_argument("--print-args", action="store_true", help="print iperf3 command lines and exit")
+    ap.add_argument("-q", "--quiet", action="store_true", help="log events only to test.log")
+    args = ap.parse_args()
+
+    try:
+        sc = load_scenario(args.scenario, args.set)
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    if args.print_args:
+        for ue in sc.ues:
+            if ue.traffic is not None:
+                print(" ".join(iperf_client_argv(sc, ue)))
+        return 0
+
+    last = max(ue.schedule[-1][0] for ue in sc.ues)
+    if sc.duration_s < last:
+        print(f"ERROR: duration_s={sc.duration_s:g} is shorter than the last change at {last:g}s",
+              file=sys.stderr)
+        return 2
+    if any(u.control == "pcf" for u in sc.ues) and not sc.pcf.get("base") and not args.dry_run:
+        print("ERROR: control=pcf needs pcf.base", file=sys.stderr)
+        return 2
+    if any(u.control == "nas" and not (u.nas_socket or sc.nas.get("socket")) for u in sc.ues) and not args.dry_run:
+        print("ERROR: control=nas needs nas.socket (or a per-UE nas_socket)", file=sys.stderr)
+        return 2
+
+    return run(sc, args.dry_run, args.spin_us, args.quiet)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
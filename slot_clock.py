@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+NR slot clock: unwrap SFN.slot / tti counters and map them to absolute time.
+
+SFN counts 0..1023 frames of 10 ms, so slot tags and UE tti counters wrap
+every 10.24 s (SFN_PERIOD * slots_per_frame indices). A slot lasts
+1000 * 15 / scs_khz us (15 kHz -> 1 ms, 30 kHz -> 0.5 ms, ...).
+
+SlotClock.unwrap(raw, ts_us) turns the raw counter into a monotone absolute
+index. With the wall-clock timestamp of the same log line the number of
+wraps in between comes from the elapsed time, so gaps longer than 10.24 s
+(sparse QRT-PROF phase rows) are fine; without timestamps a counter that goes
+backwards is taken as one wrap. Each (index, timestamp) pair also anchors
+the clock: offset_us = min(ts_us - index * slot_us), since a line is logged
+after its slot started, never before. wall_us(index) then places any slot
+on the timeline of the timestamped extractors.
+
+A second clock built with reference=first starts in the epoch that matches
+the first clock's anchor, so UE tti and gNB slot indices stay comparable.
+
+  python3 ul_gnb.py gnb.log -o ul_gnb.txt                     # slot,dscp_new,timestamp
+  python3 slot_clock.py ul_gnb.txt --scs 30                   # + abs_index,time_s,timestamp_abs
+  python3 slot_clock.py ul_ue.txt --period 0 --relative-time  # counter never wraps
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from log_io import open_log
+from rle_series import dt_to_us, us_to_dt
+
+SFN_PERIOD = 1024
+FRAME_US = 10_000
+SCS_KHZ = (15, 30, 60, 120)
+
+
+def slot_us_for_scs(scs_khz: int) -> int:
+    """Slot duration for the numerology of scs_khz (15 kHz -> 1000 us, 30 -> 500, ...)."""
+    return 1000 * 15 // scs_khz
+
+
+def slots_per_frame(scs_khz: int) -> int:
+    return FRAME_US // slot_us_for_scs(scs_khz)
+
+
+def counter_period(scs_khz: int) -> int:
+    """Slot indices per SFN cycle (10.24 s): 10240 at 15 kHz, 20480 at 30 kHz."""
+    return SFN_PERIOD * slots_per_frame(scs_khz)
+
+
+class SlotClock:
+    """Unwraps one counter (UE tti or gNB slot) and anchors it to log timestamps."""
+
+    def __init__(self, scs_khz: int = 15, period: Optional[int] = None, reference: Optional["SlotClock"] = None) -> None:
+        if scs_khz not in SCS_KHZ:
+            raise ValueError(f"unsupported SCS {scs_khz} kHz (one of {', '.join(map(str, SCS_KHZ))})")
+        self.scs_khz = scs_khz
+        self.slot_us = slot_us_for_scs(scs_khz)
+        self.period = counter_period(scs_khz) if period is None else period  # 0: never wraps
+        self.reference = reference
+        self.offset_us: Optional[int] = None
+        self.wraps = 0
+        self._last_raw: Optional[int] = None
+        self._last_abs = 0
+        self._last_ts: Optional[int] = None
+
+    def unwrap(self, raw: int, ts_us: Optional[int] = None) -> int:
+        """Absolute index of the next counter value (values in log order)."""
+        p = self.period
+        if not p:
+            idx = raw
+        elif self._last_raw is None:
+            idx = raw
+            ref = self.reference
+            if ts_us is not None and ref is not None and ref.offset_us is not None:
+                idx = raw + p * round((ref.index_at(ts_us) - raw) / p)
+        elif ts_us is not None and self._last_ts is not None:
+            expect = self._last_abs + (ts_us - self._last_ts) / self.slot_us
+            idx = raw + p * round((expect - raw) / p)
+        else:
+            idx = self._last_abs + raw - self._last_raw
+            if raw < self._last_raw:
+                idx += p
+        if self._last_raw is not None and idx - raw != self._last_abs - self._last_raw:
+            self.wraps += 1
+        self._last_raw, self._last_abs = raw, idx
+        if ts_us is not None:
+            self._last_ts = ts_us
+            self.anchor(idx, ts_us)
+        return idx
+
+    def sfn_slot(self, sfn: int, slot: int, ts_us: Optional[int] = None) -> int:
+        return self.unwrap(sfn * slots_per_frame(self.scs_khz) + slot, ts_us)
+
+    def to_us(self, idx: int) -> int:
+        """Index -> microseconds on the slot grid (index 0 = 0 us)."""
+        return idx * self.slot_us
+
+    def anchor(self, idx: int, ts_us: int) -> None:
+        off = ts_us - idx * self.slot_us
+        if self.offset_us is None or off < self.offset_us:
+            self.offset_us = off
+
+    def wall_us(self, idx: int) -> Optional[int]:
+        """Wall-clock start of slot idx (None before the first timestamped value)."""
+        if self.offset_us is None:
+            return None
+        return self.offset_us + idx * self.slot_us
+
+    def index_at(self, ts_us: int) -> float:
+        return (ts_us - self.offset_us) / self.slot_us
+
+
+def parse_ts_us(text: str) -> Optional[int]:
+    """ISO log timestamp column -> us, '' -> None."""
+    text = text.strip()
+    return dt_to_us(datetime.fromisoformat(text)) if text else None
+
+
+def read_index_rows(path: str) -> Iterator[Tuple[int, str, Optional[int]]]:
+    """(raw index, value, ts_us) from ul_ue.py / ul_gnb.py CSV (index,value[,timestamp])."""
+    with open_log(path) as f:
+        for line in f:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) < 2 or not parts[0].isdigit():
+                continue
+            yield int(parts[0]), parts[1], parse_ts_us(parts[2]) if len(parts) > 2 else None
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Unwrap tti/slot index CSVs and place them on the wall clock.")
+    ap.add_argument("csv", help="ul_ue.py / ul_gnb.py output (index,dscp_new[,timestamp])")
+    ap.add_argument("--scs", type=int, choices=SCS_KHZ, default=15, help="subcarrier spacing in kHz (default: 15)")
+    ap.add_argument("--period", type=int, default=None, help="counter wrap in indices (default: 10.24 s of slots; 0 = none)")
+    ap.add_argument("--relative-time", action="store_true", help="time_s from the first row instead of slot 0")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    clock = SlotClock(args.scs, args.period)
+    rows: List[Tuple[int, str, int]] = []
+    try:
+        for raw, value, ts_us in read_index_rows(args.csv):
+            rows.append((raw, value, clock.unwrap(raw, ts_us)))
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if not rows:
+        print(f"No index rows in {args.csv}", file=sys.stderr)
+        return 1
+
+    base = rows[0][2] if args.relative_time else 0
+    if not args.no_header:
+        print("index,value,abs_index,time_s,timestamp")
+    for raw, value, idx in rows:
+        wall = clock.wall_us(idx)
+        ts = us_to_dt(wall).strftime("%Y-%m-%dT%H:%M:%S.%f") if wall is not None else ""
+        print(f"{raw},{value},{idx},{clock.to_us(idx - base) / 1e6:.6f},{ts}")
+    anchored = "none" if clock.offset_us is None else us_to_dt(clock.offset_us).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    print(
+        f"# scs_khz={args.scs} slot_us={clock.slot_us} period={clock.period} rows={len(rows)} "
+        f"wraps={clock.wraps} slot0_at={anchored}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
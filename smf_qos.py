@@ -20,8 +20,11 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import List
 
+from log_io import open_log
+from open5gs_time import Open5gsClock
 
-TIME_RE = re.compile(r"(?P<mm>\d{1,2})/(?P<dd>\d{1,2})\s+(?P<hms>\d{2}:\d{2}:\d{2}\.\d{3})")
+
+TIME_RE = re.compile(r"(?P<date>\d{1,2}/\d{1,2})\s+(?P<hms>\d{2}:\d{2}:\d{2}\.\d{3})")
 Q5_RE = re.compile(r"\b5QI=(?P<qos_5qi>\d+)\b")
 GBR_DL_RE = re.compile(r"\bGBR_DL=(?P<gbr_dl>\d+)\b")
 GBR_UL_RE = re.compile(r"\bGBR_UL=(?P<gbr_ul>\d+)\b")
@@ -65,8 +68,10 @@ def parse_entries(log_path: str, year: int, start_time: str | None = None) -> Li
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
+    # MM/DD has no year: decode in log order so midnight / New Year roll over.
+    clock = Open5gsClock(year)
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             # Some deployments include extra tags/colors; parse fields independently.
             if "[NGAP-BUILD]" not in line:
@@ -81,10 +86,7 @@ def parse_entries(log_path: str, year: int, start_time: str | None = None) -> Li
             if not (t and q and dl and ul):
                 continue
 
-            month = int(t.group("mm"))
-            day = int(t.group("dd"))
-            hms = t.group("hms")
-            ts = datetime.strptime(f"{year:04d}-{month:02d}-{day:02d} {hms}", "%Y-%m-%d %H:%M:%S.%f")
+            ts = clock.decode_dt(t.group("date"), t.group("hms"))
 
             if first_ts is None:
                 first_ts = ts
@@ -115,7 +117,7 @@ def main() -> int:
         "--year",
         type=int,
         default=datetime.now().year,
-        help="Year to apply to MM/DD timestamps (default: current year)",
+        help="Year of the first MM/DD timestamp; later lines roll over into the next year (default: current year)",
     )
     ap.add_argument(
         "--start-time",
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Stale-QoS bytes: traffic served under the previous priority after a change.
+
+For every matched transition (signal time -> prio time, compute_qrt.py
+--intervals or batch_qrt.py output) the UE's DL bytes between the two times
+were scheduled with the old weight. Bytes come from gnb.log:
+
+  mac    UEn [MAC-THP-DL] window_ms=.. vol_bytes=..     (real_thro.py)
+         vol_bytes spread evenly over its window
+  sdap   [STEP1-SDAP] DL ... pdu_len=..                  (ul_sdap.py)
+         each PDU at its log time
+
+The log is read once into a cumulative byte curve per UE (times and running
+sums in two arrays); bytes in [a, b) are C(b) - C(a), two bisects per
+transition. Times must be on the interval file's base: --start-time (the
+one given to the extractors) makes them seconds from it, otherwise epoch
+seconds (ISO-based --pair series). ul-ue-gnb intervals (slot clock) have no
+such base; compute_qrt.py does not write them.
+
+Each transition is charged to one UE: the ue column of the interval file
+(compute_qrt.py --intervals-ue), else the single --ue. A batch_qrt.py CSV
+with several runs needs --run.
+
+  python3 compute_qrt.py --signal pcf --intervals /tmp/qrt_iv.csv --intervals-ue 0
+  python3 stale_bytes.py /tmp/qrt_iv.csv gnb.log --start-time 18:59:39.866793
+  python3 stale_bytes.py qrt_all.csv gnb.log --run run03 --source sdap --ue 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from log_io import open_log
+from real_thro import MAC_THP_RE
+from rle_series import dt_to_us
+from ue_select import add_ue_args, resolve_ue_set, ue_wanted
+from ul_sdap import SDAP_DSCP_RE
+
+SOURCES = ("mac", "sdap")
+
+
+class ByteCurve:
+    """Cumulative bytes C(t) of one UE; linear between points (mac) or a step function (sdap)."""
+
+    __slots__ = ("t_us", "cum", "linear")
+
+    def __init__(self, linear: bool) -> None:
+        self.t_us = array("q")
+        self.cum = array("q")
+        self.linear = linear
+
+    @property
+    def total(self) -> int:
+        return self.cum[-1] if self.cum else 0
+
+    def add_window(self, end_us: int, window_us: int, nbytes: int) -> None:
+        """nbytes served evenly over (end_us - window_us, end_us]."""
+        t, c = self.t_us, self.cum
+        last = c[-1] if c else 0
+        start = end_us - window_us
+        if not t or start > t[-1]:
+            t.append(start)  # idle gap: C flat up to the window start
+            c.append(last)
+        if end_us < t[-1]:
+            end_us = t[-1]  # overlapping / out-of-order window
+        t.append(end_us)
+        c.append(last + nbytes)
+
+    def add_point(self, ts_us: int, nbytes: int) -> None:
+        t = self.t_us
+        if t and ts_us < t[-1]:
+            ts_us = t[-1]
+        t.append(ts_us)
+        self.cum.append((self.cum[-1] if self.cum else 0) + nbytes)
+
+    def at(self, ts_us: float) -> float:
+        """Bytes before ts_us (a PDU logged exactly at ts_us is not counted yet)."""
+        t, c = self.t_us, self.cum
+        if not self.linear:
+            i = bisect_left(t, ts_us) - 1
+            return float(c[i]) if i >= 0 else 0.0
+        i = bisect_right(t, ts_us) - 1
+        if i < 0:
+            return 0.0
+        if i + 1 < len(t) and t[i + 1] > t[i]:
+            return c[i] + (c[i + 1] - c[i]) * (ts_us - t[i]) / (t[i + 1] - t[i])
+        return float(c[i])
+
+    def between(self, a_us: float, b_us: float) -> float:
+        return self.at(b_us) - self.at(a_us) if b_us > a_us else 0.0
+
+
+def read_byte_curves(log_path: str, source: str, ue_filter: Optional[Set[int]]) -> Tuple[Dict[int, ByteCurve], Optional[int]]:
+    """One pass over gnb.log -> per-UE ByteCurve (epoch us) and the first timestamp."""
+    curves: Dict[int, ByteCurve] = {}
+    marker, regex = ("MAC-THP-DL", MAC_THP_RE) if source == "mac" else ("STEP1-SDAP", SDAP_DSCP_RE)
+    first_us: Optional[int] = None
+    sec_key: Optional[str] = None
+    sec_us = 0
+    with open_log(log_path) as f:
+        for line in f:
+            if marker not in line:
+                continue
+            m = regex.search(line)
+            if not m:
+                continue
+            ue = int(m.group("ue"))
+            if not ue_wanted(ue_filter, ue):
+                continue
+            if source == "sdap" and m.group("dir") != "DL":
+                continue
+            ts = m.group("ts")
+            if ts[:19] != sec_key:
+                sec_key = ts[:19]
+                sec_us = dt_to_us(datetime.fromisoformat(sec_key))
+            frac = ts[20:26]
+            ts_us = sec_us + int(frac) * 10 ** (6 - len(frac))
+            if first_us is None:
+                first_us = ts_us
+            curve = curves.get(ue)
+            if curve is None:
+                curve = curves[ue] = ByteCurve(linear=source == "mac")
+            if source == "mac":
+                curve.add_window(ts_us, round(float(m.group("window_ms")) * 1000), int(m.group("vol_bytes")))
+            else:
+                curve.add_point(ts_us, int(m.group("pdu_len")))
+    return curves, first_us
+
+
+@dataclass
+class Interval:
+    run: str
+    t_signal_s: float
+    t_target_s: float
+    key: str
+    ue: Optional[int] = None  # None: no ue column / empty cell
+
+
+def read_intervals(path: str, run: Optional[str]) -> List[Interval]:
+    """compute_qrt.py --intervals or batch_qrt.py CSV (rel_time_signal, rel_time_target, key[, ue][, run])."""
+    out: List[Interval] = []
+    runs: Set[str] = set()
+    with open_log(path) as f:
+        for row in csv.DictReader(f):
+            name = row.get("run") or ""
+            runs.add(name)
+            if run is not None and name != run:
+                continue
+            ue = row.get("ue") or ""
+            out.append(
+                Interval(
+                    name,
+                    float(row["rel_time_signal"]),
+                    float(row["rel_time_target"]),
+                    row.get("key", ""),
+                    int(ue) if ue else None,
+                )
+            )
+    if run is None and len(runs) > 1:
+        raise ValueError(f"{path} has {len(runs)} runs ({', '.join(sorted(runs))}): pick one with --run")
+    return out
+
+
+def _base_us(start_time: Optional[str], first_us: Optional[int]) -> int:
+    if start_time is None:
+        return 0
+    if "T" in start_time:
+        return dt_to_us(datetime.fromisoformat(start_time))
+    if first_us is None:
+        raise ValueError("time-only --start-time needs at least one byte sample to infer the date")
+    day_us = first_us - first_us % 86_400_000_000
+    h, m, s = start_time.split(":")
+    return day_us + round((int(h) * 3600 + int(m) * 60 + float(s)) * 1_000_000)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Bytes served between each QoS signal and its matched prio change.")
+    ap.add_argument("intervals", help="compute_qrt.py --intervals / batch_qrt.py CSV")
+    ap.add_argument("gnb_log", help="gnb.log with [MAC-THP-DL] or [STEP1-SDAP] lines")
+    ap.add_argument("--source", choices=SOURCES, default="mac", help="byte source (default: mac)")
+    add_ue_args(ap, default=None, help_default="the ue column of the interval file")
+    ap.add_argument("--start-time", default=None, help="t=0 of the interval file (ISO or HH:MM:SS.ffffff)")
+    ap.add_argument("--run", default=None, help="only this run of a batch_qrt.py CSV")
+    ap.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    ue_set = resolve_ue_set(args)
+    try:
+        intervals = read_intervals(args.intervals, args.run)
+        if any(iv.ue is None for iv in intervals):
+            if ue_set is None or len(ue_set) != 1:
+                raise ValueError(
+                    f"{args.intervals} has no ue column: give the UE of its transitions with --ue "
+                    "(or write it with compute_qrt.py --intervals-ue)"
+                )
+            (only_ue,) = ue_set
+            for iv in intervals:
+                if iv.ue is None:
+                    iv.ue = only_ue
+        intervals = [iv for iv in intervals if ue_wanted(ue_set, iv.ue)]
+        if ue_set is None:
+            ue_set = {iv.ue for iv in intervals}
+        curves, first_us = read_byte_curves(args.gnb_log, args.source, ue_set)
+        base_us = _base_us(args.start_time, first_us)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if not intervals:
+        print(f"No intervals in {args.intervals}", file=sys.stderr)
+        return 1
+    if not curves:
+        print(f"No {args.source} byte samples in {args.gnb_log}", file=sys.stderr)
+        return 1
+
+    with_run = any(iv.run for iv in intervals)
+    if not args.no_header:
+        print(("run," if with_run else "") + "ue,rel_time_signal,rel_time_target,key,qrt_ms,stale_bytes,stale_mbps")
+    totals: Dict[Tuple[str, int], List[float]] = {}  # (run, ue) -> [transitions, stale bytes]
+    for iv in intervals:
+        a_us = base_us + iv.t_signal_s * 1e6
+        b_us = base_us + iv.t_target_s * 1e6
+        qrt_s = iv.t_target_s - iv.t_signal_s
+        curve = curves.get(iv.ue)
+        nbytes = curve.between(a_us, b_us) if curve is not None else 0.0
+        mbps = nbytes * 8.0 / qrt_s / 1e6 if qrt_s > 0 else 0.0
+        tot = totals.setdefault((iv.run, iv.ue), [0, 0.0])
+        tot[0] += 1
+        tot[1] += nbytes
+        print(
+            (f"{iv.run}," if with_run else "")
+            + f"{iv.ue},{iv.t_signal_s:.6f},{iv.t_target_s:.6f},{iv.key},{qrt_s * 1000:.3f},{nbytes:.0f},{mbps:.3f}"
+        )
+
+    for (run, ue), (n, stale) in sorted(totals.items()):
+        total = curves[ue].total if ue in curves else 0
+        share = stale / total if total else 0.0
+        run_s = f"run={run} " if with_run else ""
+        print(f"# {run_s}ue={ue} transitions={n} stale_bytes={stale:.0f} total_bytes={total} ({share:.2%})",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
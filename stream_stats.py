@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Streaming, mergeable distribution statistics for delay and QRT metrics.
+
+LogHistogram is an HDR-style log-linear histogram: values are quantized to
+--unit and bucketed with a fixed relative error (2^-precision_bits), so memory
+depends on the value range, not on the sample count. Histograms from several
+runs / UEs merge exactly (bucket counts add).
+
+Examples:
+  # p50/p90/p99/p99.9 of a delay CSV (column 1), any size, streamed
+  python3 hol_delay_ms.py gnb.log --relative-time | python3 stream_stats.py summary - --column 1
+
+  # per-second percentiles + CDF table, save histogram for later merging
+  python3 stream_stats.py summary delay.txt --window-s 1 --cdf cdf.csv --save run1.hist.json
+
+  # merge runs / UEs
+  python3 stream_stats.py merge run*.hist.json --save all.hist.json
+
+  # bootstrap CI of QRT percentiles across runs (batch_qrt.py output)
+  python3 stream_stats.py bootstrap qrt_all.csv --group-column run --column qrt_s --scale 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from log_io import open_log
+
+DEFAULT_QUANTILES = (50.0, 90.0, 99.0, 99.9)
+DEFAULT_PRECISION_BITS = 10  # ~0.1% relative error
+DEFAULT_UNIT = 0.001
+
+
+class LogHistogram:
+    """
+    Sparse log-linear histogram. Values v are quantized to n = round(v / unit);
+    |n| < 2^p is exact, larger |n| keeps its p most significant bits.
+    """
+
+    __slots__ = ("unit", "precision_bits", "counts", "count", "total", "min", "max")
+
+    def __init__(self, unit: float = DEFAULT_UNIT, precision_bits: int = DEFAULT_PRECISION_BITS) -> None:
+        if unit <= 0:
+            raise ValueError("unit must be > 0")
+        if not 1 <= precision_bits <= 30:
+            raise ValueError("precision_bits must be in 1..30")
+        self.unit = unit
+        self.precision_bits = precision_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # --- bucketing ---
+
+    def _index(self, n: int) -> int:
+        if n < 0:
+            return -self._index(-n) - 1
+        p = self.precision_bits
+        shift = n.bit_length() - p
+        if shift <= 0:
+            return n
+        return (shift << (p - 1)) + (n >> shift)
+
+    def _bucket_bounds(self, idx: int) -> Tuple[float, float]:
+        """[lo, hi] in value units for a bucket index."""
+        if idx < 0:
+            lo, hi = self._bucket_bounds(-idx - 1)
+            return -hi, -lo
+        p = self.precision_bits
+        half = 1 << (p - 1)
+        if idx < (1 << p):
+            return idx * self.unit, idx * self.unit
+        shift = (idx >> (p - 1)) - 1
+        mant = idx - (shift << (p - 1))
+        lo = mant << shift
+        return lo * self.unit, (lo + (1 << shift) - 1) * self.unit
+
+    def _bucket_value(self, idx: int) -> float:
+        lo, hi = self._bucket_bounds(idx)
+        return (lo + hi) / 2.0
+
+    # --- updates ---
+
+    def add(self, value: float, weight: int = 1) -> None:
+        idx = self._index(int(round(value / self.unit)))
+        self.counts[idx] = self.counts.get(idx, 0) + weight
+        self.count += weight
+        self.total += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def update(self, values: Iterable[float]) -> None:
+        # Hot path for 1e8+ samples: locals only, no per-sample method calls
+        # for the common non-negative case.
+        counts = self.counts
+        unit = self.unit
+        p = self.precision_bits
+        n_add = 0
+        total = 0.0
+        vmin, vmax = self.min, self.max
+        for v in values:
+            n = int(round(v / unit))
+            if n < 0:
+                idx = self._index(n)
+            else:
+                shift = n.bit_length() - p
+                idx = n if shift <= 0 else (shift << (p - 1)) + (n >> shift)
+            counts[idx] = counts.get(idx, 0) + 1
+            n_add += 1
+            total += v
+            if v < vmin:
+                vmin = v
+            if v > vmax:
+                vmax = v
+        self.count += n_add
+        self.total += total
+        self.min, self.max = vmin, vmax
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        if other.unit != self.unit or other.precision_bits != self.precision_bits:
+            raise ValueError("cannot merge histograms with different unit/precision")
+        for idx, c in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + c
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # --- queries ---
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def _sorted_buckets(self) -> List[Tuple[int, int]]:
+        return sorted(self.counts.items())
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """Values at percentiles qs (0..100); exact min/max at the ends."""
+        if not self.count:
+            return [math.nan for _ in qs]
+        buckets = self._sorted_buckets()
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out = [math.nan] * len(qs)
+        cum = 0
+        b = 0
+        for i in order:
+            q = qs[i]
+            if q <= 0:
+                out[i] = self.min
+                continue
+            if q >= 100:
+                out[i] = self.max
+                continue
+            rank = q / 100.0 * self.count
+            while b < len(buckets) and cum + buckets[b][1] < rank:
+                cum += buckets[b][1]
+                b += 1
+            idx = buckets[min(b, len(buckets) - 1)][0]
+            out[i] = min(max(self._bucket_value(idx), self.min), self.max)
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def cdf(self) -> Iterator[Tuple[float, int, float]]:
+        """(bucket upper value, cumulative count, cumulative fraction) per bucket."""
+        cum = 0
+        for idx, c in self._sorted_buckets():
+            cum += c
+            yield min(self._bucket_bounds(idx)[1], self.max), cum, cum / self.count
+
+    # --- persistence ---
+
+    def to_dict(self) -> dict:
+        return {
+            "unit": self.unit,
+            "precision_bits": self.precision_bits,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "counts": [[idx, c] for idx, c in self._sorted_buckets()],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LogHistogram":
+        h = cls(unit=float(d["unit"]), precision_bits=int(d["precision_bits"]))
+        h.counts = {int(idx): int(c) for idx, c in d["counts"]}
+        h.count = int(d["count"])
+        h.total = float(d["total"])
+        h.min = math.inf if d.get("min") is None else float(d["min"])
+        h.max = -math.inf if d.get("max") is None else float(d["max"])
+        return h
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "LogHistogram":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class WindowedHistograms:
+    """One LogHistogram per fixed time window (bounded memory per window)."""
+
+    def __init__(self, window_s: float, unit: float = DEFAULT_UNIT,
+                 precision_bits: int = DEFAULT_PRECISION_BITS) -> None:
+        if window_s <= 0:
+            raise ValueError("window_s must be > 0")
+        self.window_s = window_s
+        self.unit = unit
+        self.precision_bits = precision_bits
+        self.windows: Dict[int, LogHistogram] = {}
+
+    def add(self, t_s: float, value: float) -> None:
+        w = int(math.floor(t_s / self.window_s))
+        h = self.windows.get(w)
+        if h is None:
+            h = self.windows[w] = LogHistogram(self.unit, self.precision_bits)
+        h.add(value)
+
+    def items(self) -> Iterator[Tuple[float, LogHistogram]]:
+        for w in sorted(self.windows):
+            yield w * self.window_s, self.windows[w]
+
+
+def bootstrap_ci(
+    groups: Sequence[LogHistogram],
+    qs: Sequence[float],
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> List[Tuple[float, float, float]]:
+    """
+    Cluster bootstrap over groups (runs): resample groups with replacement,
+    merge, take the percentiles. Returns (estimate, lo, hi) per q.
+    """
+    if not groups:
+        raise ValueError("bootstrap needs at least one group")
+    rng = random.Random(seed)
+    pooled = LogHistogram(groups[0].unit, groups[0].precision_bits)
+    for g in groups:
+        pooled.merge(g)
+    estimates = pooled.quantiles(qs)
+
+    draws: List[List[float]] = [[] for _ in qs]
+    for _ in range(n_boot):
+        h = LogHistogram(groups[0].unit, groups[0].precision_bits)
+        for _ in range(len(groups)):
+            h.merge(groups[rng.randrange(len(groups))])
+        for i, v in enumerate(h.quantiles(qs)):
+            draws[i].append(v)
+
+    alpha = (1.0 - confidence) / 2.0
+    out: List[Tuple[float, float, float]] = []
+    for i, est in enumerate(estimates):
+        d = sorted(draws[i])
+        lo = d[min(int(alpha * len(d)), len(d) - 1)]
+        hi = d[min(int((1.0 - alpha) * len(d)), len(d) - 1)]
+        out.append((est, lo, hi))
+    return out
+
+
+def format_summary(h: LogHistogram, qs: Sequence[float] = DEFAULT_QUANTILES) -> str:
+    """'n=.. mean=.. p50=.. ...' for '# ...' stderr stats lines."""
+    if not h.count:
+        return "n=0"
+    parts = [f"n={h.count}", f"min={h.min:.3f}", f"mean={h.mean:.3f}"]
+    for q, v in zip(qs, h.quantiles(qs)):
+        parts.append(f"p{q:g}={v:.3f}")
+    parts.append(f"max={h.max:.3f}")
+    return " ".join(parts)
+
+
+def report_stats(
+    label: str,
+    samples: Iterable[Tuple[float, float]],
+    stats_json: Optional[str] = None,
+    window_s: Optional[float] = None,
+    qs: Sequence[float] = DEFAULT_QUANTILES,
+) -> LogHistogram:
+    """
+    Extractor hook for --stats: samples are (rel_time_s, value). Prints
+    '# <label>: n=.. p50=..' (and one '# window ...' line per window) to stderr.
+    """
+    h = LogHistogram()
+    win = WindowedHistograms(window_s) if window_s else None
+    for t_s, v in samples:
+        h.add(v)
+        if win is not None:
+            win.add(t_s, v)
+    print(f"# {label}: {format_summary(h, qs)}", file=sys.stderr)
+    if win is not None:
+        for start, wh in win.items():
+            print(f"# window t={start:.3f}s {format_summary(wh, qs)}", file=sys.stderr)
+    if stats_json:
+        h.save(stats_json)
+    return h
+
+
+def add_stats_args(ap: argparse.ArgumentParser) -> None:
+    """--stats / --stats-window-s / --stats-json for the delay extractors."""
+    ap.add_argument(
+        "--stats",
+        action="store_true",
+        help="Also print p50/p90/p99/p99.9 of the delay column to stderr",
+    )
+    ap.add_argument(
+        "--stats-window-s",
+        type=float,
+        default=None,
+        help="With --stats: also per-window percentiles (seconds from base time)",
+    )
+    ap.add_argument(
+        "--stats-json",
+        default=None,
+        metavar="PATH",
+        help="Save the delay histogram for stream_stats.py merge",
+    )
+
+
+def parse_quantiles(text: str) -> List[float]:
+    qs = [float(x) for x in text.split(",") if x.strip()]
+    if not qs or any(q < 0 or q > 100 for q in qs):
+        raise ValueError("quantiles must be in 0..100")
+    return qs
+
+
+def _iter_csv(paths: Sequence[str]) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yield (header, fields) for each data row; header from the first non-numeric row."""
+    for path in paths:
+        header: List[str] = []
+        with open_log(path) as f:
+            for raw in f:
+                line = raw.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split(",")
+                if not header:
+                    try:
+                        float(parts[-1])
+                    except ValueError:
+                        header = [p.strip() for p in parts]
+                        continue
+                yield header, parts
+
+
+def _column_index(header: List[str], spec: str) -> int:
+    if spec.lstrip("-").isdigit():
+        return int(spec)
+    if spec not in header:
+        raise ValueError(f"column {spec!r} not in header {header}")
+    return header.index(spec)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Streaming percentiles / CDF / bootstrap CI.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--quantiles", default="50,90,99,99.9", help="comma list (default: 50,90,99,99.9)")
+        p.add_argument("--unit", type=float, default=DEFAULT_UNIT, help="value resolution (default: 0.001)")
+        p.add_argument("--precision-bits", type=int, default=DEFAULT_PRECISION_BITS)
+        p.add_argument("--scale", type=float, default=1.0, help="multiply values (e.g. 1000: s -> ms)")
+
+    p_sum = sub.add_parser("summary", help="percentiles of one CSV column")
+    p_sum.add_argument("csv", nargs="+", help="CSV file(s), .gz/.xz/.zst ok, - for stdin")
+    p_sum.add_argument("--column", default="1", help="value column name/index (default: 1)")
+    p_sum.add_argument("--time-column", default="0", help="time column for --window-s (default: 0)")
+    p_sum.add_argument("--window-s", type=float, default=None, help="also print per-window percentiles")
+    p_sum.add_argument("--cdf", default=None, help="write CDF table CSV")
+    p_sum.add_argument("--save", default=None, help="save histogram JSON (for merge/bootstrap)")
+    common(p_sum)
+
+    p_merge = sub.add_parser("merge", help="merge saved histograms")
+    p_merge.add_argument("hist", nargs="+")
+    p_merge.add_argument("--save", default=None)
+    p_merge.add_argument("--cdf", default=None)
+    p_merge.add_argument("--quantiles", default="50,90,99,99.9")
+
+    p_boot = sub.add_parser("bootstrap", help="bootstrap CI across groups (runs)")
+    p_boot.add_argument("csv", nargs="+")
+    p_boot.add_argument("--column", default="qrt_s")
+    p_boot.add_argument("--group-column", default="run")
+    p_boot.add_argument("--n-boot", type=int, default=1000)
+    p_boot.add_argument("--confidence", type=float, default=0.95)
+    p_boot.add_argument("--seed", type=int, default=None)
+    common(p_boot)
+
+    args = ap.parse_args()
+
+    try:
+        qs = parse_quantiles(args.quantiles)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        if args.cmd == "merge":
+            hists = [LogHistogram.load(p) for p in args.hist]
+            h = hists[0]
+            for other in hists[1:]:
+                h.merge(other)
+            if args.save:
+                h.save(args.save)
+            if args.cdf:
+                _write_cdf(h, args.cdf)
+            print(format_summary(h, qs))
+            return 0
+
+        if args.cmd == "summary":
+            h = LogHistogram(args.unit, args.precision_bits)
+            win = WindowedHistograms(args.window_s, args.unit, args.precision_bits) if args.window_s else None
+            col: Optional[int] = None
+            tcol: Optional[int] = None
+            scale = args.scale
+            batch: List[float] = []
+            for header, parts in _iter_csv(args.csv):
+                if col is None:
+                    col = _column_index(header, args.column)
+                    tcol = _column_index(header, args.time_column)
+                try:
+                    v = float(parts[col]) * scale
+                except (ValueError, IndexError):
+                    continue
+                if win is not None:
+                    win.add(float(parts[tcol]), v)
+                batch.append(v)
+                if len(batch) >= 65536:
+                    h.update(batch)
+                    batch.clear()
+            h.update(batch)
+            if not h.count:
+                print("ERROR: no numeric values", file=sys.stderr)
+                return 1
+            print(format_summary(h, qs))
+            if win is not None:
+                print("window_start_s,n," + ",".join(f"p{q:g}" for q in qs) + ",max")
+                for start, wh in win.items():
+                    vals = ",".join(f"{v:.3f}" for v in wh.quantiles(qs))
+                    print(f"{start:.6f},{wh.count},{vals},{wh.max:.3f}")
+            if args.cdf:
+                _write_cdf(h, args.cdf)
+            if args.save:
+                h.save(args.save)
+            return 0
+
+        groups: Dict[str, LogHistogram] = {}
+        col = gcol = None
+        for header, parts in _iter_csv(args.csv):
+            if col is None:
+                col = _column_index(header, args.column)
+                gcol = _column_index(header, args.group_column)
+            try:
+                v = float(parts[col]) * args.scale
+            except (ValueError, IndexError):
+                continue
+            g = groups.get(parts[gcol])
+            if g is None:
+                g = groups[parts[gcol]] = LogHistogram(args.unit, args.precision_bits)
+            g.add(v)
+        if not groups:
+            print("ERROR: no numeric values", file=sys.stderr)
+            return 1
+        ci = bootstrap_ci(list(groups.values()), qs, args.n_boot, args.confidence, args.seed)
+        print("quantile,estimate,ci_lo,ci_hi,groups,n")
+        n = sum(g.count for g in groups.values())
+        for q, (est, lo, hi) in zip(qs, ci):
+            print(f"p{q:g},{est:.3f},{lo:.3f},{hi:.3f},{len(groups)},{n}")
+        return 0
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+
+def _write_cdf(h: LogHistogram, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("value,cum_count,cdf\n")
+        for value, cum, frac in h.cdf():
+            f.write(f"{value:.6f},{cum},{frac:.6f}\n")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Shared row output for the extractors: CSV, TSV or a binary columnar file.
+
+Rows are buffered as tuples and written in chunks of CHUNK_ROWS: one
+template %-format per row and a single write() per chunk for csv / tsv, one
+array per column for bin. Timestamp columns are formatted per chunk with a
+per-second prefix cache instead of strftime() per row.
+
+Column formats:
+  "%.6f", "%d", "%s"  printf; bin stores float64 / int64 / utf-8 text
+  "iso"               datetime -> 2026-01-02T03:04:05.123456; bin: epoch us
+  "iso_us"            epoch us (int) -> the same text; bin: epoch us
+  "num"               float or None: integer if integral, else %g, "" for None
+  nullable=True       None -> "" (bin: NaN / INT64_MIN / "")
+
+Text values holding the separator, a quote or a newline are quoted the way
+the csv module does it (QUOTE_MINIMAL), in csv and tsv output.
+
+bin layout (little-endian): MAGIC, one JSON line {"columns": [{"name",
+"fmt", "type"}], "meta": {...}}, then chunks of <u32 rows> followed by
+every column (rows * 8 bytes; text as <u32 bytes> + NUL-joined utf-8).
+
+  python3 real_thro.py gnb.log --bin-ms 1 --format bin > thp.tbl
+  python3 table_io.py info thp.tbl
+  python3 table_io.py cat thp.tbl --format tsv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from rle_series import dt_to_us, us_to_dt
+
+FORMATS = ("csv", "tsv", "bin")
+MAGIC = b"QOSTBL1\n"
+CHUNK_ROWS = 65536
+INT64_NULL = -(2**63)
+_ROWS = struct.Struct("<I")
+_SWAP = sys.byteorder != "little"
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    fmt: str = "%s"
+    nullable: bool = False
+
+    @property
+    def type(self) -> str:
+        """bin storage: q (int64), d (float64) or str."""
+        if self.fmt in ("iso", "iso_us") or self.fmt.endswith("d"):
+            return "q"
+        if self.fmt == "num" or self.fmt[-1:] in ("f", "g", "e"):
+            return "d"
+        return "str"
+
+
+def _iso(ts: datetime) -> str:
+    if ts.tzinfo is None:
+        return ts.isoformat(timespec="microseconds")
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _iso_us_texts(values: Iterable[Optional[int]]) -> List[str]:
+    out: List[str] = []
+    sec_key = None
+    prefix = ""
+    for us in values:
+        if us is None or us == INT64_NULL:
+            out.append("")
+            continue
+        sec, frac = divmod(us, 1_000_000)
+        if sec != sec_key:
+            sec_key = sec
+            prefix = us_to_dt(sec * 1_000_000).strftime("%Y-%m-%dT%H:%M:%S.")
+        out.append(prefix + "%06d" % frac)
+    return out
+
+
+def _num(v: Optional[float]) -> str:
+    if v is None or v != v:
+        return ""
+    if abs(v - round(v)) < 1e-9:
+        return str(int(round(v)))
+    return f"{v:g}"
+
+
+def _quoter(sep: str, null: bool) -> Callable[[Sequence], List[str]]:
+    """Text column -> str list, csv-quoted where needed (checked once per chunk)."""
+    specials = (sep, '"', "\n", "\r")
+
+    def conv(vals: Sequence) -> List[str]:
+        texts = ["" if null and v is None else str(v) for v in vals]
+        if not any(c in "".join(texts) for c in specials):
+            return texts
+        return ['"' + t.replace('"', '""') + '"' if any(c in t for c in specials) else t for t in texts]
+
+    return conv
+
+
+def _text_converter(col: Column, sep: str) -> Optional[Callable[[Sequence], List[str]]]:
+    """Per-chunk column -> str list for the columns a plain % template cannot take."""
+    if col.type == "str" and col.fmt == "%s":
+        return _quoter(sep, col.nullable)
+    if col.fmt == "iso":
+        return lambda vals: ["" if v is None else _iso(v) for v in vals]
+    if col.fmt == "iso_us":
+        return _iso_us_texts
+    if col.fmt == "num":
+        return lambda vals: [_num(v) for v in vals]
+    if col.nullable:
+        f = col.fmt
+        null = INT64_NULL if col.type == "q" else None
+        return lambda vals: ["" if v is None or v == null or v != v else f % v for v in vals]
+    return None
+
+
+def _to_us(ts: Optional[datetime]) -> int:
+    if ts is None:
+        return INT64_NULL
+    return dt_to_us(ts.replace(tzinfo=None) if ts.tzinfo is not None else ts)
+
+
+class TableWriter:
+    """Buffered csv / tsv / bin writer; row() per record, close() (or with-block) at the end."""
+
+    def __init__(
+        self,
+        columns: Sequence[Column],
+        fmt: str = "csv",
+        out: Optional[TextIO] = None,
+        header: bool = True,
+        meta: Optional[dict] = None,
+        chunk_rows: int = CHUNK_ROWS,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown output format {fmt!r} (use {', '.join(FORMATS)})")
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.out = sys.stdout if out is None else out
+        self.chunk_rows = chunk_rows
+        self.count = 0
+        self._rows: List[tuple] = []
+        if fmt == "bin":
+            self._raw: BinaryIO = getattr(self.out, "buffer", self.out)
+            self.out.flush()
+            head = {
+                "columns": [{"name": c.name, "fmt": c.fmt, "type": c.type} for c in self.columns],
+                "meta": meta or {},
+            }
+            self._raw.write(MAGIC + json.dumps(head).encode("utf-8") + b"\n")
+            return
+        sep = "," if fmt == "csv" else "\t"
+        self._convert = [(i, conv) for i, c in enumerate(self.columns) if (conv := _text_converter(c, sep))]
+        converted = {i for i, _ in self._convert}
+        self._template = sep.join("%s" if i in converted else c.fmt for i, c in enumerate(self.columns)) + "\n"
+        if header:
+            self.out.write(sep.join(c.name for c in self.columns) + "\n")
+
+    def row(self, *values: object) -> None:
+        self._rows.append(values)
+        if len(self._rows) >= self.chunk_rows:
+            self.flush()
+
+    def rows(self, rows: Iterable[tuple]) -> None:
+        for r in rows:
+            self.row(*r)
+
+    def flush(self) -> None:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        self.count += len(rows)
+        if self.fmt == "bin":
+            self._write_chunk(rows)
+            return
+        if self._convert:
+            cols = list(zip(*rows))
+            for i, conv in self._convert:
+                cols[i] = conv(cols[i])
+            rows = zip(*cols)
+        tpl = self._template
+        self.out.write("".join([tpl % r for r in rows]))
+
+    def _write_chunk(self, rows: List[tuple]) -> None:
+        parts = [_ROWS.pack(len(rows))]
+        for c, vals in zip(self.columns, zip(*rows)):
+            if c.type == "str":
+                data = "\0".join("" if v is None else str(v) for v in vals).encode("utf-8")
+                parts += [_ROWS.pack(len(data)), data]
+                continue
+            if c.fmt == "iso":
+                vals = [_to_us(v) for v in vals]
+            elif c.type == "q" and c.nullable:
+                vals = [INT64_NULL if v is None else v for v in vals]
+            elif c.type == "d" and (c.nullable or c.fmt == "num"):
+                vals = [math.nan if v is None else v for v in vals]
+            a = array(c.type, vals)
+            if _SWAP:
+                a.byteswap()
+            parts.append(a.tobytes())
+        self._raw.write(b"".join(parts))
+
+    def close(self) -> None:
+        self.flush()
+        if self.fmt == "bin":
+            self._raw.flush()
+        else:
+            self.out.flush()
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def read_table(path: str) -> Tuple[List[Column], dict, Dict[str, list]]:
+    """bin file (or - for stdin) -> columns, meta, {name: values}; iso columns come back as epoch us."""
+    f = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a table_io bin file")
+        head = json.loads(f.readline())
+        columns = [Column(c["name"], "iso_us" if c["fmt"] == "iso" else c["fmt"]) for c in head["columns"]]
+        types = [c["type"] for c in head["columns"]]
+        data: Dict[str, list] = {c.name: [] for c in columns}
+        while True:
+            raw = f.read(_ROWS.size)
+            if not raw:
+                break
+            (n,) = _ROWS.unpack(raw)
+            for c, t in zip(columns, types):
+                if t == "str":
+                    (size,) = _ROWS.unpack(f.read(_ROWS.size))
+                    data[c.name].extend(f.read(size).decode("utf-8").split("\0") if n else [])
+                    continue
+                a = array(t)
+                a.frombytes(f.read(n * a.itemsize))
+                if _SWAP:
+                    a.byteswap()
+                data[c.name].extend(a)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+    return columns, head.get("meta", {}), data
+
+
+def add_format_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="Row output: csv (default), tsv or bin (columnar, see table_io.py)",
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Inspect bin tables written with --format bin.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_info = sub.add_parser("info", help="columns, rows and meta")
+    p_info.add_argument("path")
+    p_cat = sub.add_parser("cat", help="dump as CSV / TSV")
+    p_cat.add_argument("path")
+    p_cat.add_argument("--format", choices=("csv", "tsv"), default="csv")
+    p_cat.add_argument("--no-header", action="store_true")
+    args = ap.parse_args()
+
+    try:
+        columns, meta, data = read_table(args.path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    rows = len(data[columns[0].name]) if columns else 0
+    if args.cmd == "info":
+        print(f"rows={rows} meta={json.dumps(meta)}")
+        for c in columns:
+            print(f"  {c.name}: {c.type} ({c.fmt})")
+        return 0
+
+    # nulls are stored as NaN / INT64_NULL: print them as empty fields
+    columns = [Column(c.name, c.fmt, nullable=c.type != "str") for c in columns]
+    with TableWriter(columns, args.format, header=not args.no_header) as w:
+        w.rows(zip(*(data[c.name] for c in columns)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Shared UE selection for the extractors: --ue N, --ues 0-63,70 (or all).
+
+Replaces the per-script UE_FLAG_NAMES = ("ue0", ... "ue3") flags; --ue0 ..
+--ue3 are still accepted where scripts used them. A UE set of None means
+"every UE in the log". Extractors filter with ue_wanted() while reading and
+split the result with group_by_ue() / per_ue(), so any number of UEs is one
+pass.
+
+  python3 real_thro.py gnb.log --ues 0-63 --bin-ms 500 --relative-time
+  python3 prio.py gnb.log --ues all
+  python3 ue_select.py 0-3,8,10-11        # -> 0,1,2,3,8,10,11
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+ALL_UES = ("all", "*")
+LEGACY_UE_FLAGS = ("ue0", "ue1", "ue2", "ue3")
+
+
+def parse_ue_spec(spec: str) -> Optional[Set[int]]:
+    """'0-63,70,72-75' -> {0..63, 70, 72..75}; 'all' / '*' -> None."""
+    text = spec.strip().lower()
+    if text in ALL_UES:
+        return None
+    ues: Set[int] = set()
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if part.startswith("ue"):
+            part = part[2:]
+        lo, sep, hi = part.partition("-")
+        try:
+            a = int(lo)
+            b = int(hi) if sep else a
+        except ValueError:
+            raise ValueError(f"invalid UE range {part!r} in {spec!r}") from None
+        if a < 0 or b < a:
+            raise ValueError(f"invalid UE range {part!r} in {spec!r}")
+        ues.update(range(a, b + 1))
+    if not ues:
+        raise ValueError(f"empty UE set: {spec!r}")
+    return ues
+
+
+def _ue_spec_type(spec: str) -> Optional[Set[int]]:
+    try:
+        return parse_ue_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def add_ue_args(
+    ap: argparse.ArgumentParser,
+    default: Optional[int] = 0,
+    legacy_flags: bool = False,
+    help_default: Optional[str] = None,
+) -> None:
+    """--ue N / --ues SPEC (+ --ue0..--ue3 when legacy_flags)."""
+    dflt = help_default or ("all UEs" if default is None else f"{default}")
+    ap.add_argument("--ue", type=int, default=None, help=f"UE index to extract (default: {dflt})")
+    ap.add_argument(
+        "--ues",
+        type=_ue_spec_type,
+        default=argparse.SUPPRESS,
+        metavar="SPEC",
+        help="UE set, e.g. 0-63 or 0,2,5-7 or all (overrides --ue)",
+    )
+    if legacy_flags:
+        for name in LEGACY_UE_FLAGS:
+            ap.add_argument(f"--{name}", action="store_true", help=f"Include UE{int(name[2:])}")
+    ap.set_defaults(_ue_default=default)
+
+
+def resolve_ue_set(args: argparse.Namespace) -> Optional[Set[int]]:
+    """--ues > --ueN flags > --ue > script default; None = all UEs."""
+    if hasattr(args, "ues"):
+        return args.ues
+    selected = {int(n[2:]) for n in LEGACY_UE_FLAGS if getattr(args, n, False)}
+    if selected:
+        return selected
+    if args.ue is not None:
+        return {args.ue}
+    default = getattr(args, "_ue_default", 0)
+    return None if default is None else {default}
+
+
+def ue_wanted(ue_set: Optional[Set[int]], ue: int) -> bool:
+    return ue_set is None or ue in ue_set
+
+
+def is_multi_ue(ue_set: Optional[Set[int]]) -> bool:
+    """True when output needs a ue column."""
+    return ue_set is None or len(ue_set) > 1
+
+
+def format_ue_set(ue_set: Optional[Set[int]]) -> str:
+    """'UE0', 'UE0-63', 'UE0-3,UE8' or 'any UE' (messages)."""
+    if ue_set is None:
+        return "any UE"
+    vals = sorted(ue_set)
+    runs: List[Tuple[int, int]] = []
+    start = prev = vals[0]
+    for v in vals[1:]:
+        if v == prev + 1:
+            prev = v
+            continue
+        runs.append((start, prev))
+        start = prev = v
+    runs.append((start, prev))
+    return ",".join(f"UE{a}" if a == b else f"UE{a}-{b}" for a, b in runs)
+
+
+def group_by_ue(items: Iterable[T], key: Optional[Callable[[T], int]] = None) -> Dict[int, List[T]]:
+    """Split items by UE (default: item.ue), keeping their order; keys sorted."""
+    get = key or attrgetter("ue")
+    out: Dict[int, List[T]] = {}
+    for it in items:
+        out.setdefault(get(it), []).append(it)
+    return {ue: out[ue] for ue in sorted(out)}
+
+
+def per_ue(
+    items: Iterable[T], fn: Callable[[List[T]], List[R]], ts: Callable[[R], object] = attrgetter("ts")
+) -> List[R]:
+    """Run a per-UE transform (change detection, binning, dedup) and merge by time."""
+    out: List[R] = []
+    for group in group_by_ue(items).values():
+        out.extend(fn(group))
+    out.sort(key=ts)
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Expand a UE set spec (as accepted by --ues).")
+    ap.add_argument("spec", help="e.g. 0-63 or 0,2,5-7")
+    args = ap.parse_args()
+    try:
+        ues = parse_ue_spec(args.spec)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    print("all" if ues is None else ",".join(str(u) for u in sorted(ues)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,7 +16,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Set
+
+from log_io import open_log
+from stream_stats import add_stats_args, report_stats
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 DELAY_RE = re.compile(
@@ -42,19 +46,19 @@ def parse_time_arg(value: str, date_fallback: datetime | None) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = DELAY_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -76,7 +80,7 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract UL queueing delay from UL-DELAY-WEIGHT logs.")
     ap.add_argument("log_file", help="Path to scheduler log file")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -85,11 +89,13 @@ def main() -> int:
     )
     ap.add_argument("--relative-time", action="store_true", help="Output relative seconds")
     ap.add_argument("--no-header", action="store_true", help="Print only rows without header")
+    add_stats_args(ap)
     args = ap.parse_args()
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
     if not entries:
-        print(f"No UL-DELAY-WEIGHT entries found for UE{args.ue} in {args.log_file}", file=sys.stderr)
+        print(f"No UL-DELAY-WEIGHT entries found for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -97,19 +103,29 @@ def main() -> int:
     else:
         base = entries[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,ul_queue_delay_ms_sum")
+            print(f"rel_time_s{ue_col},ul_queue_delay_ms_sum")
         else:
-            print("timestamp,ul_queue_delay_ms_sum")
+            print(f"timestamp{ue_col},ul_queue_delay_ms_sum")
 
     for e in entries:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.queue_ms:.3f}")
+            print(f"{rel_s:.6f}{ue_f},{e.queue_ms:.3f}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.queue_ms:.3f}")
-
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.queue_ms:.3f}")
+
+    if args.stats or args.stats_json:
+        report_stats(
+            "ul_queue_delay_ms_sum",
+            (((e.ts - base).total_seconds(), e.queue_ms) for e in entries),
+            stats_json=args.stats_json,
+            window_s=args.stats_window_s,
+        )
     return 0
 
 
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Extract slot,dscp_new from QRT-PROF GNB_SCHED_SLOT log lines."""
+"""Extract slot,dscp_new,timestamp from QRT-PROF GNB_SCHED_SLOT log lines."""
 
 from __future__ import annotations
 
@@ -7,26 +7,31 @@ import argparse
 import re
 import sys
 
+from log_io import open_log
+
 GNB_RE = re.compile(
     r"QRT-PROF GNB_SCHED_SLOT\b.*?dscp_new=(?P<dscp>\d+)\b.*?slot=(?P<slot>\d+)\b"
 )
+TS_RE = re.compile(r"^(?:\d+:)?\s*(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+)")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser(description=__doc__)
-    ap.add_argument("log", help="gNB log file (or - for stdin)")
+    ap.add_argument("log", help="gNB log file (.gz/.xz/.zst ok, or - for stdin)")
     ap.add_argument("-o", "--output", help="output CSV path (default: stdout)")
     args = ap.parse_args()
 
-    inf = sys.stdin if args.log == "-" else open(args.log, "r", encoding="utf-8", errors="replace")
+    inf = open_log(args.log)
     outf = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
 
     try:
-        outf.write("slot,dscp_new\n")
+        outf.write("slot,dscp_new,timestamp\n")
         for line in inf:
             m = GNB_RE.search(line)
             if m:
-                outf.write(f"{m.group('slot')},{m.group('dscp')}\n")
+                t = TS_RE.match(line)
+                ts = t.group(1) if t else ""
+                outf.write(f"{m.group('slot')},{m.group('dscp')},{ts}\n")
     finally:
         if args.log != "-":
             inf.close()
@@ -8,6 +8,7 @@ Features:
   - Emit only rows where prio_weight changes from previous value
   - Optional --start-time filtering (full ISO or time-only)
   - Optional --relative-time output (seconds from base time)
+  - Optional --runs: one row per constant run (start,end,duration) via rle_series
 """
 
 from __future__ import annotations
@@ -17,7 +18,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Set
+
+from log_io import open_log
+from rle_series import add_runs_args, change_items, epsilon_same, print_runs, report_run_stats, series_by_ue
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 UL_PRIO_RE = re.compile(
@@ -45,19 +50,19 @@ def parse_time_arg(value: str, date_fallback: datetime | None) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = UL_PRIO_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -90,25 +95,10 @@ def filter_excluded(entries: List[Entry], exclude_value: float | None, tol: floa
     return [e for e in entries if abs(e.prio_weight - exclude_value) > tol]
 
 
-def extract_changes(entries: List[Entry], epsilon: float) -> List[Entry]:
-    if not entries:
-        return []
-
-    out: List[Entry] = []
-    prev = entries[0].prio_weight
-    out.append(entries[0])
-
-    for e in entries[1:]:
-        if abs(e.prio_weight - prev) > epsilon:
-            out.append(e)
-            prev = e.prio_weight
-    return out
-
-
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract UL prio_weight change events from scheduler logs with seq.")
     ap.add_argument("log_file", help="Path to scheduler log file")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -134,6 +124,7 @@ def main() -> int:
         default=1e-12,
         help="Absolute tolerance for --exclude-prio-weight comparison (default: 1e-12)",
     )
+    add_runs_args(ap)
     ap.add_argument("--no-header", action="store_true", help="Print only rows without header")
     args = ap.parse_args()
 
@@ -144,15 +135,18 @@ def main() -> int:
         print("ERROR: --exclude-tol must be >= 0", file=sys.stderr)
         return 2
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
     entries = filter_excluded(entries, args.exclude_prio_weight, args.exclude_tol)
     if not entries:
-        print(f"No UL priority entries found for UE{args.ue} after filtering in {args.log_file}", file=sys.stderr)
+        print(f"No UL priority entries found for {format_ue_set(ue_set)} after filtering in {args.log_file}", file=sys.stderr)
         return 1
 
-    rows = extract_changes(entries, args.epsilon)
+    # One run per prio_weight value (within --epsilon); the change rows are the first entry of each run.
+    series = series_by_ue(entries, lambda e: e.prio_weight, epsilon_same(args.epsilon))
+    rows = change_items(series)
     if not rows:
-        print(f"No UL prio_weight changes found for UE{args.ue}", file=sys.stderr)
+        print(f"No UL prio_weight changes found for {format_ue_set(ue_set)}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -160,18 +154,29 @@ def main() -> int:
     else:
         base = rows[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
+    if args.run_stats:
+        report_run_stats(series, "prio_weight")
+    if args.runs:
+        print_runs(
+            series, "prio_weight", lambda v: f"{v:.6f}", base if args.relative_time else None, multi_ue, args.no_header
+        )
+        return 0
+
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,seq,prio_weight")
+            print(f"rel_time_s{ue_col},seq,prio_weight")
         else:
-            print("timestamp,seq,prio_weight")
+            print(f"timestamp{ue_col},seq,prio_weight")
 
     for e in rows:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.seq},{e.prio_weight:.6f}")
+            print(f"{rel_s:.6f}{ue_f},{e.seq},{e.prio_weight:.6f}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.seq},{e.prio_weight:.6f}")
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.seq},{e.prio_weight:.6f}")
 
     return 0
 
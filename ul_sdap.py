@@ -19,7 +19,10 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, List, TextIO
+from typing import Iterable, List, Set, TextIO
+
+from log_io import open_log
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, per_ue, resolve_ue_set, ue_wanted
 
 
 SDAP_DSCP_RE = re.compile(
@@ -52,7 +55,7 @@ def parse_time_arg(value: str, date_fallback: datetime | None) -> datetime:
 
 def parse_lines(
     lines: Iterable[str],
-    ue_filter: int,
+    ue_filter: Set[int] | None,
     direction: str | None,
     start_time: str | None = None,
 ) -> List[Entry]:
@@ -66,7 +69,7 @@ def parse_lines(
             continue
 
         ue = int(m.group("ue"))
-        if ue != ue_filter:
+        if not ue_wanted(ue_filter, ue):
             continue
 
         dir_ = m.group("dir")
@@ -90,8 +93,8 @@ def parse_lines(
     return entries
 
 
-def parse_entries(log_path: str, ue_filter: int, direction: str | None, start_time: str | None = None) -> List[Entry]:
-    with open(log_path, encoding="utf-8", errors="replace") as f:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, direction: str | None, start_time: str | None = None) -> List[Entry]:
+    with open_log(log_path) as f:
         return parse_lines(f, ue_filter, direction, start_time)
 
 
@@ -114,7 +117,7 @@ def extract_changes(entries: List[Entry], per_direction: bool) -> List[Entry]:
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract DSCP and time from SDAP STEP1-SDAP logs.")
     ap.add_argument("log_file", help="Log file path, or '-' for stdin")
-    ap.add_argument("--ue", type=int, default=0, help="UE index (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--direction",
         choices=("DL", "UL"),
@@ -144,22 +147,23 @@ def main() -> int:
     ap.add_argument("--min-pdu-len", type=int, default=0, help="Ignore pdu_len below this")
     args = ap.parse_args()
 
+    ue_set = resolve_ue_set(args)
     if args.log_file == "-":
-        entries = parse_lines(sys.stdin, args.ue, args.direction, args.start_time)
+        entries = parse_lines(sys.stdin, ue_set, args.direction, args.start_time)
     else:
-        entries = parse_entries(args.log_file, args.ue, args.direction, args.start_time)
+        entries = parse_entries(args.log_file, ue_set, args.direction, args.start_time)
 
     if args.min_pdu_len > 0:
         entries = [e for e in entries if e.pdu_len >= args.min_pdu_len]
 
     if not entries:
-        print(f"No SDAP DSCP entries for UE{args.ue}", file=sys.stderr)
+        print(f"No SDAP DSCP entries for {format_ue_set(ue_set)}", file=sys.stderr)
         return 1
 
     changes_only = args.changes_only and not args.all
-    rows = extract_changes(entries, args.per_direction) if changes_only else entries
+    rows = per_ue(entries, lambda g: extract_changes(g, args.per_direction)) if changes_only else entries
     if not rows:
-        print(f"No DSCP changes for UE{args.ue}", file=sys.stderr)
+        print(f"No DSCP changes for {format_ue_set(ue_set)}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -167,18 +171,21 @@ def main() -> int:
     else:
         base = rows[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,direction,dscp,pdu_len")
+            print(f"rel_time_s{ue_col},direction,dscp,pdu_len")
         else:
-            print("timestamp,direction,dscp,pdu_len")
+            print(f"timestamp{ue_col},direction,dscp,pdu_len")
 
     for e in rows:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.direction},{e.dscp},{e.pdu_len}")
+            print(f"{rel_s:.6f}{ue_f},{e.direction},{e.dscp},{e.pdu_len}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.direction},{e.dscp},{e.pdu_len}")
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.direction},{e.dscp},{e.pdu_len}")
 
     return 0
 
@@ -3,6 +3,9 @@ import argparse
 import re
 from datetime import datetime
 
+from log_io import open_log
+from ue_select import add_ue_args, resolve_ue_set, ue_wanted
+
 
 LINE_RE = re.compile(
     r"(?P<ts>\d{4}-\d{2}-\d{2}T(?P<tod>\d{2}:\d{2}:\d{2}\.\d+)).*"
@@ -14,7 +17,7 @@ LINE_RE = re.compile(
 def parse_args():
     p = argparse.ArgumentParser(description="Extract UL-SR-BOOST logs.")
     p.add_argument("logfile", help="Path to gnb log or filtered UL-SR-BOOST log")
-    p.add_argument("--ue", type=int, default=None, help="Filter by UE index (e.g. 0)")
+    add_ue_args(p, default=None)
     p.add_argument("--start-time", default=None, help="HH:MM:SS.ffffff")
     p.add_argument("--relative-time", action="store_true", help="Print relative time in seconds")
     return p.parse_args()
@@ -37,18 +40,19 @@ def relative_seconds(cur_tod: str, start_dt: datetime) -> float:
 def main():
     args = parse_args()
     start_dt = parse_start_time(args.start_time)
+    ue_set = resolve_ue_set(args)
 
     header = ["time", "ue", "has_pending_sr", "avg_ul_rate", "estim_ul_rate"]
     print("\t".join(header))
 
-    with open(args.logfile, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(args.logfile) as f:
         for raw in f:
             m = LINE_RE.search(raw)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if args.ue is not None and ue != args.ue:
+            if not ue_wanted(ue_set, ue):
                 continue
 
             tod = m.group("tod")
@@ -17,7 +17,10 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Set
+
+from log_io import open_log
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, per_ue, resolve_ue_set, ue_wanted
 
 
 TPUT_RE = re.compile(
@@ -43,19 +46,19 @@ def parse_time_arg(value: str, date_fallback: datetime | None) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m = TPUT_RE.search(line)
             if not m:
                 continue
 
             ue = int(m.group("ue"))
-            if ue != ue_filter:
+            if not ue_wanted(ue_filter, ue):
                 continue
 
             ts = datetime.fromisoformat(m.group("ts"))
@@ -98,7 +101,7 @@ def aggregate_by_bin(entries: List[Entry], base: datetime, bin_ms: int) -> List[
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract UL throughput (Mbps) from UL-TPUT-1MS logs.")
     ap.add_argument("log_file", help="Path to scheduler log file")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -114,9 +117,10 @@ def main() -> int:
         print("ERROR: --bin-ms must be > 0", file=sys.stderr)
         return 2
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
     if not entries:
-        print(f"No UL-TPUT-1MS entries found for UE{args.ue} in {args.log_file}", file=sys.stderr)
+        print(f"No UL-TPUT-1MS entries found for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -124,20 +128,23 @@ def main() -> int:
     else:
         base = entries[0].ts
 
-    entries = aggregate_by_bin(entries, base, args.bin_ms)
+    entries = per_ue(entries, lambda g: aggregate_by_bin(g, base, args.bin_ms))
 
+    multi_ue = is_multi_ue(ue_set)
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,ul_brate_mbps")
+            print(f"rel_time_s{ue_col},ul_brate_mbps")
         else:
-            print("timestamp,ul_brate_mbps")
+            print(f"timestamp{ue_col},ul_brate_mbps")
 
     for e in entries:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.mbps:.2f}")
+            print(f"{rel_s:.6f}{ue_f},{e.mbps:.2f}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.mbps:.2f}")
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.mbps:.2f}")
 
     return 0
 
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Extract tti,dscp_new from QRT-PROF UE_SDAP_SLOT log lines."""
+"""Extract tti,dscp_new,timestamp from QRT-PROF UE_SDAP_SLOT log lines."""
 
 from __future__ import annotations
 
@@ -7,26 +7,31 @@ import argparse
 import re
 import sys
 
+from log_io import open_log
+
 UE_RE = re.compile(
     r"QRT-PROF UE_SDAP_SLOT\b.*?dscp_new=(?P<dscp>\d+)\b.*?tti=(?P<tti>\d+)\b"
 )
+TS_RE = re.compile(r"^(?:\d+:)?\s*(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+)")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser(description=__doc__)
-    ap.add_argument("log", help="UE log file (or - for stdin)")
+    ap.add_argument("log", help="UE log file (.gz/.xz/.zst ok, or - for stdin)")
     ap.add_argument("-o", "--output", help="output CSV path (default: stdout)")
     args = ap.parse_args()
 
-    inf = sys.stdin if args.log == "-" else open(args.log, "r", encoding="utf-8", errors="replace")
+    inf = open_log(args.log)
     outf = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
 
     try:
-        outf.write("tti,dscp_new\n")
+        outf.write("tti,dscp_new,timestamp\n")
         for line in inf:
             m = UE_RE.search(line)
             if m:
-                outf.write(f"{m.group('tti')},{m.group('dscp')}\n")
+                t = TS_RE.match(line)
+                ts = t.group(1) if t else ""
+                outf.write(f"{m.group('tti')},{m.group('dscp')},{ts}\n")
     finally:
         if args.log != "-":
             inf.close()
@@ -14,6 +14,7 @@ Supports:
   - --ue
   - --start-time (ISO or time-only)
   - --relative-time
+  - --dedup-consecutive / --runs / --run-stats (5QI as run-length series, see rle_series.py)
 """
 
 from __future__ import annotations
@@ -23,7 +24,11 @@ import re
 import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Set
+
+from log_io import open_log
+from rle_series import add_runs_args, change_items, print_runs, report_run_stats, series_by_ue
+from ue_select import add_ue_args, format_ue_set, is_multi_ue, resolve_ue_set, ue_wanted
 
 
 RE_RECEIVED = re.compile(
@@ -62,24 +67,24 @@ def _parse_five_qi(raw: str) -> int:
     return int(raw, 16) if raw.lower().startswith("0x") else int(raw)
 
 
-def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None) -> List[Entry]:
+def parse_entries(log_path: str, ue_filter: Set[int] | None, start_time: str | None = None) -> List[Entry]:
     entries: List[Entry] = []
     first_ts: datetime | None = None
     start_dt: datetime | None = None
 
-    # Timestamp from received line waiting for matching requested-flow line.
-    pending_received_ts: datetime | None = None
+    # Per UE: timestamp from received line waiting for matching requested-flow line.
+    pending_received_ts: Dict[int, datetime] = {}
 
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
             m_recv = RE_RECEIVED.search(line)
             if m_recv:
                 ue = int(m_recv.group("ue"))
-                if ue != ue_filter:
+                if not ue_wanted(ue_filter, ue):
                     continue
                 if int(m_recv.group("mod")) != 1:
                     # Ignore empty modifications (drb_mod_count=0).
-                    pending_received_ts = None
+                    pending_received_ts.pop(ue, None)
                     continue
 
                 ts = datetime.fromisoformat(m_recv.group("ts"))
@@ -88,10 +93,10 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
                 if start_time is not None and start_dt is None:
                     start_dt = _parse_start_time_arg(start_time, first_ts)
                 if start_dt is not None and ts < start_dt:
-                    pending_received_ts = None
+                    pending_received_ts.pop(ue, None)
                     continue
 
-                pending_received_ts = ts
+                pending_received_ts[ue] = ts
                 continue
 
             m_req = RE_REQUESTED.search(line)
@@ -99,56 +104,28 @@ def parse_entries(log_path: str, ue_filter: int, start_time: str | None = None)
                 continue
 
             ue = int(m_req.group("ue"))
-            if ue != ue_filter or pending_received_ts is None:
+            recv_ts = pending_received_ts.pop(ue, None)
+            if recv_ts is None:
                 continue
 
             raw = m_req.group("fiveqi")
             entries.append(
                 Entry(
-                    ts=pending_received_ts,
+                    ts=recv_ts,
                     ue=ue,
                     five_qi_raw=raw,
                     five_qi_dec=_parse_five_qi(raw),
                 )
             )
-            pending_received_ts = None
 
     entries.sort(key=lambda e: e.ts)
     return entries
 
 
-def dedup_consecutive(entries: List[Entry], mode: str = "first") -> List[Entry]:
-    if not entries:
-        return entries
-    if mode == "first":
-        out: List[Entry] = [entries[0]]
-        prev = entries[0].five_qi_dec
-        for e in entries[1:]:
-            if e.five_qi_dec == prev:
-                continue
-            out.append(e)
-            prev = e.five_qi_dec
-        return out
-
-    if mode == "last":
-        out: List[Entry] = []
-        current = entries[0]
-        for e in entries[1:]:
-            if e.five_qi_dec == current.five_qi_dec:
-                current = e
-                continue
-            out.append(current)
-            current = e
-        out.append(current)
-        return out
-
-    raise ValueError(f"Unsupported dedup mode: {mode}")
-
-
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract CU-UP QoS modify receive time + requested 5QI.")
     ap.add_argument("log_file", help="Path to CU log (e.g. gnb.log)")
-    ap.add_argument("--ue", type=int, default=0, help="UE index to extract (default: 0)")
+    add_ue_args(ap)
     ap.add_argument(
         "--start-time",
         type=str,
@@ -171,14 +148,18 @@ def main() -> int:
         default="first",
         help="When --dedup-consecutive is set: keep first or last row of each same-5QI run (default: first).",
     )
+    add_runs_args(ap)
     ap.add_argument("--no-header", action="store_true", help="Print only rows without header")
     args = ap.parse_args()
 
-    entries = parse_entries(args.log_file, args.ue, args.start_time)
+    ue_set = resolve_ue_set(args)
+    entries = parse_entries(args.log_file, ue_set, args.start_time)
+    # Runs of equal five_qi per UE; --dedup-consecutive keeps the first / last row of each run.
+    series = series_by_ue(entries, lambda e: e.five_qi_dec)
     if args.dedup_consecutive:
-        entries = dedup_consecutive(entries, args.dedup_mode)
+        entries = change_items(series, args.dedup_mode)
     if not entries:
-        print(f"No CU-UP QoS entries found for UE{args.ue} in {args.log_file}", file=sys.stderr)
+        print(f"No CU-UP QoS entries found for {format_ue_set(ue_set)} in {args.log_file}", file=sys.stderr)
         return 1
 
     if args.start_time is not None:
@@ -186,18 +167,27 @@ def main() -> int:
     else:
         base = entries[0].ts
 
+    multi_ue = is_multi_ue(ue_set)
+    if args.run_stats:
+        report_run_stats(series, "five_qi")
+    if args.runs:
+        print_runs(series, "five_qi", str, base if args.relative_time else None, multi_ue, args.no_header)
+        return 0
+
     if not args.no_header:
+        ue_col = ",ue" if multi_ue else ""
         if args.relative_time:
-            print("rel_time_s,five_qi_raw,five_qi_dec")
+            print(f"rel_time_s{ue_col},five_qi_raw,five_qi_dec")
         else:
-            print("timestamp,five_qi_raw,five_qi_dec")
+            print(f"timestamp{ue_col},five_qi_raw,five_qi_dec")
 
     for e in entries:
+        ue_f = f",{e.ue}" if multi_ue else ""
         if args.relative_time:
             rel_s = (e.ts - base).total_seconds()
-            print(f"{rel_s:.6f},{e.five_qi_raw},{e.five_qi_dec}")
+            print(f"{rel_s:.6f}{ue_f},{e.five_qi_raw},{e.five_qi_dec}")
         else:
-            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')},{e.five_qi_raw},{e.five_qi_dec}")
+            print(f"{e.ts.strftime('%Y-%m-%dT%H:%M:%S.%f')}{ue_f},{e.five_qi_raw},{e.five_qi_dec}")
 
     return 0
 
@@ -2,23 +2,49 @@
 """
 Parse UPF [UPF-DSCP] lines and emit DSCP vs time.
 
+The lines are logged per packet (N6-TUN-DL at line rate), so packets are
+aggregated while reading (UpfPacketStream): per-direction 1 ms DSCP counters
+and DSCP change events, no per-packet objects. Packets go through a
+--reorder-ms window (default 200 ms) and are aggregated in timestamp order,
+so raw rows, --changes and the bin base (earliest packet) are the same as for
+a fully sorted log as long as no line is logged later than that; packets
+behind the window are kept and counted as late= on stderr.
+
   grep "UPF-DSCP" upf.log > upf_dscp.log
   python3 extract_upf_dscp.py upf.log --bin-ms 500 --relative-time \\
       --start-time 18:59:39.866793 --year 2026
+  # only the DSCP transitions (what compute_qrt.py --signal upf uses)
+  python3 upf.py upfd.log --direction N6-TUN-DL --changes --relative-time \\
+      --start-time 18:59:39.866793 > upf.txt
+  # all bin sizes (1..1000 ms) from one pass, then zoom without re-reading
+  python3 upf.py upfd.log --pyramid upf.pyr.json.gz --bin-ms 500 > /dev/null
+  python3 upf.py --from-pyramid upf.pyr.json.gz --bin-ms 50 --bin-mode mode
+
+--format tsv|bin writes the rows as TSV or as a columnar table_io.py file
+(timestamps as epoch us) instead of CSV.
 """
 
 from __future__ import annotations
 
 import argparse
+import heapq
 import re
 import sys
 from collections import Counter
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from log_io import open_log
+from open5gs_time import Open5gsClock
+from profiling import ParseStats, add_profile_args, attach, session_from_args, stage
+from pyramid import Cell, Pyramid, add_pyramid_args, load_pyramids, merged_level, save_pyramids
+from rle_series import dt_to_us, us_to_dt
+from table_io import Column, TableWriter, add_format_args
 
 # Strip ANSI colour codes (some terminals / log collectors keep them).
 ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+UPF_MARKER = "UPF-DSCP"
 
 # Primary: user's open5gs gtp-path.c format.
 UPF_DSCP_FULL_RE = re.compile(
@@ -39,22 +65,7 @@ TIME_OF_DAY_RE = re.compile(r"(?P<t>\d{2}:\d{2}:\d{2}\.\d+)")
 DSCP_LOOSE_RE = re.compile(r"DSCP\s*=\s*(?P<dscp>\d+)", re.IGNORECASE)
 TOS_LOOSE_RE = re.compile(r"TOS\s*=\s*(?P<tos>0x[0-9a-fA-F]+)", re.IGNORECASE)
 DIR_LOOSE_RE = re.compile(r"\[UPF-DSCP\]\s*\[([^\]]+)\]", re.IGNORECASE)
-
-
-@dataclass
-class DscpSample:
-    ts: datetime
-    dscp: int
-    tos: int
-    direction: str
-
-
-@dataclass
-class ParseStats:
-    lines_read: int = 0
-    marker_hits: int = 0
-    parsed: int = 0
-    after_start_filter: int = 0
+REORDER_MS = 200
 
 
 def _parse_time_of_day(value: str) -> datetime.time:
@@ -70,14 +81,6 @@ def _parse_start_time(value: str, date_fallback: datetime) -> datetime:
     return datetime.combine(date_fallback.date(), t)
 
 
-def _combine_ts(date_mmdd: Optional[str], wall: str, year: int, fallback_date: datetime) -> datetime:
-    t = _parse_time_of_day(wall)
-    if date_mmdd:
-        month, day = map(int, date_mmdd.split("/"))
-        return datetime(year, month, day, t.hour, t.minute, t.second, t.microsecond)
-    return datetime.combine(fallback_date.date(), t)
-
-
 def _parse_iso_ts(value: str) -> datetime:
     v = value.replace("Z", "+00:00")
     if " " in v and "T" not in v:
@@ -90,25 +93,25 @@ def _resolve_timestamp(
     date_mmdd: Optional[str],
     wall: Optional[str],
     prefix_ts: Optional[str],
-    year: int,
-    fallback: datetime,
+    clock: Open5gsClock,
 ) -> datetime:
     if wall:
-        return _combine_ts(date_mmdd, wall, year, fallback)
+        return clock.decode_dt(date_mmdd, wall, prefix_ts)
     iso_m = ISO_TS_RE.search(line)
     if iso_m:
         return _parse_iso_ts(iso_m.group("iso"))
     if prefix_ts:
-        return _combine_ts(date_mmdd, prefix_ts, year, fallback)
+        return clock.decode_dt(date_mmdd, prefix_ts)
     tod_m = TIME_OF_DAY_RE.search(line)
     if tod_m:
-        return _combine_ts(date_mmdd, tod_m.group("t"), year, fallback)
+        return clock.decode_dt(date_mmdd, tod_m.group("t"))
     raise ValueError(f"no timestamp in line: {line[:120]!r}")
 
 
-def _parse_line(line: str, year: int, fallback: datetime) -> Optional[Tuple[datetime, int, int, str]]:
-    raw = ANSI_RE.sub("", line).rstrip("\n")
-    if "UPF-DSCP" not in raw:
+def _parse_line(line: str, clock: Open5gsClock) -> Optional[Tuple[datetime, int, int, str]]:
+    """Slow path for unusual layouts; line must already be ANSI-stripped."""
+    raw = line.rstrip("\n")
+    if UPF_MARKER not in raw:
         return None
 
     m = UPF_DSCP_FULL_RE.search(raw)
@@ -122,8 +125,7 @@ def _parse_line(line: str, year: int, fallback: datetime) -> Optional[Tuple[date
             m.group("date"),
             m.group("wall"),
             m.group("prefix_ts"),
-            year,
-            fallback,
+            clock,
         )
         return ts, dscp, tos, direction
 
@@ -144,99 +146,250 @@ def _parse_line(line: str, year: int, fallback: datetime) -> Optional[Tuple[date
         date_mmdd,
         wall_m.group("wall") if wall_m else None,
         prefix_m.group("prefix") if prefix_m else None,
-        year,
-        fallback,
+        clock,
     )
     return ts, dscp, tos, direction
 
 
-def parse_samples(
-    log_path: str,
-    start_time: Optional[str],
-    year: Optional[int],
-    direction: Optional[str],
-    stats: Optional[ParseStats] = None,
-) -> List[DscpSample]:
-    samples: List[DscpSample] = []
-    first_ts: Optional[datetime] = None
-    start_dt: Optional[datetime] = None
-    use_year = year or datetime.now().year
-    st = stats if stats is not None else ParseStats()
-
-    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            st.lines_read += 1
-            if "UPF-DSCP" in ANSI_RE.sub("", line):
-                st.marker_hits += 1
-
-            try:
-                parsed = _parse_line(line, use_year, first_ts or datetime.now())
-            except ValueError:
-                continue
-            if parsed is None:
-                continue
-
-            st.parsed += 1
-            ts, dscp, tos, dir_name = parsed
-            if direction is not None and dir_name != direction:
-                continue
-
-            if first_ts is None:
-                first_ts = ts
-            if start_time is not None and start_dt is None:
-                start_dt = _parse_start_time(start_time, ts)
-            if start_dt is not None and ts < start_dt:
-                continue
-
-            st.after_start_filter += 1
-            samples.append(DscpSample(ts=ts, dscp=dscp, tos=tos, direction=dir_name))
-
-    samples.sort(key=lambda s: s.ts)
-    return samples
-
-
-def bin_samples_last(samples: List[DscpSample], bin_ms: int, bin_base: datetime) -> List[tuple[int, int, int]]:
-    if not samples:
-        return []
-
-    by_bin: dict[int, DscpSample] = {}
-    last_idx = 0
-    for s in samples:
-        idx = int(max(0.0, (s.ts - bin_base).total_seconds() * 1000.0) // bin_ms)
-        by_bin[idx] = s
-        last_idx = max(last_idx, idx)
-
-    return [(idx, by_bin[idx].dscp, by_bin[idx].tos) for idx in range(0, last_idx + 1) if idx in by_bin]
-
-
-def bin_samples_mode(samples: List[DscpSample], bin_ms: int, bin_base: datetime) -> List[tuple[int, int, int]]:
-    if not samples:
-        return []
-
-    counts: dict[int, Counter[int]] = {}
-    last: dict[int, DscpSample] = {}
-    last_idx = 0
-    for s in samples:
-        idx = int(max(0.0, (s.ts - bin_base).total_seconds() * 1000.0) // bin_ms)
-        counts.setdefault(idx, Counter())[s.dscp] += 1
-        last[idx] = s
-        last_idx = max(last_idx, idx)
-
-    out: List[tuple[int, int, int]] = []
-    for idx in range(0, last_idx + 1):
-        if idx not in counts:
-            continue
-        dscp = counts[idx].most_common(1)[0][0]
-        out.append((idx, dscp, last[idx].tos))
-    return out
+class _MsBin:
+    """Packets of one direction in one 1 ms slot (relative to the bin base)."""
+
+    __slots__ = ("count", "last_us", "dscp", "tos", "counts")
+
+    def __init__(self, ts_us: int, dscp: int, tos: int) -> None:
+        self.count = 1
+        self.last_us = ts_us
+        self.dscp = dscp
+        self.tos = tos
+        self.counts: Optional[Dict[int, int]] = None  # only once a 2nd DSCP shows up
+
+    def add(self, ts_us: int, dscp: int, tos: int) -> None:
+        self.count += 1
+        if dscp != self.dscp or self.counts is not None:
+            if self.counts is None:
+                self.counts = {self.dscp: self.count - 1}
+            self.counts[dscp] = self.counts.get(dscp, 0) + 1
+        if ts_us >= self.last_us:
+            self.last_us = ts_us
+            self.dscp = dscp
+            self.tos = tos
+
+    def dscp_counts(self) -> Dict[int, int]:
+        return self.counts if self.counts is not None else {self.dscp: self.count}
 
 
-def _bin_base(start_time: Optional[str], samples: List[DscpSample]) -> datetime:
-    if not samples:
-        raise ValueError("no samples")
-    if start_time is not None:
-        return _parse_start_time(start_time, samples[0].ts)
-    return samples[0].ts
+@dataclass
+class DscpChange:
+    ts_us: int
+    direction: str
+    dscp: int
+    tos: int
+    prev_dscp: Optional[int]
+    prev_packets: int  # packets in the run that ended here
+
+
+class UpfPacketStream:
+    """
+    Online parser / aggregator for per-packet [UPF-DSCP] lines.
+
+    Each line is ANSI-stripped at most once and decoded with UPF_DSCP_FULL_RE;
+    the timestamp goes through Open5gsClock (date and second cached, midnight /
+    New Year rollover), so a packet costs one regex search and a few int() calls.
+    Packets are held in a heap for reorder_ms and released in (ts, log order);
+    released packets are not stored: they go into per-direction 1 ms DSCP
+    counters and per-direction change events (and to on_sample, if given, for
+    raw per-packet output). Call flush() after the last feed() (feed_file()
+    does).
+    """
+
+    def __init__(
+        self,
+        start_time: Optional[str],
+        year: Optional[int],
+        direction: Optional[str],
+        stats: Optional[ParseStats] = None,
+        on_sample: Optional[Callable[[int, int, int, str], None]] = None,
+        reorder_ms: int = REORDER_MS,
+    ) -> None:
+        self.start_time = start_time
+        self.clock = Open5gsClock(year)
+        self.direction = direction
+        self.stats = stats if stats is not None else ParseStats()
+        self.on_sample = on_sample
+        self.first_ts: Optional[datetime] = None
+        self.start_us: Optional[int] = None
+        self.base_us: Optional[int] = None  # bin base: --start-time or earliest kept packet
+        self.reorder_us = reorder_ms * 1000
+        self.late = 0  # packets released after a later one (beyond the reorder window)
+        self._pending: List[Tuple[int, int, int, int, str]] = []  # heap of (ts_us, seq, dscp, tos, dir)
+        self._seq = 0
+        self._max_us: Optional[int] = None
+        self._released_us: Optional[int] = None
+        self.ms_bins: Dict[str, Dict[int, _MsBin]] = {}
+        self.changes: List[DscpChange] = []
+        self.dscp_hist: Dict[str, Counter] = {}
+        self._cur: Dict[str, List] = {}  # direction -> [dscp, packets]
+
+    def _decode(self, line: str) -> Optional[Tuple[int, int, int, str]]:
+        m = UPF_DSCP_FULL_RE.search(line)
+        if m is not None:
+            tod = m.group("wall") or (
+                None if ISO_TS_RE.search(line) else m.group("prefix_ts")
+            )
+            if tod is not None and len(tod) > 9 and tod[8] == ".":
+                ref = m.group("prefix_ts") if m.group("wall") else None
+                ts_us = self.clock.decode(m.group("date"), tod, ref)
+                dscp = int(m.group("dscp"))
+                tos_s = m.group("tos")
+                tos = int(tos_s, 16) if tos_s else dscp << 2
+                return ts_us, dscp, tos, m.group("dir") or "unknown"
+        self.stats.fallback += 1
+        parsed = _parse_line(line, self.clock)
+        if parsed is None:
+            return None
+        ts, dscp, tos, dir_name = parsed
+        return dt_to_us(ts.replace(tzinfo=None)), dscp, tos, dir_name
+
+    def feed(self, line: str) -> None:
+        st = self.stats
+        st.lines_read += 1
+        if "\x1b" in line:
+            line = ANSI_RE.sub("", line)
+        if UPF_MARKER not in line:
+            return
+        st.marker_hits += 1
+        try:
+            parsed = self._decode(line)
+        except ValueError:
+            return
+        if parsed is None:
+            return
+
+        st.parsed += 1
+        ts_us, dscp, tos, dir_name = parsed
+        if self.direction is not None and dir_name != self.direction:
+            return
+
+        if self.first_ts is None:
+            self.first_ts = us_to_dt(ts_us)
+            if self.start_time is not None:
+                self.start_us = dt_to_us(_parse_start_time(self.start_time, self.first_ts).replace(tzinfo=None))
+        if self.start_us is not None and ts_us < self.start_us:
+            return
+
+        st.after_start_filter += 1
+        if self.reorder_us <= 0:
+            self._release(ts_us, dscp, tos, dir_name)
+            return
+        pending = self._pending
+        self._seq += 1
+        heapq.heappush(pending, (ts_us, self._seq, dscp, tos, dir_name))
+        if self._max_us is None or ts_us > self._max_us:
+            self._max_us = ts_us
+            horizon = ts_us - self.reorder_us
+            while pending[0][0] < horizon:
+                p_ts, _, p_dscp, p_tos, p_dir = heapq.heappop(pending)
+                self._release(p_ts, p_dscp, p_tos, p_dir)
+
+    def flush(self) -> None:
+        """Release the packets still held for reordering."""
+        pending = self._pending
+        while pending:
+            ts_us, _, dscp, tos, dir_name = heapq.heappop(pending)
+            self._release(ts_us, dscp, tos, dir_name)
+
+    def _release(self, ts_us: int, dscp: int, tos: int, dir_name: str) -> None:
+        if self._released_us is not None and ts_us < self._released_us:
+            self.late += 1
+        else:
+            self._released_us = ts_us
+        if self.base_us is None:
+            self.base_us = self.start_us if self.start_us is not None else ts_us
+        self._add(ts_us, dscp, tos, dir_name)
+        if self.on_sample is not None:
+            self.on_sample(ts_us, dscp, tos, dir_name)
+
+    def _add(self, ts_us: int, dscp: int, tos: int, dir_name: str) -> None:
+        ms = (ts_us - self.base_us) // 1000
+        bins = self.ms_bins.get(dir_name)
+        if bins is None:
+            bins = self.ms_bins[dir_name] = {}
+            self.dscp_hist[dir_name] = Counter()
+        b = bins.get(ms)
+        if b is None:
+            bins[ms] = _MsBin(ts_us, dscp, tos)
+        else:
+            b.add(ts_us, dscp, tos)
+        self.dscp_hist[dir_name][dscp] += 1
+
+        cur = self._cur.get(dir_name)
+        if cur is None or cur[0] != dscp:
+            self.changes.append(
+                DscpChange(ts_us, dir_name, dscp, tos, cur[0] if cur else None, cur[1] if cur else 0)
+            )
+            self._cur[dir_name] = [dscp, 1]
+        else:
+            cur[1] += 1
+
+    def feed_file(self, log_path: str) -> "UpfPacketStream":
+        with open_log(log_path) as f:
+            for line in f:
+                self.feed(line)
+        self.flush()
+        return self
+
+    @property
+    def packets(self) -> int:
+        return self.stats.after_start_filter
+
+    def histogram(self) -> Counter:
+        total: Counter = Counter()
+        for h in self.dscp_hist.values():
+            total.update(h)
+        return total
+
+    def bins(self, bin_ms: int, mode: str = "last") -> List[Tuple[int, int, int]]:
+        """(bin index, dscp, tos) per non-empty bin, all kept directions merged."""
+        merged: Dict[int, List[_MsBin]] = {}
+        for bins in self.ms_bins.values():
+            for ms, b in bins.items():
+                merged.setdefault(max(0, ms) // bin_ms, []).append(b)
+        out: List[Tuple[int, int, int]] = []
+        for idx in sorted(merged):
+            slots = sorted(merged[idx], key=lambda b: b.last_us)
+            last = slots[-1]
+            if mode == "mode":
+                counts: Counter = Counter()
+                for b in slots:
+                    counts.update(b.dscp_counts())
+                out.append((idx, counts.most_common(1)[0][0], last.tos))
+            else:
+                out.append((idx, last.dscp, last.tos))
+        return out
+
+    def pyramids(self) -> Dict[str, Pyramid]:
+        """Per-direction pyramids seeded with the 1 ms slots (last = (dscp, tos), mode key = dscp)."""
+        out: Dict[str, Pyramid] = {}
+        for dir_name, bins in self.ms_bins.items():
+            p = out[dir_name] = Pyramid(self.base_us)
+            for ms, b in bins.items():
+                c = Cell(0)
+                c.count = b.count
+                c.last_us, c.last = b.last_us, (b.dscp, b.tos)
+                c.counts = dict(b.dscp_counts())
+                p.add_cell(ms, c)
+        return out
+
+
+def bins_from_pyramid(
+    series: Dict[str, Pyramid], bin_ms: int, mode: str = "last"
+) -> List[Tuple[int, int, int]]:
+    """Same rows as UpfPacketStream.bins, served from stored per-direction pyramids."""
+    out: List[Tuple[int, int, int]] = []
+    for idx, c in merged_level(series.values(), bin_ms):
+        dscp, tos = c.last
+        out.append((idx, c.mode if mode == "mode" else dscp, tos))
+    return out
 
 
 def _print_no_match_help(log_path: str, stats: ParseStats) -> None:
@@ -254,18 +407,74 @@ def _print_no_match_help(log_path: str, stats: ParseStats) -> None:
         print("  No 'UPF-DSCP' in file — try: grep UPF-DSCP core.log | head", file=sys.stderr)
 
     try:
-        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        with open_log(log_path) as f:
             for line in f:
-                if "UPF-DSCP" in line:
+                if UPF_MARKER in line:
                     print(f"  example: {ANSI_RE.sub('', line).rstrip()[:200]}", file=sys.stderr)
                     break
     except OSError:
         pass
 
 
+def _writer(args: argparse.Namespace, extra: Tuple[Column, ...] = ()) -> TableWriter:
+    cols = [Column("rel_time_s", "%.6f") if args.relative_time else Column("timestamp", "iso_us"), Column("dscp", "%d")]
+    if args.include_tos:
+        cols.append(Column("tos", "%d"))
+    return TableWriter(cols + list(extra), args.format, header=not args.no_header)
+
+
+def _time_value(ts_us: int, base_us: int, relative: bool) -> float:
+    """rel_time_s (s from base) or the epoch us of an iso_us column."""
+    return (ts_us - base_us) / 1e6 if relative else ts_us
+
+
+def _serve_pyramid(args: argparse.Namespace) -> int:
+    """--from-pyramid: binned rows of the stored directions (--direction picks one)."""
+    try:
+        meta, series = load_pyramids(args.from_pyramid, tool="upf")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if args.direction is not None:
+        series = {d: p for d, p in series.items() if d == args.direction}
+        if meta.get("direction") is None:
+            # The grid is the one the file was written with (first packet of any direction).
+            print("# note: bins aligned to the all-direction base of the pyramid", file=sys.stderr)
+    if not series:
+        print(f"No [UPF-DSCP] bins in {args.from_pyramid}", file=sys.stderr)
+        return 1
+    try:
+        bins = bins_from_pyramid(series, args.bin_ms, args.bin_mode)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    base_us = next(iter(series.values())).base_us
+    step_us = args.bin_ms * 1000
+    with _writer(args) as out:
+        for idx, dscp, tos in bins:
+            t = _time_value(base_us + idx * step_us, base_us, args.relative_time)
+            if args.include_tos:
+                out.row(t, dscp, tos)
+            else:
+                out.row(t, dscp)
+
+    hist: Counter = Counter()
+    for p in series.values():
+        for _, c in p.level(p.levels_ms[-1]):
+            hist.update(c.counts or {})
+    print(
+        f"# bin_ms={args.bin_ms} bin_mode={args.bin_mode} "
+        f"lines={sum(p.samples for p in series.values())} bins={len(bins)} "
+        f"dscp_hist={dict(sorted(hist.items()))}",
+        file=sys.stderr,
+    )
+    return 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Extract [UPF-DSCP] DSCP vs time CSV")
-    ap.add_argument("log_file")
+    ap.add_argument("log_file", nargs="?", default=None)
     ap.add_argument("--bin-ms", type=int, default=None, help="Bin width (500 = 0.5s iperf step)")
     ap.add_argument(
         "--bin-mode",
@@ -273,80 +482,119 @@ def main() -> int:
         default="last",
         help="Per-bin DSCP: last sample or most common (default: last)",
     )
+    ap.add_argument(
+        "--changes",
+        action="store_true",
+        help="Emit only DSCP change events (first packet of each DSCP run, per direction)",
+    )
     ap.add_argument("--start-time", type=str, default=None, help="e.g. 18:59:39.866793 or ISO")
     ap.add_argument("--relative-time", action="store_true")
     ap.add_argument("--year", type=int, default=None, help="Year for MM/DD log prefix (default: today)")
     ap.add_argument("--direction", type=str, default=None, help="Filter e.g. N6-TUN-DL")
     ap.add_argument("--no-header", action="store_true")
     ap.add_argument("--include-tos", action="store_true", help="Add TOS column")
+    ap.add_argument(
+        "--reorder-ms",
+        type=int,
+        default=REORDER_MS,
+        help=f"Sort packets by timestamp within this window before aggregating (default: {REORDER_MS}; 0 = log order)",
+    )
+    add_pyramid_args(ap)
+    add_profile_args(ap)
+    add_format_args(ap)
     args = ap.parse_args()
+    with session_from_args(args):
+        return _run(args)
+
+
+def _run(args: argparse.Namespace) -> int:
+    if args.bin_ms is not None and args.bin_ms <= 0:
+        print("ERROR: --bin-ms must be > 0", file=sys.stderr)
+        return 2
+    if args.reorder_ms < 0:
+        print("ERROR: --reorder-ms must be >= 0", file=sys.stderr)
+        return 2
+    if args.bin_ms is not None and args.changes:
+        print("ERROR: --changes and --bin-ms are exclusive", file=sys.stderr)
+        return 2
+    if (args.log_file is None) == (args.from_pyramid is None):
+        print("ERROR: give either a log file or --from-pyramid", file=sys.stderr)
+        return 2
+    if args.from_pyramid is not None:
+        if args.bin_ms is None:
+            print("ERROR: --from-pyramid needs --bin-ms", file=sys.stderr)
+            return 2
+        return _serve_pyramid(args)
 
-    stats = ParseStats()
-    samples = parse_samples(args.log_file, args.start_time, args.year, args.direction, stats)
-    if not samples:
-        _print_no_match_help(args.log_file, stats)
-        return 1
-
-    bin_base = _bin_base(args.start_time, samples)
-
-    if not args.no_header:
+    def emit(out: TableWriter, ts_us: int, dscp: int, tos: int, *extra: object) -> None:
+        t = _time_value(ts_us, stream.base_us, args.relative_time)
         if args.include_tos:
-            cols = "rel_time_s,dscp,tos" if args.relative_time else "timestamp,dscp,tos"
+            out.row(t, dscp, tos, *extra)
         else:
-            cols = "rel_time_s,dscp" if args.relative_time else "timestamp,dscp"
-        print(cols)
+            out.row(t, dscp, *extra)
 
-    if args.bin_ms is not None:
-        if args.bin_ms <= 0:
-            print("ERROR: --bin-ms must be > 0", file=sys.stderr)
-            return 2
+    raw_out = args.bin_ms is None and not args.changes
+    raw_writer: Optional[TableWriter] = None
 
-        bins = (
-            bin_samples_mode(samples, args.bin_ms, bin_base)
-            if args.bin_mode == "mode"
-            else bin_samples_last(samples, args.bin_ms, bin_base)
-        )
-        step_s = args.bin_ms / 1000.0
-        for idx, dscp, tos in bins:
-            if args.relative_time:
-                rel = idx * step_s
-                if args.include_tos:
-                    print(f"{rel:.6f},{dscp},{tos}")
-                else:
-                    print(f"{rel:.6f},{dscp}")
-            else:
-                ts = bin_base + timedelta(milliseconds=idx * args.bin_ms)
-                ts_s = ts.strftime("%Y-%m-%dT%H:%M:%S.%f")
-                if args.include_tos:
-                    print(f"{ts_s},{dscp},{tos}")
-                else:
-                    print(f"{ts_s},{dscp}")
+    def on_sample(ts_us: int, dscp: int, tos: int, _dir: str) -> None:
+        # Raw per-packet rows are written as packets leave the reorder window; the header comes with the first one.
+        nonlocal raw_writer
+        if raw_writer is None:
+            raw_writer = _writer(args)
+        emit(raw_writer, ts_us, dscp, tos)
+
+    stats = attach(ParseStats())
+    stream = UpfPacketStream(
+        args.start_time, args.year, args.direction, stats, on_sample if raw_out else None, args.reorder_ms
+    )
+    with stage("read"):  # raw rows are written inside this stage
+        stream.feed_file(args.log_file)
+        if raw_writer is not None:
+            raw_writer.close()
+    if stream.packets == 0:
+        _print_no_match_help(args.log_file, stats)
+        return 1
 
-        dscp_counts = Counter(s.dscp for s in samples)
+    if args.pyramid is not None:
+        with stage("pyramid"):
+            save_pyramids(args.pyramid, "upf", stream.pyramids(), {"direction": args.direction})
+
+    hist = dict(sorted(stream.histogram().items()))
+    if stream.late:
+        print(f"# late={stream.late} (logged more than --reorder-ms={args.reorder_ms} after a later packet)", file=sys.stderr)
+    if raw_out:
+        print(f"# lines={stream.packets} dscp_hist={hist}", file=sys.stderr)
+        return 0
+
+    if args.changes:
+        multi_dir = len(stream.ms_bins) > 1
+        with stage("write"), _writer(args, (Column("direction"),) if multi_dir else ()) as out:
+            for c in stream.changes:
+                if multi_dir:
+                    emit(out, c.ts_us, c.dscp, c.tos, c.direction)
+                else:
+                    emit(out, c.ts_us, c.dscp, c.tos)
         print(
-            f"# bin_ms={args.bin_ms} bin_mode={args.bin_mode} "
-            f"lines={len(samples)} bins={len(bins)} "
-            f"dscp_hist={dict(sorted(dscp_counts.items()))}",
+            f"# lines={stream.packets} changes={len(stream.changes)} directions={','.join(stream.ms_bins)} "
+            f"dscp_hist={hist}",
             file=sys.stderr,
         )
-    else:
-        for s in samples:
-            if args.relative_time:
-                rel = (s.ts - bin_base).total_seconds()
-                if args.include_tos:
-                    print(f"{rel:.6f},{s.dscp},{s.tos}")
-                else:
-                    print(f"{rel:.6f},{s.dscp}")
-            else:
-                ts_s = s.ts.strftime("%Y-%m-%dT%H:%M:%S.%f")
-                if args.include_tos:
-                    print(f"{ts_s},{s.dscp},{s.tos}")
-                else:
-                    print(f"{ts_s},{s.dscp}")
+        return 0
 
-        dscp_counts = Counter(s.dscp for s in samples)
-        print(f"# lines={len(samples)} dscp_hist={dict(sorted(dscp_counts.items()))}", file=sys.stderr)
+    out = _writer(args)
+    with stage("bin"):
+        bins = stream.bins(args.bin_ms, args.bin_mode)
+    step_us = args.bin_ms * 1000
+    with stage("write"), out:
+        for idx, dscp, tos in bins:
+            emit(out, stream.base_us + idx * step_us, dscp, tos)
 
+    print(
+        f"# bin_ms={args.bin_ms} bin_mode={args.bin_mode} "
+        f"lines={stream.packets} bins={len(bins)} "
+        f"dscp_hist={hist}",
+        file=sys.stderr,
+    )
     return 0
 
 
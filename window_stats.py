@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Group-by-window statistics for per-record scheduler logs (priority.py,
+final_priority.py, extract_ue_priority.py).
+
+Every record gets an integer window id, (ts_us - origin_us) // window_us, and
+is folded into that window's count / sum / min / max in one pass; values are
+only kept when percentiles are asked for. Records may arrive in any order and
+the window size is arbitrary (0.001 s .. hours), no per-window rescans.
+
+  # 100 ms windows of two CSV columns (time in seconds), with p50/p99
+  python3 window_stats.py prio.csv --time-column t --columns prio_weight,pf_weight \\
+      --window-s 0.1 --quantiles 50,99
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sys
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from log_io import open_log
+
+PRIORITY_FIELDS = ("min_combined_prio", "prio_weight", "pf_weight", "gbr_weight", "delay_weight")
+
+
+class FieldStats:
+    """count / sum / min / max of one field in one window (+ values for percentiles)."""
+
+    __slots__ = ("count", "total", "min", "max", "values")
+
+    def __init__(self, keep_values: bool = False) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.values: Optional[List[float]] = [] if keep_values else None
+
+    def add(self, v: float) -> None:
+        self.count += 1
+        self.total += v
+        if v < self.min:
+            self.min = v
+        if v > self.max:
+            self.max = v
+        if self.values is not None:
+            self.values.append(v)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (q in 0..100); needs keep_values."""
+        if not self.values:
+            return math.nan
+        self.values.sort()
+        n = len(self.values)
+        rank = max(1, math.ceil(q / 100.0 * n))
+        return self.values[min(rank, n) - 1]
+
+
+class WindowStats:
+    __slots__ = ("wid", "count", "fields")
+
+    def __init__(self, wid: int, fields: Sequence[str], keep_values: bool) -> None:
+        self.wid = wid
+        self.count = 0
+        self.fields: Dict[str, FieldStats] = {f: FieldStats(keep_values) for f in fields}
+
+
+def window_stats(
+    rows: Iterable[Mapping],
+    ts_us: Callable[[Mapping], Optional[int]],
+    fields: Sequence[str],
+    window_us: int,
+    origin_us: int = 0,
+    keep_values: bool = False,
+) -> Dict[int, WindowStats]:
+    """Single pass: {window id: WindowStats}, ids ascending. Rows with ts None are skipped."""
+    if window_us <= 0:
+        raise ValueError(f"window must be > 0 us (got {window_us})")
+    windows: Dict[int, WindowStats] = {}
+    for row in rows:
+        t = ts_us(row)
+        if t is None:
+            continue
+        wid = (t - origin_us) // window_us
+        w = windows.get(wid)
+        if w is None:
+            w = windows[wid] = WindowStats(wid, fields, keep_values)
+        w.count += 1
+        for f, st in w.fields.items():
+            st.add(row[f])
+    return {wid: windows[wid] for wid in sorted(windows)}
+
+
+def _delta_us(td: timedelta) -> int:
+    return (td.days * 86400 + td.seconds) * 1_000_000 + td.microseconds
+
+
+def window_records(
+    entries: Sequence[Mapping],
+    fields: Sequence[str] = PRIORITY_FIELDS,
+    window_s: float = 1.0,
+    quantiles: Sequence[float] = (),
+    ts_key: str = "timestamp",
+) -> List[Dict]:
+    """
+    Windowed aggregate of datetime-stamped dict entries, one dict per window:
+    {'timestamp': window start, 'count': n, <field>: mean, <field>_min,
+    <field>_max, <field>_p<q>...}. Windows are aligned to local midnight of
+    the first entry, so 1 s windows start on whole seconds.
+    """
+    first = next((e[ts_key] for e in entries if e[ts_key] is not None), None)
+    if first is None:
+        return []
+    origin = first.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_us = max(1, round(window_s * 1_000_000))
+
+    def ts_us(e: Mapping) -> Optional[int]:
+        ts = e[ts_key]
+        return None if ts is None else _delta_us(ts - origin)
+
+    out: List[Dict] = []
+    for wid, w in window_stats(entries, ts_us, fields, window_us, keep_values=bool(quantiles)).items():
+        rec: Dict = {ts_key: origin + timedelta(microseconds=wid * window_us), "count": w.count}
+        for f, st in w.fields.items():
+            rec[f] = st.mean
+            rec[f"{f}_min"] = st.min
+            rec[f"{f}_max"] = st.max
+            for q in quantiles:
+                rec[f"{f}_p{q:g}"] = st.percentile(q)
+        out.append(rec)
+    return out
+
+
+def summarize(entries: Iterable[Mapping], fields: Sequence[str] = PRIORITY_FIELDS,
+              keep_values: bool = False) -> Dict[str, FieldStats]:
+    """Whole-input stats of each field in one pass (no window)."""
+    stats = {f: FieldStats(keep_values) for f in fields}
+    for e in entries:
+        for f, st in stats.items():
+            st.add(e[f])
+    return stats
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Windowed mean/min/max/percentiles of CSV columns.")
+    ap.add_argument("csv", help="CSV with a header row (or - for stdin)")
+    ap.add_argument("--time-column", default="t", help="time column in seconds (default: t)")
+    ap.add_argument("--columns", required=True, help="comma-separated value columns")
+    ap.add_argument("--window-s", type=float, default=1.0, help="window size in seconds (default: 1)")
+    ap.add_argument("--quantiles", default="", help="e.g. 50,90,99")
+    ap.add_argument("--no-header", action="store_true", help="do not print the CSV header")
+    args = ap.parse_args()
+
+    if not args.window_s > 0:
+        print("ERROR: --window-s must be > 0", file=sys.stderr)
+        return 2
+    fields = [c.strip() for c in args.columns.split(",") if c.strip()]
+    try:
+        qs = [float(q) for q in args.quantiles.split(",") if q.strip()]
+    except ValueError:
+        print(f"ERROR: bad --quantiles {args.quantiles!r}", file=sys.stderr)
+        return 2
+    window_us = max(1, round(args.window_s * 1_000_000))
+
+    with open_log(args.csv) as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in [args.time_column, *fields] if c not in (reader.fieldnames or [])]
+        if missing:
+            print(f"ERROR: column(s) not in header: {','.join(missing)}", file=sys.stderr)
+            return 2
+        rows = (
+            {"_t_us": round(float(r[args.time_column]) * 1_000_000), **{c: float(r[c]) for c in fields}}
+            for r in reader
+            if r[args.time_column]
+        )
+        windows = window_stats(rows, lambda r: r["_t_us"], fields, window_us, keep_values=bool(qs))
+
+    if not windows:
+        print("ERROR: no rows", file=sys.stderr)
+        return 1
+    if not args.no_header:
+        cols = ["t_start_s", "count"]
+        for c in fields:
+            cols += [f"{c}_mean", f"{c}_min", f"{c}_max"] + [f"{c}_p{q:g}" for q in qs]
+        print(",".join(cols))
+    for wid, w in windows.items():
+        vals = [f"{wid * window_us / 1e6:.6f}", str(w.count)]
+        for c in fields:
+            st = w.fields[c]
+            vals += [f"{st.mean:.6g}", f"{st.min:.6g}", f"{st.max:.6g}"]
+            vals += [f"{st.percentile(q):.6g}" for q in qs]
+        print(",".join(vals))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())